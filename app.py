@@ -4,10 +4,10 @@ import sqlite3
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
-import plotly.express as px
 from utils.translations import t, translation_manager
 from streamlit_option_menu import option_menu
 import logging
+import time
 
 # Aggiungi il percorso della directory corrente al path di Python
 import tempfile
@@ -37,61 +37,14 @@ except ImportError as e:
         st.error("❌ Sistema di autenticazione non disponibile")
     AUTH_SYSTEM = "disabled"
 
-try:
-    from components.charts import Charts
-    print("✅ Charts importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import Charts: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="Charts", error=e))
-    Charts = None
-
-try:
-    from components.client_form import ClientForm
-    print("✅ ClientForm importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import ClientForm: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="ClientForm", error=e))
-    ClientForm = None
-
-try:
-    from components.client_table import ClientTable
-    print("✅ ClientTable importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import ClientTable: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="ClientTable", error=e))
-    ClientTable = None
-
-try:
-    from components.incroci_tab import IncrociTab
-    print("✅ IncrociTab importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import IncrociTab: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="IncrociTab", error=e))
-    IncrociTab = None
-
-try:
-    from components.broker_links_manager import BrokerLinksManager
-    print("✅ BrokerLinksManager importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import BrokerLinksManager: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="BrokerLinksManager", error=e))
-    BrokerLinksManager = None
-
-try:
-    from components.vps_ui import VPSUI
-    print("✅ VPSUI importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import VPSUI: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="VPSUI", error=e))
-    VPSUI = None
-
-try:
-    from components.vps_notifications import VPSNotifications
-    print("✅ VPSNotifications importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import VPSNotifications: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="VPSNotifications", error=e))
-    VPSNotifications = None
+# Registro pagine: i moduli delle singole pagine vengono importati solo quando
+# la pagina viene selezionata per la prima volta (login e menu non li caricano)
+from components.pages import (
+    pages, Charts, ClientForm, ClientTable, IncrociTab, IncrociManager, BrokerLinksManager, VPSUI,
+    VPSNotifications, render_ai_assistant, render_user_navigation, WalletTransactionsManager,
+    WalletTransactionForm, WalletTransactionTable, WalletManagement, DepositManagement,
+    DatabaseBackupManager, auto_backup, create_secure_backup, list_secure_backups, restore_from_secure_backup
+)
 
 try:
     from database.database import DatabaseManager
@@ -100,13 +53,6 @@ except Exception as e:
     print(f"❌ Errore import DatabaseManager: {e}")
     st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="DatabaseManager", error=e))
 
-try:
-    from database.incroci_manager import IncrociManager
-    print("✅ IncrociManager importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import IncrociManager: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="IncrociManager", error=e))
-
 try:
     from utils.helpers import *
     print("✅ utils.helpers importato correttamente")
@@ -114,61 +60,16 @@ except Exception as e:
     print(f"❌ Errore import utils.helpers: {e}")
     st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="utils.helpers", error=e))
 
+# Import menu di navigazione (necessario prima della selezione della pagina)
 try:
-    from utils.backup import DatabaseBackupManager, auto_backup
-    print("✅ utils.backup importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import utils.backup: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="utils.backup", error=e))
-
-try:
-    from utils.secure_backup import create_secure_backup, list_secure_backups, restore_from_secure_backup
-    print("✅ utils.secure_backup importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import utils.secure_backup: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="utils.secure_backup", error=e))
-
-# Import AI Assistant
-try:
-    from components.ai_assistant.ai_ui_components import render_ai_assistant
-    print("✅ AI Assistant importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import AI Assistant: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="AI Assistant", error=e))
-
-# Import sistema gestione utenti
-try:
-    from components.user_navigation import render_user_navigation
     from components.layout.central_menu import render_central_menu, render_compact_sidebar
     print("✅ Sistema gestione utenti importato correttamente")
 except Exception as e:
     print(f"❌ Errore import sistema gestione utenti: {e}")
     st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="sistema gestione utenti", error=e))
-    render_user_navigation = None
     render_central_menu = None
     render_compact_sidebar = None
 
-# Sistema impostazioni utente integrato direttamente nell'app
-
-# Sistema gestione permessi integrato direttamente nell'app
-
-# Import sistema gestione wallet
-try:
-    from components.wallet_transactions_manager import WalletTransactionsManager
-    from components.wallet_transaction_form import WalletTransactionForm
-    from components.wallet_transaction_table import WalletTransactionTable
-    from components.wallet_management import WalletManagement
-    from components.deposit_management import DepositManagement
-    print("✅ Sistema gestione wallet importato correttamente")
-except Exception as e:
-    print(f"❌ Errore import sistema gestione wallet: {e}")
-    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module="sistema gestione wallet", error=e))
-    WalletTransactionsManager = None
-    WalletTransactionForm = None
-    WalletTransactionTable = None
-    WalletManagement = None
-    DepositManagement = None
-
 # Configurazione pagina
 st.set_page_config(
     page_title=t("dashboard.title", "Dashboard Gestione CPA"),
@@ -177,54 +78,53 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Inizializzazione del database
+# Inizializzazione del database (condiviso tra rerun e sessioni)
+@st.cache_resource
 def init_database():
     """Inizializza il database"""
     return DatabaseManager()
 
+def _build_incroci_modern(registry, db):
+    """Crea la versione moderna della sezione incroci"""
+    from components.incroci_modern import IncrociModern
+    return IncrociModern(registry['incroci_manager'], db)
+
 # Inizializzazione dei componenti
-def init_components(db):
-    """Inizializza i componenti"""
-    try:
-        print("🔧 Inizializzazione componenti...")
-        
-        components_dict = {}
-        
-        # Inizializza solo i componenti disponibili
-        if ClientForm:
-            components_dict['client_form'] = ClientForm()
-        if ClientTable:
-            components_dict['client_table'] = ClientTable()
-        if Charts:
-            components_dict['charts'] = Charts()
-        if IncrociTab and IncrociManager:
-            # Usa l'istanza esistente di IncrociManager invece di crearne una nuova
-            incroci_manager = IncrociManager()
-            components_dict['incroci_tab'] = IncrociTab(incroci_manager, db)
-            components_dict['incroci_manager'] = incroci_manager
-        if BrokerLinksManager:
-            components_dict['broker_links_manager'] = BrokerLinksManager()
-        
-        # Componenti wallet
-        if WalletTransactionsManager:
-            wallet_manager = WalletTransactionsManager()
-            components_dict['wallet_manager'] = wallet_manager
-            if WalletTransactionForm:
-                components_dict['wallet_form'] = WalletTransactionForm(wallet_manager)
-            if WalletTransactionTable:
-                components_dict['wallet_table'] = WalletTransactionTable(wallet_manager)
-            if WalletManagement:
-                components_dict['wallet_management'] = WalletManagement(wallet_manager)
-            if DepositManagement:
-                components_dict['deposit_management'] = DepositManagement(wallet_manager)
-        
-        print("✅ Componenti inizializzati correttamente")
-        return components_dict
-        
-    except Exception as e:
-        print(f"❌ Errore inizializzazione componenti: {e}")
-        st.error(f"Errore inizializzazione componenti: {e}")
-        return None
+@st.cache_resource
+def init_components(_db):
+    """
+    Crea il registro dei componenti (uno per processo, condiviso tra rerun e sessioni)
+    
+    I componenti vengono costruiti solo quando la pagina attiva li richiede.
+    """
+    from components.component_registry import ComponentRegistry
+    
+    registry = ComponentRegistry()
+    
+    # Registra i componenti: i moduli vengono importati alla prima richiesta della pagina
+    registry.register('client_form', lambda r: ClientForm(), requires=[ClientForm])
+    registry.register('client_table', lambda r: ClientTable(), requires=[ClientTable])
+    registry.register('charts', lambda r: Charts(), requires=[Charts])
+    registry.register('incroci_manager', lambda r: IncrociManager(), requires=[IncrociManager])
+    registry.register('incroci_modern', lambda r: _build_incroci_modern(r, _db), requires=[IncrociManager])
+    # Usa l'istanza condivisa di IncrociManager invece di crearne una nuova
+    registry.register('incroci_tab', lambda r: IncrociTab(r['incroci_manager'], _db),
+                      requires=[IncrociManager, IncrociTab])
+    registry.register('broker_links_manager', lambda r: BrokerLinksManager(), requires=[BrokerLinksManager])
+    
+    # Componenti wallet (condividono lo stesso WalletTransactionsManager)
+    registry.register('wallet_manager', lambda r: WalletTransactionsManager(), requires=[WalletTransactionsManager])
+    registry.register('wallet_form', lambda r: WalletTransactionForm(r['wallet_manager']),
+                      requires=[WalletTransactionsManager, WalletTransactionForm])
+    registry.register('wallet_table', lambda r: WalletTransactionTable(r['wallet_manager']),
+                      requires=[WalletTransactionsManager, WalletTransactionTable])
+    registry.register('wallet_management', lambda r: WalletManagement(r['wallet_manager']),
+                      requires=[WalletTransactionsManager, WalletManagement])
+    registry.register('deposit_management', lambda r: DepositManagement(r['wallet_manager']),
+                      requires=[WalletTransactionsManager, DepositManagement])
+    
+    print("✅ Registro componenti creato")
+    return registry
 
 # Creazione automatica tabelle se non esistono
 def create_database_tables():
@@ -295,11 +195,10 @@ try:
     print("✅ Database inizializzato correttamente")
     
     print("🔧 Inizializzazione componenti...")
+    _components_start = time.perf_counter()
     components = init_components(db)
-    if components is None:
-        st.error("❌ Impossibile inizializzare i componenti. Controlla i log per dettagli.")
-        st.stop()
-    print("✅ Componenti inizializzati correttamente")
+    print(f"✅ Componenti pronti in {(time.perf_counter() - _components_start) * 1000:.1f} ms "
+          f"(costruiti: {', '.join(components.built()) or 'nessuno'})")
     
     # DISABILITATO: Non creiamo tabelle SQLite perché usiamo solo Supabase
     # print("🔧 Creazione tabelle database...")
@@ -529,11 +428,23 @@ else:
 if render_compact_sidebar:
     render_compact_sidebar()
 
+# Import dei moduli della pagina selezionata (solo alla prima visita della pagina)
+for modulo, errore in pages.load_page(page):
+    print(f"❌ Errore import {modulo}: {errore}")
+    st.error(t("system.errors.import_error", "Errore import {module}: {error}").format(module=modulo, error=errore))
+
 # Funzioni per la gestione dei clienti
-def sync_all_data_to_supabase():
-    """Sincronizza manualmente tutti i dati dal database locale a Supabase"""
+def sync_all_data_to_supabase(bulk: bool = True, chunk_size: int = None):
+    """
+    Sincronizza manualmente tutti i dati dal database locale a Supabase
+    
+    Args:
+        bulk: Se True confronta in memoria con l'indice email remoto e invia upsert a blocchi,
+              altrimenti sincronizza un cliente alla volta
+        chunk_size: Righe per blocco in modalità bulk (default SUPABASE_SYNC_CHUNK_SIZE)
+    """
     try:
-        from supabase_manager import SupabaseManager
+        from supabase_manager import SupabaseManager, BULK_SYNC_CHUNK_SIZE
         
         # Inizializza manager Supabase
         supabase_manager = SupabaseManager()
@@ -553,6 +464,9 @@ def sync_all_data_to_supabase():
         elif not clienti_locali:
             return False, "❌ Nessun cliente presente nel database locale"
         
+        if bulk:
+            return _sync_clienti_bulk(supabase_manager, clienti_locali, chunk_size or BULK_SYNC_CHUNK_SIZE)
+        
         # Contatori per statistiche
         sincronizzati = 0
         errori = 0
@@ -567,6 +481,10 @@ def sync_all_data_to_supabase():
         # Log dettagliato per debug
         debug_info = []
         
+        # Indice email dei clienti Supabase (recuperato una sola volta)
+        clienti_per_email = {c.get('email'): c for c in supabase_manager.get_clienti()}
+        email_aggiunte = set()
+        
         for i, cliente in enumerate(clienti_locali):
             # Aggiorna progress bar
             progress = (i + 1) / len(clienti_locali)
@@ -577,26 +495,16 @@ def sync_all_data_to_supabase():
             
             try:
                 # Prepara dati per Supabase
-                supabase_data = {
-                    'nome_cliente': str(cliente.get('nome_cliente', '')),
-                    'email': str(cliente.get('email', f"cliente_{i}@local.com")),
-                    'broker': str(cliente.get('broker', '')),
-                    'piattaforma': str(cliente.get('piattaforma', '')),
-                    'numero_conto': str(cliente.get('numero_conto', '')),
-                    'volume_posizione': float(cliente.get('deposito', 0.0))
-                }
+                supabase_data = _prepara_cliente_supabase(cliente, i)
                 
                 # Log dati preparati
                 debug_info.append(f"Cliente {i+1}: {supabase_data['nome_cliente']} - Email: {supabase_data['email']}")
                 
                 # Verifica se il cliente esiste già in Supabase (per email)
-                clienti_supabase = supabase_manager.get_clienti()
-                cliente_esistente = None
-                
-                for c in clienti_supabase:
-                    if c.get('email') == supabase_data['email']:
-                        cliente_esistente = c
-                        break
+                if supabase_data['email'] in email_aggiunte and supabase_data['email'] not in clienti_per_email:
+                    # Email ripetuta nei dati locali: serve l'id del cliente appena creato
+                    clienti_per_email = {c.get('email'): c for c in supabase_manager.get_clienti()}
+                cliente_esistente = clienti_per_email.get(supabase_data['email'])
                 
                 if cliente_esistente:
                     # Aggiorna cliente esistente
@@ -614,6 +522,7 @@ def sync_all_data_to_supabase():
                     success, message = supabase_manager.add_cliente(supabase_data)
                     if success:
                         sincronizzati += 1
+                        email_aggiunte.add(supabase_data['email'])
                         debug_info.append(f"✅ Aggiunto: {supabase_data['nome_cliente']}")
                     else:
                         errori += 1
@@ -651,6 +560,48 @@ def sync_all_data_to_supabase():
     except Exception as e:
         return False, f"❌ Errore sincronizzazione: {e}"
 
+def _prepara_cliente_supabase(cliente, indice):
+    """Converte un cliente del database locale nel formato della tabella clienti Supabase"""
+    return {
+        'nome_cliente': str(cliente.get('nome_cliente', '')),
+        'email': str(cliente.get('email', f"cliente_{indice}@local.com")),
+        'broker': str(cliente.get('broker', '')),
+        'piattaforma': str(cliente.get('piattaforma', '')),
+        'numero_conto': str(cliente.get('numero_conto', '')),
+        'volume_posizione': float(cliente.get('deposito', 0.0))
+    }
+
+def _sync_clienti_bulk(supabase_manager, clienti_locali, chunk_size):
+    """Sincronizzazione bulk: diff in memoria e upsert a blocchi per email"""
+    st.info(f"🔄 Sincronizzazione bulk in corso... {len(clienti_locali)} clienti, blocchi da {chunk_size}")
+    
+    dati_supabase = [_prepara_cliente_supabase(cliente, i) for i, cliente in enumerate(clienti_locali)]
+    risultato = supabase_manager.bulk_upsert_clienti(dati_supabase, chunk_size=chunk_size)
+    
+    # Mostra log dettagliato
+    with st.expander("📋 Log Dettagliato Sincronizzazione", expanded=True):
+        if risultato['chunks']:
+            st.dataframe(pd.DataFrame(risultato['chunks']), use_container_width=True, hide_index=True)
+        for messaggio in risultato['messaggi_errore']:
+            st.write(messaggio)
+        
+        st.write(f"\n**📊 Riepilogo finale:**")
+        st.write(f"• Inseriti: {risultato['inseriti']}")
+        st.write(f"• Aggiornati: {risultato['aggiornati']}")
+        st.write(f"• Invariati: {risultato['invariati']}")
+        st.write(f"• Errori: {risultato['errori']}")
+        st.write(f"• Email duplicate (accorpate nell'ultima riga): {risultato['duplicati']}")
+        st.write(f"• Senza email (non sincronizzati): {risultato['senza_email']}")
+        st.write(f"• Totale processati: {len(clienti_locali)}")
+    
+    # Risultato finale
+    scartati = risultato['duplicati'] + risultato['senza_email']
+    if risultato['errori'] == 0:
+        return True, (f"✅ Sincronizzazione completata! {risultato['inseriti']} nuovi clienti, {risultato['aggiornati']} aggiornati, "
+                      f"{risultato['invariati']} invariati" + (f", {scartati} righe duplicate o senza email" if scartati else ""))
+    else:
+        return True, f"⚠️ Sincronizzazione parziale: {risultato['inseriti']} nuovi, {risultato['aggiornati']} aggiornati, {risultato['errori']} errori"
+
 def handle_save_client(dati_cliente, campi_aggiuntivi):
     """Gestisce il salvataggio di un nuovo cliente"""
     # Salva nel database locale
@@ -697,25 +648,13 @@ def handle_save_client(dati_cliente, campi_aggiuntivi):
                             wallet_manager = WalletTransactionsManager()
                             
                             if wallet_manager.supabase_manager:
-                                # Verifica se il wallet esiste già
-                                existing_wallets = wallet_manager.get_wallet_collaboratori()
-                                wallet_exists = False
-                                for w in existing_wallets:
-                                    note = w.get('note') or ''
-                                    if 'Wallet:' in note:
-                                        try:
-                                            wallet_address = note.split('Wallet:')[1].split('|')[0].strip()
-                                            if wallet_address == dati_cliente['wallet'].strip():
-                                                wallet_exists = True
-                                                break
-                                        except Exception:
-                                            # Se c'è un errore nel parsing, continua
-                                            continue
+                                # Verifica se il wallet esiste già (indice indirizzo -> wallet)
+                                wallet_exists = wallet_manager.find_wallet_by_address(dati_cliente['wallet']) is not None
                                 
                                 if not wallet_exists:
-                                    # Recupera l'ID del cliente appena creato da Supabase (più recente)
-                                    clienti_response = wallet_manager.supabase_manager.supabase.table('clienti').select('id').eq('email', dati_cliente['email']).eq('nome_cliente', dati_cliente['nome_cliente']).order('created_at', desc=True).limit(1).execute()
-                                    cliente_id = clienti_response.data[0]['id'] if clienti_response.data else None
+                                    # Recupera l'ID del cliente appena creato (la rubrica legge solo i clienti modificati)
+                                    cliente = wallet_manager.supabase_manager.get_client_directory().by_email(dati_cliente['email'])
+                                    cliente_id = cliente['id'] if cliente and cliente.get('nome_cliente') == dati_cliente['nome_cliente'] else None
                                     
                                     if cliente_id:
                                         # Crea nuovo wallet nel sistema dedicato
@@ -729,11 +668,14 @@ def handle_save_client(dati_cliente, campi_aggiuntivi):
                                             'proprietario': dati_cliente['nome_cliente'],
                                             'attivo': True,
                                             'note': f"Wallet: {dati_cliente['wallet'].strip()} | Cliente: {dati_cliente['nome_cliente']} (ID: {cliente_id})",
+                                            'wallet_address': dati_cliente['wallet'].strip(),
+                                            'cliente_id': cliente_id,
                                             'created_at': datetime.now().isoformat(),
                                             'updated_at': datetime.now().isoformat()
                                         }
                                         
                                         response = wallet_manager.supabase_manager.supabase.table('wallet_collaboratori').insert(wallet_data).execute()
+                                        wallet_manager.supabase_manager.invalidate_cache('wallet_collaboratori')
                                         
                                         if response.data:
                                             st.success(f"💰 Wallet automaticamente creato nel sistema dedicato per {dati_cliente['nome_cliente']}")
@@ -881,22 +823,10 @@ def handle_update_client(cliente_id, dati_cliente, campi_aggiuntivi):
                                 wallet_manager = WalletTransactionsManager()
                                 
                                 if wallet_manager.supabase_manager:
-                                    # Verifica se il wallet esiste già
-                                    existing_wallets = wallet_manager.get_wallet_collaboratori()
-                                    wallet_exists = False
-                                    for w in existing_wallets:
-                                        note = w.get('note') or ''
-                                        if 'Wallet:' in note:
-                                            try:
-                                                wallet_address = note.split('Wallet:')[1].split('|')[0].strip()
-                                                if wallet_address == dati_cliente['wallet'].strip():
-                                                    wallet_exists = True
-                                                    break
-                                            except Exception:
-                                                # Se c'è un errore nel parsing, continua
-                                                continue
+                                    # Verifica se il wallet esiste già (indice indirizzo -> wallet)
+                                    wallet_to_update = wallet_manager.find_wallet_by_address(dati_cliente['wallet'])
                                     
-                                    if not wallet_exists:
+                                    if not wallet_to_update:
                                         # Crea nuovo wallet nel sistema dedicato
                                         # Crea nome wallet univoco usando parte dell'indirizzo
                                         wallet_suffix = dati_cliente['wallet'].strip()[-8:] if len(dati_cliente['wallet'].strip()) >= 8 else dati_cliente['wallet'].strip()
@@ -908,39 +838,33 @@ def handle_update_client(cliente_id, dati_cliente, campi_aggiuntivi):
                                             'proprietario': dati_cliente['nome_cliente'],
                                             'attivo': True,
                                             'note': f"Wallet: {dati_cliente['wallet'].strip()} | Cliente: {dati_cliente['nome_cliente']} (ID: {cliente_supabase['id']})",
+                                            'wallet_address': dati_cliente['wallet'].strip(),
+                                            'cliente_id': cliente_supabase['id'],
                                             'created_at': datetime.now().isoformat(),
                                             'updated_at': datetime.now().isoformat()
                                         }
                                         
                                         response = wallet_manager.supabase_manager.supabase.table('wallet_collaboratori').insert(wallet_data).execute()
+                                        wallet_manager.supabase_manager.invalidate_cache('wallet_collaboratori')
                                         
                                         if response.data:
                                             st.info(f"💰 Wallet automaticamente creato nel sistema dedicato per {dati_cliente['nome_cliente']}")
                                         else:
                                             st.warning(f"⚠️ Wallet non creato nel sistema dedicato per {dati_cliente['nome_cliente']}")
                                     else:
-                                        # Aggiorna wallet esistente se necessario
-                                        wallet_to_update = None
-                                        for w in existing_wallets:
-                                            note = w.get('note') or ''
-                                            if 'Wallet:' in note:
-                                                try:
-                                                    wallet_address = note.split('Wallet:')[1].split('|')[0].strip()
-                                                    if wallet_address == dati_cliente['wallet'].strip():
-                                                        wallet_to_update = w
-                                                        break
-                                                except Exception:
-                                                    continue
-                                        
-                                        if wallet_to_update and cliente_supabase['id'] not in (wallet_to_update.get('note') or ''):
+                                        # Aggiorna wallet esistente se collegato a un altro cliente
+                                        if wallet_manager.find_wallet_by_address(dati_cliente['wallet'], cliente_supabase['id']) is None:
                                             # Aggiorna il collegamento al cliente
                                             wallet_suffix = dati_cliente['wallet'].strip()[-8:] if len(dati_cliente['wallet'].strip()) >= 8 else dati_cliente['wallet'].strip()
                                             wallet_manager.supabase_manager.supabase.table('wallet_collaboratori').update({
                                                 'proprietario': dati_cliente['nome_cliente'],
                                                 'updated_at': datetime.now().isoformat(),
                                                 'nome_wallet': f"Wallet {dati_cliente['nome_cliente']} - {wallet_suffix}",
-                                                'note': f"Wallet: {dati_cliente['wallet'].strip()} | Cliente: {dati_cliente['nome_cliente']} (ID: {cliente_supabase['id']})"
+                                                'note': f"Wallet: {dati_cliente['wallet'].strip()} | Cliente: {dati_cliente['nome_cliente']} (ID: {cliente_supabase['id']})",
+                                                'wallet_address': dati_cliente['wallet'].strip(),
+                                                'cliente_id': cliente_supabase['id']
                                             }).eq('id', wallet_to_update['id']).execute()
+                                            wallet_manager.supabase_manager.invalidate_cache('wallet_collaboratori')
                                             st.info(f"💰 Wallet aggiornato nel sistema dedicato per {dati_cliente['nome_cliente']}")
                                         else:
                                             st.info(f"ℹ️ Wallet {dati_cliente['wallet']} già collegato al cliente")
@@ -969,7 +893,7 @@ if page == "🏠 Dashboard":
     render_user_navigation()
     
     # Mostra notifiche VPS se disponibili
-    if VPSNotifications is not None:
+    if VPSNotifications:
         vps_notifications = VPSNotifications()
         vps_notifications.render_notifications_banner()
     
@@ -991,9 +915,6 @@ elif page == "👥 Gestione Clienti":
         st.info("💡 Controlla che il componente sia stato importato correttamente")
         st.stop()
     
-    # Ottieni dati da Supabase tramite ClientTable
-    df_clienti = components['client_table'].get_clienti()
-    
     # Se stiamo modificando un cliente
     if st.session_state.editing_client:
         st.subheader("✏️ Modifica Cliente")
@@ -1024,8 +945,8 @@ elif page == "👥 Gestione Clienti":
             if success:
                 handle_save_client(dati_cliente, campi_aggiuntivi)
         
-        # Tabella dei clienti esistenti (sempre visibile)
-        if not df_clienti.empty:
+        # Tabella dei clienti esistenti (sempre visibile, paginata lato server)
+        if components['client_table'].has_clienti():
             st.markdown("---")
             st.subheader("📋 Clienti Esistenti")
             
@@ -1076,9 +997,6 @@ elif page == "🔄 Incroci":
         if st.session_state.get('incroci_version', 'original') == 'modern':
             # Versione moderna
             try:
-                from components.incroci_modern import IncrociModern
-                if 'incroci_modern' not in components:
-                    components['incroci_modern'] = IncrociModern(IncrociManager(), db)
                 components['incroci_modern'].render()
             except Exception as e:
                 st.error(f"❌ Errore caricamento versione moderna: {e}")
@@ -1108,7 +1026,7 @@ elif page == "🔗 Broker":
 
 elif page == "🖥️ VPS":
     # Controlla se il componente è disponibile
-    if VPSUI is None:
+    if not VPSUI:
         st.error("❌ **Componente VPS non disponibile**")
         st.info("💡 Assicurati che il componente VPS sia installato correttamente")
     else:
@@ -1238,10 +1156,11 @@ elif page == "💰 Wallet":
                         
                         if all_wallets:
                             import pandas as pd
+                            saldi = wallet_manager.get_all_wallet_balances()
                             wallet_data = []
                             for wallet in all_wallets:
                                 if wallet.get('attivo', True):
-                                    saldo = wallet_manager.calculate_wallet_balance(wallet['nome_wallet'])
+                                    saldo = saldi.get(wallet['nome_wallet'], 0.0)
                                     wallet_data.append({
                                         'nome_wallet': wallet['nome_wallet'],
                                         'proprietario': wallet.get('proprietario', 'N/A'),
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+⏱️ BENCHMARK REGISTRO COMPONENTI
+Confronta la costruzione eager di tutti i componenti ad ogni rerun (vecchio init_components)
+con il registro lazy condiviso (solo i componenti della pagina attiva, riusati tra i rerun)
+
+Uso: python benchmark_component_registry.py [--reruns 20] [--page clienti]
+"""
+
+import sys
+import os
+import time
+import tempfile
+import argparse
+import logging
+
+# Aggiungi il path del progetto
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+logging.basicConfig(level=logging.WARNING)
+
+# Componenti richiesti da ciascuna pagina
+PAGE_COMPONENTS = {
+    'clienti': ['client_form', 'client_table'],
+    'incroci': ['incroci_tab'],
+    'broker': ['broker_links_manager'],
+    'wallet': ['wallet_form', 'wallet_table', 'wallet_management', 'deposit_management'],
+    'riepilogo': ['client_table', 'charts'],
+}
+
+def _factories():
+    """Factory equivalenti a quelle registrate in app.py"""
+    from components.client_form import ClientForm
+    from components.client_table import ClientTable
+    from components.charts import Charts
+    from components.incroci_tab import IncrociTab
+    from components.broker_links_manager import BrokerLinksManager
+    from database.incroci_manager import IncrociManager
+    from database.database import DatabaseManager
+    from components.wallet_transactions_manager import WalletTransactionsManager
+    from components.wallet_transaction_form import WalletTransactionForm
+    from components.wallet_transaction_table import WalletTransactionTable
+    from components.wallet_management import WalletManagement
+    from components.deposit_management import DepositManagement
+
+    # Database SQLite in una directory temporanea: il benchmark non modifica cpa_database.db
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'cpa_database.db'))
+    return {
+        'client_form': lambda r: ClientForm(),
+        'client_table': lambda r: ClientTable(),
+        'charts': lambda r: Charts(),
+        'incroci_manager': lambda r: IncrociManager(),
+        'incroci_tab': lambda r: IncrociTab(r['incroci_manager'], db),
+        'broker_links_manager': lambda r: BrokerLinksManager(),
+        'wallet_manager': lambda r: WalletTransactionsManager(),
+        'wallet_form': lambda r: WalletTransactionForm(r['wallet_manager']),
+        'wallet_table': lambda r: WalletTransactionTable(r['wallet_manager']),
+        'wallet_management': lambda r: WalletManagement(r['wallet_manager']),
+        'deposit_management': lambda r: DepositManagement(r['wallet_manager']),
+    }
+
+def _build(registry, names, errors):
+    """Costruisce i componenti indicati, annotando quelli che falliscono"""
+    for name in names:
+        try:
+            registry[name]
+        except Exception as e:
+            errors.setdefault(name, f"{type(e).__name__}: {e}"[:120])
+
+def run_benchmark(reruns: int, page: str):
+    """Misura avvio e rerun con costruzione eager e con registro lazy"""
+    from components.component_registry import ComponentRegistry
+
+    start = time.perf_counter()
+    factories = _factories()
+    import_ms = (time.perf_counter() - start) * 1000
+
+    def new_registry():
+        registry = ComponentRegistry()
+        for name, factory in factories.items():
+            registry.register(name, factory)
+        return registry
+
+    errors = {}
+
+    # PRIMA: ogni rerun ricostruiva tutti i componenti
+    eager_times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        _build(new_registry(), list(factories), errors)
+        eager_times.append((time.perf_counter() - start) * 1000)
+
+    # DOPO: registro unico, solo i componenti della pagina attiva
+    registry = new_registry()
+    start = time.perf_counter()
+    _build(registry, PAGE_COMPONENTS[page], errors)
+    lazy_startup = (time.perf_counter() - start) * 1000
+
+    lazy_times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        _build(registry, PAGE_COMPONENTS[page], errors)
+        lazy_times.append((time.perf_counter() - start) * 1000)
+
+    print(f"📦 Import moduli componenti: {import_ms:.1f} ms")
+    print(f"🐢 PRIMA  - avvio: {eager_times[0]:.2f} ms | rerun medio: {sum(eager_times[1:]) / max(len(eager_times) - 1, 1):.2f} ms "
+          f"({len(factories)} componenti per rerun)")
+    print(f"🚀 DOPO   - avvio pagina '{page}': {lazy_startup:.2f} ms | rerun medio: {sum(lazy_times) / len(lazy_times):.4f} ms "
+          f"({len(registry.built())} componenti costruiti una volta)")
+    if errors:
+        print("⚠️ Componenti non costruibili in questo ambiente:")
+        for name, error in errors.items():
+            print(f"   • {name}: {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark registro componenti app.py")
+    parser.add_argument('--reruns', type=int, default=20, help="Numero di rerun simulati")
+    parser.add_argument('--page', choices=sorted(PAGE_COMPONENTS), default='clienti', help="Pagina attiva")
+    args = parser.parse_args()
+    run_benchmark(args.reruns, args.page)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+⏱️ BENCHMARK IMPORT TIME
+Profilo degli import (python -X importtime) dell'avvio di app.py e di ciascuna pagina
+Ogni misura gira in un processo nuovo, quindi è un cold start reale
+
+Uso:
+    python benchmark_import_time.py                     # avvio + tutte le pagine
+    python benchmark_import_time.py --top 15            # moduli più lenti per gruppo
+    python benchmark_import_time.py --budget-ms 1500    # exit 1 se l'avvio supera il budget
+"""
+
+import sys
+import os
+import ast
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Import aggiuntivi del vecchio avvio eager (components/__init__ caricava storage, app.py plotly)
+LEGACY_EAGER_MODULES = ['components.storage', 'plotly.express', 'utils.backup', 'utils.secure_backup']
+
+def startup_modules() -> List[str]:
+    """Moduli importati a livello di modulo da app.py (anche dentro try), cioè prima del login"""
+    with open(os.path.join(PROJECT_DIR, 'app.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+
+    modules: List[str] = []
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop(0)
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+        elif isinstance(node, ast.Try):
+            pending[:0] = node.body
+    return list(dict.fromkeys(modules))
+
+def page_modules() -> Dict[str, List[str]]:
+    """Moduli importati alla prima visita di ciascuna pagina, dal registro usato da app.py"""
+    sys.path.insert(0, PROJECT_DIR)
+    from components.pages import pages
+    return pages.page_modules()
+
+def profile_imports(modules: List[str], preloaded: List[str] = ()) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Importa i moduli in un processo nuovo con -X importtime
+
+    Args:
+        modules: Moduli da misurare
+        preloaded: Moduli importati prima (il loro costo non viene conteggiato)
+
+    Returns:
+        (millisecondi totali, [(modulo, ms cumulativi)] per i moduli caricati dalla misura)
+    """
+    marker = "import sys; sys.stderr.write('--- MISURA ---\\n')"
+    code = "; ".join(
+        [f"import {m}" for m in preloaded] + [marker] + [f"import {m}" for m in modules]
+    )
+    env = dict(os.environ, PYTHONPATH=PROJECT_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, cwd=PROJECT_DIR, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'errore import')
+
+    lines = result.stderr.split('--- MISURA ---\n', 1)[-1].splitlines()
+    entries: List[Tuple[str, float, int]] = []
+    for line in lines:
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append((name.strip(), int(cumulative_us) / 1000, depth))
+
+    # I moduli di primo livello (profondità minima) sommano l'intero costo della misura
+    min_depth = min((depth for _, _, depth in entries), default=0)
+    total_ms = sum(ms for _, ms, depth in entries if depth == min_depth)
+    slowest = sorted(((name, ms) for name, ms, _ in entries), key=lambda item: item[1], reverse=True)
+    return total_ms, slowest
+
+def _print_group(title: str, total_ms: float, slowest: List[Tuple[str, float]], top: int):
+    print(f"{title}: {total_ms:.1f} ms")
+    for name, ms in slowest[:top]:
+        print(f"   {ms:8.1f} ms  {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Profilo import-time di app.py e delle pagine")
+    parser.add_argument('--top', type=int, default=5, help="Moduli più lenti da mostrare per gruppo")
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help="Budget per gli import di avvio: exit 1 se superato")
+    args = parser.parse_args()
+
+    startup = startup_modules()
+    pages = page_modules()
+
+    startup_ms, startup_slowest = profile_imports(startup)
+    _print_group("🚀 Avvio (prima del login)", startup_ms, startup_slowest, args.top)
+
+    for page, modules in pages.items():
+        try:
+            page_ms, page_slowest = profile_imports(modules, preloaded=startup)
+        except RuntimeError as e:
+            print(f"❌ {page}: {e}")
+            continue
+        _print_group(f"📄 Prima visita {page}", page_ms, page_slowest, args.top)
+
+    eager_ms, _ = profile_imports(startup + LEGACY_EAGER_MODULES +
+                                  sorted({m for ms in pages.values() for m in ms}))
+    print(f"📦 Import eager di tutte le pagine (comportamento precedente): {eager_ms:.1f} ms")
+
+    if args.budget_ms is not None and startup_ms > args.budget_ms:
+        print(f"❌ Avvio {startup_ms:.1f} ms oltre il budget di {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
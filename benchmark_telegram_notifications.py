@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+⏱️ BENCHMARK NOTIFICHE TELEGRAM IN RAFFICA
+Sincronizzazione massiva simulata: N notifiche new_client inviate con TelegramManager.send_notification
+verso un server locale che imita la Bot API, con limite per chat e risposte 429 (retry_after).
+
+Scenari:
+    PRIMA   nessun limite lato client, un messaggio per evento (i 429 finiscono nei retry)
+    DOPO    token bucket per chat allineato al limite del server
+    DOPO    token bucket + accorpamento degli eventi in riepiloghi
+
+I ritardi dei retry sono ridotti rispetto alla produzione per contenere la durata del benchmark.
+
+Uso: python benchmark_telegram_notifications.py [--events 100] [--rate 10] [--burst 5] [--window 1.0]
+"""
+
+import sys
+import os
+import re
+import json
+import math
+import time
+import threading
+import argparse
+import logging
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Aggiungi il path del progetto
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+logging.basicConfig(level=logging.CRITICAL)
+
+CHAT_ID = '-1001234567890'
+RETRY_DELAYS = [0.5, 1, 2, 4]
+_EVENT_RE = re.compile(r'Cliente Sync (\d+)')
+
+class MockBotAPI(BaseHTTPRequestHandler):
+    """sendMessage con token bucket per chat: oltre il limite risponde 429 con retry_after"""
+
+    rate = 10.0
+    burst = 5.0
+    buckets = {}
+    requests = 0
+    rejected = 0
+    delivered = []
+
+    @classmethod
+    def reset(cls, rate: float, burst: float):
+        cls.rate, cls.burst = rate, burst
+        cls.buckets, cls.requests, cls.rejected, cls.delivered = {}, 0, 0, []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        cls = MockBotAPI
+        cls.requests += 1
+
+        now = time.monotonic()
+        tokens, updated_at = cls.buckets.get(payload['chat_id'], (cls.burst, now))
+        tokens = min(cls.burst, tokens + (now - updated_at) * cls.rate)
+        if tokens >= 1:
+            cls.buckets[payload['chat_id']] = (tokens - 1, now)
+            cls.delivered.append(payload['text'])
+            status, body = 200, {'ok': True, 'result': {'message_id': len(cls.delivered)}}
+        else:
+            cls.buckets[payload['chat_id']] = (tokens, now)
+            cls.rejected += 1
+            retry_after = math.ceil((1 - tokens) / cls.rate)
+            status, body = 429, {'ok': False, 'error_code': 429,
+                                 'description': f'Too Many Requests: retry after {retry_after}',
+                                 'parameters': {'retry_after': retry_after}}
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def make_telegram_manager():
+    """TelegramManager configurato senza leggere la configurazione da Supabase"""
+    from components.telegram_manager import TelegramManager
+
+    manager = TelegramManager.__new__(TelegramManager)
+    manager.bot_token = 'BENCHMARK'
+    manager.chat_id = CHAT_ID
+    manager.is_configured = True
+    manager.supabase_manager = None
+    return manager
+
+def run_scenario(events: int, server, rate: float, burst: float, limiter: bool, window: float):
+    """Invia `events` notifiche new_client e attende la consegna o il fallimento di tutti i messaggi"""
+    from components import telegram_dispatcher
+    from components.telegram_dispatcher import TelegramDispatcher, ChatRateLimiter
+
+    MockBotAPI.reset(rate, burst)
+    dispatcher = TelegramDispatcher(
+        log_writer=lambda rows: None, retry_delays=RETRY_DELAYS, spool_path=None,
+        api_base=f"http://127.0.0.1:{server.server_port}",
+        rate_limiter=ChatRateLimiter(group_rate=rate, group_burst=burst) if limiter else None,
+        coalesce_window=window
+    )
+    telegram_dispatcher._dispatcher = dispatcher
+    manager = make_telegram_manager()
+
+    start = time.perf_counter()
+    for i in range(events):
+        manager.send_notification('new_client', {
+            'nome_cliente': f'Cliente Sync {i}', 'email': f'cliente{i}@example.com',
+            'telefono': '+39 000 0000000', 'broker': 'Broker Demo', 'created_at': '2026-03-10 09:00'
+        })
+    enqueue_ms = (time.perf_counter() - start) * 1000
+
+    while True:
+        stats = dispatcher.get_stats()
+        if (stats['queue_size'] == 0 and not stats['retry_pending'] and not stats['throttled_pending']
+                and not stats['digest_pending'] and not dispatcher._in_flight):
+            break
+        time.sleep(0.02)
+    elapsed = time.perf_counter() - start
+    dispatcher.stop()
+    telegram_dispatcher._dispatcher = None
+
+    consegnati = {int(n) for text in MockBotAPI.delivered for n in _EVENT_RE.findall(text)}
+    return {
+        'richieste': MockBotAPI.requests,
+        'rifiutate_429': MockBotAPI.rejected,
+        'messaggi': len(MockBotAPI.delivered),
+        'eventi_consegnati': len(consegnati),
+        'falliti': stats['failed'],
+        'secondi': elapsed,
+        'accodamento_ms': enqueue_ms,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark notifiche Telegram in raffica con limite per chat")
+    parser.add_argument('--events', type=int, default=100, help="Notifiche new_client della raffica")
+    parser.add_argument('--rate', type=float, default=10.0, help="Messaggi al secondo consentiti per chat")
+    parser.add_argument('--burst', type=float, default=5.0, help="Raffica consentita per chat")
+    parser.add_argument('--window', type=float, default=1.0, help="Finestra di accorpamento in secondi")
+    args = parser.parse_args()
+
+    server = HTTPServer(('127.0.0.1', 0), MockBotAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🧪 {args.events} eventi new_client, limite server {args.rate:g} msg/s per chat (burst {args.burst:g})")
+
+    scenari = [
+        ("🐢 PRIMA  senza limite     ", False, 0),
+        ("🚦 DOPO   token bucket     ", True, 0),
+        ("🚀 DOPO   bucket+riepiloghi", True, args.window),
+    ]
+    for label, limiter, window in scenari:
+        r = run_scenario(args.events, server, args.rate, args.burst, limiter, window)
+        print(f"   {label}: {r['messaggi']:4d} messaggi | {r['richieste']:4d} richieste | "
+              f"{r['rifiutate_429']:4d} risposte 429 | eventi consegnati {r['eventi_consegnati']}/{args.events} "
+              f"({r['falliti']} messaggi falliti) | {r['secondi']:6.2f} s "
+              f"→ {r['eventi_consegnati'] / r['secondi']:7.1f} eventi/s | accodamento {r['accodamento_ms']:.1f} ms")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+⏱️ BENCHMARK STORICO TRANSAZIONI WALLET
+Storico paginato keyset e statistiche sull'intero storico con N transazioni sintetiche
+
+Il client Supabase è simulato da un database SQLite in memoria che traduce le query
+PostgREST usate da WalletTransactionsManager (filtri, or() del cursore, order, limit,
+range, count e la funzione wallet_transaction_stats), così il costo di ogni pagina
+dipende dalla query eseguita come sul database reale.
+
+Uso: python benchmark_wallet_transactions.py [--transactions 100000] [--pages 2000]
+"""
+
+import sys
+import os
+import re
+import time
+import uuid
+import random
+import sqlite3
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+# Aggiungi il path del progetto
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+logging.basicConfig(level=logging.WARNING)
+
+COLUMNS = ['id', 'created_at', 'data_transazione', 'wallet_mittente', 'wallet_destinatario',
+           'importo', 'valuta', 'stato', 'tipo_transazione', 'commissione', 'note']
+
+_CURSOR_RE = re.compile(r'created_at\.lt\."(.+?)",and\(created_at\.eq\."(.+?)",id\.lt\.(.+)\)$')
+
+class _Response:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class _Query:
+    """Sottoinsieme del query builder PostgREST tradotto in SQL"""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.columns = '*'
+        self.where, self.params, self.order_by = [], [], []
+        self.limit_value = self.offset_value = None
+        self.count = self.head = None
+
+    def select(self, columns, count=None, head=None):
+        self.columns = ', '.join(c.strip() for c in columns.split(',')) if columns != '*' else '*'
+        self.count, self.head = count, head
+        return self
+
+    def _filter(self, sql, value):
+        self.where.append(sql)
+        self.params.append(value)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(f'{column} = ?', value)
+
+    def gte(self, column, value):
+        return self._filter(f'{column} >= ?', value)
+
+    def lte(self, column, value):
+        return self._filter(f'{column} <= ?', value)
+
+    def gt(self, column, value):
+        return self._filter(f'{column} > ?', value)
+
+    def or_(self, expression):
+        match = _CURSOR_RE.match(expression)
+        if not match:
+            raise ValueError(f"or() non supportato dal benchmark: {expression}")
+        created_at, _, last_id = match.groups()
+        self.where.append('(created_at < ? OR (created_at = ? AND id < ?))')
+        self.params.extend([created_at, created_at, last_id])
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by.append(f"{column} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, value):
+        self.limit_value = value
+        return self
+
+    def range(self, start, end):
+        self.offset_value, self.limit_value = start, end - start + 1
+        return self
+
+    def execute(self):
+        where = f" WHERE {' AND '.join(self.where)}" if self.where else ''
+        self.client.requests += 1
+        count = None
+        if self.count:
+            count = self.client.conn.execute(f"SELECT COUNT(*) FROM {self.table}{where}", self.params).fetchone()[0]
+        if self.head:
+            return _Response([], count)
+
+        sql = f"SELECT {self.columns} FROM {self.table}{where}"
+        if self.order_by:
+            sql += f" ORDER BY {', '.join(self.order_by)}"
+        if self.limit_value is not None:
+            sql += f" LIMIT {self.limit_value} OFFSET {self.offset_value or 0}"
+        cursor = self.client.conn.execute(sql, self.params)
+        names = [d[0] for d in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        self.client.rows_transferred += len(rows)
+        return _Response(rows, count)
+
+class _Rpc:
+    def __init__(self, client, params):
+        self.client, self.params = client, params
+
+    def execute(self):
+        if not self.client.stats_function:
+            raise RuntimeError("function wallet_transaction_stats does not exist")
+        self.client.requests += 1
+        where, values = [], []
+        for column, key, op in (('stato', 'p_stato', '='), ('wallet_mittente', 'p_wallet_mittente', '='),
+                                ('data_transazione', 'p_date_from', '>='), ('data_transazione', 'p_date_to', '<=')):
+            if self.params.get(key) is not None:
+                where.append(f'{column} {op} ?')
+                values.append(self.params[key])
+        sql = ("SELECT stato, tipo_transazione, valuta, COUNT(*), SUM(importo) FROM wallet_transactions"
+               + (f" WHERE {' AND '.join(where)}" if where else '') + " GROUP BY 1, 2, 3")
+        rows = [dict(zip(['stato', 'tipo_transazione', 'valuta', 'numero', 'importo'], r))
+                for r in self.client.conn.execute(sql, values)]
+        self.client.rows_transferred += len(rows)
+        return _Response(rows)
+
+class SQLiteSupabase:
+    """Client Supabase simulato su SQLite"""
+
+    def __init__(self, conn, stats_function=True):
+        self.conn = conn
+        self.stats_function = stats_function
+        self.requests = 0
+        self.rows_transferred = 0
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def rpc(self, name, params):
+        return _Rpc(self, params)
+
+def build_database(n: int) -> sqlite3.Connection:
+    """Crea wallet_transactions con n transazioni sintetiche e l'indice keyset"""
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.execute(f"CREATE TABLE wallet_transactions ({', '.join(COLUMNS)}, PRIMARY KEY (id))")
+    rng = random.Random(42)
+    wallets = [f"Wallet {i}" for i in range(40)]
+    start = datetime(2023, 1, 1)
+    rows = []
+    for i in range(n):
+        # Tre transazioni per minuto con lo stesso created_at: i pareggi sono risolti da id
+        created = (start + timedelta(minutes=i // 3)).isoformat()
+        mittente, destinatario = rng.sample(wallets, 2)
+        rows.append((str(uuid.UUID(int=rng.getrandbits(128))), created, created, mittente, destinatario,
+                     round(rng.uniform(10, 5000), 2), rng.choice(['USD', 'USD', 'USD', 'EUR']),
+                     rng.choice(['completed', 'completed', 'completed', 'pending', 'failed', 'cancelled']),
+                     rng.choice(['transfer', 'deposit', 'withdrawal']), 0.0, None))
+    conn.executemany(f"INSERT INTO wallet_transactions VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+    conn.execute("CREATE INDEX idx_wallet_transactions_created_id ON wallet_transactions(created_at DESC, id DESC)")
+    return conn
+
+def make_manager(client):
+    """WalletTransactionsManager collegato al client simulato"""
+    from supabase_manager import SupabaseManager
+    from components.wallet_transactions_manager import WalletTransactionsManager
+
+    supabase_manager = SupabaseManager.__new__(SupabaseManager)
+    supabase_manager.supabase = client
+    manager = WalletTransactionsManager.__new__(WalletTransactionsManager)
+    manager.supabase_manager = supabase_manager
+    manager.telegram_manager = None
+    return manager
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+def run_benchmark(n: int, pages: int):
+    """Storico (offset vs keyset) e statistiche (limite 1000 vs aggregato vs scansione)"""
+    from components.wallet_transactions_manager import TRANSACTIONS_PAGE_SIZE
+
+    conn, build_ms = _timed(lambda: build_database(n))
+    client = SQLiteSupabase(conn)
+    manager = make_manager(client)
+    print(f"🧪 {n} transazioni sintetiche generate in {build_ms:.0f} ms")
+
+    # Storico: pagine in profondità con OFFSET (prima) e con cursore keyset (dopo)
+    pages = min(pages, n // TRANSACTIONS_PAGE_SIZE)
+    def offset_pages():
+        tempi, ultima = [], None
+        for page in range(pages):
+            start = page * TRANSACTIONS_PAGE_SIZE
+            ultima, ms = _timed(lambda: client.table('wallet_transactions').select('*').order('created_at', desc=True)
+                                .order('id', desc=True).range(start, start + TRANSACTIONS_PAGE_SIZE - 1).execute().data)
+            tempi.append(ms)
+        return ultima, tempi
+
+    def keyset_pages():
+        tempi, visti, cursor, ultima = [], set(), None, None
+        for _ in range(pages):
+            page, ms = _timed(lambda: manager.get_wallet_transactions_page(cursor=cursor))
+            tempi.append(ms)
+            ultima = page['rows']
+            visti.update(r['id'] for r in ultima)
+            cursor = page['next_cursor']
+        return ultima, tempi, len(visti)
+
+    offset_last, offset_times = offset_pages()
+    keyset_last, keyset_times, distinct = keyset_pages()
+    assert [r['id'] for r in offset_last] == [r['id'] for r in keyset_last], "pagine keyset diverse dall'ordinamento atteso"
+    assert distinct == pages * TRANSACTIONS_PAGE_SIZE, "righe duplicate o saltate tra le pagine"
+    print(f"📄 Storico, {pages} pagine da {TRANSACTIONS_PAGE_SIZE} (nessuna riga duplicata o saltata):")
+    print(f"   🐢 PRIMA  OFFSET: totale {sum(offset_times):7.0f} ms | prima pagina {offset_times[0]:.2f} ms | ultima {offset_times[-1]:.2f} ms")
+    print(f"   🚀 DOPO   keyset: totale {sum(keyset_times):7.0f} ms | prima pagina {keyset_times[0]:.2f} ms | ultima {keyset_times[-1]:.2f} ms")
+
+    # Statistiche: vecchio limit=1000, funzione SQL, scansione a pagine (fallback)
+    expected_total, expected_amount = conn.execute(
+        "SELECT COUNT(*), SUM(importo) FROM wallet_transactions").fetchone()
+
+    def legacy_stats():
+        transactions = manager.get_wallet_transactions(limit=1000)
+        return {'totale_transazioni': len(transactions),
+                'importo_totale': sum(float(t.get('importo', 0)) for t in transactions)}
+
+    legacy, legacy_ms = _timed(legacy_stats)
+
+    client.rows_transferred = 0
+    manager.supabase_manager.invalidate_cache('wallet_transactions')
+    aggregated, rpc_ms = _timed(manager.get_transaction_statistics)
+    rpc_rows = client.rows_transferred
+
+    client.stats_function = False
+    client.rows_transferred = 0
+    manager.supabase_manager.invalidate_cache('wallet_transactions')
+    scanned, scan_ms = _timed(manager.get_transaction_statistics)
+    scan_rows = client.rows_transferred
+
+    _, cached_ms = _timed(manager.get_transaction_statistics)
+
+    for stats in (aggregated, scanned):
+        assert stats['totale_transazioni'] == expected_total
+        assert abs(stats['importo_totale'] - expected_amount) < 0.01 * max(expected_total, 1)
+
+    print(f"📊 Statistiche (attese {expected_total} transazioni, importo {expected_amount:,.2f}):")
+    print(f"   🐢 PRIMA  limit=1000:        {legacy_ms:7.1f} ms → {legacy['totale_transazioni']} transazioni, "
+          f"importo {legacy['importo_totale']:,.2f} ❌ troncato")
+    print(f"   🚀 DOPO   funzione SQL:       {rpc_ms:7.1f} ms → {aggregated['totale_transazioni']} transazioni ✅ ({rpc_rows} righe trasferite)")
+    print(f"   🔁 DOPO   scansione fallback: {scan_ms:7.1f} ms → {scanned['totale_transazioni']} transazioni ✅ ({scan_rows} righe trasferite)")
+    print(f"   ⚡ DOPO   lettura in cache:   {cached_ms:7.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark storico e statistiche transazioni wallet")
+    parser.add_argument('--transactions', type=int, default=100000, help="Transazioni sintetiche")
+    parser.add_argument('--pages', type=int, default=2000, help="Pagine dello storico da scorrere")
+    args = parser.parse_args()
+    run_benchmark(args.transactions, args.pages)
+
+if __name__ == "__main__":
+    main()
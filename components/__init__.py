@@ -2,12 +2,16 @@
 Components package per Dashboard_Gestione_CPA
 """
 
-# Import dei moduli principali
-try:
-    from . import auth
-    from . import layout
-    from . import storage
-except ImportError as e:
-    print(f"⚠️ Errore import components: {e}")
+import importlib
 
+# Sottopacchetti principali, importati al primo accesso (components.storage carica supabase)
 __all__ = ['auth', 'layout', 'storage']
+
+def __getattr__(name):
+    if name in __all__:
+        try:
+            return importlib.import_module(f".{name}", __name__)
+        except ImportError as e:
+            print(f"⚠️ Errore import components: {e}")
+            raise AttributeError(name) from e
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
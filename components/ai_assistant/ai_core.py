@@ -5,18 +5,168 @@ Gestisce le chiamate API DeepSeek e la logica di base
 Creato da Ezio Camporeale
 """
 
+import os
 import requests
 import json
 import time
+import sqlite3
 import logging
-from typing import Dict, Optional, Any
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, Optional, Tuple, Any
+from datetime import timedelta
 import hashlib
 
+from utils.private_files import private_path, create_private_file
+
 # Configurazione logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Cache persistente delle risposte AI (condivisa tra sessioni e processi); senza AI_CACHE_PATH
+# il file sta nella directory dati privata dell'applicazione
+AI_CACHE_PATH = os.getenv('AI_CACHE_PATH')
+AI_CACHE_FILENAME = 'ai_cache.sqlite3'
+AI_CACHE_MAX_MB = float(os.getenv('AI_CACHE_MAX_MB', 20))
+
+class AIResponseCache:
+    """
+    Cache delle risposte AI su SQLite: TTL sulla data di creazione, eviction LRU quando
+    la dimensione totale delle risposte supera max_bytes, contatori hit/miss persistiti
+    
+    La cache è best-effort: errori SQLite in lettura o scrittura vengono registrati e
+    trattati come miss, senza mai far perdere la risposta dell'API.
+    """
+    
+    def __init__(self, path: Optional[str] = None, max_bytes: int = int(AI_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        try:
+            path = path or AI_CACHE_PATH or private_path(AI_CACHE_FILENAME)
+            self._conn = self._connect(path)
+            self.path = path
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"⚠️ Cache AI su file non disponibile ({path}): {e}, uso cache in memoria")
+            self._conn = self._connect(':memory:')
+            self.path = ':memory:'
+    
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        """Apre il database della cache (file 0600) e crea le tabelle"""
+        if path != ':memory:':
+            create_private_file(path)
+        conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        if path != ':memory:':
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_response_cache (
+                cache_key TEXT PRIMARY KEY,
+                prompt_type TEXT,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_response_cache_last_access ON ai_response_cache(last_access)")
+        conn.execute("CREATE TABLE IF NOT EXISTS ai_cache_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        return conn
+    
+    def _count(self, name: str, amount: int = 1):
+        self._conn.execute("INSERT INTO ai_cache_counters (name, value) VALUES (?, ?) "
+                           "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+    
+    def get(self, cache_key: str, ttl_seconds: float) -> Optional[str]:
+        """Risposta in cache se presente e non scaduta (aggiorna l'ordine LRU); None anche in caso di errore"""
+        try:
+            return self._get(cache_key, ttl_seconds)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Lettura cache AI non riuscita: {e}")
+            return None
+    
+    def _get(self, cache_key: str, ttl_seconds: float) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM ai_response_cache WHERE cache_key = ?",
+                                     (cache_key,)).fetchone()
+            if row is None or now - row[1] >= ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM ai_response_cache WHERE cache_key = ?", (cache_key,))
+                self._count('misses')
+                return None
+            self._conn.execute("UPDATE ai_response_cache SET last_access = ?, hits = hits + 1 WHERE cache_key = ?",
+                               (now, cache_key))
+            self._count('hits')
+            return row[0]
+    
+    def set(self, cache_key: str, prompt_type: str, response: str, ttl_seconds: float):
+        """Salva una risposta e libera spazio rimuovendo scadute e meno usate di recente (errori solo registrati)"""
+        try:
+            self._set(cache_key, prompt_type, response, ttl_seconds)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Scrittura cache AI non riuscita: {e}")
+    
+    def _set(self, cache_key: str, prompt_type: str, response: str, ttl_seconds: float):
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO ai_response_cache "
+                               "(cache_key, prompt_type, response, size, created_at, last_access, hits) "
+                               "VALUES (?, ?, ?, ?, ?, ?, 0)", (cache_key, prompt_type, response, size, now, now))
+            self._conn.execute("DELETE FROM ai_response_cache WHERE created_at <= ?", (now - ttl_seconds,))
+            
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ai_response_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for key, entry_size in self._conn.execute(
+                    "SELECT cache_key, size FROM ai_response_cache WHERE cache_key != ? ORDER BY last_access",
+                    (cache_key,)).fetchall():
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= entry_size
+            self._conn.executemany("DELETE FROM ai_response_cache WHERE cache_key = ?", evicted)
+            self._count('evictions', len(evicted))
+    
+    def clear(self):
+        """Svuota risposte e contatori"""
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_response_cache")
+            self._conn.execute("DELETE FROM ai_cache_counters")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Voci, dimensione e hit rate della cache"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ai_response_cache").fetchone()
+            counters = dict(self._conn.execute("SELECT name, value FROM ai_cache_counters").fetchall())
+        hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+        return {
+            'entries': entries,
+            'size_bytes': size,
+            'hits': hits,
+            'misses': misses,
+            'evictions': counters.get('evictions', 0),
+            'hit_rate': round(hits / (hits + misses) * 100, 1) if hits + misses else 0.0
+        }
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ai_response_cache").fetchone()[0]
+
+_response_cache: Optional[AIResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_ai_response_cache() -> AIResponseCache:
+    """Restituisce la cache delle risposte AI unica per processo"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = AIResponseCache()
+        return _response_cache
+
 class AIAssistant:
     """Classe principale per gestire le chiamate API DeepSeek"""
     
@@ -30,8 +180,8 @@ class AIAssistant:
         self.config = Config.AI_ASSISTANT_CONFIG
         self.prompts = Config.AI_PROMPTS
         
-        # Cache per le risposte
-        self.cache = {}
+        # Cache persistente delle risposte, condivisa da tutte le istanze
+        self.cache = get_ai_response_cache()
         
         logger.info("🤖 AI Assistant inizializzato per Dashboard CPA")
     
@@ -45,13 +195,14 @@ class AIAssistant:
             logger.error(f"❌ Test connessione fallito: {e}")
             return False
     
-    def generate_response(self, prompt_type: str, data: Dict[str, Any]) -> str:
+    def generate_response(self, prompt_type: str, data: Dict[str, Any], timeout: Optional[float] = None) -> str:
         """
         Genera una risposta AI basata sul tipo di prompt e i dati forniti
         
         Args:
             prompt_type: Tipo di prompt (client_analysis, incroci_prediction, etc.)
             data: Dati da inserire nel prompt
+            timeout: Secondi massimi per la risposta, retry inclusi (oltre si usa il fallback)
             
         Returns:
             str: Risposta generata dall'AI
@@ -59,11 +210,11 @@ class AIAssistant:
         try:
             # Controlla cache
             cache_key = self._generate_cache_key(prompt_type, data)
-            if self.config['cache_responses'] and cache_key in self.cache:
-                cached_response = self.cache[cache_key]
-                if self._is_cache_valid(cached_response):
+            if self.config['cache_responses']:
+                cached_response = self.cache.get(cache_key, self._cache_ttl_seconds())
+                if cached_response is not None:
                     logger.info("📋 Risposta recuperata dalla cache")
-                    return cached_response['response']
+                    return cached_response
             
             # Genera prompt
             if prompt_type not in self.prompts:
@@ -73,16 +224,13 @@ class AIAssistant:
             formatted_prompt = prompt_template.format(**data)
             
             # Chiama API con retry
-            response = self._make_api_call_with_retry(formatted_prompt)
+            deadline = time.monotonic() + timeout if timeout else None
+            response = self._make_api_call_with_retry(formatted_prompt, deadline)
             
             if response:
                 # Salva in cache
                 if self.config['cache_responses']:
-                    self.cache[cache_key] = {
-                        'response': response,
-                        'timestamp': datetime.now(),
-                        'prompt_type': prompt_type
-                    }
+                    self.cache.set(cache_key, prompt_type, response, self._cache_ttl_seconds())
                 
                 logger.info(f"✅ Risposta AI generata per {prompt_type}")
                 return response
@@ -93,23 +241,53 @@ class AIAssistant:
             logger.error(f"❌ Errore generazione risposta AI: {e}")
             return self._get_fallback_response(prompt_type)
     
-    def _make_api_call_with_retry(self, prompt: str) -> Optional[str]:
-        """Effettua chiamata API con retry e backoff esponenziale"""
+    def generate_many(self, calls: Dict[str, Tuple[str, Dict[str, Any]]], max_workers: Optional[int] = None,
+                      timeout: Optional[float] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Genera più risposte indipendenti in parallelo, restituendole man mano che sono pronte
+        
+        Args:
+            calls: {nome: (prompt_type, data)}
+            max_workers: Chiamate API contemporanee (default 'max_concurrent_calls' della configurazione)
+            timeout: Secondi massimi per ogni chiamata, retry inclusi (default 'call_timeout')
+            
+        Yields:
+            (nome, risposta) in ordine di completamento; una chiamata scaduta restituisce il fallback
+        """
+        if not calls:
+            return
+        max_workers = max_workers or self.config.get('max_concurrent_calls', 3)
+        timeout = timeout or self.config.get('call_timeout')
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(calls)), thread_name_prefix='ai-call') as pool:
+            futures = {
+                pool.submit(self.generate_response, prompt_type, data, timeout): name
+                for name, (prompt_type, data) in calls.items()
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    
+    def _make_api_call_with_retry(self, prompt: str, deadline: Optional[float] = None) -> Optional[str]:
+        """Effettua chiamata API con retry e backoff esponenziale, entro la scadenza opzionale"""
         for attempt in range(self.config['retry_attempts']):
+            remaining = deadline - time.monotonic() if deadline else None
+            if remaining is not None and remaining <= 0:
+                logger.warning("⚠️ Tempo massimo della chiamata AI superato")
+                break
             try:
-                response = self._make_api_call(prompt)
+                response = self._make_api_call(prompt, min(self.config['timeout'], remaining) if remaining else None)
                 if response:
                     return response
                     
             except requests.exceptions.Timeout:
                 logger.warning(f"⚠️ Timeout API (tentativo {attempt + 1}) - Timeout: {self.config['timeout']}s")
                 if attempt < self.config['retry_attempts'] - 1:
-                    time.sleep(3 ** attempt)  # Backoff più lungo per timeout
+                    self._backoff(3 ** attempt, deadline)  # Backoff più lungo per timeout
                     
             except requests.exceptions.RequestException as e:
                 logger.warning(f"⚠️ Errore richiesta API (tentativo {attempt + 1}): {e}")
                 if attempt < self.config['retry_attempts'] - 1:
-                    time.sleep(2 ** attempt)  # Backoff esponenziale
+                    self._backoff(2 ** attempt, deadline)  # Backoff esponenziale
                     
             except Exception as e:
                 logger.error(f"❌ Errore generico chiamata API: {e}")
@@ -118,7 +296,14 @@ class AIAssistant:
         logger.error("❌ Tutti i tentativi API falliti")
         return None
     
-    def _make_api_call(self, prompt: str) -> Optional[str]:
+    @staticmethod
+    def _backoff(seconds: float, deadline: Optional[float] = None):
+        """Attesa tra i tentativi, troncata alla scadenza della chiamata"""
+        if deadline:
+            seconds = min(seconds, max(0.0, deadline - time.monotonic()))
+        time.sleep(seconds)
+    
+    def _make_api_call(self, prompt: str, timeout: Optional[float] = None) -> Optional[str]:
         """Effettua una singola chiamata API"""
         headers = {
             'Authorization': f'Bearer {self.api_key}',
@@ -145,7 +330,7 @@ class AIAssistant:
             self.api_url,
             headers=headers,
             json=payload,
-            timeout=self.config['timeout']
+            timeout=timeout or self.config['timeout']
         )
         
         if response.status_code == 200:
@@ -159,13 +344,12 @@ class AIAssistant:
     
     def _generate_cache_key(self, prompt_type: str, data: Dict[str, Any]) -> str:
         """Genera una chiave unica per la cache"""
-        data_str = json.dumps(data, sort_keys=True)
+        data_str = json.dumps(data, sort_keys=True, default=str)
         return hashlib.md5(f"{prompt_type}:{data_str}".encode()).hexdigest()
     
-    def _is_cache_valid(self, cached_response: Dict[str, Any]) -> bool:
-        """Controlla se la risposta in cache è ancora valida"""
-        cache_duration = timedelta(hours=self.config['cache_duration_hours'])
-        return datetime.now() - cached_response['timestamp'] < cache_duration
+    def _cache_ttl_seconds(self) -> float:
+        """Durata di validità delle risposte in cache"""
+        return timedelta(hours=self.config['cache_duration_hours']).total_seconds()
     
     def _get_fallback_response(self, prompt_type: str) -> str:
         """Risposta di fallback quando l'API non è disponibile"""
@@ -282,8 +466,16 @@ class AIAssistant:
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """Restituisce statistiche sulla cache"""
+        stats = self.cache.stats()
         return {
-            'total_cached': len(self.cache),
+            'total_cached': stats['entries'],
             'cache_enabled': self.config['cache_responses'],
-            'cache_duration_hours': self.config['cache_duration_hours']
+            'cache_duration_hours': self.config['cache_duration_hours'],
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'hit_rate': stats['hit_rate'],
+            'evictions': stats['evictions'],
+            'size_mb': round(stats['size_bytes'] / (1024 * 1024), 2),
+            'max_size_mb': round(self.cache.max_bytes / (1024 * 1024), 2),
+            'cache_path': self.cache.path
         }
@@ -6,6 +6,7 @@ Creato da Ezio Camporeale
 """
 
 import streamlit as st
+import time
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
@@ -81,7 +82,7 @@ def render_ai_assistant(supabase_manager=None):
         _render_risk_analysis_tab(risk_analyzer)
     
     with tab6:
-        _render_report_generation_tab(report_generator)
+        _render_report_generation_tab(report_generator, risk_analyzer, marketing_advisor)
     
     with tab7:
         _render_ai_configuration_tab(ai_assistant)
@@ -312,7 +313,7 @@ def _render_risk_analysis_tab(risk_analyzer):
         st.markdown("#### Risultati Analisi Rischi")
         st.info("Clicca sui pulsanti per vedere le analisi dei rischi")
 
-def _render_report_generation_tab(report_generator):
+def _render_report_generation_tab(report_generator, risk_analyzer=None, marketing_advisor=None):
     """Renderizza il tab per la generazione report"""
     st.markdown("### 📋 Generazione Report")
     st.markdown("Genera report professionali sui dati CPA")
@@ -372,6 +373,49 @@ def _render_report_generation_tab(report_generator):
     with col2:
         st.markdown("#### Risultati Report")
         st.info("Seleziona il tipo di report e clicca per generarlo")
+    
+    if risk_analyzer is not None and marketing_advisor is not None:
+        st.markdown("---")
+        st.markdown("#### 🚀 Tutte le Analisi")
+        st.markdown("Report esecutivo, rischi di portafoglio e consigli marketing con le chiamate AI in parallelo")
+        
+        if st.button("🚀 Genera Tutte le Analisi", key="generate_all_analyses"):
+            _render_all_analyses(report_type, report_generator, risk_analyzer, marketing_advisor)
+
+def _render_all_analyses(report_type, report_generator, risk_analyzer, marketing_advisor):
+    """
+    Calcola le sezioni in locale, poi lancia le chiamate AI in parallelo
+    e mostra ogni sezione appena la sua risposta è pronta
+    """
+    sections = {
+        'report': ("📊 Report Esecutivo", lambda: report_generator.prepare_executive_report(report_type),
+                   'report_generation', 'ai_report', _display_executive_report_result),
+        'rischi': ("⚠️ Rischi Portafoglio", risk_analyzer.prepare_portfolio_risks,
+                   'risk_analysis', 'ai_analysis', _display_portfolio_risks_result),
+        'marketing': ("📈 Consigli Marketing", marketing_advisor.prepare_marketing_advice,
+                      'marketing_advice', 'ai_analysis', _display_marketing_advice_result),
+    }
+    
+    start = time.monotonic()
+    results, placeholders, calls = {}, {}, {}
+    for name, (title, prepare, prompt_type, _, _) in sections.items():
+        with st.expander(title, expanded=True):
+            placeholders[name] = st.empty()
+        try:
+            results[name], ai_data = prepare()
+            calls[name] = (prompt_type, ai_data)
+            placeholders[name].info("⏳ In attesa della risposta AI...")
+        except Exception as e:
+            logger.error(f"❌ Errore preparazione sezione {name}: {e}")
+            placeholders[name].error(f"❌ Errore durante l'analisi: {e}")
+    
+    for name, response in report_generator.ai_assistant.generate_many(calls):
+        _, _, _, field, display = sections[name]
+        results[name][field] = response
+        with placeholders[name].container():
+            display(results[name])
+    
+    st.success(f"✅ Analisi completate in {time.monotonic() - start:.1f} secondi")
 
 def _render_ai_configuration_tab(ai_assistant):
     """Renderizza il tab per la configurazione AI"""
@@ -397,6 +441,9 @@ def _render_ai_configuration_tab(ai_assistant):
         st.write(f"**Risposte in cache:** {cache_stats['total_cached']}")
         st.write(f"**Cache abilitata:** {'Sì' if cache_stats['cache_enabled'] else 'No'}")
         st.write(f"**Durata cache:** {cache_stats['cache_duration_hours']} ore")
+        st.write(f"**Hit rate:** {cache_stats['hit_rate']}% ({cache_stats['hits']} hit, {cache_stats['misses']} miss)")
+        st.write(f"**Dimensione:** {cache_stats['size_mb']} / {cache_stats['max_size_mb']} MB "
+                 f"({cache_stats['evictions']} risposte rimosse per spazio)")
         
         if st.button("🗑️ Pulisci Cache", key="clear_cache"):
             ai_assistant.clear_cache()
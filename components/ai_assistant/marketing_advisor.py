@@ -6,7 +6,7 @@ Creato da Ezio Camporeale
 """
 
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 import pandas as pd
 
@@ -38,37 +38,47 @@ class MarketingAdvisor:
             Dict: Consigli di marketing
         """
         try:
-            # Recupera dati clienti
-            client_data = self._get_client_marketing_data()
-            
-            # Analizza segmentazione clienti
-            client_segmentation = self._analyze_client_segmentation(client_data)
-            
-            # Identifica opportunità di crescita
-            growth_opportunities = self._identify_growth_opportunities(client_data)
-            
-            # Calcola strategie di retention
-            retention_strategies = self._calculate_retention_strategies(client_data)
-            
-            # Prepara dati per AI
-            ai_data = self._prepare_marketing_ai_data(client_data, client_segmentation, growth_opportunities, retention_strategies)
+            advice, ai_data = self.prepare_marketing_advice()
             
             # Genera analisi AI
-            ai_analysis = self.ai_assistant.generate_response('marketing_advice', ai_data)
-            
-            return {
-                'client_data': client_data,
-                'client_segmentation': client_segmentation,
-                'growth_opportunities': growth_opportunities,
-                'retention_strategies': retention_strategies,
-                'ai_analysis': ai_analysis,
-                'analysis_date': datetime.now().isoformat()
-            }
+            advice['ai_analysis'] = self.ai_assistant.generate_response('marketing_advice', ai_data)
+            return advice
             
         except Exception as e:
             logger.error(f"❌ Errore generazione consigli marketing: {e}")
             return {"error": f"Errore durante l'analisi: {e}"}
     
+    def prepare_marketing_advice(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Calcola segmentazione, opportunità e retention senza chiamare l'AI
+        
+        Returns:
+            Tuple: (consigli senza 'ai_analysis', dati per il prompt 'marketing_advice')
+        """
+        # Recupera dati clienti
+        client_data = self._get_client_marketing_data()
+        
+        # Analizza segmentazione clienti
+        client_segmentation = self._analyze_client_segmentation(client_data)
+        
+        # Identifica opportunità di crescita
+        growth_opportunities = self._identify_growth_opportunities(client_data)
+        
+        # Calcola strategie di retention
+        retention_strategies = self._calculate_retention_strategies(client_data)
+        
+        # Prepara dati per AI
+        ai_data = self._prepare_marketing_ai_data(client_data, client_segmentation, growth_opportunities, retention_strategies)
+        
+        advice = {
+            'client_data': client_data,
+            'client_segmentation': client_segmentation,
+            'growth_opportunities': growth_opportunities,
+            'retention_strategies': retention_strategies,
+            'analysis_date': datetime.now().isoformat()
+        }
+        return advice, ai_data
+    
     def analyze_client_lifetime_value(self) -> Dict[str, Any]:
         """
         Analizza il valore del ciclo di vita dei clienti
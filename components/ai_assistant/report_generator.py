@@ -6,7 +6,7 @@ Creato da Ezio Camporeale
 """
 
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 import pandas as pd
 
@@ -41,38 +41,48 @@ class ReportGenerator:
             Dict: Report esecutivo completo
         """
         try:
-            # Recupera dati per il report
-            report_data = self._get_report_data(report_type)
-            
-            # Calcola metriche chiave
-            key_metrics = self._calculate_key_metrics(report_data)
-            
-            # Analizza trend e performance
-            trend_analysis = self._analyze_trends(report_data)
-            
-            # Identifica insights e raccomandazioni
-            insights = self._generate_insights(report_data, key_metrics, trend_analysis)
-            
-            # Prepara dati per AI
-            ai_data = self._prepare_report_ai_data(report_data, key_metrics, trend_analysis, insights)
+            report, ai_data = self.prepare_executive_report(report_type)
             
             # Genera report AI
-            ai_report = self.ai_assistant.generate_response('report_generation', ai_data)
-            
-            return {
-                'report_type': report_type,
-                'report_data': report_data,
-                'key_metrics': key_metrics,
-                'trend_analysis': trend_analysis,
-                'insights': insights,
-                'ai_report': ai_report,
-                'generation_date': datetime.now().isoformat()
-            }
+            report['ai_report'] = self.ai_assistant.generate_response('report_generation', ai_data)
+            return report
             
         except Exception as e:
             logger.error(f"❌ Errore generazione report esecutivo: {e}")
             return {"error": f"Errore durante la generazione: {e}"}
     
+    def prepare_executive_report(self, report_type: str = "monthly") -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Calcola le sezioni del report esecutivo senza chiamare l'AI
+        
+        Returns:
+            Tuple: (report senza 'ai_report', dati per il prompt 'report_generation')
+        """
+        # Recupera dati per il report
+        report_data = self._get_report_data(report_type)
+        
+        # Calcola metriche chiave
+        key_metrics = self._calculate_key_metrics(report_data)
+        
+        # Analizza trend e performance
+        trend_analysis = self._analyze_trends(report_data)
+        
+        # Identifica insights e raccomandazioni
+        insights = self._generate_insights(report_data, key_metrics, trend_analysis)
+        
+        # Prepara dati per AI
+        ai_data = self._prepare_report_ai_data(report_data, key_metrics, trend_analysis, insights)
+        
+        report = {
+            'report_type': report_type,
+            'report_data': report_data,
+            'key_metrics': key_metrics,
+            'trend_analysis': trend_analysis,
+            'insights': insights,
+            'generation_date': datetime.now().isoformat()
+        }
+        return report, ai_data
+    
     def generate_client_report(self, cliente_id: int) -> Dict[str, Any]:
         """
         Genera un report specifico per un cliente
@@ -6,7 +6,7 @@ Creato da Ezio Camporeale
 """
 
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
@@ -39,45 +39,55 @@ class RiskAnalyzer:
             Dict: Analisi completa dei rischi
         """
         try:
-            # Recupera dati del portafoglio
-            portfolio_data = self._get_portfolio_data()
-            
-            # Analizza concentrazione dei rischi
-            concentration_risks = self._analyze_concentration_risks(portfolio_data)
-            
-            # Analizza rischi operativi
-            operational_risks = self._analyze_operational_risks(portfolio_data)
-            
-            # Analizza rischi di mercato
-            market_risks = self._analyze_market_risks(portfolio_data)
-            
-            # Calcola score di rischio complessivo
-            overall_risk_score = self._calculate_overall_risk_score(concentration_risks, operational_risks, market_risks)
-            
-            # Genera raccomandazioni di mitigazione
-            mitigation_recommendations = self._generate_mitigation_recommendations(concentration_risks, operational_risks, market_risks)
-            
-            # Prepara dati per AI
-            ai_data = self._prepare_risk_ai_data(portfolio_data, concentration_risks, operational_risks, market_risks, overall_risk_score)
+            analysis, ai_data = self.prepare_portfolio_risks()
             
             # Genera analisi AI
-            ai_analysis = self.ai_assistant.generate_response('risk_analysis', ai_data)
-            
-            return {
-                'portfolio_data': portfolio_data,
-                'concentration_risks': concentration_risks,
-                'operational_risks': operational_risks,
-                'market_risks': market_risks,
-                'overall_risk_score': overall_risk_score,
-                'mitigation_recommendations': mitigation_recommendations,
-                'ai_analysis': ai_analysis,
-                'analysis_date': datetime.now().isoformat()
-            }
+            analysis['ai_analysis'] = self.ai_assistant.generate_response('risk_analysis', ai_data)
+            return analysis
             
         except Exception as e:
             logger.error(f"❌ Errore analisi rischi portafoglio: {e}")
             return {"error": f"Errore durante l'analisi: {e}"}
     
+    def prepare_portfolio_risks(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Calcola l'analisi rischi del portafoglio senza chiamare l'AI
+        
+        Returns:
+            Tuple: (analisi senza 'ai_analysis', dati per il prompt 'risk_analysis')
+        """
+        # Recupera dati del portafoglio
+        portfolio_data = self._get_portfolio_data()
+        
+        # Analizza concentrazione dei rischi
+        concentration_risks = self._analyze_concentration_risks(portfolio_data)
+        
+        # Analizza rischi operativi
+        operational_risks = self._analyze_operational_risks(portfolio_data)
+        
+        # Analizza rischi di mercato
+        market_risks = self._analyze_market_risks(portfolio_data)
+        
+        # Calcola score di rischio complessivo
+        overall_risk_score = self._calculate_overall_risk_score(concentration_risks, operational_risks, market_risks)
+        
+        # Genera raccomandazioni di mitigazione
+        mitigation_recommendations = self._generate_mitigation_recommendations(concentration_risks, operational_risks, market_risks)
+        
+        # Prepara dati per AI
+        ai_data = self._prepare_risk_ai_data(portfolio_data, concentration_risks, operational_risks, market_risks, overall_risk_score)
+        
+        analysis = {
+            'portfolio_data': portfolio_data,
+            'concentration_risks': concentration_risks,
+            'operational_risks': operational_risks,
+            'market_risks': market_risks,
+            'overall_risk_score': overall_risk_score,
+            'mitigation_recommendations': mitigation_recommendations,
+            'analysis_date': datetime.now().isoformat()
+        }
+        return analysis, ai_data
+    
     def analyze_client_risks(self, cliente_id: int) -> Dict[str, Any]:
         """
         Analizza i rischi specifici di un cliente
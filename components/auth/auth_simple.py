@@ -197,6 +197,10 @@ def render_login_form():
                 # IMPORTANTE: Imposta user_info completo con tutti i dati inclusi l'id
                 st.session_state.user_info = user_info
                 
+                # Ruoli e permessi risolti una volta e tenuti in sessione
+                from utils.supabase_permissions import supabase_permission_manager
+                supabase_permission_manager.load_session_permissions()
+                
                 logger.info(f"✅ Login riuscito per utente: {username}")
                 logger.info(f"🔍 DEBUG: user_info impostato nella sessione (senza dati sensibili)")
                 st.success(f'✅ Benvenuto {user_info["name"]}!')
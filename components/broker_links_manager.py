@@ -24,7 +24,6 @@ class BrokerLinksManager:
     def __init__(self):
         """Inizializza il gestore"""
         self.supabase_manager = SupabaseManager()
-        self.setup_session_state()
     
     def setup_session_state(self):
         """Inizializza lo stato della sessione"""
@@ -67,6 +66,9 @@ class BrokerLinksManager:
         st.header("🔗 Gestione Link Broker")
         st.markdown("Gestisci i link di affiliate per i broker")
         
+        # Stato di sessione a ogni render: l'istanza è condivisa tra le sessioni (st.cache_resource)
+        self.setup_session_state()
+        
         # Verifica permessi
         if not self.has_permission():
             st.error("❌ Non hai i permessi per accedere a questa sezione")
@@ -1,23 +1,29 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from supabase_manager import SupabaseManager
+from supabase_manager import SupabaseManager, CLIENTI_PAGE_SIZE
 from utils.translations import t
 
+# Chiavi di sessione della paginazione (pila dei cursori keyset e firma dei filtri)
+CURSORI_KEY = 'clienti_pagina_cursori'
+FILTRI_KEY = 'clienti_pagina_filtri'
+
 class ClientTable:
     def __init__(self):
         """Inizializza la tabella dei clienti con Supabase"""
+        # L'istanza è condivisa tra le sessioni: la disponibilità resta sull'oggetto
         try:
             self.supabase = SupabaseManager()
-            st.session_state.supabase_available = True
+            self.supabase_available = True
         except Exception as e:
             st.error(f"❌ Errore inizializzazione Supabase: {e}")
-            st.session_state.supabase_available = False
+            self.supabase = None
+            self.supabase_available = False
     
     def get_clienti(self):
         """Recupera tutti i clienti da Supabase"""
         try:
-            if not st.session_state.get('supabase_available', False):
+            if not self.supabase_available:
                 return pd.DataFrame()
             
             clienti = self.supabase.get_clienti()
@@ -46,10 +52,36 @@ class ClientTable:
             st.error(f"❌ Errore recupero clienti: {e}")
             return pd.DataFrame()
     
+    def has_clienti(self) -> bool:
+        """True se esiste almeno un cliente (legge una sola riga)"""
+        if not self.supabase_available:
+            return False
+        return bool(self.supabase.get_clienti_page(limit=1, columns='id')['rows'])
+    
+    def get_clienti_page(self, limit=CLIENTI_PAGE_SIZE, cursor=None, broker=None, piattaforma=None, search=None):
+        """
+        Recupera una pagina di clienti filtrata lato server
+        
+        Returns:
+            Tuple (DataFrame della pagina, cursore pagina successiva, totale clienti filtrati)
+        """
+        if not self.supabase_available:
+            return pd.DataFrame(), None, 0
+        
+        page = self.supabase.get_clienti_page(limit=limit, cursor=cursor, broker=broker,
+                                              piattaforma=piattaforma, search=search, with_count=True)
+        df = pd.DataFrame(page['rows'])
+        if not df.empty:
+            if 'data_registrazione' not in df.columns or df['data_registrazione'].isna().all():
+                df['data_registrazione'] = df['created_at']
+            if 'deposito' not in df.columns:
+                df['deposito'] = 0.0
+        return df, page['next_cursor'], page['total'] or 0
+    
     def get_statistiche_clienti(self):
         """Calcola le statistiche dei clienti da Supabase"""
         try:
-            if not st.session_state.get('supabase_available', False):
+            if not self.supabase_available:
                 return {
                     'totale_clienti': 0,
                     'broker_attivi': 0,
@@ -105,59 +137,17 @@ class ClientTable:
                 'cpa_attive': 0
             }
     
-    def render_table(self, df_clienti=None, on_edit=None, on_delete=None):
-        """Rende la tabella dei clienti con opzioni di modifica ed eliminazione"""
-        
-        # Se non viene passato df_clienti, lo recupera da Supabase
-        if df_clienti is None:
-            df_clienti = self.get_clienti()
-        
-        if df_clienti.empty:
+    def render_table(self, on_edit=None, on_delete=None, page_size=CLIENTI_PAGE_SIZE):
+        """
+        Rende la tabella dei clienti con opzioni di modifica ed eliminazione
+        
+        Filtri e paginazione (keyset su created_at, id) sono eseguiti da Supabase:
+        ad ogni rerun viene letta solo la pagina visibile.
+        """
+        if not self.supabase_available:
             st.info(t("clients.no_clients", "Nessun cliente presente nel database. Aggiungi il primo cliente!"))
             return
         
-        # Formattazione della tabella per una migliore visualizzazione
-        df_display = df_clienti.copy()
-        
-        # Formattazione delle colonne
-        if 'data_registrazione' in df_display.columns:
-            df_display['data_registrazione'] = pd.to_datetime(df_display['data_registrazione']).dt.strftime('%d/%m/%Y')
-        
-        if 'deposito' in df_display.columns:
-            df_display['deposito'] = df_display['deposito'].apply(lambda x: f"€{x:,.2f}" if pd.notna(x) and x != 0 else "€0.00")
-        
-        if 'data_creazione' in df_display.columns:
-            df_display['data_creazione'] = pd.to_datetime(df_display['data_creazione']).dt.strftime('%d/%m/%Y %H:%M')
-        
-        if 'data_modifica' in df_display.columns:
-            df_display['data_modifica'] = pd.to_datetime(df_display['data_modifica']).dt.strftime('%d/%m/%Y %H:%M')
-        
-        # Selezione delle colonne da mostrare
-        colonne_display = [
-            'id', 'nome_cliente', 'email', 'broker', 'data_registrazione', 
-            'deposito', 'piattaforma', 'numero_conto', 'vps_ip'
-        ]
-        
-        # Filtra le colonne disponibili
-        colonne_disponibili = [col for col in colonne_display if col in df_display.columns]
-        df_display = df_display[colonne_disponibili]
-        
-        # Rinomina le colonne per una migliore visualizzazione
-        mapping_colonne = {
-            'id': t("clients.columns.id", "ID"),
-            'nome_cliente': t("clients.columns.name", "Nome Cliente"),
-            'email': t("clients.columns.email", "Email"),
-            'broker': t("clients.columns.broker", "Broker"),
-            'data_registrazione': t("clients.columns.registration_date", "Data Registrazione"),
-            'deposito': t("clients.columns.deposit", "Deposito"),
-            'piattaforma': t("clients.columns.platform", "Piattaforma"),
-            'numero_conto': t("clients.columns.account_number", "Numero Conto"),
-            'wallet': t("clients.columns.wallet", "Wallet"),
-            'vps_ip': t("clients.columns.vps_ip", "IP VPS")
-        }
-        
-        df_display = df_display.rename(columns=mapping_colonne)
-        
         # Gestione conferma eliminazione cliente (come negli incroci)
         if st.session_state.get('mostra_conferma_eliminazione_cliente', False) and st.session_state.get('cliente_da_eliminare'):
             cliente_id = st.session_state.cliente_da_eliminare
@@ -188,46 +178,83 @@ class ClientTable:
                     st.session_state.cliente_da_eliminare = None
                     st.rerun()
         
-        # Filtri per la tabella
+        # Filtri per la tabella (applicati lato server)
         st.subheader(t("clients.table.filters", "🔍 Filtri"))
         col_filtro1, col_filtro2, col_filtro3 = st.columns(3)
+        opzioni_filtri = self.supabase.get_clienti_filter_options()
         
         with col_filtro1:
-            filtro_nome = st.text_input(t("clients.table.filter_name", "Filtra per Nome"), placeholder="Nome cliente...")
+            filtro_nome = st.text_input(t("clients.table.filter_name", "Filtra per Nome"), placeholder="Nome, email o conto...")
         
         with col_filtro2:
-            # Ordina alfabeticamente i broker per il filtro
-            broker_list = list(df_clienti['broker'].unique()) if 'broker' in df_clienti.columns else []
-            broker_list.sort()
             filtro_broker = st.selectbox(t("clients.table.filter_broker", "Filtra per Broker"), 
-                                       ["Tutti"] + broker_list)
+                                       ["Tutti"] + opzioni_filtri['broker'])
         
         with col_filtro3:
-            # Ordina alfabeticamente le piattaforme per il filtro
-            piattaforme_list = list(df_clienti['piattaforma'].unique()) if 'piattaforma' in df_clienti.columns else []
-            piattaforme_list.sort()
             filtro_piattaforma = st.selectbox(t("clients.table.filter_platform", "Filtra per Piattaforma"), 
-                                            ["Tutte"] + piattaforme_list)
+                                            ["Tutte"] + opzioni_filtri['piattaforma'])
         
-        # Applicazione filtri
-        df_filtrato = df_clienti.copy()
+        filtri = {
+            'search': filtro_nome or None,
+            'broker': filtro_broker if filtro_broker != "Tutti" else None,
+            'piattaforma': filtro_piattaforma if filtro_piattaforma != "Tutte" else None
+        }
+        
+        # Nuovi filtri: si riparte dalla prima pagina
+        if st.session_state.get(FILTRI_KEY) != filtri or CURSORI_KEY not in st.session_state:
+            st.session_state[FILTRI_KEY] = filtri
+            st.session_state[CURSORI_KEY] = [None]
+        cursori = st.session_state[CURSORI_KEY]
+        
+        df_pagina, cursore_successivo, totale = self.get_clienti_page(limit=page_size, cursor=cursori[-1], **filtri)
+        
+        if df_pagina.empty and len(cursori) == 1:
+            if any(filtri.values()):
+                st.info("🔍 Nessun cliente corrisponde ai filtri selezionati")
+            else:
+                st.info(t("clients.no_clients", "Nessun cliente presente nel database. Aggiungi il primo cliente!"))
+            return
+        
+        # Formattazione della tabella per una migliore visualizzazione
+        df_display = df_pagina.copy()
+        
+        if 'data_registrazione' in df_display.columns:
+            df_display['data_registrazione'] = pd.to_datetime(df_display['data_registrazione'], errors='coerce', utc=True).dt.strftime('%d/%m/%Y')
         
-        if filtro_nome:
-            df_filtrato = df_filtrato[df_filtrato['nome_cliente'].str.contains(filtro_nome, case=False, na=False)]
+        if 'deposito' in df_display.columns:
+            df_display['deposito'] = df_display['deposito'].apply(lambda x: f"€{x:,.2f}" if pd.notna(x) and x != 0 else "€0.00")
+        
+        # Selezione delle colonne da mostrare
+        colonne_display = [
+            'id', 'nome_cliente', 'email', 'broker', 'data_registrazione', 
+            'deposito', 'piattaforma', 'numero_conto', 'vps_ip'
+        ]
         
-        if filtro_broker and filtro_broker != "Tutti":
-            df_filtrato = df_filtrato[df_filtrato['broker'] == filtro_broker]
+        # Filtra le colonne disponibili
+        colonne_disponibili = [col for col in colonne_display if col in df_display.columns]
+        df_display = df_display[colonne_disponibili]
         
-        if filtro_piattaforma and filtro_piattaforma != "Tutte":
-            df_filtrato = df_filtrato[df_filtrato['piattaforma'] == filtro_piattaforma]
+        # Rinomina le colonne per una migliore visualizzazione
+        mapping_colonne = {
+            'id': t("clients.columns.id", "ID"),
+            'nome_cliente': t("clients.columns.name", "Nome Cliente"),
+            'email': t("clients.columns.email", "Email"),
+            'broker': t("clients.columns.broker", "Broker"),
+            'data_registrazione': t("clients.columns.registration_date", "Data Registrazione"),
+            'deposito': t("clients.columns.deposit", "Deposito"),
+            'piattaforma': t("clients.columns.platform", "Piattaforma"),
+            'numero_conto': t("clients.columns.account_number", "Numero Conto"),
+            'wallet': t("clients.columns.wallet", "Wallet"),
+            'vps_ip': t("clients.columns.vps_ip", "IP VPS")
+        }
         
-        # Aggiorna df_display con i dati filtrati
-        df_display = df_filtrato[colonne_disponibili].rename(columns=mapping_colonne)
+        df_display = df_display.rename(columns=mapping_colonne)
         
-        # Mostra statistiche dei filtri
-        clienti_text = t("clients.table.clients_plural", "clienti") if len(df_filtrato) != 1 else t("clients.table.clients", "cliente")
-        totali_text = t("clients.table.total", "totali")
-        st.write(f"**{t('clients.table.results', 'Risultati')}:** {len(df_filtrato)} {clienti_text} su {len(df_clienti)} {totali_text}")
+        # Mostra statistiche dei filtri e posizione nella paginazione
+        numero_pagina = len(cursori)
+        pagine_totali = max(1, -(-totale // page_size))
+        clienti_text = t("clients.table.clients_plural", "clienti") if totale != 1 else t("clients.table.clients", "cliente")
+        st.write(f"**{t('clients.table.results', 'Risultati')}:** {totale} {clienti_text} — pagina {numero_pagina} di {pagine_totali}")
         
         # Tabella principale
         st.subheader(t("clients.table.title", "📋 Tabella Clienti"))
@@ -251,6 +278,17 @@ class ClientTable:
             }
         )
         
+        # Navigazione tra le pagine
+        col_nav1, col_nav2 = st.columns(2)
+        with col_nav1:
+            if st.button("◀ Precedente", key="clienti_pagina_precedente", disabled=numero_pagina == 1):
+                cursori.pop()
+                st.rerun()
+        with col_nav2:
+            if st.button("Successiva ▶", key="clienti_pagina_successiva", disabled=cursore_successivo is None):
+                cursori.append(cursore_successivo)
+                st.rerun()
+        
         # Azioni rapide (sempre visibili)
         st.subheader(t("clients.table.quick_actions", "⚡ Azioni Rapide"))
         
@@ -258,7 +296,7 @@ class ClientTable:
         
         with col_azione1:
             if st.button(t("clients.actions.export", "📊 Esporta"), help=t("clients.help.export", "Esporta i dati filtrati in formato CSV")):
-                csv = df_filtrato.to_csv(index=False)
+                csv = self._export_clienti_filtrati(filtri).to_csv(index=False)
                 st.download_button(
                     label="💾 CSV",
                     data=csv,
@@ -268,6 +306,7 @@ class ClientTable:
         
         with col_azione2:
             if st.button(t("clients.actions.refresh", "🔄 Aggiorna"), help=t("clients.help.refresh", "Aggiorna i dati dalla tabella")):
+                self.supabase.invalidate_cache('clienti')
                 st.rerun()
         
         with col_azione3:
@@ -276,26 +315,29 @@ class ClientTable:
                 st.rerun()
         
         # Azioni sui clienti (solo quando si seleziona un cliente)
-        if len(df_filtrato) > 0:
+        if len(df_pagina) > 0:
             st.subheader(t("clients.table.client_actions", "⚡ Azioni sui Clienti"))
             st.info(t("clients.messages.select_client_actions", "💡 **Seleziona un cliente dalla sezione 'Dettagli Cliente' per visualizzare le azioni disponibili**"))
         
-        # Dettagli cliente selezionato (opzionale)
-        if len(df_filtrato) > 0:
+        # Dettagli cliente selezionato (opzionale) tra quelli della pagina corrente
+        if len(df_pagina) > 0:
             st.subheader(t("clients.table.client_details", "👤 Dettagli Cliente"))
             
             # Selezione cliente per visualizzare i dettagli (ordinata alfabeticamente)
-            clienti_list = df_filtrato['nome_cliente'].tolist()
-            clienti_list.sort()
+            nomi_clienti = dict(zip(df_pagina['id'], df_pagina['nome_cliente']))
+            clienti_list = sorted(nomi_clienti, key=lambda cliente_id: str(nomi_clienti[cliente_id]))
             cliente_selezionato = st.selectbox(
                 t("clients.table.select_client", "Seleziona un cliente per visualizzare i dettagli completi:"),
                 options=clienti_list,
+                format_func=lambda cliente_id: nomi_clienti[cliente_id],
                 index=0
             )
             
-            if cliente_selezionato:
-                cliente_dettagli = df_filtrato[df_filtrato['nome_cliente'] == cliente_selezionato].iloc[0]
-                
+            # La pagina contiene solo le colonne della lista: il record completo si legge per id
+            cliente_dettagli = self.supabase.get_cliente_by_id(cliente_selezionato) if cliente_selezionato else None
+            if cliente_dettagli:
+                if not cliente_dettagli.get('data_registrazione'):
+                    cliente_dettagli['data_registrazione'] = cliente_dettagli.get('created_at')
                 # Mostra dettagli completi
                 col_det1, col_det2 = st.columns(2)
                 
@@ -361,6 +403,16 @@ class ClientTable:
                         # Copia i dati negli appunti (simulato)
                         st.success(t("clients.actions.data_copied", "Dati copiati negli appunti!"))
     
+    def _export_clienti_filtrati(self, filtri) -> pd.DataFrame:
+        """Tutti i clienti che soddisfano i filtri (solo colonne della lista), pagina per pagina"""
+        righe, cursore = [], None
+        while True:
+            page = self.supabase.get_clienti_page(limit=1000, cursor=cursore, **filtri)
+            righe.extend(page['rows'])
+            cursore = page['next_cursor']
+            if cursore is None:
+                return pd.DataFrame(righe)
+    
     def _get_wallet_info_from_dedicated_system(self, wallet_address: str, cliente_id: str = None):
         """Recupera le informazioni del wallet dal sistema dedicato"""
         if not wallet_address or not wallet_address.strip():
@@ -373,27 +425,14 @@ class ClientTable:
             if not wallet_manager.supabase_manager:
                 return None
             
-            # Cerca il wallet nel sistema dedicato
-            wallets = wallet_manager.get_wallet_collaboratori()
-            for wallet in wallets:
-                # Cerca nel campo note che contiene il wallet address
-                note = wallet.get('note', '')
-                if note and 'Wallet:' in note:
-                    note_wallet_address = note.split('Wallet:')[1].split('|')[0].strip()
-                    if note_wallet_address == wallet_address.strip():
-                        # Se abbiamo l'ID del cliente, verifica che corrisponda
-                        if cliente_id and cliente_id in note:
-                            # Calcola il saldo attuale
-                            saldo = wallet_manager.calculate_wallet_balance(wallet_address.strip())
-                            wallet['saldo_calcolato'] = saldo
-                            wallet['wallet_address'] = wallet_address.strip()  # Aggiungi per compatibilità
-                            return wallet
-                        elif not cliente_id:
-                            # Se non abbiamo l'ID del cliente, restituisci il primo match
-                            saldo = wallet_manager.calculate_wallet_balance(wallet_address.strip())
-                            wallet['saldo_calcolato'] = saldo
-                            wallet['wallet_address'] = wallet_address.strip()  # Aggiungi per compatibilità
-                            return wallet
+            # Cerca il wallet nell'indice indirizzo -> wallet (verificando il cliente se noto)
+            wallet = wallet_manager.find_wallet_by_address(wallet_address, cliente_id or None)
+            if wallet:
+                # Calcola il saldo attuale
+                saldo = wallet_manager.calculate_wallet_balance(wallet_address.strip())
+                wallet['saldo_calcolato'] = saldo
+                wallet['wallet_address'] = wallet_address.strip()  # Aggiungi per compatibilità
+                return wallet
             
             return None
         except Exception as e:
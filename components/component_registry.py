@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+🧩 COMPONENT REGISTRY
+Registro dei componenti della dashboard con costruzione lazy e thread-safe
+Ogni componente viene creato solo quando la pagina attiva lo richiede e poi
+riutilizzato tra rerun e sessioni (il registro è condiviso via st.cache_resource)
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List
+
+# Configurazione logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ComponentRegistry:
+    """Dizionario di componenti costruiti su richiesta da factory registrate"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[['ComponentRegistry'], Any]] = {}
+        self._requires: Dict[str, Iterable[Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self.build_times: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[['ComponentRegistry'], Any], requires: Iterable[Any] = ()):
+        """
+        Registra la factory di un componente
+
+        Args:
+            name: Chiave del componente (es. 'client_table')
+            factory: Funzione che riceve il registro (per risolvere le dipendenze) e crea il componente
+            requires: Classi/simboli necessari; il componente è disponibile solo se tutti sono veri
+                      (con simboli lazy la verifica importa il modulo solo a quel punto)
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._requires[name] = tuple(requires)
+
+    def __contains__(self, name: str) -> bool:
+        """True se il componente è disponibile (già costruito o costruibile)"""
+        if name in self._instances:
+            return True
+        return name in self._factories and all(self._requires.get(name, ()))
+
+    def __getitem__(self, name: str) -> Any:
+        """Restituisce il componente, costruendolo alla prima richiesta"""
+        if name in self._instances:
+            return self._instances[name]
+
+        with self._lock:
+            # Un'altra sessione potrebbe averlo costruito mentre si attendeva il lock
+            if name in self._instances:
+                return self._instances[name]
+            if name not in self._factories:
+                raise KeyError(name)
+
+            start = time.perf_counter()
+            instance = self._factories[name](self)
+            self.build_times[name] = time.perf_counter() - start
+            self._instances[name] = instance
+            logger.info(f"🧩 Componente '{name}' costruito in {self.build_times[name] * 1000:.1f} ms")
+            return instance
+
+    def __setitem__(self, name: str, instance: Any):
+        """Registra un'istanza già costruita"""
+        with self._lock:
+            self._instances[name] = instance
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Come dict.get: il componente se disponibile, altrimenti default"""
+        return self[name] if name in self else default
+
+    def built(self) -> List[str]:
+        """Componenti già costruiti"""
+        return list(self._instances)
+
+    def reset(self, name: str = None):
+        """Scarta un componente (o tutti) per forzarne la ricostruzione"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+                self.build_times.clear()
+            else:
+                self._instances.pop(name, None)
+                self.build_times.pop(name, None)
@@ -0,0 +1,112 @@
+"""
+📊 DASHBOARD STATS SERVICE
+Statistiche della home dashboard calcolate da un'unica lettura della tabella clienti
+"""
+
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Any, Optional
+import logging
+
+# Configurazione logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Chiave di sessione in cui vengono conservate le statistiche
+SESSION_KEY = 'dashboard_home_stats'
+
+# Righe per pagina nella lettura dei clienti (PostgREST restituisce al massimo 1000 righe per richiesta)
+STATS_PAGE_SIZE = 1000
+
+class DashboardStatsService:
+    """Raccoglie conteggi, depositi e distribuzioni per la home della dashboard"""
+
+    def __init__(self, supabase_manager=None):
+        """Inizializza il servizio con il SupabaseManager condiviso"""
+        if supabase_manager is None:
+            from supabase_manager import SupabaseManager
+            supabase_manager = SupabaseManager()
+        self.supabase_manager = supabase_manager
+
+    def get_stats(self, session_state: Optional[Dict[str, Any]] = None, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Restituisce le statistiche, cachate nella sessione fino al refresh manuale
+
+        Args:
+            session_state: Dizionario di sessione (st.session_state); se None non si usa cache
+            force_refresh: Ignora la cache e ricalcola
+
+        Returns:
+            Dizionario con conteggi, depositi e distribuzioni
+        """
+        if session_state is not None and not force_refresh and SESSION_KEY in session_state:
+            return session_state[SESSION_KEY]
+
+        stats = self.compute_stats()
+        if session_state is not None:
+            session_state[SESSION_KEY] = stats
+        return stats
+
+    def compute_stats(self) -> Dict[str, Any]:
+        """Legge i dati necessari (clienti a pagine + due conteggi) e calcola le statistiche"""
+        supabase = self.supabase_manager.supabase if self.supabase_manager else None
+        if not supabase:
+            return self._empty_stats("Supabase non configurato")
+
+        try:
+            clienti = self._load_clienti(supabase)
+            incroci_response = supabase.table('incroci').select('id', count='exact').limit(1).execute()
+            users_response = supabase.table('users').select('id', count='exact').limit(1).execute()
+        except Exception as e:
+            logger.error(f"❌ Errore recupero statistiche dashboard: {e}")
+            return self._empty_stats(str(e))
+
+        stats = self.aggregate_clienti(clienti)
+        stats['incroci_count'] = incroci_response.count or 0
+        stats['users_count'] = users_response.count or 0
+        return stats
+
+    @staticmethod
+    def _load_clienti(supabase) -> list:
+        """Legge a pagine broker, piattaforma e deposito di tutti i clienti fino a una pagina incompleta"""
+        clienti = []
+        offset = 0
+        while True:
+            page = supabase.table('clienti').select('broker, piattaforma, deposito').order('id')\
+                .range(offset, offset + STATS_PAGE_SIZE - 1).execute().data or []
+            clienti.extend(page)
+            if len(page) < STATS_PAGE_SIZE:
+                return clienti
+            offset += STATS_PAGE_SIZE
+
+    @classmethod
+    def aggregate_clienti(cls, clienti: list) -> Dict[str, Any]:
+        """Calcola in un unico passaggio pandas conteggio, depositi e distribuzioni dei clienti"""
+        stats = cls._empty_stats()
+        if not clienti:
+            return stats
+
+        df = pd.DataFrame(clienti, columns=['broker', 'piattaforma', 'deposito'])
+        df['deposito'] = pd.to_numeric(df['deposito'], errors='coerce').fillna(0.0)
+
+        stats['clienti_count'] = len(df)
+        stats['depositi_totali'] = float(df['deposito'].sum())
+        stats['per_broker'] = df['broker'].value_counts()
+        stats['per_piattaforma'] = df['piattaforma'].value_counts()
+        stats['depositi_per_broker'] = df.groupby('broker')['deposito'].sum()
+        return stats
+
+    @staticmethod
+    def _empty_stats(error: Optional[str] = None) -> Dict[str, Any]:
+        """Struttura statistiche vuota"""
+        return {
+            'clienti_count': 0,
+            'incroci_count': 0,
+            'users_count': 0,
+            'depositi_totali': 0.0,
+            'per_broker': pd.Series(dtype='int64'),
+            'per_piattaforma': pd.Series(dtype='int64'),
+            'depositi_per_broker': pd.Series(dtype='float64'),
+            'aggiornato_il': datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+            'error': error
+        }
@@ -407,11 +407,12 @@ class DepositManagement:
             st.info("📋 Nessun wallet disponibile.")
             return
         
-        # Calcola saldi
+        # Calcola saldi (una sola lettura del ledger per tutti i wallet)
+        saldi = self.wallet_manager.get_all_wallet_balances()
         wallet_data = []
         for wallet in all_wallets:
             if wallet.get('attivo', True):
-                saldo = self.wallet_manager.calculate_wallet_balance(wallet['nome_wallet'])
+                saldo = saldi.get(wallet['nome_wallet'], 0.0)
                 wallet_data.append({
                     'nome_wallet': wallet['nome_wallet'],
                     'proprietario': wallet.get('proprietario', 'N/A'),
@@ -13,6 +13,11 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Proiezioni della vista incroci attivi (solo i campi usati dall'interfaccia di chiusura)
+ACTIVE_CROSS_COLUMNS = ['id', 'nome_incrocio', 'data_apertura', 'pair_trading', 'volume_trading', 'note']
+ACTIVE_ACCOUNT_COLUMNS = ['numero_conto', 'broker', 'piattaforma', 'volume_posizione']
+ACTIVE_CLIENT_COLUMNS = ['id', 'nome_cliente', 'wallet']
+
 class IncrociCloseManager:
     """Gestore per la chiusura degli incroci con bilanciamento automatico"""
     
@@ -43,87 +48,93 @@ class IncrociCloseManager:
             self.wallet_manager = None
     
     def get_active_crosses(self) -> List[Dict[str, Any]]:
-        """Recupera tutti gli incroci attivi"""
+        """
+        Recupera tutti gli incroci attivi con la coppia long/short già risolta
+        
+        Round-trip costanti qualunque sia il numero di incroci: una query con gli
+        account embedded (condivisa tramite la cache di lettura) e la rubrica clienti,
+        con al massimo una query batch in_() per i conti non ancora presenti in rubrica.
+        
+        Returns:
+            Lista di incroci con cliente_long/short ({'id', 'nome_cliente', 'wallet'})
+            e account_long/short ({'numero_conto', 'broker', 'piattaforma', 'volume_posizione'})
+        """
         if not self.supabase_manager:
             return []
         
         try:
-            # Query per incroci attivi con informazioni clienti
-            response = self.supabase_manager.supabase.table('incroci').select('''
-                *,
-                incroci_account!inner(*)
-            ''').eq('stato', 'attivo').order('data_apertura', desc=True).execute()
-            
-            if not response.data:
-                return []
-            
-            # Organizza i dati per incrocio
-            incroci_data = {}
-            for incrocio in response.data:
-                incrocio_id = incrocio['id']
-                if incrocio_id not in incroci_data:
-                    incroci_data[incrocio_id] = {
-                        'id': incrocio_id,
-                        'nome_incrocio': incrocio['nome_incrocio'],
-                        'data_apertura': incrocio['data_apertura'],
-                        'pair_trading': incrocio['pair_trading'],
-                        'volume_trading': incrocio.get('volume_trading', 0),
-                        'note': incrocio.get('note', ''),
-                        'accounts': []
-                    }
-                
-                # Aggiungi account
-                for account in incrocio.get('incroci_account', []):
-                    incroci_data[incrocio_id]['accounts'].append(account)
-            
-            # Converti in lista e aggiungi informazioni clienti
-            incroci_list = []
-            for incrocio_id, incrocio_data in incroci_data.items():
-                # Trova account long e short
-                account_long = None
-                account_short = None
-                
-                for account in incrocio_data['accounts']:
-                    if account['tipo_posizione'] == 'long':
-                        account_long = account
-                    elif account['tipo_posizione'] == 'short':
-                        account_short = account
-                
-                if account_long and account_short:
-                    # Recupera informazioni clienti
-                    cliente_long_info = self._get_cliente_info(account_long['numero_conto'])
-                    cliente_short_info = self._get_cliente_info(account_short['numero_conto'])
-                    
-                    incroci_list.append({
-                        'id': incrocio_id,
-                        'nome_incrocio': incrocio_data['nome_incrocio'],
-                        'data_apertura': incrocio_data['data_apertura'],
-                        'pair_trading': incrocio_data['pair_trading'],
-                        'volume_trading': incrocio_data['volume_trading'],
-                        'note': incrocio_data['note'],
-                        'cliente_long': cliente_long_info,
-                        'cliente_short': cliente_short_info,
-                        'account_long': account_long,
-                        'account_short': account_short
-                    })
-            
-            return incroci_list
-            
+            # Query unica per incroci attivi e relativi account (solo colonne usate)
+            incroci = self.supabase_manager.cached_read('incroci', lambda: self.supabase_manager.supabase.table('incroci').select(
+                f"{', '.join(ACTIVE_CROSS_COLUMNS)}, incroci_account!inner({', '.join(['tipo_posizione'] + ACTIVE_ACCOUNT_COLUMNS)})"
+            ).eq('stato', 'attivo').order('data_apertura', desc=True).execute().data or [], key='active_crosses')
         except Exception as e:
             logger.error(f"❌ Errore recupero incroci attivi: {e}")
             return []
+        
+        # Coppia long/short per incrocio (account incompleti esclusi)
+        coppie = []
+        for incrocio in incroci:
+            posizioni = {account.get('tipo_posizione'): account for account in incrocio.get('incroci_account') or []}
+            if 'long' in posizioni and 'short' in posizioni:
+                coppie.append((incrocio, posizioni['long'], posizioni['short']))
+        
+        clienti = self._get_clienti_by_conto(
+            [account['numero_conto'] for _, long_acc, short_acc in coppie for account in (long_acc, short_acc)]
+        )
+        
+        incroci_list = []
+        for incrocio, account_long, account_short in coppie:
+            voce = {column: incrocio.get(column) for column in ACTIVE_CROSS_COLUMNS}
+            voce['volume_trading'] = voce['volume_trading'] or 0
+            voce['note'] = voce['note'] or ''
+            for tipo, account in (('long', account_long), ('short', account_short)):
+                voce[f'account_{tipo}'] = {column: account.get(column) for column in ACTIVE_ACCOUNT_COLUMNS}
+                voce[f'cliente_{tipo}'] = clienti.get(str(account.get('numero_conto')))
+            incroci_list.append(voce)
+        
+        return incroci_list
+    
+    def _get_clienti_by_conto(self, numeri_conto: List[Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Risolve i numeri conto in clienti compatti ({'id', 'nome_cliente', 'wallet'})
+        
+        Usa la rubrica clienti condivisa; i conti non presenti (es. clienti appena
+        creati da un altro processo) vengono letti con una query batch in_().
+        """
+        conti = sorted({str(conto) for conto in numeri_conto if conto})
+        clienti = {}
+        if not conti:
+            return clienti
+        
+        mancanti = []
+        try:
+            rubrica = self.supabase_manager.get_client_directory()
+            for conto in conti:
+                cliente = rubrica.by_numero_conto(conto)
+                if cliente:
+                    clienti[conto] = {column: cliente.get(column) for column in ACTIVE_CLIENT_COLUMNS}
+                else:
+                    mancanti.append(conto)
+            
+            if mancanti:
+                response = self.supabase_manager.supabase.table('clienti')\
+                    .select(', '.join(ACTIVE_CLIENT_COLUMNS + ['numero_conto']))\
+                    .in_('numero_conto', mancanti)\
+                    .execute()
+                for cliente in response.data or []:
+                    clienti.setdefault(str(cliente['numero_conto']),
+                                       {column: cliente.get(column) for column in ACTIVE_CLIENT_COLUMNS})
+        except Exception as e:
+            logger.error(f"❌ Errore recupero clienti incroci attivi: {e}")
+        
+        return clienti
     
     def _get_cliente_info(self, numero_conto: str) -> Optional[Dict[str, Any]]:
         """Recupera informazioni cliente dal numero conto"""
         if not self.supabase_manager:
             return None
         
-        try:
-            response = self.supabase_manager.supabase.table('clienti').select('id, nome_cliente, wallet').eq('numero_conto', numero_conto).execute()
-            return response.data[0] if response.data else None
-        except Exception as e:
-            logger.error(f"❌ Errore recupero cliente {numero_conto}: {e}")
-            return None
+        return self._get_clienti_by_conto([numero_conto]).get(str(numero_conto))
     
     def render_close_cross_interface(self):
         """Rende l'interfaccia per chiudere gli incroci"""
@@ -301,10 +312,12 @@ class IncrociCloseManager:
             update_data = {
                 'stato': 'chiuso',
                 'data_chiusura': datetime.now().isoformat(),
+                'updated_at': datetime.now().isoformat(),
                 'note': f"{incrocio.get('note', '')}\n\nChiusura: {note_chiusura}".strip()
             }
             
             response = self.supabase_manager.supabase.table('incroci').update(update_data).eq('id', incrocio['id']).execute()
+            self.supabase_manager.invalidate_cache('incroci')
             
             if not response.data:
                 return False, "❌ Errore aggiornamento stato incrocio"
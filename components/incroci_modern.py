@@ -35,9 +35,6 @@ class IncrociModern:
         except Exception as e:
             st.error(f"❌ Errore inizializzazione SupabaseManager: {e}")
             self.supabase_manager = None
-        
-        # CSS personalizzato per design moderno
-        self._load_custom_css()
     
     def _load_custom_css(self):
         """Carica CSS personalizzato per design moderno"""
@@ -238,6 +235,9 @@ class IncrociModern:
     
     def render(self):
         """Rende l'interfaccia moderna completa"""
+        # CSS personalizzato a ogni render: l'istanza è condivisa tra sessioni e rerun
+        self._load_custom_css()
+        
         # Header moderno
         st.markdown("""
         <div class="modern-header fade-in">
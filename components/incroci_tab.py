@@ -380,12 +380,40 @@ class IncrociTab:
                         st.error("❌ Errore nella creazione dell'incrocio")
                 else:
                     st.error("❌ Dati mancanti o non validi")
+        
+        self.render_importa_csv()
+    
+    def render_importa_csv(self):
+        """Importazione di più incroci da CSV (tutti o nessuno)"""
+        from database.incroci_manager import CSV_REQUIRED_COLUMNS
+        
+        with st.expander("📥 Importa Incroci da CSV", expanded=False):
+            st.info(
+                "💡 **Colonne obbligatorie**: " + ", ".join(CSV_REQUIRED_COLUMNS) +
+                ". **Facoltative**: volume_trading, volume_long, volume_short, note, bonus_importo, bonus_data. "
+                "Date in formato AAAA-MM-GG; i clienti vengono associati tramite numero conto."
+            )
+            file_csv = st.file_uploader("File CSV", type=["csv"], key="incroci_csv_upload")
+            
+            if file_csv is not None and st.button("🚀 Importa Incroci", key="incroci_csv_import"):
+                with st.spinner("Importazione in corso..."):
+                    success, risultato = self.incroci_manager.importa_incroci_csv(file_csv)
+                
+                if success:
+                    st.success(f"✅ {len(risultato)} incroci importati con successo!")
+                else:
+                    st.error(f"❌ Importazione annullata: {risultato}")
     
     def render_statistiche(self):
         """Rende le statistiche degli incroci"""
         st.subheader("📊 Statistiche Incroci")
         
-        stats = self.incroci_manager.ottieni_statistiche_incroci()
+        # Periodo opzionale (filtro sulla data di apertura applicato dal database)
+        periodo = st.date_input("📅 Periodo apertura", value=(), key="incroci_stats_periodo")
+        data_da = periodo[0] if len(periodo) > 0 else None
+        data_a = periodo[1] if len(periodo) > 1 else None
+        
+        stats = self.incroci_manager.ottieni_statistiche_incroci(data_da, data_a)
         if not stats:
             st.info("Nessuna statistica disponibile")
             return
@@ -424,6 +452,12 @@ class IncrociTab:
                 fig = px.bar(broker_data, x='Broker', y='Utilizzi', title="Utilizzo per Broker")
                 st.plotly_chart(fig, width='stretch')
         
+        st.write("**Andamento Mensile**")
+        if stats.get('per_mese'):
+            mese_data = pd.DataFrame(stats['per_mese'], columns=['Mese', 'Incroci', 'Volume', 'Bonus'])
+            fig = px.bar(mese_data, x='Mese', y='Incroci', hover_data=['Volume', 'Bonus'], title="Incroci aperti per mese")
+            st.plotly_chart(fig, width='stretch')
+        
         # Tabella dettagliata
         st.write("**Dettagli per Pair**")
         if stats['per_pair']:
@@ -445,8 +479,8 @@ class IncrociTab:
         """Ottiene la lista dei clienti per i selectbox da Supabase"""
         try:
             if self.supabase_manager:
-                # Usa Supabase per i clienti
-                clienti = self.supabase_manager.get_clienti()
+                # Usa la rubrica clienti condivisa (solo le colonne necessarie)
+                clienti = self.supabase_manager.get_client_directory().all()
                 if clienti:
                     options = [(f"{cliente['nome_cliente']} ({cliente['broker']})", cliente['id']) for cliente in clienti]
                     return options
@@ -510,12 +544,8 @@ class IncrociTab:
         """Ottiene le informazioni di un cliente specifico da Supabase"""
         try:
             if self.supabase_manager:
-                # Usa Supabase per le info cliente
-                clienti = self.supabase_manager.get_clienti()
-                for cliente in clienti:
-                    if str(cliente['id']) == str(cliente_id):
-                        return cliente
-                return {}
+                # Usa la rubrica clienti condivisa (indice per id)
+                return self.supabase_manager.get_client_directory().get(cliente_id) or {}
             else:
                 # Fallback al database locale se Supabase non è disponibile
                 clienti_df = self.database_manager.ottieni_tutti_clienti()
@@ -9,7 +9,7 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Any
 import logging
 
@@ -141,27 +141,26 @@ class NotificationDashboard:
         """Rende il tab statistiche"""
         st.subheader("📈 Statistiche Dettagliate")
         
-        if not self.supabase_manager:
-            st.error("❌ SupabaseManager non disponibile")
+        if not self.telegram_manager:
+            st.error("❌ TelegramManager non disponibile")
             return
         
         try:
-            # Recupera log degli ultimi 30 giorni
-            thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
-            
-            response = self.supabase_manager.supabase.table('notification_logs').select('*').gte('sent_at', thirty_days_ago).execute()
+            # Contatori giornalieri per tipo degli ultimi 30 giorni
+            rollups = self.telegram_manager.get_notification_rollups()
             
-            if not response.data:
+            if not rollups:
                 st.info("📋 Nessun log di notifiche trovato negli ultimi 30 giorni")
                 return
             
-            logs_df = pd.DataFrame(response.data)
+            stats_df = pd.DataFrame(rollups)
+            stats_df['totale'] = stats_df['sent'] + stats_df['failed']
             
             # Grafico notifiche per giorno
             st.subheader("📅 Notifiche per Giorno")
             
-            logs_df['date'] = pd.to_datetime(logs_df['sent_at']).dt.date
-            daily_counts = logs_df.groupby('date').size().reset_index(name='count')
+            stats_df['date'] = pd.to_datetime(stats_df['giorno']).dt.date
+            daily_counts = stats_df.groupby('date')['totale'].sum().reset_index(name='count')
             
             fig_daily = px.line(daily_counts, x='date', y='count', 
                               title='Notifiche Inviate per Giorno',
@@ -172,7 +171,8 @@ class NotificationDashboard:
             # Grafico notifiche per tipo
             st.subheader("📊 Notifiche per Tipo")
             
-            type_counts = logs_df['notification_type'].value_counts().reset_index()
+            per_type = stats_df.groupby('notification_type')[['sent', 'totale']].sum()
+            type_counts = per_type['totale'].sort_values(ascending=False).reset_index()
             type_counts.columns = ['Tipo', 'Conteggio']
             
             fig_type = px.pie(type_counts, values='Conteggio', names='Tipo',
@@ -183,9 +183,7 @@ class NotificationDashboard:
             # Grafico success rate per tipo
             st.subheader("📈 Success Rate per Tipo")
             
-            success_by_type = logs_df.groupby('notification_type').agg({
-                'status': lambda x: (x == 'sent').sum() / len(x) * 100
-            }).reset_index()
+            success_by_type = (per_type['sent'] / per_type['totale'] * 100).reset_index()
             success_by_type.columns = ['Tipo', 'Success Rate']
             
             fig_success = px.bar(success_by_type, x='Tipo', y='Success Rate',
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+🗂️ PAGE REGISTRY
+Import lazy dei moduli delle pagine della dashboard
+Ogni modulo viene importato solo quando la pagina che lo usa viene selezionata
+per la prima volta dal menu (il login non paga l'import di tutte le pagine)
+"""
+
+import time
+import logging
+import importlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Configurazione logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_NOT_LOADED = object()
+
+class LazySymbol:
+    """Riferimento a una classe/funzione di un modulo, importato al primo utilizzo"""
+
+    def __init__(self, module: str, attr: str, label: Optional[str] = None):
+        self.module = module
+        self.attr = attr
+        self.label = label or attr
+        self.error: Optional[str] = None
+        self.import_ms: Optional[float] = None
+        self._value = _NOT_LOADED
+        self._lock = threading.Lock()
+
+    def load(self) -> Any:
+        """Importa il simbolo (una sola volta); None se l'import fallisce"""
+        if self._value is not _NOT_LOADED:
+            return self._value
+
+        with self._lock:
+            if self._value is _NOT_LOADED:
+                start = time.perf_counter()
+                try:
+                    self._value = getattr(importlib.import_module(self.module), self.attr)
+                    logger.info(f"✅ {self.label} importato correttamente")
+                except Exception as e:
+                    self._value = None
+                    self.error = str(e)
+                    logger.error(f"❌ Errore import {self.label}: {e}")
+                self.import_ms = (time.perf_counter() - start) * 1000
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        """True se l'import è già stato tentato"""
+        return self._value is not _NOT_LOADED
+
+    def __bool__(self) -> bool:
+        return self.load() is not None
+
+    def __call__(self, *args, **kwargs):
+        value = self.load()
+        if value is None:
+            raise ImportError(f"{self.label} non disponibile: {self.error}")
+        return value(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"LazySymbol({self.module}.{self.attr})"
+
+class PageRegistry:
+    """Associa a ogni pagina del menu i simboli (lazy) di cui ha bisogno"""
+
+    def __init__(self):
+        self._symbols: Dict[Tuple[str, str], LazySymbol] = {}
+        self._pages: Dict[str, List[LazySymbol]] = {}
+
+    def symbol(self, module: str, attr: str, label: Optional[str] = None) -> LazySymbol:
+        """Restituisce il LazySymbol per module.attr (uno solo per coppia)"""
+        key = (module, attr)
+        if key not in self._symbols:
+            self._symbols[key] = LazySymbol(module, attr, label)
+        return self._symbols[key]
+
+    def register(self, page: str, *symbols: LazySymbol):
+        """Dichiara i simboli usati da una pagina"""
+        self._pages.setdefault(page, []).extend(symbols)
+
+    def page_modules(self) -> Dict[str, List[str]]:
+        """Moduli importati alla prima visita di ciascuna pagina"""
+        return {
+            page: list(dict.fromkeys(symbol.module for symbol in symbols))
+            for page, symbols in self._pages.items()
+        }
+
+    def load_page(self, page: str) -> List[Tuple[str, str]]:
+        """
+        Importa i moduli della pagina selezionata
+
+        Returns:
+            Lista di (etichetta, errore) per i simboli non importabili
+        """
+        failures = []
+        for symbol in self._pages.get(page, []):
+            if symbol.load() is None:
+                failures.append((symbol.label, symbol.error))
+        return failures
+
+    def get_import_times(self) -> Dict[str, float]:
+        """Millisecondi spesi per l'import di ciascun simbolo già caricato"""
+        return {
+            f"{symbol.module}.{symbol.attr}": symbol.import_ms
+            for symbol in self._symbols.values()
+            if symbol.import_ms is not None
+        }
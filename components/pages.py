@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+🗂️ PAGINE DELLA DASHBOARD
+Simboli lazy di ciascuna pagina del menu (vedi components/page_registry.py)
+Modulo senza effetti collaterali: lo importano app.py e benchmark_import_time.py
+"""
+
+from components.page_registry import PageRegistry
+
+pages = PageRegistry()
+
+Charts = pages.symbol('components.charts', 'Charts')
+ClientForm = pages.symbol('components.client_form', 'ClientForm')
+ClientTable = pages.symbol('components.client_table', 'ClientTable')
+IncrociTab = pages.symbol('components.incroci_tab', 'IncrociTab')
+IncrociManager = pages.symbol('database.incroci_manager', 'IncrociManager')
+BrokerLinksManager = pages.symbol('components.broker_links_manager', 'BrokerLinksManager')
+VPSUI = pages.symbol('components.vps_ui', 'VPSUI')
+VPSNotifications = pages.symbol('components.vps_notifications', 'VPSNotifications')
+render_ai_assistant = pages.symbol('components.ai_assistant.ai_ui_components', 'render_ai_assistant', 'AI Assistant')
+render_user_navigation = pages.symbol('components.user_navigation', 'render_user_navigation')
+
+# Sistema gestione wallet
+WalletTransactionsManager = pages.symbol('components.wallet_transactions_manager', 'WalletTransactionsManager')
+WalletTransactionForm = pages.symbol('components.wallet_transaction_form', 'WalletTransactionForm')
+WalletTransactionTable = pages.symbol('components.wallet_transaction_table', 'WalletTransactionTable')
+WalletManagement = pages.symbol('components.wallet_management', 'WalletManagement')
+DepositManagement = pages.symbol('components.deposit_management', 'DepositManagement')
+
+# Backup (non legati a una pagina: importati solo se usati)
+DatabaseBackupManager = pages.symbol('utils.backup', 'DatabaseBackupManager')
+auto_backup = pages.symbol('utils.backup', 'auto_backup')
+create_secure_backup = pages.symbol('utils.secure_backup', 'create_secure_backup')
+list_secure_backups = pages.symbol('utils.secure_backup', 'list_secure_backups')
+restore_from_secure_backup = pages.symbol('utils.secure_backup', 'restore_from_secure_backup')
+
+pages.register("🏠 Dashboard", render_user_navigation, VPSNotifications)
+pages.register("👥 Gestione Clienti", ClientForm, ClientTable)
+pages.register("🔄 Incroci", IncrociManager, IncrociTab)
+pages.register("🔗 Broker", BrokerLinksManager)
+pages.register("🖥️ VPS", VPSUI)
+pages.register("💰 Wallet", WalletTransactionsManager, WalletTransactionForm, WalletTransactionTable,
+               WalletManagement, DepositManagement)
+pages.register("📈 Riepilogo", ClientTable, Charts)
+pages.register("🤖 AI Assistant", render_ai_assistant)
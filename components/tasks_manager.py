@@ -803,69 +803,46 @@ class TasksManager:
             logger.error(f"❌ Errore invio notifica task '{notification_type}': {e}")
     
     def _is_notification_enabled(self, notification_type: str) -> bool:
-        """Controlla se le notifiche per un tipo specifico sono abilitate"""
-        try:
-            if not self.supabase_manager:
-                # Default settings se Supabase non disponibile
-                default_settings = {
-                    'task_new_task': True,
-                    'task_completed': True,
-                    'task_due_soon': True,
-                    'task_daily_report': False,
-                }
-                return default_settings.get(notification_type, True)
-            
-            # Recupera impostazioni notifiche dal database
-            response = self.supabase_manager.supabase.table('notification_settings').select('*').eq('notification_type', notification_type).execute()
-            
-            if response.data and len(response.data) > 0:
-                setting = response.data[0]
-                return setting.get('is_enabled', True)
-            else:
-                # Default settings se nessuna impostazione trovata
-                default_settings = {
-                    'task_new_task': True,
-                    'task_completed': True,
-                    'task_due_soon': True,
-                    'task_daily_report': False,
-                }
-                return default_settings.get(notification_type, True)
-                
-        except Exception as e:
-            logger.error(f"❌ Errore controllo impostazioni notifiche {notification_type}: {e}")
-            # Default settings in caso di errore
-            default_settings = {
-                'task_new_task': True,
-                'task_completed': True,
-                'task_due_soon': True,
-                'task_daily_report': False,
-            }
-            return default_settings.get(notification_type, True)
+        """Controlla se le notifiche per un tipo specifico sono abilitate (registro condiviso)"""
+        if not self.supabase_manager:
+            from supabase_manager import DEFAULT_NOTIFICATION_SETTINGS
+            return DEFAULT_NOTIFICATION_SETTINGS.get(notification_type, True)
+        
+        return self.supabase_manager.is_notification_enabled(notification_type)
+    
+    def get_tasks_due_soon(self, max_days: int = 3) -> List[Tuple[Dict[str, Any], int]]:
+        """
+        Task aperti che scadono tra 1 e max_days giorni
+        
+        Returns:
+            Lista di (task, giorni rimanenti)
+        """
+        due_soon = []
+        today = date.today()
+        
+        for task in self.get_tasks():
+            if not task.get('due_date') or task.get('status') in [TaskStatus.COMPLETED.value, TaskStatus.CANCELLED.value]:
+                continue
+            
+            try:
+                due_date = datetime.fromisoformat(task['due_date']).date()
+                days_left = (due_date - today).days
+                if 1 <= days_left <= max_days:
+                    due_soon.append((task, days_left))
+            except Exception as e:
+                logger.error(f"❌ Errore controllo scadenza task {task.get('id')}: {e}")
+        
+        return due_soon
     
     def check_task_due_notifications(self):
-        """Controlla e invia notifiche per task in scadenza"""
+        """Controlla e invia notifiche per task in scadenza (eseguito dallo scheduler, vedi utils/job_scheduler.py)"""
         try:
-            tasks = self.get_tasks()
-            today = date.today()
-            
-            for task in tasks:
-                if not task.get('due_date') or task.get('status') in [TaskStatus.COMPLETED.value, TaskStatus.CANCELLED.value]:
-                    continue
-                
-                try:
-                    due_date = datetime.fromisoformat(task['due_date']).date()
-                    days_left = (due_date - today).days
-                    
-                    # Invia notifica se scade tra 1-3 giorni
-                    if 1 <= days_left <= 3:
-                        self._send_task_notification('task_due_soon', {
-                            'title': task.get('title', 'N/A'),
-                            'days_left': days_left,
-                            'assigned_to': task.get('assigned_to', []),
-                            'priority': task.get('priority', 'N/A')
-                        })
-                except Exception as e:
-                    logger.error(f"❌ Errore controllo scadenza task {task.get('id')}: {e}")
-                    
+            for task, days_left in self.get_tasks_due_soon():
+                self._send_task_notification('task_due_soon', {
+                    'title': task.get('title', 'N/A'),
+                    'days_left': days_left,
+                    'assigned_to': task.get('assigned_to', []),
+                    'priority': task.get('priority', 'N/A')
+                })
         except Exception as e:
             logger.error(f"❌ Errore controllo task in scadenza: {e}")
@@ -803,44 +803,12 @@ class TasksManager:
             logger.error(f"❌ Errore invio notifica task '{notification_type}': {e}")
     
     def _is_notification_enabled(self, notification_type: str) -> bool:
-        """Controlla se le notifiche per un tipo specifico sono abilitate"""
-        try:
-            if not self.supabase_manager:
-                # Default settings se Supabase non disponibile
-                default_settings = {
-                    'task_new_task': True,
-                    'task_completed': True,
-                    'task_due_soon': True,
-                    'task_daily_report': False,
-                }
-                return default_settings.get(notification_type, True)
-            
-            # Recupera impostazioni notifiche dal database
-            response = self.supabase_manager.supabase.table('notification_settings').select('*').eq('notification_type', notification_type).execute()
-            
-            if response.data and len(response.data) > 0:
-                setting = response.data[0]
-                return setting.get('is_enabled', True)
-            else:
-                # Default settings se nessuna impostazione trovata
-                default_settings = {
-                    'task_new_task': True,
-                    'task_completed': True,
-                    'task_due_soon': True,
-                    'task_daily_report': False,
-                }
-                return default_settings.get(notification_type, True)
-                
-        except Exception as e:
-            logger.error(f"❌ Errore controllo impostazioni notifiche {notification_type}: {e}")
-            # Default settings in caso di errore
-            default_settings = {
-                'task_new_task': True,
-                'task_completed': True,
-                'task_due_soon': True,
-                'task_daily_report': False,
-            }
-            return default_settings.get(notification_type, True)
+        """Controlla se le notifiche per un tipo specifico sono abilitate (registro condiviso)"""
+        if not self.supabase_manager:
+            from supabase_manager import DEFAULT_NOTIFICATION_SETTINGS
+            return DEFAULT_NOTIFICATION_SETTINGS.get(notification_type, True)
+        
+        return self.supabase_manager.is_notification_enabled(notification_type)
     
     def check_task_due_notifications(self):
         """Controlla e invia notifiche per task in scadenza"""
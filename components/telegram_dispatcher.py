@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+"""
+📨 TELEGRAM DISPATCHER
+Coda asincrona per l'invio delle notifiche Telegram
+I produttori accodano e tornano subito; un thread di background invia i messaggi,
+ripianifica i tentativi falliti (schedule persistito su file privato, senza token del bot)
+e scrive i log a blocchi.
+Gli invii rispettano un token bucket per chat e le raffiche di eventi dello stesso tipo
+vengono accorpate in un unico messaggio riepilogativo
+"""
+
+import os
+import json
+import time
+import heapq
+import queue
+import atexit
+import logging
+import threading
+import uuid
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any, Callable
+
+import requests
+
+from utils.private_files import private_path, create_private_file
+
+# Configurazione logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Configurazione dispatcher
+TELEGRAM_API_BASE = os.getenv('TELEGRAM_API_BASE', 'https://api.telegram.org')
+DISPATCH_QUEUE_SIZE = int(os.getenv('TELEGRAM_QUEUE_SIZE', 500))
+DISPATCH_HTTP_TIMEOUT = float(os.getenv('TELEGRAM_HTTP_TIMEOUT', 10))
+RETRY_DELAYS = [2, 10, 60, 300]  # Secondi di attesa prima di ogni nuovo tentativo
+# Schedule dei retry: senza TELEGRAM_RETRY_SPOOL il file sta nella directory dati privata
+RETRY_SPOOL_PATH = os.getenv('TELEGRAM_RETRY_SPOOL')
+RETRY_SPOOL_FILENAME = 'telegram_retry.json'
+LOG_BATCH_SIZE = 20
+LOG_FLUSH_INTERVAL = 2.0
+
+# Limiti di invio per chat (Telegram: ~1 msg/s per chat privata, 20 msg/min per gruppi e canali)
+CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1.0))
+CHAT_BURST = float(os.getenv('TELEGRAM_CHAT_BURST', 3))
+GROUP_RATE = float(os.getenv('TELEGRAM_GROUP_RATE', 20 / 60))
+GROUP_BURST = float(os.getenv('TELEGRAM_GROUP_BURST', 5))
+
+# Finestra di accorpamento degli eventi dello stesso tipo in un messaggio riepilogativo
+COALESCE_WINDOW = float(os.getenv('TELEGRAM_COALESCE_WINDOW', 3.0))
+DIGEST_MAX_CHARS = 3800  # Telegram accetta al massimo 4096 caratteri per messaggio
+DIGEST_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+
+def _default_log_writer(rows: List[Dict[str, Any]]):
+    """Scrive un blocco di log in notification_logs con un'unica insert"""
+    from supabase_manager import SupabaseManager
+    supabase_manager = SupabaseManager()
+    if supabase_manager.supabase:
+        supabase_manager.supabase.table('notification_logs').insert(rows).execute()
+
+def _default_token_resolver() -> Optional[str]:
+    """Token del bot dalla configurazione Telegram corrente (telegram_config)"""
+    from supabase_manager import SupabaseManager
+    supabase_manager = SupabaseManager()
+    if not supabase_manager.supabase:
+        return None
+    response = supabase_manager.supabase.table('telegram_config').select('bot_token').limit(1).execute()
+    return (response.data or [{}])[0].get('bot_token')
+
+def token_ref(bot_token: str) -> str:
+    """Riferimento non reversibile al token del bot, salvato nello spool al posto del token"""
+    return hashlib.sha256(bot_token.encode('utf-8')).hexdigest()[:16]
+
+class ChatRateLimiter:
+    """
+    Token bucket per chat: ogni invio consuma un gettone, i gettoni si ricaricano a `rate` al secondo
+    fino a `burst`. Le chat con id negativo (gruppi, supergruppi e canali) usano i limiti di gruppo.
+    """
+
+    def __init__(self, rate: float = CHAT_RATE, burst: float = CHAT_BURST,
+                 group_rate: float = GROUP_RATE, group_burst: float = GROUP_BURST,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limits = {False: (rate, burst), True: (group_rate, group_burst)}
+        self.clock = clock
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _refill(self, chat_id: str) -> Tuple[float, float, float]:
+        """Gettoni disponibili ora per la chat (possono essere negativi se già prenotati)"""
+        rate, burst = self.limits[str(chat_id).startswith('-')]
+        now = self.clock()
+        tokens, updated_at = self._buckets.get(str(chat_id), (burst, now))
+        return min(burst, tokens + (now - updated_at) * rate), rate, now
+
+    def reserve(self, chat_id: str, max_wait: Optional[float] = None) -> float:
+        """
+        Prenota un invio per la chat
+
+        Args:
+            max_wait: Se l'attesa supera questo valore l'invio non viene prenotato
+
+        Returns:
+            Secondi da attendere prima dell'invio (0 se c'è un gettone libero)
+        """
+        with self._lock:
+            tokens, rate, now = self._refill(chat_id)
+            tokens -= 1
+            wait = 0.0 if tokens >= 0 else -tokens / rate
+            if max_wait is None or wait <= max_wait:
+                self._buckets[str(chat_id)] = (tokens, now)
+            return wait
+
+    def pause(self, chat_id: str, seconds: float):
+        """Sospende la chat per `seconds` (retry_after di una risposta 429)"""
+        with self._lock:
+            tokens, rate, now = self._refill(chat_id)
+            self._buckets[str(chat_id)] = (min(tokens, -seconds * rate), now)
+
+class TelegramDispatcher:
+    """Coda limitata + worker thread per l'invio non bloccante dei messaggi Telegram"""
+
+    def __init__(self, log_writer: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 max_queue_size: int = DISPATCH_QUEUE_SIZE, retry_delays: Optional[List[float]] = None,
+                 spool_path: Optional[str] = RETRY_SPOOL_PATH, api_base: Optional[str] = None,
+                 rate_limiter: Optional[ChatRateLimiter] = None, coalesce_window: float = COALESCE_WINDOW,
+                 token_resolver: Optional[Callable[[], Optional[str]]] = None):
+        self.log_writer = log_writer or _default_log_writer
+        self.token_resolver = token_resolver or _default_token_resolver
+        self.retry_delays = list(RETRY_DELAYS if retry_delays is None else retry_delays)
+        self.spool_path = spool_path
+        self.api_base = (api_base or TELEGRAM_API_BASE).rstrip('/')
+        self.rate_limiter = rate_limiter
+        self.coalesce_window = coalesce_window
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue_size)
+        self._retries: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._throttled: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._digests: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._in_flight = 0  # Job estratti da schedule/riepiloghi e non ancora gestiti
+        self._retry_seq = 0
+        self._resolved_tokens: Dict[str, str] = {}  # token_ref -> token dei job ripresi dallo spool
+        self._log_buffer: List[Dict[str, Any]] = []
+        self._last_log_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._session = requests.Session()
+        self.stats = {'enqueued': 0, 'sent': 0, 'failed': 0, 'dropped': 0, 'retried': 0,
+                      'throttled': 0, 'coalesced': 0}
+        self._load_spool()
+
+    # ===== PRODUTTORI =====
+
+    def enqueue(self, bot_token: str, chat_id: str, message: str, notification_type: str,
+                parse_mode: str = "Markdown", disable_web_page_preview: bool = True,
+                coalesce_key: Optional[str] = None, digest_title: Optional[str] = None) -> Tuple[bool, str]:
+        """
+        Accoda un messaggio senza bloccare il chiamante
+
+        Con coalesce_key il messaggio attende la finestra di accorpamento: gli eventi con la stessa
+        chiave per la stessa chat arrivati nella finestra partono in un unico riepilogo `digest_title`.
+        """
+        job = {
+            'bot_token': bot_token,
+            'payload': {
+                'chat_id': chat_id,
+                'text': message,
+                'parse_mode': parse_mode,
+                'disable_web_page_preview': disable_web_page_preview
+            },
+            'notification_type': notification_type,
+            'attempts': 0
+        }
+        if coalesce_key and self.coalesce_window > 0:
+            job['digest'] = {'key': coalesce_key, 'title': digest_title or notification_type}
+
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.stats['dropped'] += 1
+            logger.error(f"❌ Coda notifiche piena, messaggio '{notification_type}' scartato")
+            self._buffer_log(job, 'failed', 'Coda notifiche piena')
+            return False, "❌ Coda notifiche piena"
+
+        with self._lock:
+            self.stats['enqueued'] += 1
+        self._ensure_worker()
+        return True, "📨 Notifica accodata per l'invio"
+
+    # ===== WORKER =====
+
+    def _ensure_worker(self):
+        """Avvia il worker thread se non è già attivo"""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stop.clear()
+                self._worker = threading.Thread(target=self._run, name='telegram-dispatcher', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        """Ciclo del worker: consegna, tentativi programmati e flush dei log"""
+        while not self._stop.is_set():
+            try:
+                job = self._queue.get(timeout=self._next_wakeup())
+            except queue.Empty:
+                job = None
+
+            if job is not None:
+                try:
+                    self._dispatch(job)
+                finally:
+                    self._queue.task_done()
+
+            self._handle(self._pop_due_retries(), self._dispatch)
+            self._handle(self._pop_due_digests(), self._dispatch)
+            self._handle(self._pop_due(self._throttled), self._deliver)
+
+            # A coda ferma si scrive subito, salvo invii imminenti (verranno accorpati)
+            self._flush_logs(force=job is None and self._queue.empty() and not self._pending())
+
+        # In chiusura i riepiloghi aperti e gli invii rallentati partono subito
+        self._handle(self._pop_due_digests(force=True) + self._pop_due(self._throttled, force=True), self._deliver)
+        self._flush_logs(force=True)
+
+    def _handle(self, jobs: List[Dict[str, Any]], handler: Callable[[Dict[str, Any]], None]):
+        """Gestisce i job estratti e li toglie dal conteggio in corso"""
+        for job in jobs:
+            try:
+                handler(job)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def _pending(self) -> bool:
+        """True se ci sono retry, invii rallentati o riepiloghi in attesa"""
+        with self._lock:
+            return bool(self._retries or self._throttled or self._digests)
+
+    def _next_wakeup(self) -> float:
+        """Secondi di attesa massima sulla coda (prossimo retry o flush log)"""
+        wakeup = 1.0
+        with self._lock:
+            due_times = [heap[0][0] for heap in (self._retries, self._throttled) if heap]
+            due_times += [digest['due_at'] for digest in self._digests.values()]
+            if due_times:
+                wakeup = min(wakeup, max(0.0, min(due_times) - time.time()))
+            if self._log_buffer:
+                wakeup = min(wakeup, max(0.0, self._last_log_flush + LOG_FLUSH_INTERVAL - time.monotonic()))
+        return max(wakeup, 0.01)
+
+    def _dispatch(self, job: Dict[str, Any]):
+        """Instrada un job: finestra di accorpamento, attesa del token bucket o invio immediato"""
+        if 'bot_token' not in job and not self._restore_token(job):
+            return
+
+        if 'digest' in job:
+            self._add_to_digest(job)
+            return
+
+        if self.rate_limiter is not None:
+            delay = self.rate_limiter.reserve(job['payload']['chat_id'])
+            if delay > 0:
+                with self._lock:
+                    self._retry_seq += 1
+                    heapq.heappush(self._throttled, (time.time() + delay, self._retry_seq, job))
+                    self.stats['throttled'] += 1
+                return
+
+        self._deliver(job)
+
+    def _deliver(self, job: Dict[str, Any]):
+        """Esegue un tentativo di invio e ripianifica in caso di errore temporaneo"""
+        job['attempts'] += 1
+        success, error, retry_after = self._post(job)
+
+        if success:
+            with self._lock:
+                self.stats['sent'] += 1
+            logger.info(f"✅ Notifica '{job['notification_type']}' inviata (tentativo {job['attempts']})")
+            self._buffer_log(job, 'sent')
+            return
+
+        if retry_after and self.rate_limiter is not None:
+            # 429: anche gli altri messaggi per la chat attendono retry_after
+            self.rate_limiter.pause(job['payload']['chat_id'], retry_after)
+
+        if retry_after is not None and job['attempts'] <= len(self.retry_delays):
+            delay = max(retry_after, self.retry_delays[job['attempts'] - 1])
+            logger.warning(f"⚠️ Invio '{job['notification_type']}' fallito ({error}), nuovo tentativo tra {delay:.0f}s")
+            self._schedule_retry(job, delay)
+            return
+
+        with self._lock:
+            self.stats['failed'] += 1
+        logger.error(f"❌ Invio notifica '{job['notification_type']}' fallito: {error}")
+        self._buffer_log(job, 'failed', error)
+
+    def _post(self, job: Dict[str, Any]) -> Tuple[bool, Optional[str], Optional[float]]:
+        """
+        Invia il messaggio all'API Telegram
+
+        Returns:
+            (successo, errore, retry_after): retry_after è None se l'errore non è temporaneo
+        """
+        url = f"{self.api_base}/bot{job['bot_token']}/sendMessage"
+        try:
+            response = self._session.post(url, json=job['payload'], timeout=DISPATCH_HTTP_TIMEOUT)
+        except requests.exceptions.Timeout:
+            return False, 'Timeout', 0.0
+        except requests.exceptions.RequestException as e:
+            return False, f"Errore di rete: {e}", 0.0
+
+        try:
+            result = response.json()
+        except ValueError:
+            result = {}
+
+        if response.status_code == 200 and result.get('ok'):
+            return True, None, None
+
+        error = result.get('description') or f"HTTP {response.status_code}: {response.text[:200]}"
+        if response.status_code == 429:
+            return False, error, float((result.get('parameters') or {}).get('retry_after', 0))
+        if response.status_code >= 500:
+            return False, error, 0.0
+        return False, error, None
+
+    # ===== ACCORPAMENTO IN RIEPILOGHI =====
+
+    def _add_to_digest(self, job: Dict[str, Any]):
+        """Aggiunge il job al riepilogo aperto per (bot, chat, tipo) o ne apre uno nuovo"""
+        key = (job['bot_token'], str(job['payload']['chat_id']), job['digest']['key'])
+        with self._lock:
+            digest = self._digests.setdefault(key, {'due_at': time.time() + self.coalesce_window, 'jobs': []})
+            digest['jobs'].append(job)
+
+    def _pop_due_digests(self, force: bool = False) -> List[Dict[str, Any]]:
+        """Chiude i riepiloghi con finestra scaduta e restituisce i messaggi da inviare"""
+        now = time.time()
+        with self._lock:
+            due_keys = [key for key, digest in self._digests.items() if force or digest['due_at'] <= now]
+            closed = [self._digests.pop(key)['jobs'] for key in due_keys]
+            self._in_flight += sum(len(jobs) for jobs in closed)
+
+        messages = []
+        for jobs in closed:
+            built = self._build_digest(jobs)
+            with self._lock:
+                self.stats['coalesced'] += len(jobs) - len(built)
+                self._in_flight -= len(jobs) - len(built)
+            messages.extend(built)
+        return messages
+
+    @staticmethod
+    def _build_digest(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Unisce i messaggi già formattati in riepiloghi entro il limite di lunghezza Telegram
+        Un evento isolato parte invariato
+        """
+        chunks, current, size = [], [], 0
+        for job in jobs:
+            text = job['payload']['text']
+            if current and size + len(text) + len(DIGEST_SEPARATOR) > DIGEST_MAX_CHARS:
+                chunks.append(current)
+                current, size = [], 0
+            current.append(text)
+            size += len(text) + len(DIGEST_SEPARATOR)
+        chunks.append(current)
+
+        first = jobs[0]
+        title = first['digest']['title']
+        messages = []
+        for chunk in chunks:
+            if len(chunk) == 1:
+                text = chunk[0]
+            else:
+                text = f"{title} ({len(chunk)})" + DIGEST_SEPARATOR + DIGEST_SEPARATOR.join(chunk)
+            messages.append({
+                'bot_token': first['bot_token'],
+                'payload': {**first['payload'], 'text': text},
+                'notification_type': first['notification_type'],
+                'attempts': 0
+            })
+        return messages
+
+    # ===== SCHEDULE TENTATIVI (PERSISTITO) =====
+
+    def _schedule_retry(self, job: Dict[str, Any], delay: float):
+        """Inserisce il job nello schedule dei tentativi e aggiorna il file di spool"""
+        with self._lock:
+            self._retry_seq += 1
+            heapq.heappush(self._retries, (time.time() + delay, self._retry_seq, job))
+            self.stats['retried'] += 1
+        self._save_spool()
+
+    def _pop_due_retries(self) -> List[Dict[str, Any]]:
+        """Estrae i job il cui tentativo è scaduto"""
+        due = self._pop_due(self._retries)
+        if due:
+            self._save_spool()
+        return due
+
+    def _pop_due(self, heap: List[Tuple[float, int, Dict[str, Any]]], force: bool = False) -> List[Dict[str, Any]]:
+        """Estrae da uno schedule (retry o invii rallentati) i job scaduti"""
+        now = time.time()
+        due = []
+        with self._lock:
+            while heap and (force or heap[0][0] <= now):
+                due.append(heapq.heappop(heap)[2])
+            self._in_flight += len(due)
+        return due
+
+    def _restore_token(self, job: Dict[str, Any]) -> bool:
+        """
+        Risolve dalla configurazione corrente il token di un job ripreso dallo spool
+
+        Se il token configurato non corrisponde più al riferimento salvato il job viene scartato
+        """
+        ref = job.get('bot_ref')
+        token = self._resolved_tokens.get(ref)
+        if token is None:
+            try:
+                token = self.token_resolver()
+            except Exception as e:
+                logger.warning(f"⚠️ Impossibile leggere il token del bot per i retry Telegram: {e}")
+                token = None
+            if token and token_ref(token) == ref:
+                self._resolved_tokens[ref] = token
+            else:
+                token = None
+
+        if token is None:
+            with self._lock:
+                self.stats['failed'] += 1
+            logger.error(f"❌ Retry '{job['notification_type']}' scartato: token del bot non più configurato")
+            self._buffer_log(job, 'failed', 'Token del bot non più configurato')
+            return False
+
+        job['bot_token'] = token
+        return True
+
+    @staticmethod
+    def _spool_job(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Copia del job da salvare su file: il token è sostituito dal suo riferimento"""
+        spooled = {key: value for key, value in job.items() if key != 'bot_token'}
+        if 'bot_token' in job:
+            spooled['bot_ref'] = token_ref(job['bot_token'])
+        return spooled
+
+    def _save_spool(self):
+        """Persiste lo schedule dei tentativi (senza token del bot) per riprenderlo dopo un riavvio"""
+        if not self.spool_path:
+            return
+        with self._lock:
+            pending = [{'due_at': due_at, 'job': self._spool_job(job)} for due_at, _, job in self._retries]
+        try:
+            tmp_path = f"{self.spool_path}.tmp"
+            create_private_file(tmp_path)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(pending, f)
+            os.replace(tmp_path, self.spool_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Impossibile salvare lo schedule retry Telegram: {e}")
+
+    def _load_spool(self):
+        """Ricarica i tentativi pendenti salvati da un processo precedente"""
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return
+        try:
+            with open(self.spool_path, 'r', encoding='utf-8') as f:
+                pending = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Schedule retry Telegram illeggibile: {e}")
+            return
+
+        for entry in pending:
+            self._retry_seq += 1
+            # Il token viene risolto dalla configurazione al momento del retry
+            heapq.heappush(self._retries, (entry['due_at'], self._retry_seq, self._spool_job(entry['job'])))
+        if self._retries:
+            logger.info(f"📨 Ripresi {len(self._retries)} invii Telegram pendenti")
+            if any('bot_token' in entry['job'] for entry in pending):
+                self._save_spool()  # Riscrive gli spool di versioni precedenti che contenevano il token
+            self._ensure_worker()
+
+    # ===== LOG A BLOCCHI =====
+
+    def _buffer_log(self, job: Dict[str, Any], status: str, error_message: Optional[str] = None):
+        """Registra l'esito di un job nel buffer dei log"""
+        self.log(job['notification_type'], job['payload']['text'], status, error_message,
+                 retry_count=max(job['attempts'] - 1, 0))
+
+    def log(self, notification_type: str, message: str, status: str, error_message: Optional[str] = None,
+            retry_count: int = 0):
+        """Accoda una riga di notification_logs; la scrittura avviene a blocchi dal worker"""
+        row = {
+            'id': str(uuid.uuid4()),
+            'notification_type': notification_type,
+            'message': message[:1000],  # Limita lunghezza messaggio
+            'status': status,
+            'error_message': error_message,
+            'sent_at': datetime.now().isoformat(),
+            'retry_count': retry_count
+        }
+        with self._lock:
+            self._log_buffer.append(row)
+        self._ensure_worker()
+
+    def _flush_logs(self, force: bool = False):
+        """Scrive i log accumulati con un'unica insert (per dimensione, intervallo o a coda vuota)"""
+        with self._lock:
+            if not self._log_buffer:
+                return
+            due = (force or len(self._log_buffer) >= LOG_BATCH_SIZE
+                   or time.monotonic() - self._last_log_flush >= LOG_FLUSH_INTERVAL)
+            if not due:
+                return
+            rows, self._log_buffer = self._log_buffer, []
+            self._last_log_flush = time.monotonic()
+
+        try:
+            self.log_writer(rows)
+        except Exception as e:
+            logger.error(f"❌ Errore scrittura log notifiche ({len(rows)} righe): {e}")
+
+    # ===== CONTROLLO =====
+
+    def _waiting(self) -> bool:
+        """True se restano messaggi in coda, rallentati o in un riepilogo aperto (esclusi i retry)"""
+        with self._lock:
+            return bool(self._queue.unfinished_tasks or self._throttled or self._digests or self._in_flight)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Attende lo svuotamento della coda (esclusi i retry futuri) e scrive i log pendenti"""
+        deadline = time.monotonic() + timeout
+        while self._waiting() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self._flush_logs(force=True)
+        return not self._waiting()
+
+    def stop(self, timeout: float = 5.0):
+        """Ferma il worker dopo aver scritto i log pendenti"""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        self._flush_logs(force=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contatori del dispatcher e dimensioni di coda/schedule"""
+        with self._lock:
+            return {
+                **self.stats,
+                'queue_size': self._queue.qsize(),
+                'retry_pending': len(self._retries),
+                'throttled_pending': len(self._throttled),
+                'digest_pending': sum(len(digest['jobs']) for digest in self._digests.values()),
+                'log_buffer': len(self._log_buffer)
+            }
+
+_dispatcher: Optional[TelegramDispatcher] = None
+_dispatcher_lock = threading.Lock()
+_rate_limiter = ChatRateLimiter()
+
+def get_chat_rate_limiter() -> ChatRateLimiter:
+    """Token bucket per chat condiviso da dispatcher e invii sincroni del processo"""
+    return _rate_limiter
+
+def get_telegram_dispatcher() -> TelegramDispatcher:
+    """Restituisce il dispatcher unico per processo (condiviso da tutte le sessioni)"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = TelegramDispatcher(spool_path=RETRY_SPOOL_PATH or private_path(RETRY_SPOOL_FILENAME),
+                                             rate_limiter=_rate_limiter)
+            atexit.register(_dispatcher.stop)
+        return _dispatcher
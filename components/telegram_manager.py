@@ -6,18 +6,43 @@ Gestisce invio messaggi, configurazione bot e logging
 Creato da Ezio Camporeale
 """
 
+import os
 import requests
 import logging
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import datetime, timedelta, date
 from typing import Dict, List, Optional, Tuple, Any
 import json
+import math
 import time
 import uuid
 
+from components.telegram_dispatcher import (TELEGRAM_API_BASE, DISPATCH_HTTP_TIMEOUT, get_telegram_dispatcher,
+                                            get_chat_rate_limiter)
+
 # Configurazione logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Eventi che in raffica (sincronizzazioni, import massivi) vengono accorpati in un riepilogo:
+# tipo notifica -> (chiave di accorpamento, titolo del riepilogo)
+COALESCED_NOTIFICATIONS = {
+    'new_client': ('new_client', '👥 *NUOVI CLIENTI INSERITI*'),
+    'cliente_new_client': ('new_client', '👥 *NUOVI CLIENTI INSERITI*'),
+    'new_incrocio': ('new_incrocio', '🔄 *NUOVI INCROCI CREATI*'),
+    'incrocio_new_incrocio': ('new_incrocio', '🔄 *NUOVI INCROCI CREATI*'),
+    'new_transaction': ('new_transaction', '💳 *NUOVE TRANSAZIONI*'),
+}
+
+# Statistiche notifiche: contatori giornalieri per tipo (database/create_notification_stats_daily.sql)
+NOTIFICATION_ROLLUP_TABLE = 'notification_stats_daily'
+NOTIFICATION_STATS_DAYS = 30
+NOTIFICATION_LOG_PAGE_SIZE = 1000
+NOTIFICATION_LOG_RETENTION_DAYS = int(os.getenv('NOTIFICATION_LOG_RETENTION_DAYS', 30))
+
+# Attesa massima sul token bucket negli invii sincroni; oltre si risponde subito "riprova tra Ns"
+SYNC_RATE_LIMIT_MAX_WAIT = float(os.getenv('TELEGRAM_SYNC_MAX_WAIT', 2.0))
+
 class TelegramManager:
     """Gestore per le notifiche Telegram"""
     
@@ -120,8 +145,8 @@ class TelegramManager:
                 return False, "❌ Configurazione Telegram non completa"
             
             # Test con getMe
-            url = f"https://api.telegram.org/bot{self.bot_token}/getMe"
-            response = requests.get(url, timeout=10)
+            url = f"{TELEGRAM_API_BASE}/bot{self.bot_token}/getMe"
+            response = requests.get(url, timeout=DISPATCH_HTTP_TIMEOUT)
             
             if response.status_code == 200:
                 bot_info = response.json()
@@ -144,13 +169,13 @@ class TelegramManager:
     
     def send_message(self, message: str, parse_mode: str = "Markdown", 
                      disable_web_page_preview: bool = True) -> Tuple[bool, str]:
-        """Invia un messaggio al canale/gruppo Telegram"""
+        """Invia un messaggio al canale/gruppo Telegram attendendo la risposta (test e invii manuali)"""
         try:
             if not self.is_configured:
                 return False, "❌ Configurazione Telegram non completa"
             
             # Prepara il messaggio
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+            url = f"{TELEGRAM_API_BASE}/bot{self.bot_token}/sendMessage"
             
             payload = {
                 'chat_id': self.chat_id,
@@ -159,8 +184,22 @@ class TelegramManager:
                 'disable_web_page_preview': disable_web_page_preview
             }
             
+            # Rispetta il token bucket della chat condiviso con il dispatcher (attesa breve, altrimenti fail fast)
+            wait = get_chat_rate_limiter().reserve(self.chat_id, max_wait=SYNC_RATE_LIMIT_MAX_WAIT)
+            if wait > SYNC_RATE_LIMIT_MAX_WAIT:
+                self._log_notification('message_failed', message, 'failed', f"Rate limit, riprova tra {math.ceil(wait)}s")
+                return False, f"⏳ Limite invii Telegram raggiunto, riprova tra {math.ceil(wait)}s"
+            if wait > 0:
+                time.sleep(wait)
+            
             # Invia il messaggio
-            response = requests.post(url, json=payload, timeout=10)
+            response = requests.post(url, json=payload, timeout=DISPATCH_HTTP_TIMEOUT)
+            
+            if response.status_code == 429:
+                retry_after = self._retry_after(response)
+                get_chat_rate_limiter().pause(self.chat_id, retry_after)
+                self._log_notification('message_failed', message, 'failed', f"Rate limit, retry_after {retry_after}s")
+                return False, f"❌ Limite invii Telegram raggiunto, riprova tra {retry_after:.0f}s"
             
             if response.status_code == 200:
                 result = response.json()
@@ -192,8 +231,14 @@ class TelegramManager:
             self._log_notification('message_failed', message, 'failed', str(e))
             return False, f"❌ Errore invio: {e}"
     
-    def send_notification(self, notification_type: str, data: Dict[str, Any]) -> Tuple[bool, str]:
-        """Invia una notifica formattata basata sul tipo"""
+    def send_notification(self, notification_type: str, data: Dict[str, Any], wait: bool = False) -> Tuple[bool, str]:
+        """
+        Invia una notifica formattata basata sul tipo
+        
+        Per default la notifica viene accodata al dispatcher di background e il
+        chiamante non attende l'API Telegram; con wait=True l'invio è sincrono.
+        I tipi in COALESCED_NOTIFICATIONS arrivati in raffica partono in un unico riepilogo.
+        """
         try:
             # Genera il messaggio basato sul tipo
             message = self._format_notification(notification_type, data)
@@ -201,8 +246,15 @@ class TelegramManager:
             if not message:
                 return False, f"❌ Tipo notifica non supportato: {notification_type}"
             
-            # Invia il messaggio
-            return self.send_message(message)
+            if wait:
+                return self.send_message(message)
+            
+            if not self.is_configured:
+                return False, "❌ Configurazione Telegram non completa"
+            
+            coalesce_key, digest_title = COALESCED_NOTIFICATIONS.get(notification_type, (None, None))
+            return get_telegram_dispatcher().enqueue(self.bot_token, self.chat_id, message, notification_type,
+                                                     coalesce_key=coalesce_key, digest_title=digest_title)
             
         except Exception as e:
             logger.error(f"❌ Errore invio notifica {notification_type}: {e}")
@@ -702,12 +754,40 @@ Il VPS è scaduto e potrebbe essere disattivato dal provider.
     
     # ===== SISTEMA RETRY E GESTIONE ERRORI =====
     
+    @staticmethod
+    def _retry_after(response) -> float:
+        """Secondi indicati da Telegram in una risposta 429 (parameters.retry_after)"""
+        try:
+            return float((response.json().get('parameters') or {}).get('retry_after', 1))
+        except (ValueError, AttributeError):
+            return 1.0
+    
     def _send_with_retry(self, url: str, payload: Dict[str, Any], max_retries: int = 3) -> Tuple[bool, str]:
-        """Invia richiesta con retry automatico"""
+        """
+        Invia richiesta con retry automatico (i 429 attendono retry_after tramite il token bucket)
+        
+        Se il token bucket richiede un'attesa oltre SYNC_RATE_LIMIT_MAX_WAIT si rinuncia subito
+        """
+        limiter = get_chat_rate_limiter()
         for attempt in range(max_retries):
             try:
+                wait = limiter.reserve(payload.get('chat_id'), max_wait=SYNC_RATE_LIMIT_MAX_WAIT)
+                if wait > SYNC_RATE_LIMIT_MAX_WAIT:
+                    logger.warning(f"⚠️ Limite invii Telegram, riprova tra {math.ceil(wait)}s")
+                    return False, f"⏳ Limite invii Telegram raggiunto, riprova tra {math.ceil(wait)}s"
+                if wait > 0:
+                    time.sleep(wait)
+                
                 response = requests.post(url, json=payload, timeout=10)
                 
+                if response.status_code == 429:
+                    retry_after = self._retry_after(response)
+                    logger.warning(f"⚠️ Limite invii Telegram, attesa {retry_after:.0f}s - Tentativo {attempt + 1}")
+                    if attempt == max_retries - 1:
+                        return False, f"❌ Limite invii Telegram (retry_after {retry_after:.0f}s)"
+                    limiter.pause(payload.get('chat_id'), retry_after)
+                    continue
+                
                 if response.status_code == 200:
                     result = response.json()
                     if result.get('ok'):
@@ -748,17 +828,14 @@ Il VPS è scaduto e potrebbe essere disattivato dal provider.
         return False, "❌ Tutti i tentativi falliti"
     
     def get_notification_statistics(self) -> Dict[str, Any]:
-        """Recupera statistiche delle notifiche"""
+        """Recupera statistiche delle notifiche degli ultimi 30 giorni dai contatori giornalieri"""
         try:
             if not self.supabase_manager:
                 return {"error": "SupabaseManager non disponibile"}
             
-            # Recupera statistiche degli ultimi 30 giorni
-            thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
+            rollups = self.get_notification_rollups()
             
-            response = self.supabase_manager.supabase.table('notification_logs').select('*').gte('sent_at', thirty_days_ago).execute()
-            
-            if not response.data:
+            if not rollups:
                 return {
                     "total_notifications": 0,
                     "successful_notifications": 0,
@@ -768,21 +845,20 @@ Il VPS è scaduto e potrebbe essere disattivato dal provider.
                     "last_notification": "N/A"
                 }
             
-            logs = response.data
-            
             # Calcola statistiche
-            total = len(logs)
-            successful = sum(1 for log in logs if log.get('status') == 'sent')
-            failed = total - successful
+            successful = sum(int(r.get('sent') or 0) for r in rollups)
+            failed = sum(int(r.get('failed') or 0) for r in rollups)
+            total = successful + failed
             success_rate = (successful / total * 100) if total > 0 else 0
             
             # Tipo più comune
-            types = [log.get('notification_type', 'unknown') for log in logs]
-            most_common_type = max(set(types), key=types.count) if types else "N/A"
+            per_type = Counter()
+            for r in rollups:
+                per_type[r.get('notification_type') or 'unknown'] += int(r.get('sent') or 0) + int(r.get('failed') or 0)
+            most_common_type = per_type.most_common(1)[0][0] if per_type else "N/A"
             
             # Ultima notifica
-            last_notification = max(logs, key=lambda x: x.get('sent_at', '')) if logs else None
-            last_notification_time = last_notification.get('sent_at', 'N/A') if last_notification else 'N/A'
+            last_notification_time = max((str(r['last_sent_at']) for r in rollups if r.get('last_sent_at')), default='N/A')
             
             return {
                 "total_notifications": total,
@@ -797,23 +873,89 @@ Il VPS è scaduto e potrebbe essere disattivato dal provider.
             logger.error(f"❌ Errore recupero statistiche notifiche: {e}")
             return {"error": f"Errore: {e}"}
     
+    def get_notification_rollups(self, days: int = NOTIFICATION_STATS_DAYS) -> List[Dict[str, Any]]:
+        """
+        Contatori giornalieri per tipo degli ultimi `days` giorni
+        
+        Returns:
+            Righe {giorno, notification_type, sent, failed, last_sent_at}, condivise tramite
+            la cache di SupabaseManager
+        """
+        if not self.supabase_manager:
+            return []
+        
+        dal = (date.today() - timedelta(days=days)).isoformat()
+        return self.supabase_manager.cached_read(
+            'notification_logs',
+            lambda: self._load_notification_rollups(dal),
+            key=f'rollup:{dal}'
+        )
+    
+    def _load_notification_rollups(self, dal: str) -> List[Dict[str, Any]]:
+        """Legge i contatori dalla tabella di rollup; se non è installata li calcola dai log"""
+        supabase = self.supabase_manager.supabase
+        try:
+            response = supabase.table(NOTIFICATION_ROLLUP_TABLE)\
+                .select('giorno, notification_type, sent, failed, last_sent_at')\
+                .gte('giorno', dal).execute()
+            return response.data or []
+        except Exception as e:
+            logger.warning(f"⚠️ Tabella {NOTIFICATION_ROLLUP_TABLE} non disponibile, aggregazione dai log: {e}")
+        
+        # Scansione keyset sulla chiave primaria, senza il testo dei messaggi
+        rollups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        last_id = None
+        while True:
+            query = supabase.table('notification_logs').select('id, notification_type, status, sent_at').gte('sent_at', dal)
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            page = query.order('id').limit(NOTIFICATION_LOG_PAGE_SIZE).execute().data or []
+            
+            for log in page:
+                sent_at = str(log.get('sent_at') or '')
+                key = (sent_at[:10], log.get('notification_type') or 'unknown')
+                rollup = rollups.setdefault(key, {'giorno': key[0], 'notification_type': key[1],
+                                                  'sent': 0, 'failed': 0, 'last_sent_at': None})
+                rollup['sent' if log.get('status') == 'sent' else 'failed'] += 1
+                if rollup['last_sent_at'] is None or sent_at > rollup['last_sent_at']:
+                    rollup['last_sent_at'] = sent_at
+            
+            if len(page) < NOTIFICATION_LOG_PAGE_SIZE:
+                break
+            last_id = page[-1]['id']
+        
+        return list(rollups.values())
+    
+    def trim_notification_logs(self, days: int = NOTIFICATION_LOG_RETENTION_DAYS) -> int:
+        """
+        Retention dei log: svuota il testo dei messaggi più vecchi di `days` giorni
+        Le righe restano (e i contatori giornalieri non cambiano)
+        
+        Returns:
+            Numero di log alleggeriti
+        """
+        if not self.supabase_manager:
+            return 0
+        
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        # Solo il conteggio: restituire le righe aggiornate non serve e può essere enorme
+        response = self.supabase_manager.supabase.table('notification_logs')\
+            .update({'message': ''}, count='exact', returning='minimal')\
+            .lt('sent_at', cutoff)\
+            .neq('message', '')\
+            .execute()
+        trimmed = response.count or 0
+        if trimmed:
+            logger.info(f"🧹 Svuotato il testo di {trimmed} log notifiche più vecchi di {days} giorni")
+        return trimmed
+    
     def _log_notification(self, notification_type: str, message: str, status: str, error_message: str = None):
-        """Logga la notifica nel database"""
+        """Logga la notifica nel database (scrittura a blocchi tramite il dispatcher)"""
         try:
             if not self.supabase_manager:
                 return
             
-            log_data = {
-                'id': str(uuid.uuid4()),
-                'notification_type': notification_type,
-                'message': message[:1000],  # Limita lunghezza messaggio
-                'status': status,
-                'error_message': error_message,
-                'sent_at': datetime.now().isoformat(),
-                'retry_count': 0
-            }
-            
-            self.supabase_manager.supabase.table('notification_logs').insert(log_data).execute()
+            get_telegram_dispatcher().log(notification_type, message, status, error_message)
             
         except Exception as e:
             logger.error(f"❌ Errore logging notifica: {e}")
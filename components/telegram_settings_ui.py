@@ -376,13 +376,10 @@ class TelegramSettingsUI:
                 logger.warning("⚠️ SupabaseManager non disponibile per caricamento impostazioni")
                 return self._get_default_notification_settings()
             
-            # Recupera tutte le impostazioni notifiche
-            response = self.supabase_manager.supabase.table('notification_settings').select('*').execute()
+            # Registro condiviso: una sola query per tutte le impostazioni, cachata con TTL
+            settings = self.supabase_manager.get_notification_settings()
             
-            if response.data:
-                settings = {}
-                for setting in response.data:
-                    settings[setting['notification_type']] = setting.get('is_enabled', True)
+            if settings:
                 logger.info(f"✅ Caricate {len(settings)} impostazioni notifiche dal database")
                 return settings
             else:
@@ -433,6 +430,9 @@ class TelegramSettingsUI:
                     logger.error(f"❌ Errore salvataggio impostazione {notification_type}: {e}")
                     continue
             
+            # I manager leggono dal registro condiviso: invalidazione immediata
+            self.supabase_manager.invalidate_cache('notification_settings')
+            
             if saved_count > 0:
                 st.success(f"✅ Impostazioni notifiche salvate con successo! ({saved_count}/{len(settings)} impostazioni)")
                 logger.info(f"✅ Salvate {saved_count}/{len(settings)} impostazioni notifiche nel database")
@@ -446,33 +446,5 @@ class TelegramSettingsUI:
     
     def _get_default_notification_settings(self) -> Dict[str, bool]:
         """Restituisce le impostazioni notifiche di default"""
-        return {
-            # Task
-            'task_new_task': True,
-            'task_completed': True,
-            'task_due_soon': True,
-            'task_daily_report': False,
-            
-            # Incroci
-            'incrocio_new_incrocio': True,
-            'incrocio_closed': True,
-            'incrocio_daily_report': False,
-            'incrocio_long_open_alert': False,
-            
-            # Clienti
-            'cliente_new_client': True,
-            'cliente_modified': False,
-            'cliente_deleted': True,
-            
-            # Wallet
-            'wallet_new_deposit': True,
-            'wallet_new_withdrawal': True,
-            'wallet_cross_transaction': True,
-            'wallet_low_balance_alert': False,
-            
-            # VPS
-            'vps_expiring': True,
-            'vps_expired': True,
-            'vps_new': True,
-            'vps_monthly_report': False,
-        }
\ No newline at end of file
+        from supabase_manager import DEFAULT_NOTIFICATION_SETTINGS
+        return dict(DEFAULT_NOTIFICATION_SETTINGS)
@@ -19,6 +19,7 @@ logger = logging.getLogger(__name__)
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'progetti', 'supabase_integration'))
 
 from supabase_manager import SupabaseManager
+from components.dashboard_stats import DashboardStatsService
 
 class UserNavigation:
     """Classe per la navigazione e integrazione utente"""
@@ -162,95 +163,69 @@ class UserNavigation:
             st.markdown("---")
             
             # Contenuto dashboard esistente
-            st.subheader("📊 Panoramica Sistema")
+            col_title, col_refresh = st.columns([4, 1])
+            with col_title:
+                st.subheader("📊 Panoramica Sistema")
+            with col_refresh:
+                refresh = st.button("🔄 Aggiorna", key="refresh_dashboard_stats", help="Ricarica le statistiche dal database")
             
-            # Statistiche rapide
-            try:
-                # Conta clienti
-                clienti_response = self.supabase_manager.supabase.table('clienti').select('count', count='exact').execute()
-                clienti_count = clienti_response.count if hasattr(clienti_response, 'count') else 0
-                
-                # Conta incroci
-                incroci_response = self.supabase_manager.supabase.table('incroci').select('count', count='exact').execute()
-                incroci_count = incroci_response.count if hasattr(incroci_response, 'count') else 0
-                
-                # Conta utenti
-                users_response = self.supabase_manager.supabase.table('users').select('count', count='exact').execute()
-                users_count = users_response.count if hasattr(users_response, 'count') else 0
-                
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.metric("👥 Clienti", clienti_count)
-                
-                with col2:
-                    st.metric("🔗 Incroci", incroci_count)
-                
-                with col3:
-                    st.metric("👤 Utenti", users_count)
-                
-            except Exception as e:
-                st.warning(f"⚠️ Impossibile recuperare le statistiche: {e}")
+            # Statistiche rapide (una sola lettura, cachate nella sessione)
+            stats = DashboardStatsService(self.supabase_manager).get_stats(st.session_state, force_refresh=refresh)
+            clienti_count = stats['clienti_count']
+            incroci_count = stats['incroci_count']
+            users_count = stats['users_count']
+            
+            if stats.get('error'):
+                st.warning(f"⚠️ Impossibile recuperare le statistiche: {stats['error']}")
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.metric("👥 Clienti", clienti_count)
+            
+            with col2:
+                st.metric("🔗 Incroci", incroci_count)
+            
+            with col3:
+                st.metric("👤 Utenti", users_count)
+            
+            st.caption(f"🕒 Statistiche aggiornate il {stats['aggiornato_il']}")
             
             st.markdown("---")
             
             # Azioni rapide
             # Riepilogo Depositi Totali
-            try:
-                depositi_response = self.supabase_manager.supabase.table("clienti").select("deposito").execute()
-                if depositi_response.data:
-                    df_depositi = pd.DataFrame(depositi_response.data)
-                    depositi_totali = df_depositi["deposito"].sum() if "deposito" in df_depositi.columns else 0
-                    st.metric("💰 Depositi Totali", f"€{depositi_totali:,.2f}")
-                else:
-                    st.metric("💰 Depositi Totali", "€0.00")
-            except Exception as e:
-                st.metric("💰 Depositi Totali", "€0.00")
+            st.metric("💰 Depositi Totali", f"€{stats['depositi_totali']:,.2f}")
 
             # Grafici a torta
             st.subheader("📊 Grafici Sistema")
             col1, col2 = st.columns(2)
 
             with col1:
-                try:
-                    # Distribuzione Clienti per Broker
-                    broker_response = self.supabase_manager.supabase.table("clienti").select("broker").execute()
-                    if broker_response.data:
-                        df_broker = pd.DataFrame(broker_response.data)
-                        broker_counts = df_broker["broker"].value_counts()
-                        fig_broker = px.pie(values=broker_counts.values, names=broker_counts.index, title="Distribuzione Clienti per Broker")
-                        st.plotly_chart(fig_broker, use_container_width=True)
-                    else:
-                        st.info("📊 Nessun dato disponibile per la distribuzione broker")
-                except Exception as e:
-                    st.info("📊 Errore nel caricamento grafico broker")
+                # Distribuzione Clienti per Broker
+                broker_counts = stats['per_broker']
+                if not broker_counts.empty:
+                    fig_broker = px.pie(values=broker_counts.values, names=broker_counts.index, title="Distribuzione Clienti per Broker")
+                    st.plotly_chart(fig_broker, use_container_width=True)
+                else:
+                    st.info("📊 Nessun dato disponibile per la distribuzione broker")
 
-                try:
-                    # Distribuzione Piattaforme
-                    piattaforma_response = self.supabase_manager.supabase.table("clienti").select("piattaforma").execute()
-                    if piattaforma_response.data:
-                        df_piattaforma = pd.DataFrame(piattaforma_response.data)
-                        piattaforma_counts = df_piattaforma["piattaforma"].value_counts()
-                        fig_piattaforma = px.pie(values=piattaforma_counts.values, names=piattaforma_counts.index, title="Distribuzione Piattaforme")
-                        st.plotly_chart(fig_piattaforma, use_container_width=True)
-                    else:
-                        st.info("📊 Nessun dato disponibile per la distribuzione piattaforme")
-                except Exception as e:
-                    st.info("📊 Errore nel caricamento grafico piattaforme")
+                # Distribuzione Piattaforme
+                piattaforma_counts = stats['per_piattaforma']
+                if not piattaforma_counts.empty:
+                    fig_piattaforma = px.pie(values=piattaforma_counts.values, names=piattaforma_counts.index, title="Distribuzione Piattaforme")
+                    st.plotly_chart(fig_piattaforma, use_container_width=True)
+                else:
+                    st.info("📊 Nessun dato disponibile per la distribuzione piattaforme")
 
             with col2:
-                try:
-                    # Depositi Totali per Broker
-                    depositi_broker_response = self.supabase_manager.supabase.table("clienti").select("broker,deposito").execute()
-                    if depositi_broker_response.data:
-                        df_depositi_broker = pd.DataFrame(depositi_broker_response.data)
-                        depositi_per_broker = df_depositi_broker.groupby("broker")["deposito"].sum()
-                        fig_depositi = px.pie(values=depositi_per_broker.values, names=depositi_per_broker.index, title="Depositi Totali per Broker")
-                        st.plotly_chart(fig_depositi, use_container_width=True)
-                    else:
-                        st.info("📊 Nessun dato disponibile per i depositi per broker")
-                except Exception as e:
-                    st.info("📊 Errore nel caricamento grafico depositi")
+                # Depositi Totali per Broker
+                depositi_per_broker = stats['depositi_per_broker']
+                if not depositi_per_broker.empty:
+                    fig_depositi = px.pie(values=depositi_per_broker.values, names=depositi_per_broker.index, title="Depositi Totali per Broker")
+                    st.plotly_chart(fig_depositi, use_container_width=True)
+                else:
+                    st.info("📊 Nessun dato disponibile per i depositi per broker")
 
                 try:
                     # Statistiche Sistema
@@ -5,14 +5,70 @@
 
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Optional, Any, Tuple
 import logging
+import threading
 
 # Configurazione logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Colonne clienti lette per i VPS
+VPS_COLUMNS = ('id, nome_cliente, email, broker, vps_ip, vps_username, vps_password, '
+               'data_rinnovo, prezzo_vps, created_at, updated_at')
+
+# Orizzonte dell'indice scadenze (copre notifiche a 60 giorni e pianificazione a 90)
+VPS_EXPIRY_HORIZON_DAYS = 90
+
+# Fasce di urgenza delle notifiche: (nome, giorni rimanenti massimi)
+VPS_NOTIFICATION_BUCKETS = [('critical', 7), ('warning', 15), ('info', 30), ('upcoming', 60)]
+
+class VPSExpiryIndex:
+    """
+    Indice per processo dei VPS in scadenza entro VPS_EXPIRY_HORIZON_DAYS
+    
+    Ricostruito al più una volta al giorno oppure dopo una scrittura su clienti
+    (generazione della cache di lettura), condiviso da tutte le sessioni.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: Optional[Tuple[date, int]] = None
+        self._vps: List[Dict[str, Any]] = []
+        self._buckets: Dict[str, List[Dict[str, Any]]] = {}
+        self.builds = 0
+    
+    def get(self, vps_manager: 'VPSManager') -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+        """Restituisce (VPS ordinati per giorni rimanenti, fasce di urgenza), ricostruendo se necessario"""
+        # Generazione letta prima della query: una scrittura concorrente forza la ricostruzione successiva
+        key = (date.today(), vps_manager.supabase_manager.get_cache_generation('clienti'))
+        with self._lock:
+            if key == self._key:
+                return self._vps, self._buckets
+        
+        vps_list = vps_manager._query_vps_expiring(VPS_EXPIRY_HORIZON_DAYS)
+        buckets = {name: [] for name, _ in VPS_NOTIFICATION_BUCKETS}
+        for vps in vps_list:
+            for name, max_giorni in VPS_NOTIFICATION_BUCKETS:
+                if vps['giorni_rimanenti'] <= max_giorni:
+                    buckets[name].append(vps)
+                    break
+        
+        with self._lock:
+            self._key, self._vps, self._buckets = key, vps_list, buckets
+            self.builds += 1
+        logger.info(f"🖥️ Indice scadenze VPS ricostruito: {len(vps_list)} VPS entro {VPS_EXPIRY_HORIZON_DAYS} giorni")
+        return vps_list, buckets
+    
+    def reset(self):
+        """Forza la ricostruzione alla prossima lettura"""
+        with self._lock:
+            self._key = None
+
+# Indice unico per processo, usato da VPSManager e VPSNotifications
+_vps_expiry_index = VPSExpiryIndex()
+
 class VPSManager:
     """Gestore VPS per monitoraggio scadenze e gestione credenziali"""
     
@@ -41,35 +97,36 @@ class VPSManager:
                 st.error("❌ Database non configurato")
                 return []
             
-            # Recupera tutti i clienti con dati VPS
-            clienti = supabase_manager.get_clienti()
-            
-            # Filtra solo i clienti con VPS
-            vps_list = []
-            for cliente in clienti:
-                if cliente.get('vps_ip') and cliente.get('vps_ip').strip():
-                    vps_data = {
-                        'id': cliente['id'],
-                        'nome_cliente': cliente['nome_cliente'],
-                        'email': cliente['email'],
-                        'broker': cliente['broker'],
-                        'vps_ip': cliente.get('vps_ip', ''),
-                        'vps_username': cliente.get('vps_username', ''),
-                        'vps_password': self._decrypt_password(cliente.get('vps_password', '')),
-                        'data_rinnovo': cliente.get('data_rinnovo'),
-                        'prezzo_vps': cliente.get('prezzo_vps', 0.0),
-                        'created_at': cliente.get('created_at'),
-                        'updated_at': cliente.get('updated_at')
-                    }
-                    vps_list.append(vps_data)
-            
-            return vps_list
+            # Solo clienti con VPS e solo le colonne VPS (condiviso tramite la cache di lettura)
+            clienti = supabase_manager.cached_read('clienti', lambda: supabase_manager.supabase.table('clienti')
+                                                   .select(VPS_COLUMNS)
+                                                   .not_.is_('vps_ip', 'null')
+                                                   .neq('vps_ip', '')
+                                                   .execute().data or [], key='vps')
+            
+            return [self._to_vps(cliente) for cliente in clienti if (cliente.get('vps_ip') or '').strip()]
             
         except Exception as e:
             logger.error(f"Errore recupero VPS: {e}")
             st.error(f"❌ Errore recupero VPS: {e}")
             return []
     
+    def _to_vps(self, cliente: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte una riga clienti nel dizionario VPS"""
+        return {
+            'id': cliente['id'],
+            'nome_cliente': cliente['nome_cliente'],
+            'email': cliente['email'],
+            'broker': cliente['broker'],
+            'vps_ip': cliente.get('vps_ip', ''),
+            'vps_username': cliente.get('vps_username', ''),
+            'vps_password': self._decrypt_password(cliente.get('vps_password', '')),
+            'data_rinnovo': cliente.get('data_rinnovo'),
+            'prezzo_vps': cliente.get('prezzo_vps', 0.0),
+            'created_at': cliente.get('created_at'),
+            'updated_at': cliente.get('updated_at')
+        }
+    
     def update_vps_data(self, cliente_id: str, vps_data: Dict[str, Any]) -> bool:
         """Aggiorna i dati VPS di un cliente"""
         try:
@@ -98,6 +155,7 @@ class VPSManager:
             
             # Aggiorna il cliente
             result = supabase_manager.supabase.table('clienti').update(update_data).eq('id', cliente_id).execute()
+            supabase_manager.invalidate_cache('clienti')
             
             if result.data:
                 st.success("✅ Dati VPS aggiornati con successo!")
@@ -114,45 +172,75 @@ class VPSManager:
     def get_vps_expiring_soon(self, days_ahead: int = 30) -> List[Dict[str, Any]]:
         """Recupera VPS che scadono nei prossimi N giorni"""
         try:
-            all_vps = self.get_all_vps()
-            expiring_vps = []
+            if days_ahead > VPS_EXPIRY_HORIZON_DAYS:
+                return self._query_vps_expiring(days_ahead)
             
-            if not all_vps:
-                return expiring_vps
-            
-            # Data limite per le scadenze
-            limit_date = datetime.now() + timedelta(days=days_ahead)
-            
-            for vps in all_vps:
-                data_rinnovo = vps.get('data_rinnovo')
-                if data_rinnovo:
-                    try:
-                        # Converte la data stringa in datetime
-                        if isinstance(data_rinnovo, str):
-                            rinnovo_date = datetime.fromisoformat(data_rinnovo.replace('Z', '+00:00'))
-                        else:
-                            rinnovo_date = data_rinnovo
-                        
-                        # Se la data di rinnovo è entro il limite
-                        if rinnovo_date.date() <= limit_date.date():
-                            # Calcola giorni rimanenti
-                            giorni_rimanenti = (rinnovo_date.date() - datetime.now().date()).days
-                            vps['giorni_rimanenti'] = giorni_rimanenti
-                            expiring_vps.append(vps)
-                            
-                    except Exception as e:
-                        logger.warning(f"Errore parsing data rinnovo per VPS {vps['nome_cliente']}: {e}")
-                        continue
-            
-            # Ordina per giorni rimanenti (più urgenti prima)
-            expiring_vps.sort(key=lambda x: x.get('giorni_rimanenti', 999))
-            
-            return expiring_vps
+            vps_list, _ = _vps_expiry_index.get(self)
+            return [dict(vps) for vps in vps_list if vps['giorni_rimanenti'] <= days_ahead]
             
         except Exception as e:
             logger.error(f"Errore recupero VPS in scadenza: {e}")
             return []
     
+    def get_vps_expiry_buckets(self) -> Dict[str, List[Dict[str, Any]]]:
+        """VPS in scadenza divisi per urgenza (critical ≤7, warning ≤15, info ≤30, upcoming ≤60 giorni)"""
+        try:
+            _, buckets = _vps_expiry_index.get(self)
+            return {name: [dict(vps) for vps in vps_list] for name, vps_list in buckets.items()}
+        except Exception as e:
+            logger.error(f"Errore recupero scadenze VPS: {e}")
+            return {name: [] for name, _ in VPS_NOTIFICATION_BUCKETS}
+    
+    def _query_vps_expiring(self, days_ahead: int) -> List[Dict[str, Any]]:
+        """
+        Query filtrata lato database: VPS con IP e data_rinnovo entro oggi + N giorni
+        
+        Returns:
+            VPS con giorni_rimanenti, ordinati dal più urgente
+        """
+        if not self.supabase_manager or not self.supabase_manager.supabase:
+            return []
+        
+        oggi = date.today()
+        limit_date = oggi + timedelta(days=days_ahead)
+        
+        response = self.supabase_manager.supabase.table('clienti')\
+            .select(VPS_COLUMNS)\
+            .not_.is_('vps_ip', 'null')\
+            .neq('vps_ip', '')\
+            .lte('data_rinnovo', limit_date.isoformat())\
+            .order('data_rinnovo')\
+            .execute()
+        
+        expiring_vps = []
+        for cliente in response.data or []:
+            if not (cliente.get('vps_ip') or '').strip():
+                continue
+            
+            data_rinnovo = cliente.get('data_rinnovo')
+            try:
+                # Converte la data stringa in datetime
+                if isinstance(data_rinnovo, str):
+                    rinnovo_date = datetime.fromisoformat(data_rinnovo.replace('Z', '+00:00')).date()
+                elif isinstance(data_rinnovo, datetime):
+                    rinnovo_date = data_rinnovo.date()
+                else:
+                    rinnovo_date = data_rinnovo if isinstance(data_rinnovo, date) else None
+            except ValueError as e:
+                logger.warning(f"Errore parsing data rinnovo per VPS {cliente.get('nome_cliente')}: {e}")
+                continue
+            
+            if rinnovo_date is None or rinnovo_date > limit_date:
+                continue
+            
+            vps = self._to_vps(cliente)
+            vps['giorni_rimanenti'] = (rinnovo_date - oggi).days
+            expiring_vps.append(vps)
+        
+        # Ordina per giorni rimanenti (più urgenti prima)
+        expiring_vps.sort(key=lambda x: x['giorni_rimanenti'])
+        return expiring_vps
+    
     def get_vps_statistics(self) -> Dict[str, Any]:
         """Recupera statistiche sui VPS"""
         try:
@@ -170,10 +258,9 @@ class VPSManager:
             # Statistiche base
             totale_vps = len(all_vps)
             
-            # VPS in scadenza
-            vps_30_giorni = len(self.get_vps_expiring_soon(30))
-            vps_15_giorni = len(self.get_vps_expiring_soon(15))
-            vps_7_giorni = len(self.get_vps_expiring_soon(7))
+            # VPS in scadenza (dall'indice, senza ulteriori query)
+            expiring_vps, _ = _vps_expiry_index.get(self)
+            giorni = [vps['giorni_rimanenti'] for vps in expiring_vps]
             
             # Costo totale mensile
             costo_totale = sum(
@@ -183,9 +270,9 @@ class VPSManager:
             
             return {
                 'totale_vps': totale_vps,
-                'vps_scadenti_30_giorni': vps_30_giorni,
-                'vps_scadenti_15_giorni': vps_15_giorni,
-                'vps_scadenti_7_giorni': vps_7_giorni,
+                'vps_scadenti_30_giorni': sum(1 for g in giorni if g <= 30),
+                'vps_scadenti_15_giorni': sum(1 for g in giorni if g <= 15),
+                'vps_scadenti_7_giorni': sum(1 for g in giorni if g <= 7),
                 'costo_totale_mensile': costo_totale
             }
             
@@ -276,41 +363,9 @@ class VPSManager:
             logger.error(f"❌ Errore invio notifica VPS '{notification_type}': {e}")
     
     def _is_notification_enabled(self, notification_type: str) -> bool:
-        """Controlla se le notifiche per un tipo specifico sono abilitate"""
-        try:
-            if not self.supabase_manager:
-                # Default settings se Supabase non disponibile
-                default_settings = {
-                    'vps_expiring': True,
-                    'vps_expired': True,
-                    'vps_new': True,
-                    'vps_monthly_report': False,
-                }
-                return default_settings.get(notification_type, True)
-            
-            # Recupera impostazioni notifiche dal database
-            response = self.supabase_manager.supabase.table('notification_settings').select('*').eq('notification_type', notification_type).execute()
-            
-            if response.data and len(response.data) > 0:
-                setting = response.data[0]
-                return setting.get('is_enabled', True)
-            else:
-                # Default settings se nessuna impostazione trovata
-                default_settings = {
-                    'vps_expiring': True,
-                    'vps_expired': True,
-                    'vps_new': True,
-                    'vps_monthly_report': False,
-                }
-                return default_settings.get(notification_type, True)
-                
-        except Exception as e:
-            logger.error(f"❌ Errore controllo impostazioni notifiche {notification_type}: {e}")
-            # Default settings in caso di errore
-            default_settings = {
-                'vps_expiring': True,
-                'vps_expired': True,
-                'vps_new': True,
-                'vps_monthly_report': False,
-            }
-            return default_settings.get(notification_type, True)
+        """Controlla se le notifiche per un tipo specifico sono abilitate (registro condiviso)"""
+        if not self.supabase_manager:
+            from supabase_manager import DEFAULT_NOTIFICATION_SETTINGS
+            return DEFAULT_NOTIFICATION_SETTINGS.get(notification_type, True)
+        
+        return self.supabase_manager.is_notification_enabled(notification_type)
@@ -21,36 +21,14 @@ class VPSNotifications:
         self.vps_manager = VPSManager()
     
     def get_expiring_vps_notifications(self) -> Dict[str, List[Dict]]:
-        """Recupera notifiche VPS in scadenza organizzate per urgenza"""
-        try:
-            notifications = {
-                'critical': [],    # ≤ 7 giorni
-                'warning': [],     # 8-15 giorni  
-                'info': [],        # 16-30 giorni
-                'upcoming': []     # 31-60 giorni
-            }
-            
-            # Recupera VPS in scadenza nei prossimi 60 giorni
-            expiring_vps = self.vps_manager.get_vps_expiring_soon(60)
-            
-            for vps in expiring_vps:
-                giorni_rimanenti = vps.get('giorni_rimanenti', 999)
-                
-                # Categorizza per urgenza
-                if giorni_rimanenti <= 7:
-                    notifications['critical'].append(vps)
-                elif giorni_rimanenti <= 15:
-                    notifications['warning'].append(vps)
-                elif giorni_rimanenti <= 30:
-                    notifications['info'].append(vps)
-                elif giorni_rimanenti <= 60:
-                    notifications['upcoming'].append(vps)
-            
-            return notifications
-            
-        except Exception as e:
-            logger.error(f"Errore recupero notifiche VPS: {e}")
-            return {'critical': [], 'warning': [], 'info': [], 'upcoming': []}
+        """
+        Recupera notifiche VPS in scadenza organizzate per urgenza
+        
+        critical ≤ 7 giorni, warning 8-15, info 16-30, upcoming 31-60: le fasce sono
+        precalcolate dall'indice scadenze VPS (ricalcolato una volta al giorno o dopo
+        un aggiornamento dei clienti), quindi i rerun della dashboard non fanno query.
+        """
+        return self.vps_manager.get_vps_expiry_buckets()
     
     def render_notifications_banner(self):
         """Rende il banner delle notifiche VPS nella sidebar"""
@@ -483,6 +483,7 @@ class WalletManagement:
                 return False, "❌ Supabase non configurato"
             
             response = self.wallet_manager.supabase_manager.supabase.table('wallet_collaboratori').insert(wallet_data).execute()
+            self.wallet_manager.supabase_manager.invalidate_cache('wallet_collaboratori')
             
             if response.data:
                 return True, f"✅ Wallet '{wallet_data['nome_wallet']}' creato con successo"
@@ -500,6 +501,7 @@ class WalletManagement:
                 return False, "❌ Supabase non configurato"
             
             response = self.wallet_manager.supabase_manager.supabase.table('wallet_collaboratori').update(wallet_data).eq('id', wallet_id).execute()
+            self.wallet_manager.supabase_manager.invalidate_cache('wallet_collaboratori')
             
             if response.data:
                 return True, f"✅ Wallet aggiornato con successo"
@@ -516,8 +518,6 @@ class WalletManagement:
             if not self.wallet_manager.supabase_manager:
                 return False, "❌ Supabase non configurato"
             
-            # Verifica se ci sono transazioni associate
-            transactions = self.wallet_manager.get_wallet_transactions(limit=1000)
             wallet_name = None
             
             # Trova il nome del wallet
@@ -528,14 +528,15 @@ class WalletManagement:
                     break
             
             if wallet_name:
-                # Controlla transazioni
-                wallet_transactions = [t for t in transactions if t.get('wallet_mittente') == wallet_name or t.get('wallet_destinatario') == wallet_name]
+                # Verifica se ci sono transazioni associate (conteggio sull'intero storico)
+                numero_transazioni = self.wallet_manager.count_wallet_transactions(wallet_name)
                 
-                if wallet_transactions:
-                    return False, f"❌ Impossibile eliminare '{wallet_name}': ci sono {len(wallet_transactions)} transazioni associate. Elimina prima le transazioni."
+                if numero_transazioni:
+                    return False, f"❌ Impossibile eliminare '{wallet_name}': ci sono {numero_transazioni} transazioni associate. Elimina prima le transazioni."
             
             # Elimina wallet
             response = self.wallet_manager.supabase_manager.supabase.table('wallet_collaboratori').delete().eq('id', wallet_id).execute()
+            self.wallet_manager.supabase_manager.invalidate_cache('wallet_collaboratori')
             
             if response.data:
                 return True, f"✅ Wallet eliminato con successo"
@@ -553,7 +554,7 @@ class WalletManagement:
         st.info("👑 **Accesso Amministratore**: Modifica ed elimina transazioni esistenti")
         
         # Importa la tabella delle transazioni
-        from wallet_transaction_table import WalletTransactionTable
+        from components.wallet_transaction_table import WalletTransactionTable
         
         # Crea istanza della tabella
         transaction_table = WalletTransactionTable(self.wallet_manager)
@@ -561,7 +562,8 @@ class WalletManagement:
         # Mostra la tabella con funzionalità di modifica ed eliminazione
         transaction_table.render_table(
             on_edit=lambda x: None,  # Gestito internamente dalla tabella
-            on_delete=lambda x: None  # Gestito internamente dalla tabella
+            on_delete=lambda x: None,  # Gestito internamente dalla tabella
+            key_prefix='wallet_admin_table'  # La tabella compare anche nel tab Transazioni
         )
         
         # Statistiche aggiuntive per admin
@@ -637,9 +639,9 @@ class WalletManagement:
                 st.rerun()
     
     def _export_transaction_report(self):
-        """Esporta un report delle transazioni"""
+        """Esporta un report delle transazioni (intero storico)"""
         try:
-            transactions = self.wallet_manager.get_wallet_transactions(limit=1000)
+            transactions = self.wallet_manager.get_wallet_transactions(limit=None)
             
             if not transactions:
                 st.warning("📋 Nessuna transazione da esportare")
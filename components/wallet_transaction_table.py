@@ -10,6 +10,11 @@ from typing import Dict, Any, List, Callable, Optional
 import plotly.express as px
 import plotly.graph_objects as go
 
+from components.wallet_transactions_manager import TRANSACTIONS_PAGE_SIZE, TRANSACTION_STATI
+
+# Prefisso predefinito delle chiavi di widget e di sessione (filtri, paginazione, cursori)
+DEFAULT_KEY_PREFIX = 'wallet_table'
+
 class WalletTransactionTable:
     """Tabella per la gestione delle transazioni wallet"""
     
@@ -17,22 +22,75 @@ class WalletTransactionTable:
         """Inizializza la tabella con il gestore wallet"""
         self.wallet_manager = wallet_manager
     
-    def render_table(self, on_edit: Optional[Callable] = None, on_delete: Optional[Callable] = None):
-        """Rende la tabella delle transazioni wallet"""
+    def render_table(self, on_edit: Optional[Callable] = None, on_delete: Optional[Callable] = None,
+                     page_size: int = TRANSACTIONS_PAGE_SIZE, key_prefix: str = DEFAULT_KEY_PREFIX):
+        """
+        Rende la tabella delle transazioni wallet
+        
+        Lo storico è paginato lato server (keyset su created_at, id) e le statistiche
+        sono calcolate sull'intero storico filtrato, non solo sulla pagina visibile.
+        
+        Args:
+            key_prefix: Prefisso delle chiavi di filtri, paginazione e cursori; va cambiato
+                        quando la tabella compare più volte nella stessa pagina
+        """
+        cursori_key = f"{key_prefix}_cursori"
+        filtri_key = f"{key_prefix}_filtri"
         
         # Genera un ID unico per questa istanza
         import time
         unique_id = int(time.time() * 1000) % 100000  # ID unico basato su timestamp
         
-        # Ottieni transazioni
-        transactions = self.wallet_manager.get_wallet_transactions(limit=100)
+        # Filtri (applicati lato server; chiavi stabili per conservarli tra i rerun)
+        st.subheader("🔍 Filtri")
+        col_filter1, col_filter2, col_filter3 = st.columns(3)
+        
+        with col_filter1:
+            stati_disponibili = ['Tutti'] + TRANSACTION_STATI
+            stato_selezionato = st.selectbox("📊 Stato", stati_disponibili, key=f"filter_stato_{key_prefix}")
+        
+        with col_filter2:
+            wallet_mittenti = ['Tutti'] + sorted(self.wallet_manager.get_wallet_list())
+            mittente_selezionato = st.selectbox("💰 Wallet Mittente", wallet_mittenti, key=f"filter_mittente_{key_prefix}")
+        
+        with col_filter3:
+            date_range = st.date_input(
+                "📅 Periodo",
+                value=(datetime.now() - timedelta(days=30), datetime.now()),
+                max_value=datetime.now(),
+                key=f"filter_date_{key_prefix}"
+            )
+        
+        filtri = {
+            'stato': stato_selezionato if stato_selezionato != 'Tutti' else None,
+            'wallet_mittente': mittente_selezionato if mittente_selezionato != 'Tutti' else None,
+            'date_from': None,
+            'date_to': None
+        }
+        if len(date_range) == 2:
+            start_date, end_date = date_range
+            filtri['date_from'] = datetime.combine(start_date, datetime.min.time()).isoformat()
+            filtri['date_to'] = datetime.combine(end_date, datetime.max.time()).isoformat()
         
-        if not transactions:
-            st.info("📋 Nessuna transazione wallet presente. Crea la prima transazione usando il form sopra.")
+        # Nuovi filtri: si riparte dalla prima pagina
+        if st.session_state.get(filtri_key) != filtri or cursori_key not in st.session_state:
+            st.session_state[filtri_key] = filtri
+            st.session_state[cursori_key] = [None]
+        cursori = st.session_state[cursori_key]
+        
+        pagina = self.wallet_manager.get_wallet_transactions_page(limit=page_size, cursor=cursori[-1], **filtri)
+        stats = self.wallet_manager.get_transaction_statistics(**filtri)
+        totale = stats.get('totale_transazioni', 0)
+        
+        if not pagina['rows'] and len(cursori) == 1:
+            if self.wallet_manager.get_wallet_transactions(limit=1):
+                st.info("📋 Nessuna transazione corrisponde ai filtri selezionati.")
+            else:
+                st.info("📋 Nessuna transazione wallet presente. Crea la prima transazione usando il form sopra.")
             return
         
         # Converti in DataFrame
-        df = pd.DataFrame(transactions)
+        df = pd.DataFrame(pagina['rows'])
         
         # Formatta le colonne
         if not df.empty:
@@ -60,70 +118,30 @@ class WalletTransactionTable:
                 'withdrawal': '📤 Prelievo'
             })
         
-        # Filtri
-        st.subheader("🔍 Filtri")
-        col_filter1, col_filter2, col_filter3 = st.columns(3)
+        # Statistiche rapide (intero storico filtrato)
+        st.subheader("📊 Statistiche Rapide")
         
-        with col_filter1:
-            # Filtro per stato (ordinato alfabeticamente)
-            stati_list = list(df['stato'].unique()) if not df.empty else []
-            stati_list.sort()
-            stati_disponibili = ['Tutti'] + stati_list
-            stato_selezionato = st.selectbox("📊 Stato", stati_disponibili, key=f"filter_stato_wallet_table_{unique_id}")
-            
-            if stato_selezionato != 'Tutti' and not df.empty:
-                df = df[df['stato'] == stato_selezionato]
+        col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
         
-        with col_filter2:
-            # Filtro per wallet mittente (ordinato alfabeticamente)
-            wallet_mittenti_list = list(df['wallet_mittente'].unique()) if not df.empty else []
-            wallet_mittenti_list.sort()
-            wallet_mittenti = ['Tutti'] + wallet_mittenti_list
-            mittente_selezionato = st.selectbox("💰 Wallet Mittente", wallet_mittenti, key=f"filter_mittente_wallet_table_{unique_id}")
-            
-            if mittente_selezionato != 'Tutti' and not df.empty:
-                df = df[df['wallet_mittente'] == mittente_selezionato]
+        with col_stat1:
+            st.metric("📋 Totale Transazioni", totale)
         
-        with col_filter3:
-            # Filtro per data
-            if not df.empty:
-                date_range = st.date_input(
-                    "📅 Periodo",
-                    value=(datetime.now() - timedelta(days=30), datetime.now()),
-                    max_value=datetime.now(),
-                    key=f"filter_date_wallet_table_{unique_id}"
-                )
-                
-                if len(date_range) == 2:
-                    start_date, end_date = date_range
-                    df['data_transazione_parsed'] = pd.to_datetime(df['data_transazione'], format='%d/%m/%Y %H:%M')
-                    df = df[(df['data_transazione_parsed'].dt.date >= start_date) & 
-                           (df['data_transazione_parsed'].dt.date <= end_date)]
+        with col_stat2:
+            importo_per_valuta = stats.get('importo_per_valuta') or {'USD': 0.0}
+            valuta_principale = max(importo_per_valuta, key=importo_per_valuta.get)
+            st.metric("💵 Importo Totale", f"{stats.get('importo_totale', 0.0):.2f} {valuta_principale}")
         
-        # Statistiche rapide
-        if not df.empty:
-            st.subheader("📊 Statistiche Rapide")
-            
-            col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
-            
-            with col_stat1:
-                st.metric("📋 Totale Transazioni", len(df))
-            
-            with col_stat2:
-                importo_totale = df['importo'].sum()
-                valuta_principale = df['valuta'].mode().iloc[0] if not df.empty else 'USD'
-                st.metric("💵 Importo Totale", f"{importo_totale:.2f} {valuta_principale}")
-            
-            with col_stat3:
-                transazioni_completate = len(df[df['stato'] == 'completed'])
-                st.metric("✅ Completate", transazioni_completate)
-            
-            with col_stat4:
-                transazioni_pending = len(df[df['stato'] == 'pending'])
-                st.metric("⏳ In Attesa", transazioni_pending)
+        with col_stat3:
+            st.metric("✅ Completate", stats.get('transazioni_completed', 0))
+        
+        with col_stat4:
+            st.metric("⏳ In Attesa", stats.get('transazioni_pending', 0))
         
         # Tabella principale
         st.subheader("📋 Transazioni Wallet")
+        numero_pagina = len(cursori)
+        pagine_totali = max(1, -(-totale // page_size))
+        st.caption(f"Pagina {numero_pagina} di {pagine_totali} — {len(df)} transazioni mostrate")
         
         if df.empty:
             st.info("📋 Nessuna transazione corrisponde ai filtri selezionati.")
@@ -223,15 +241,26 @@ class WalletTransactionTable:
                 
                 st.markdown("---")
         
+        # Navigazione tra le pagine
+        col_nav1, col_nav2 = st.columns(2)
+        with col_nav1:
+            if st.button("◀ Precedente", key=f"{key_prefix}_pagina_precedente", disabled=numero_pagina == 1):
+                cursori.pop()
+                st.rerun()
+        with col_nav2:
+            if st.button("Successiva ▶", key=f"{key_prefix}_pagina_successiva", disabled=pagina['next_cursor'] is None):
+                cursori.append(pagina['next_cursor'])
+                st.rerun()
+        
         # Form modifica transazione
         if 'editing_transaction' in st.session_state:
             self._render_edit_transaction_form(st.session_state.editing_transaction, unique_id)
         
         # Grafici
-        self._render_charts(df, unique_id)
+        self._render_charts(df, stats, unique_id)
     
-    def _render_charts(self, df: pd.DataFrame, unique_id: int):
-        """Rende i grafici delle transazioni"""
+    def _render_charts(self, df: pd.DataFrame, stats: Dict[str, Any], unique_id: int):
+        """Rende i grafici delle transazioni (stato e tipo sull'intero storico, timeline sulla pagina)"""
         if df.empty:
             return
         
@@ -241,7 +270,10 @@ class WalletTransactionTable:
         
         with col_chart1:
             # Grafico transazioni per stato
-            stato_counts = df['stato'].value_counts()
+            stato_counts = pd.Series({
+                stato: stats.get(f'transazioni_{stato}', 0) for stato in TRANSACTION_STATI
+            })
+            stato_counts = stato_counts[stato_counts > 0]
             
             fig_stato = px.pie(
                 values=stato_counts.values,
@@ -259,7 +291,7 @@ class WalletTransactionTable:
         
         with col_chart2:
             # Grafico transazioni per tipo
-            tipo_counts = df['tipo_transazione'].value_counts()
+            tipo_counts = pd.Series(stats.get('per_tipo') or {}, dtype='int64')
             
             fig_tipo = px.bar(
                 x=tipo_counts.index,
@@ -272,7 +304,7 @@ class WalletTransactionTable:
         
         # Grafico timeline transazioni
         if len(df) > 1:
-            st.subheader("📅 Timeline Transazioni")
+            st.subheader("📅 Timeline Transazioni (pagina corrente)")
             
             # Prepara dati per timeline
             df_timeline = df.copy()
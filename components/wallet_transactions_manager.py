@@ -8,11 +8,50 @@ import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 import logging
+import re
 
 # Configurazione logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Dimensione pagina per le letture complete di wallet_transactions (limite PostgREST)
+LEDGER_PAGE_SIZE = 1000
+
+# Tabella degli snapshot materializzati dei saldi (database/create_wallet_balance_snapshots.sql)
+WALLET_SNAPSHOT_TABLE = 'wallet_balance_snapshots'
+
+# Funzione SQL di salvataggio degli snapshot con compare-and-set sul watermark
+SNAPSHOT_SAVE_FUNCTION = 'save_wallet_balance_snapshots'
+
+# Tentativi di ricalcolo di uno snapshot quando il watermark avanza nel frattempo
+SNAPSHOT_SAVE_ATTEMPTS = 3
+
+# Righe per pagina dello storico transazioni (paginazione keyset su created_at, id)
+TRANSACTIONS_PAGE_SIZE = 50
+
+# Funzione SQL di aggregazione delle statistiche (database/create_wallet_transaction_stats.sql)
+TRANSACTION_STATS_FUNCTION = 'wallet_transaction_stats'
+
+TRANSACTION_STATI = ['cancelled', 'completed', 'failed', 'pending']
+
+# Formato storico del campo note: "Wallet: <indirizzo> | Cliente: <nome> (ID: <uuid>)"
+_NOTE_CLIENTE_ID_RE = re.compile(r'\(ID:\s*([^)]+)\)')
+
+def parse_wallet_note(note: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Estrae indirizzo wallet e ID cliente dal campo note di wallet_collaboratori
+    
+    Returns:
+        (wallet_address, cliente_id), None per i valori non presenti
+    """
+    if not note or 'Wallet:' not in note:
+        return None, None
+    
+    wallet_address = note.split('Wallet:')[1].split('|')[0].strip() or None
+    match = _NOTE_CLIENTE_ID_RE.search(note)
+    cliente_id = match.group(1).strip() if match else None
+    return wallet_address, cliente_id
+
 class WalletTransactionsManager:
     """Gestore delle transazioni tra wallet"""
     
@@ -56,24 +95,194 @@ class WalletTransactionsManager:
             return []
         
         try:
-            response = self.supabase_manager.supabase.table('wallet_collaboratori').select('*').order('created_at', desc=True).execute()
-            return response.data if response.data else []
+            wallets = self.supabase_manager.cached_read(
+                'wallet_collaboratori',
+                lambda: self.supabase_manager.supabase.table('wallet_collaboratori').select('*').order('created_at', desc=True).execute().data or []
+            )
+            return [dict(w) for w in wallets]
         except Exception as e:
             logger.error(f"❌ Errore recupero wallet collaboratori: {e}")
             return []
     
-    def get_wallet_transactions(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Recupera le transazioni wallet"""
+    def get_wallet_index(self) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """
+        Indice in memoria dei wallet, costruito una volta e cachato insieme alla lista wallet
+        
+        Usa le colonne wallet_address/cliente_id; per le righe non ancora migrate
+        ricava i valori dal campo note.
+        
+        Returns:
+            {'by_address': {...}, 'by_cliente_id': {...}, 'by_proprietario': {...}}
+            con liste di wallet ordinate per created_at decrescente
+        """
+        if not self.supabase_manager:
+            return {'by_address': {}, 'by_cliente_id': {}, 'by_proprietario': {}}
+        
+        return self.supabase_manager.cached_read(
+            'wallet_collaboratori',
+            lambda: self._build_wallet_index(self.get_wallet_collaboratori()),
+            key='wallet_index'
+        )
+    
+    @staticmethod
+    def _build_wallet_index(wallets: List[Dict[str, Any]]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Costruisce gli indici indirizzo, cliente_id e proprietario -> wallet"""
+        index = {'by_address': {}, 'by_cliente_id': {}, 'by_proprietario': {}}
+        
+        for wallet in wallets:
+            note_address, note_cliente_id = parse_wallet_note(wallet.get('note'))
+            address = (wallet.get('wallet_address') or note_address or '').strip()
+            cliente_id = str(wallet.get('cliente_id') or note_cliente_id or '')
+            
+            if address:
+                index['by_address'].setdefault(address, []).append(wallet)
+            if cliente_id:
+                index['by_cliente_id'].setdefault(cliente_id, []).append(wallet)
+            if wallet.get('proprietario') and wallet.get('tipo_wallet') == 'cliente':
+                index['by_proprietario'].setdefault(wallet['proprietario'], []).append(wallet)
+        
+        return index
+    
+    def find_wallet_by_address(self, wallet_address: str, cliente_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Trova il wallet con l'indirizzo indicato (O(1) sull'indice)
+        
+        Args:
+            wallet_address: Indirizzo del wallet
+            cliente_id: Se indicato, il wallet deve essere collegato a questo cliente
+            
+        Returns:
+            Copia del wallet trovato o None
+        """
+        if not wallet_address or not wallet_address.strip():
+            return None
+        
+        candidates = self.get_wallet_index()['by_address'].get(wallet_address.strip(), [])
+        for wallet in candidates:
+            if not cliente_id or self._wallet_cliente_id(wallet) == str(cliente_id):
+                return dict(wallet)
+        return None
+    
+    def find_wallet_by_cliente_id(self, cliente_id: str) -> Optional[Dict[str, Any]]:
+        """Trova il wallet collegato a un cliente (O(1) sull'indice)"""
+        if not cliente_id:
+            return None
+        
+        candidates = self.get_wallet_index()['by_cliente_id'].get(str(cliente_id), [])
+        return dict(candidates[0]) if candidates else None
+    
+    @staticmethod
+    def _wallet_cliente_id(wallet: Dict[str, Any]) -> str:
+        """ID cliente del wallet, dalla colonna dedicata o dal campo note"""
+        return str(wallet.get('cliente_id') or parse_wallet_note(wallet.get('note'))[1] or '')
+    
+    def get_wallet_transactions(self, limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """
+        Recupera le transazioni wallet più recenti
+        
+        Args:
+            limit: Numero massimo di transazioni; None per l'intero storico (letto a pagine)
+        """
         if not self.supabase_manager:
             return []
         
         try:
-            response = self.supabase_manager.supabase.table('wallet_transactions').select('*').order('created_at', desc=True).limit(limit).execute()
-            return response.data if response.data else []
+            if limit is not None:
+                response = self.supabase_manager.supabase.table('wallet_transactions').select('*').order('created_at', desc=True).limit(limit).execute()
+                return response.data if response.data else []
+            
+            rows, cursor = [], None
+            while True:
+                page = self.get_wallet_transactions_page(limit=LEDGER_PAGE_SIZE, cursor=cursor, raise_errors=True)
+                rows.extend(page['rows'])
+                cursor = page['next_cursor']
+                if cursor is None:
+                    return rows
         except Exception as e:
             logger.error(f"❌ Errore recupero transazioni wallet: {e}")
             return []
     
+    def get_wallet_transactions_page(self, limit: int = TRANSACTIONS_PAGE_SIZE, cursor: Optional[Dict[str, Any]] = None,
+                                     stato: Optional[str] = None, wallet_mittente: Optional[str] = None,
+                                     date_from: Optional[str] = None, date_to: Optional[str] = None,
+                                     raise_errors: bool = False) -> Dict[str, Any]:
+        """
+        Recupera una pagina dello storico transazioni, dalla più recente
+        
+        La paginazione è keyset su (created_at, id) decrescenti: ogni pagina costa
+        come la prima anche con centinaia di migliaia di transazioni.
+        
+        Args:
+            limit: Righe per pagina
+            cursor: {'created_at', 'id'} dell'ultima riga della pagina precedente (None = prima pagina)
+            stato, wallet_mittente: Filtri esatti
+            date_from, date_to: Intervallo (ISO) su data_transazione, estremi inclusi
+            raise_errors: Se True propaga gli errori invece di restituire una pagina vuota
+            
+        Returns:
+            Dict con 'rows' e 'next_cursor' (None se ultima pagina)
+        """
+        result = {'rows': [], 'next_cursor': None}
+        if not self.supabase_manager:
+            return result
+        
+        try:
+            query = self._apply_transaction_filters(
+                self.supabase_manager.supabase.table('wallet_transactions').select('*'),
+                stato, wallet_mittente, date_from, date_to
+            )
+            if cursor:
+                # Il limite superiore ridondante su created_at permette la scansione dell'indice
+                quote = self.supabase_manager._postgrest_quote
+                created_at, last_id = quote(str(cursor['created_at'])), quote(str(cursor['id']))
+                query = query.lte('created_at', cursor['created_at'])\
+                    .or_(f'created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{last_id})')
+            
+            # Una riga in più per sapere se esiste una pagina successiva
+            response = query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1).execute()
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"❌ Errore recupero pagina transazioni wallet: {e}")
+            return result
+        
+        rows = response.data or []
+        if len(rows) > limit:
+            rows = rows[:limit]
+            result['next_cursor'] = {'created_at': rows[-1]['created_at'], 'id': rows[-1]['id']}
+        result['rows'] = rows
+        return result
+    
+    def count_wallet_transactions(self, wallet_name: str) -> int:
+        """Numero di transazioni (qualsiasi stato) in cui il wallet è mittente o destinatario"""
+        if not self.supabase_manager:
+            return 0
+        
+        try:
+            wallet = self.supabase_manager._postgrest_quote(wallet_name)
+            response = self.supabase_manager.supabase.table('wallet_transactions')\
+                .select('id', count='exact', head=True)\
+                .or_(f'wallet_mittente.eq.{wallet},wallet_destinatario.eq.{wallet}')\
+                .execute()
+            return response.count or 0
+        except Exception as e:
+            logger.error(f"❌ Errore conteggio transazioni wallet {wallet_name}: {e}")
+            return 0
+    
+    @staticmethod
+    def _apply_transaction_filters(query, stato: Optional[str] = None, wallet_mittente: Optional[str] = None,
+                                   date_from: Optional[str] = None, date_to: Optional[str] = None):
+        """Applica i filtri dello storico a una query PostgREST su wallet_transactions"""
+        if stato:
+            query = query.eq('stato', stato)
+        if wallet_mittente:
+            query = query.eq('wallet_mittente', wallet_mittente)
+        if date_from:
+            query = query.gte('data_transazione', date_from)
+        if date_to:
+            query = query.lte('data_transazione', date_to)
+        return query
+    
     def add_wallet_transaction(self, transaction_data: Dict[str, Any]) -> Tuple[bool, str]:
         """Aggiunge una nuova transazione wallet e aggiorna i saldi"""
         if not self.supabase_manager:
@@ -91,6 +300,7 @@ class WalletTransactionsManager:
             
             # Inserisci la transazione
             response = self.supabase_manager.supabase.table('wallet_transactions').insert(transaction_data).execute()
+            self.supabase_manager.invalidate_cache('wallet_transactions')
             
             if response.data:
                 # Non aggiorniamo più i saldi nel database
@@ -115,10 +325,14 @@ class WalletTransactionsManager:
             transaction_data['updated_at'] = datetime.now().isoformat()
             
             response = self.supabase_manager.supabase.table('wallet_transactions').update(transaction_data).eq('id', transaction_id).execute()
+            self.supabase_manager.invalidate_cache('wallet_transactions')
             
             if response.data:
-                # Non aggiorniamo più i saldi nel database
-                # I saldi vengono calcolati dinamicamente dalle transazioni completed
+                # Ricalcola gli snapshot dei wallet coinvolti (prima e dopo la modifica)
+                rows = (existing_transaction.data or []) + response.data
+                self._recompute_wallet_snapshots(
+                    [r.get('wallet_mittente') for r in rows] + [r.get('wallet_destinatario') for r in rows]
+                )
                 return True, f"✅ Transazione aggiornata con successo"
             else:
                 return False, "❌ Errore aggiornamento transazione"
@@ -137,8 +351,13 @@ class WalletTransactionsManager:
         
         try:
             response = self.supabase_manager.supabase.table('wallet_transactions').delete().eq('id', transaction_id).execute()
+            self.supabase_manager.invalidate_cache('wallet_transactions')
             
             if response.data:
+                # Ricalcola gli snapshot dei wallet della transazione eliminata
+                self._recompute_wallet_snapshots(
+                    [r.get('wallet_mittente') for r in response.data] + [r.get('wallet_destinatario') for r in response.data]
+                )
                 return True, f"✅ Transazione eliminata con successo"
             else:
                 return False, "❌ Errore eliminazione transazione"
@@ -153,53 +372,319 @@ class WalletTransactionsManager:
             return 0.0
         
         try:
-            # Transazioni in uscita (mittente)
-            outgoing_response = self.supabase_manager.supabase.table('wallet_transactions').select('importo').eq('wallet_mittente', wallet_name).eq('stato', 'completed').execute()
-            outgoing_amount = sum(float(t['importo']) for t in outgoing_response.data) if outgoing_response.data else 0
-            
-            # Transazioni in entrata (destinatario)
-            incoming_response = self.supabase_manager.supabase.table('wallet_transactions').select('importo').eq('wallet_destinatario', wallet_name).eq('stato', 'completed').execute()
-            incoming_amount = sum(float(t['importo']) for t in incoming_response.data) if incoming_response.data else 0
-            
-            return incoming_amount - outgoing_amount
+            return self.get_all_wallet_balances().get(wallet_name, 0.0)
             
         except Exception as e:
             logger.error(f"❌ Errore calcolo saldo wallet {wallet_name}: {e}")
             return 0.0
     
-    def get_transaction_statistics(self) -> Dict[str, Any]:
-        """Ottiene statistiche delle transazioni"""
+    def get_all_wallet_balances(self) -> Dict[str, float]:
+        """
+        Restituisce il saldo netto di tutti i wallet
+        
+        I saldi partono dagli snapshot materializzati in wallet_balance_snapshots e
+        vengono aggiornati sommando solo le transazioni completed con ledger_seq
+        (assegnato dal database) successivo al watermark.
+        Se la tabella snapshot non è disponibile si ricalcola dall'intero storico.
+        Il risultato è condiviso tramite la cache di SupabaseManager e invalidato
+        da ogni scrittura su wallet_transactions.
+        
+        Returns:
+            Dizionario nome_wallet -> saldo (entrate - uscite)
+        """
         if not self.supabase_manager:
             return {}
         
         try:
-            transactions = self.get_wallet_transactions(limit=1000)
+            return self.supabase_manager.cached_read(
+                'wallet_transactions',
+                self._load_balances,
+                key='ledger_balances'
+            )
+        except Exception as e:
+            logger.error(f"❌ Errore calcolo saldi wallet: {e}")
+            return {}
+    
+    def _load_balances(self) -> Dict[str, float]:
+        """
+        Saldi da snapshot + transazioni successive al watermark (fallback: storico completo)
+        
+        I ledger_seq sono assegnati in ordine di commit (trigger serializzato da advisory lock),
+        quindi nessuna transazione con seq inferiore al watermark può diventare visibile dopo.
+        """
+        try:
+            response = self.supabase_manager.supabase.table(WALLET_SNAPSHOT_TABLE).select('*').execute()
+            snapshots = response.data or []
+        except Exception as e:
+            logger.warning(f"⚠️ Snapshot saldi non disponibili, ricalcolo completo: {e}")
+            return self._compute_balances(self._fetch_completed_transactions(ledger_seq=False))
+        
+        watermark = self._snapshot_watermark(snapshots)
+        # Senza watermark gli snapshot non sono affidabili: si riparte da zero sull'intero storico
+        balances = {s['nome_wallet']: float(s.get('saldo') or 0.0) for s in snapshots} if watermark is not None else {}
+        
+        delta = self._fetch_completed_transactions(after=watermark)
+        if not delta:
+            return balances
+        
+        variazioni = self._compute_balances(delta)
+        for wallet, variazione in variazioni.items():
+            balances[wallet] = balances.get(wallet, 0.0) + variazione
+        
+        variati = set(variazioni)
+        if watermark is None:
+            variati |= {s['nome_wallet'] for s in snapshots}
+        if self._save_snapshots({w: balances.get(w, 0.0) for w in variati}, delta[-1]['ledger_seq'], watermark):
+            logger.info(f"✅ Snapshot saldi aggiornati con {len(delta)} nuove transazioni")
+        return balances
+    
+    @staticmethod
+    def _snapshot_watermark(snapshots: List[Dict[str, Any]]) -> Optional[int]:
+        """Watermark (ledger_seq) comune agli snapshot; None se mancano snapshot"""
+        watermarks = [int(s['watermark_seq']) for s in snapshots if s.get('watermark_seq') is not None]
+        return min(watermarks) if watermarks else None
+    
+    def _save_snapshots(self, balances: Dict[str, float], watermark: int,
+                        precedente: Optional[int] = None) -> bool:
+        """
+        Salva i saldi dei wallet indicati e porta tutti gli snapshot al nuovo watermark
+        
+        La scrittura avviene nel database con compare-and-set: se il watermark corrente
+        non è più `precedente` (un'altra sessione ha già aggiornato gli snapshot) non
+        viene scritto nulla. Con precedente None la scrittura è incondizionata.
+        
+        Returns:
+            True se gli snapshot sono stati salvati
+        """
+        saldi = [{'nome_wallet': wallet, 'saldo': round(saldo, 2)} for wallet, saldo in balances.items()]
+        try:
+            response = self.supabase_manager.supabase.rpc(SNAPSHOT_SAVE_FUNCTION, {
+                'p_saldi': saldi,
+                'p_watermark': watermark,
+                'p_watermark_precedente': precedente
+            }).execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Errore salvataggio snapshot saldi: {e}")
+            return False
+        
+        if response.data is False:
+            logger.info(f"🔁 Snapshot saldi già aggiornati da un'altra sessione (watermark {precedente})")
+            return False
+        return True
+    
+    def _recompute_wallet_snapshots(self, wallets: List[str]):
+        """
+        Ricalcola da zero lo snapshot dei wallet indicati fino al watermark corrente
+        
+        Usato dopo modifiche o eliminazioni di transazioni che possono essere
+        già state sommate negli snapshot. Se nel frattempo il watermark avanza
+        il ricalcolo viene ripetuto sul nuovo watermark.
+        """
+        wallets = sorted({w for w in wallets if w})
+        if not self.supabase_manager or not wallets:
+            return
+        
+        try:
+            lista = ','.join(f'"{w}"' for w in wallets)
+            for _ in range(SNAPSHOT_SAVE_ATTEMPTS):
+                response = self.supabase_manager.supabase.table(WALLET_SNAPSHOT_TABLE).select('*').execute()
+                watermark = self._snapshot_watermark(response.data or [])
+                if watermark is None:
+                    # Nessuno snapshot: verrà costruito alla prossima lettura
+                    return
+                
+                # Solo le transazioni già coperte dal watermark, il resto verrà sommato in lettura
+                transactions = self._fetch_completed_transactions(
+                    until=watermark,
+                    or_filter=f"wallet_mittente.in.({lista}),wallet_destinatario.in.({lista})"
+                )
+                ricalcolati = self._compute_balances(transactions)
+                
+                if self._save_snapshots({w: ricalcolati.get(w, 0.0) for w in wallets}, watermark, watermark):
+                    logger.info(f"✅ Snapshot ricalcolati per {len(wallets)} wallet")
+                    return
             
+            logger.warning(f"⚠️ Snapshot wallet {wallets} non ricalcolati: watermark in continuo avanzamento, "
+                           f"usare rebuild_wallet_snapshots()")
+        except Exception as e:
+            logger.warning(f"⚠️ Errore ricalcolo snapshot wallet {wallets}: {e}")
+        finally:
+            self.supabase_manager.invalidate_cache('wallet_transactions')
+    
+    def rebuild_wallet_snapshots(self) -> Tuple[bool, str]:
+        """Ricostruisce tutti gli snapshot dei saldi dall'intero storico delle transazioni"""
+        if not self.supabase_manager:
+            return False, "❌ Supabase non configurato"
+        
+        try:
+            transactions = self._fetch_completed_transactions()
             if not transactions:
-                return {
-                    'totale_transazioni': 0,
-                    'importo_totale': 0,
-                    'transazioni_pending': 0,
-                    'transazioni_completed': 0,
-                    'transazioni_failed': 0
-                }
-            
-            total_amount = sum(float(t.get('importo', 0)) for t in transactions)
-            pending_count = len([t for t in transactions if t.get('stato') == 'pending'])
-            completed_count = len([t for t in transactions if t.get('stato') == 'completed'])
-            failed_count = len([t for t in transactions if t.get('stato') == 'failed'])
-            
-            return {
-                'totale_transazioni': len(transactions),
-                'importo_totale': total_amount,
-                'transazioni_pending': pending_count,
-                'transazioni_completed': completed_count,
-                'transazioni_failed': failed_count
-            }
+                return True, "✅ Nessuna transazione da elaborare"
+            
+            # Anche i wallet presenti solo negli snapshot vengono riscritti (saldo 0)
+            response = self.supabase_manager.supabase.table(WALLET_SNAPSHOT_TABLE).select('nome_wallet').execute()
+            balances = {s['nome_wallet']: 0.0 for s in response.data or []}
+            balances.update(self._compute_balances(transactions))
+            
+            if not self._save_snapshots(balances, transactions[-1]['ledger_seq']):
+                return False, "❌ Errore salvataggio snapshot"
+            self.supabase_manager.invalidate_cache('wallet_transactions')
+            return True, f"✅ Snapshot ricostruiti da {len(transactions)} transazioni"
+        except Exception as e:
+            logger.error(f"❌ Errore ricostruzione snapshot: {e}")
+            return False, f"❌ Errore: {e}"
+    
+    def _fetch_completed_transactions(self, after: Optional[int] = None, until: Optional[int] = None,
+                                      or_filter: Optional[str] = None,
+                                      ledger_seq: bool = True) -> List[Dict[str, Any]]:
+        """
+        Legge le transazioni completed (solo colonne del ledger) in ordine di ledger_seq, a pagine
+        
+        Args:
+            after: Watermark; se presente legge solo le transazioni con ledger_seq successivo
+            until: Legge solo le transazioni con ledger_seq fino a questo valore (incluso)
+            or_filter: Filtro PostgREST aggiuntivo in sintassi or()
+            ledger_seq: False per database senza la colonna ledger_seq (ordine created_at, id)
+        """
+        colonne = 'id, created_at, wallet_mittente, wallet_destinatario, importo'
+        rows = []
+        start = 0
+        while True:
+            query = self.supabase_manager.supabase.table('wallet_transactions')\
+                .select(f'{colonne}, ledger_seq' if ledger_seq else colonne)\
+                .eq('stato', 'completed')
+            if after is not None:
+                query = query.gt('ledger_seq', after)
+            if until is not None:
+                query = query.lte('ledger_seq', until)
+            if or_filter:
+                query = query.or_(or_filter)
             
+            query = query.order('ledger_seq') if ledger_seq else query.order('created_at').order('id')
+            response = query.range(start, start + LEDGER_PAGE_SIZE - 1).execute()
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < LEDGER_PAGE_SIZE:
+                return rows
+            start += LEDGER_PAGE_SIZE
+    
+    @staticmethod
+    def _compute_balances(transactions: List[Dict[str, Any]]) -> Dict[str, float]:
+        """Saldo per wallet: somma entrate per destinatario meno somma uscite per mittente"""
+        if not transactions:
+            return {}
+        
+        df = pd.DataFrame(transactions, columns=['wallet_mittente', 'wallet_destinatario', 'importo'])
+        df['importo'] = pd.to_numeric(df['importo'], errors='coerce').fillna(0.0)
+        
+        incoming = df.groupby('wallet_destinatario')['importo'].sum()
+        outgoing = df.groupby('wallet_mittente')['importo'].sum()
+        balances = incoming.sub(outgoing, fill_value=0.0)
+        
+        return {wallet: float(saldo) for wallet, saldo in balances.items()}
+    
+    def get_transaction_statistics(self, stato: Optional[str] = None, wallet_mittente: Optional[str] = None,
+                                   date_from: Optional[str] = None, date_to: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Ottiene statistiche delle transazioni sull'intero storico (con filtri opzionali)
+        
+        L'aggregazione è eseguita dalla funzione SQL wallet_transaction_stats; se non è
+        installata si scorre lo storico a pagine leggendo solo le colonne necessarie.
+        Il risultato è condiviso tramite la cache di SupabaseManager e invalidato
+        da ogni scrittura su wallet_transactions.
+        """
+        if not self.supabase_manager:
+            return {}
+        
+        filtri = (stato, wallet_mittente, date_from, date_to)
+        try:
+            gruppi = self.supabase_manager.cached_read(
+                'wallet_transactions',
+                lambda: self._load_transaction_groups(*filtri),
+                key='stats:' + '|'.join(str(f or '') for f in filtri)
+            )
         except Exception as e:
             logger.error(f"❌ Errore calcolo statistiche: {e}")
             return {}
+        
+        return self._summarize_transaction_groups(gruppi)
+    
+    def _load_transaction_groups(self, stato: Optional[str] = None, wallet_mittente: Optional[str] = None,
+                                 date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Conteggi e importi raggruppati per (stato, tipo_transazione, valuta)"""
+        try:
+            response = self.supabase_manager.supabase.rpc(TRANSACTION_STATS_FUNCTION, {
+                'p_stato': stato,
+                'p_wallet_mittente': wallet_mittente,
+                'p_date_from': date_from,
+                'p_date_to': date_to
+            }).execute()
+            return response.data or []
+        except Exception as e:
+            logger.warning(f"⚠️ Funzione {TRANSACTION_STATS_FUNCTION} non disponibile, aggregazione locale: {e}")
+        
+        # Scansione keyset sulla chiave primaria: ogni pagina parte dall'ultimo id letto
+        rows = []
+        last_id = None
+        while True:
+            query = self._apply_transaction_filters(
+                self.supabase_manager.supabase.table('wallet_transactions')
+                    .select('id, stato, tipo_transazione, valuta, importo'),
+                stato, wallet_mittente, date_from, date_to
+            )
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            page = query.order('id').limit(LEDGER_PAGE_SIZE).execute().data or []
+            rows.extend(page)
+            if len(page) < LEDGER_PAGE_SIZE:
+                break
+            last_id = page[-1]['id']
+        
+        if not rows:
+            return []
+        
+        df = pd.DataFrame(rows, columns=['stato', 'tipo_transazione', 'valuta', 'importo'])
+        df['importo'] = pd.to_numeric(df['importo'], errors='coerce').fillna(0.0)
+        df[['stato', 'tipo_transazione', 'valuta']] = df[['stato', 'tipo_transazione', 'valuta']].fillna('')
+        gruppi = df.groupby(['stato', 'tipo_transazione', 'valuta'])['importo'].agg(['count', 'sum']).reset_index()
+        return [{
+            'stato': row.stato,
+            'tipo_transazione': row.tipo_transazione,
+            'valuta': row.valuta,
+            'numero': int(row.count),
+            'importo': float(row.sum)
+        } for row in gruppi.itertuples(index=False)]
+    
+    @staticmethod
+    def _summarize_transaction_groups(gruppi: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Statistiche riassuntive a partire dai gruppi (stato, tipo_transazione, valuta)"""
+        stats = {
+            'totale_transazioni': 0,
+            'importo_totale': 0.0,
+            'transazioni_pending': 0,
+            'transazioni_completed': 0,
+            'transazioni_failed': 0,
+            'transazioni_cancelled': 0,
+            'per_tipo': {},
+            'importo_per_valuta': {}
+        }
+        
+        for gruppo in gruppi:
+            numero = int(gruppo.get('numero') or 0)
+            importo = float(gruppo.get('importo') or 0.0)
+            stats['totale_transazioni'] += numero
+            stats['importo_totale'] += importo
+            
+            chiave_stato = f"transazioni_{gruppo.get('stato')}"
+            if chiave_stato in stats:
+                stats[chiave_stato] += numero
+            
+            tipo = gruppo.get('tipo_transazione') or ''
+            stats['per_tipo'][tipo] = stats['per_tipo'].get(tipo, 0) + numero
+            valuta = gruppo.get('valuta') or 'USD'
+            stats['importo_per_valuta'][valuta] = stats['importo_per_valuta'].get(valuta, 0.0) + importo
+        
+        return stats
     
     def get_wallet_list(self) -> List[str]:
         """Ottiene la lista dei wallet disponibili"""
@@ -301,6 +786,7 @@ class WalletTransactionsManager:
             
             # Inserisci transazione
             response = self.supabase_manager.supabase.table('wallet_transactions').insert(transaction_data).execute()
+            self.supabase_manager.invalidate_cache('wallet_transactions')
             
             if response.data:
                 # Invia notifica Telegram per nuovo deposito
@@ -357,6 +843,7 @@ class WalletTransactionsManager:
             
             # Inserisci transazione
             response = self.supabase_manager.supabase.table('wallet_transactions').insert(transaction_data).execute()
+            self.supabase_manager.invalidate_cache('wallet_transactions')
             
             if response.data:
                 # Invia notifica Telegram per nuovo prelievo
@@ -391,17 +878,8 @@ class WalletTransactionsManager:
             return 0.0
         
         try:
-            # Transazioni in uscita (mittente)
-            outgoing_response = self.supabase_manager.supabase.table('wallet_transactions').select('importo').eq('wallet_mittente', wallet_name).eq('stato', 'completed').execute()
-            outgoing_amount = sum(float(t['importo']) for t in outgoing_response.data) if outgoing_response.data else 0
-            
-            # Transazioni in entrata (destinatario)
-            incoming_response = self.supabase_manager.supabase.table('wallet_transactions').select('importo').eq('wallet_destinatario', wallet_name).eq('stato', 'completed').execute()
-            incoming_amount = sum(float(t['importo']) for t in incoming_response.data) if incoming_response.data else 0
-            
-            # Saldo = entrate - uscite
-            balance = incoming_amount - outgoing_amount
-            return balance
+            # Saldo = entrate - uscite, dal ledger calcolato una sola volta per tutti i wallet
+            return self.get_all_wallet_balances().get(wallet_name, 0.0)
             
         except Exception as e:
             logger.error(f"❌ Errore calcolo saldo wallet {wallet_name}: {e}")
@@ -427,40 +905,23 @@ class WalletTransactionsManager:
             return False, "❌ Supabase non configurato"
         
         try:
-            # Recupera informazioni clienti
-            cliente_long_response = self.supabase_manager.supabase.table('clienti').select('nome_cliente, wallet').eq('id', cliente_long_id).execute()
-            cliente_short_response = self.supabase_manager.supabase.table('clienti').select('nome_cliente, wallet').eq('id', cliente_short_id).execute()
+            # Recupera informazioni clienti dalla rubrica condivisa
+            rubrica = self.supabase_manager.get_client_directory()
+            cliente_long = rubrica.get(cliente_long_id)
+            cliente_short = rubrica.get(cliente_short_id)
             
-            if not cliente_long_response.data or not cliente_short_response.data:
+            if not cliente_long or not cliente_short:
                 return False, "❌ Cliente non trovato"
             
-            cliente_long = cliente_long_response.data[0]
-            cliente_short = cliente_short_response.data[0]
-            
-            # Trova i wallet dei clienti
-            wallet_long = self._find_client_wallet(cliente_long['nome_cliente'], cliente_long.get('wallet', ''))
-            wallet_short = self._find_client_wallet(cliente_short['nome_cliente'], cliente_short.get('wallet', ''))
-            
-            if not wallet_long or not wallet_short:
+            transaction_data = self.build_cross_transaction(
+                incrocio_id, cliente_long, cliente_short, volume_long, volume_short, pair_trading
+            )
+            if not transaction_data:
                 return False, "❌ Wallet clienti non trovati"
             
-            # Crea transazione di apertura incrocio (registra i saldi iniziali)
-            transaction_data = {
-                'wallet_mittente': 'Sistema',
-                'wallet_destinatario': 'Sistema',
-                'importo': 0.0,  # Transazione di registrazione
-                'valuta': 'USDT',
-                'tipo_transazione': 'transfer',  # Usa tipo permesso
-                'stato': 'completed',
-                'note': f"Incrocio {incrocio_id} - Apertura: {cliente_long['nome_cliente']} (Long {volume_long} {pair_trading}) vs {cliente_short['nome_cliente']} (Short {volume_short} {pair_trading})",
-                'hash_transazione': f"incrocio_open_{incrocio_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                'commissione': 0.0,
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-            
             # Inserisci transazione di apertura
             response = self.supabase_manager.supabase.table('wallet_transactions').insert(transaction_data).execute()
+            self.supabase_manager.invalidate_cache('wallet_transactions')
             
             if response.data:
                 logger.info(f"✅ Transazione apertura incrocio {incrocio_id} creata")
@@ -472,6 +933,38 @@ class WalletTransactionsManager:
             logger.error(f"❌ Errore creazione transazione incrocio: {e}")
             return False, f"❌ Errore: {e}"
     
+    def build_cross_transaction(self, incrocio_id: str, cliente_long: Dict[str, Any], cliente_short: Dict[str, Any],
+                                volume_long: float, volume_short: float, pair_trading: str) -> Optional[Dict[str, Any]]:
+        """
+        Prepara (senza inserirla) la transazione di apertura di un incrocio
+        
+        Args:
+            cliente_long, cliente_short: Righe clienti con almeno nome_cliente e wallet
+            
+        Returns:
+            Dati della transazione, None se i wallet dei clienti non sono registrati
+        """
+        wallet_long = self._find_client_wallet(cliente_long['nome_cliente'], cliente_long.get('wallet', ''))
+        wallet_short = self._find_client_wallet(cliente_short['nome_cliente'], cliente_short.get('wallet', ''))
+        
+        if not wallet_long or not wallet_short:
+            return None
+        
+        # Transazione di apertura incrocio (registra i saldi iniziali)
+        return {
+            'wallet_mittente': 'Sistema',
+            'wallet_destinatario': 'Sistema',
+            'importo': 0.0,  # Transazione di registrazione
+            'valuta': 'USDT',
+            'tipo_transazione': 'transfer',  # Usa tipo permesso
+            'stato': 'completed',
+            'note': f"Incrocio {incrocio_id} - Apertura: {cliente_long['nome_cliente']} (Long {volume_long} {pair_trading}) vs {cliente_short['nome_cliente']} (Short {volume_short} {pair_trading})",
+            'hash_transazione': f"incrocio_open_{incrocio_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            'commissione': 0.0,
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat()
+        }
+    
     def _find_client_wallet(self, nome_cliente: str, wallet_address: str = '') -> Optional[str]:
         """
         Trova il wallet di un cliente nel sistema
@@ -484,17 +977,17 @@ class WalletTransactionsManager:
             Nome del wallet o None se non trovato
         """
         try:
+            index = self.get_wallet_index()
+            
             # Cerca wallet per nome cliente
-            wallets = self.get_client_wallets()
-            for wallet in wallets:
-                if wallet.get('proprietario') == nome_cliente:
-                    return wallet['nome_wallet']
+            wallets = index['by_proprietario'].get(nome_cliente)
+            if wallets:
+                return wallets[0]['nome_wallet']
             
             # Se non trovato e abbiamo l'indirizzo, cerca per indirizzo
             if wallet_address:
-                for wallet in wallets:
-                    note = wallet.get('note', '')
-                    if wallet_address in note:
+                for wallet in index['by_address'].get(wallet_address.strip(), []):
+                    if wallet.get('tipo_wallet') == 'cliente':
                         return wallet['nome_wallet']
             
             return None
@@ -525,16 +1018,14 @@ class WalletTransactionsManager:
             return False, "❌ Supabase non configurato"
         
         try:
-            # Recupera informazioni clienti
-            cliente_long_response = self.supabase_manager.supabase.table('clienti').select('nome_cliente, wallet').eq('id', cliente_long_id).execute()
-            cliente_short_response = self.supabase_manager.supabase.table('clienti').select('nome_cliente, wallet').eq('id', cliente_short_id).execute()
+            # Recupera informazioni clienti dalla rubrica condivisa
+            rubrica = self.supabase_manager.get_client_directory()
+            cliente_long = rubrica.get(cliente_long_id)
+            cliente_short = rubrica.get(cliente_short_id)
             
-            if not cliente_long_response.data or not cliente_short_response.data:
+            if not cliente_long or not cliente_short:
                 return False, "❌ Cliente non trovato"
             
-            cliente_long = cliente_long_response.data[0]
-            cliente_short = cliente_short_response.data[0]
-            
             # Trova i wallet dei clienti
             wallet_long = self._find_client_wallet(cliente_long['nome_cliente'], cliente_long.get('wallet', ''))
             wallet_short = self._find_client_wallet(cliente_short['nome_cliente'], cliente_short.get('wallet', ''))
@@ -573,6 +1064,7 @@ class WalletTransactionsManager:
             
             # Inserisci transazione di chiusura
             response = self.supabase_manager.supabase.table('wallet_transactions').insert(transaction_data).execute()
+            self.supabase_manager.invalidate_cache('wallet_transactions')
             
             if response.data:
                 logger.info(f"✅ Transazione chiusura incrocio {incrocio_id} creata")
@@ -612,41 +1104,9 @@ class WalletTransactionsManager:
             logger.error(f"❌ Errore invio notifica wallet '{notification_type}': {e}")
     
     def _is_notification_enabled(self, notification_type: str) -> bool:
-        """Controlla se le notifiche per un tipo specifico sono abilitate"""
-        try:
-            if not self.supabase_manager:
-                # Default settings se Supabase non disponibile
-                default_settings = {
-                    'wallet_new_deposit': True,
-                    'wallet_new_withdrawal': True,
-                    'wallet_cross_transaction': True,
-                    'wallet_low_balance_alert': False,
-                }
-                return default_settings.get(notification_type, True)
-            
-            # Recupera impostazioni notifiche dal database
-            response = self.supabase_manager.supabase.table('notification_settings').select('*').eq('notification_type', notification_type).execute()
-            
-            if response.data and len(response.data) > 0:
-                setting = response.data[0]
-                return setting.get('is_enabled', True)
-            else:
-                # Default settings se nessuna impostazione trovata
-                default_settings = {
-                    'wallet_new_deposit': True,
-                    'wallet_new_withdrawal': True,
-                    'wallet_cross_transaction': True,
-                    'wallet_low_balance_alert': False,
-                }
-                return default_settings.get(notification_type, True)
-                
-        except Exception as e:
-            logger.error(f"❌ Errore controllo impostazioni notifiche {notification_type}: {e}")
-            # Default settings in caso di errore
-            default_settings = {
-                'wallet_new_deposit': True,
-                'wallet_new_withdrawal': True,
-                'wallet_cross_transaction': True,
-                'wallet_low_balance_alert': False,
-            }
-            return default_settings.get(notification_type, True)
\ No newline at end of file
+        """Controlla se le notifiche per un tipo specifico sono abilitate (registro condiviso)"""
+        if not self.supabase_manager:
+            from supabase_manager import DEFAULT_NOTIFICATION_SETTINGS
+            return DEFAULT_NOTIFICATION_SETTINGS.get(notification_type, True)
+        
+        return self.supabase_manager.is_notification_enabled(notification_type)
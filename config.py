@@ -56,7 +56,9 @@ class Config:
         'timeout': 60,
         'retry_attempts': 3,
         'cache_responses': True,
-        'cache_duration_hours': 24
+        'cache_duration_hours': 24,
+        'max_concurrent_calls': 3,  # Chiamate API in parallelo nelle analisi multi-sezione
+        'call_timeout': 90  # Secondi massimi per chiamata, retry inclusi
     }
     
     # Prompt templates per AI Assistant CPA
@@ -0,0 +1,22 @@
+-- Indice strutturato indirizzo wallet / cliente per wallet_collaboratori
+-- Sostituisce la ricerca dell'indirizzo dentro il campo note
+-- ("Wallet: <indirizzo> | Cliente: <nome> (ID: <uuid>)")
+
+ALTER TABLE wallet_collaboratori ADD COLUMN IF NOT EXISTS wallet_address TEXT;
+ALTER TABLE wallet_collaboratori ADD COLUMN IF NOT EXISTS cliente_id UUID REFERENCES clienti(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_wallet_collaboratori_wallet_address ON wallet_collaboratori(wallet_address);
+CREATE INDEX IF NOT EXISTS idx_wallet_collaboratori_cliente_id ON wallet_collaboratori(cliente_id);
+
+-- Backfill una tantum dai campi note esistenti
+UPDATE wallet_collaboratori
+SET wallet_address = NULLIF(TRIM(SPLIT_PART(SPLIT_PART(note, 'Wallet:', 2), '|', 1)), '')
+WHERE wallet_address IS NULL
+  AND note LIKE '%Wallet:%';
+
+UPDATE wallet_collaboratori w
+SET cliente_id = c.id
+FROM clienti c
+WHERE w.cliente_id IS NULL
+  AND w.note ~ '\(ID: [0-9a-fA-F-]{36}\)'
+  AND c.id = SUBSTRING(w.note FROM '\(ID: ([0-9a-fA-F-]{36})\)')::uuid;
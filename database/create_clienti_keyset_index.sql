@@ -0,0 +1,5 @@
+-- Indice keyset per la lista clienti paginata (created_at, id decrescenti)
+-- Usato da SupabaseManager.get_clienti_page: il limite created_at <= cursore
+-- e l'ordinamento percorrono l'indice invece di ordinare l'intera tabella
+CREATE INDEX IF NOT EXISTS idx_clienti_created_id
+    ON clienti(created_at DESC, id DESC);
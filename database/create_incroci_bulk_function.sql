@@ -0,0 +1,42 @@
+-- Creazione atomica di uno o più incroci con account, bonus e transazioni wallet di apertura
+-- Le righe arrivano già complete (ID incroci generati dal client) come array JSON;
+-- il corpo della funzione è un'unica transazione: o vengono inserite tutte o nessuna.
+-- Chiamata da IncrociManager.crea_incroci_bulk (crea_incrocio e importazione CSV)
+
+CREATE OR REPLACE FUNCTION crea_incroci_bulk(
+    p_incroci JSONB,
+    p_account JSONB,
+    p_bonus JSONB DEFAULT '[]'::JSONB,
+    p_wallet_transactions JSONB DEFAULT '[]'::JSONB
+)
+RETURNS SETOF UUID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO incroci (id, nome_incrocio, data_apertura, pair_trading, volume_trading,
+                         note, stato, created_at, updated_at)
+    SELECT id, nome_incrocio, data_apertura, pair_trading, volume_trading,
+           note, stato, created_at, updated_at
+    FROM jsonb_populate_recordset(NULL::incroci, p_incroci);
+
+    INSERT INTO incroci_account (incrocio_id, tipo_posizione, broker, piattaforma,
+                                 numero_conto, volume_posizione, created_at)
+    SELECT incrocio_id, tipo_posizione, broker, piattaforma,
+           numero_conto, volume_posizione, created_at
+    FROM jsonb_populate_recordset(NULL::incroci_account, p_account);
+
+    INSERT INTO incroci_bonus (incrocio_id, importo_bonus, data_bonus, note, created_at)
+    SELECT incrocio_id, importo_bonus, data_bonus, note, created_at
+    FROM jsonb_populate_recordset(NULL::incroci_bonus, COALESCE(p_bonus, '[]'::JSONB));
+
+    INSERT INTO wallet_transactions (wallet_mittente, wallet_destinatario, importo, valuta,
+                                     tipo_transazione, stato, note, hash_transazione,
+                                     commissione, created_at, updated_at)
+    SELECT wallet_mittente, wallet_destinatario, importo, valuta,
+           tipo_transazione, stato, note, hash_transazione,
+           commissione, created_at, updated_at
+    FROM jsonb_populate_recordset(NULL::wallet_transactions, COALESCE(p_wallet_transactions, '[]'::JSONB));
+
+    RETURN QUERY SELECT (elem->>'id')::UUID FROM jsonb_array_elements(p_incroci) AS elem;
+END;
+$$;
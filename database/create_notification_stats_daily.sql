@@ -0,0 +1,67 @@
+-- Contatori giornalieri delle notifiche per tipo (rollup di notification_logs)
+-- Aggiornati da un trigger a ogni insert nei log (il dispatcher scrive a blocchi: un solo
+-- upsert per blocco). Letti da TelegramManager.get_notification_rollups e dalla dashboard
+-- notifiche al posto della scansione dei log degli ultimi 30 giorni.
+
+CREATE TABLE IF NOT EXISTS notification_stats_daily (
+    giorno DATE NOT NULL,
+    notification_type TEXT NOT NULL,
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    last_sent_at TIMESTAMP,
+    PRIMARY KEY (giorno, notification_type)
+);
+
+CREATE OR REPLACE FUNCTION notification_stats_daily_apply()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO notification_stats_daily AS s (giorno, notification_type, sent, failed, last_sent_at)
+    SELECT
+        n.sent_at::DATE,
+        COALESCE(n.notification_type, 'unknown'),
+        COUNT(*) FILTER (WHERE n.status = 'sent'),
+        COUNT(*) FILTER (WHERE n.status IS DISTINCT FROM 'sent'),
+        MAX(n.sent_at)
+    FROM nuovi_log n
+    GROUP BY 1, 2
+    ON CONFLICT (giorno, notification_type) DO UPDATE SET
+        sent = s.sent + EXCLUDED.sent,
+        failed = s.failed + EXCLUDED.failed,
+        last_sent_at = GREATEST(s.last_sent_at, EXCLUDED.last_sent_at);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_notification_stats_daily ON notification_logs;
+CREATE TRIGGER trg_notification_stats_daily
+    AFTER INSERT ON notification_logs
+    REFERENCING NEW TABLE AS nuovi_log
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notification_stats_daily_apply();
+
+-- Ricostruzione dai log esistenti (rieseguibile: sostituisce i contatori dei giorni presenti nei log)
+INSERT INTO notification_stats_daily (giorno, notification_type, sent, failed, last_sent_at)
+SELECT
+    sent_at::DATE,
+    COALESCE(notification_type, 'unknown'),
+    COUNT(*) FILTER (WHERE status = 'sent'),
+    COUNT(*) FILTER (WHERE status IS DISTINCT FROM 'sent'),
+    MAX(sent_at)
+FROM notification_logs
+GROUP BY 1, 2
+ON CONFLICT (giorno, notification_type) DO UPDATE SET
+    sent = EXCLUDED.sent,
+    failed = EXCLUDED.failed,
+    last_sent_at = EXCLUDED.last_sent_at;
+
+-- Indice per la retention (svuotamento dei testi più vecchi) e per l'elenco log recenti
+CREATE INDEX IF NOT EXISTS idx_notification_logs_sent_at ON notification_logs(sent_at);
+
+-- RLS allineata a notification_logs
+ALTER TABLE notification_stats_daily ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow all operations on notification_stats_daily" ON notification_stats_daily;
+CREATE POLICY "Allow all operations on notification_stats_daily" ON notification_stats_daily
+    FOR ALL USING (true) WITH CHECK (true);
@@ -0,0 +1,27 @@
+-- Tabelle dello scheduler dei controlli periodici (utils/job_scheduler.py)
+
+-- Storico delle esecuzioni dei job
+CREATE TABLE IF NOT EXISTS scheduled_job_runs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    job_name TEXT NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP NOT NULL,
+    duration_ms INTEGER DEFAULT 0,
+    status TEXT NOT NULL CHECK (status IN ('success', 'error')),
+    items INTEGER DEFAULT 0,
+    message TEXT,
+    host TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_scheduled_job_runs_job_started
+    ON scheduled_job_runs(job_name, started_at DESC);
+
+-- Alert già inviati: una riga per chiave di deduplica (es. vps_expiring:<id>:<data_rinnovo>:7)
+CREATE TABLE IF NOT EXISTS scheduled_alerts_sent (
+    alert_key TEXT PRIMARY KEY,
+    job_name TEXT NOT NULL,
+    sent_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_scheduled_alerts_sent_at
+    ON scheduled_alerts_sent(sent_at);
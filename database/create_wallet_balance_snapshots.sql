@@ -0,0 +1,123 @@
+-- Snapshot materializzati dei saldi wallet
+-- Ogni riga contiene il saldo di un wallet calcolato fino al watermark: il ledger_seq
+-- dell'ultima transazione completed applicata. Le letture successive sommano solo
+-- le transazioni con ledger_seq maggiore del watermark.
+
+-- Numero di sequenza del ledger assegnato dal database (mai dal client) a ogni
+-- inserimento e modifica di una transazione.
+-- Il trigger prende un advisory lock di transazione prima di nextval: le scritture su
+-- wallet_transactions sono serializzate fino al commit, quindi l'ordine dei ledger_seq
+-- coincide con l'ordine di commit e una lettura non vede mai il seq N+1 prima del seq N
+-- (altrimenti il watermark potrebbe superare una transazione non ancora visibile).
+CREATE SEQUENCE IF NOT EXISTS wallet_transactions_ledger_seq;
+
+ALTER TABLE wallet_transactions ADD COLUMN IF NOT EXISTS ledger_seq BIGINT;
+
+-- Backfill delle transazioni esistenti in ordine (created_at, id)
+WITH ordinate AS (
+    SELECT id,
+           ROW_NUMBER() OVER (ORDER BY created_at, id)
+               + (SELECT COALESCE(MAX(ledger_seq), 0) FROM wallet_transactions) AS seq
+    FROM wallet_transactions
+    WHERE ledger_seq IS NULL
+)
+UPDATE wallet_transactions t
+SET ledger_seq = ordinate.seq
+FROM ordinate
+WHERE t.id = ordinate.id;
+
+SELECT setval('wallet_transactions_ledger_seq',
+              GREATEST((SELECT MAX(ledger_seq) FROM wallet_transactions), 1));
+
+CREATE OR REPLACE FUNCTION assign_wallet_transaction_ledger_seq()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('wallet_transactions_ledger_seq'));
+    NEW.ledger_seq := nextval('wallet_transactions_ledger_seq');
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_wallet_transactions_ledger_seq ON wallet_transactions;
+CREATE TRIGGER trg_wallet_transactions_ledger_seq
+    BEFORE INSERT OR UPDATE ON wallet_transactions
+    FOR EACH ROW EXECUTE FUNCTION assign_wallet_transaction_ledger_seq();
+
+CREATE TABLE IF NOT EXISTS wallet_balance_snapshots (
+    nome_wallet TEXT PRIMARY KEY,
+    saldo DECIMAL(15,2) NOT NULL DEFAULT 0,
+    watermark_seq BIGINT,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Installazioni con il vecchio watermark (created_at, id)
+ALTER TABLE wallet_balance_snapshots ADD COLUMN IF NOT EXISTS watermark_seq BIGINT;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_name = 'wallet_balance_snapshots' AND column_name = 'watermark_id') THEN
+        UPDATE wallet_balance_snapshots s
+        SET watermark_seq = t.ledger_seq
+        FROM wallet_transactions t
+        WHERE t.id = s.watermark_id AND s.watermark_seq IS NULL;
+        ALTER TABLE wallet_balance_snapshots DROP COLUMN watermark_created_at;
+        ALTER TABLE wallet_balance_snapshots DROP COLUMN watermark_id;
+    END IF;
+END;
+$$;
+
+-- Salvataggio con compare-and-set sul watermark: i saldi vengono scritti solo se il
+-- watermark corrente è ancora p_watermark_precedente (NULL = scrittura incondizionata).
+-- p_saldi contiene solo i wallet variati ([{"nome_wallet": ..., "saldo": ...}]);
+-- gli altri restano validi e avanzano al nuovo watermark.
+-- Chiamata da WalletTransactionsManager._save_snapshots
+CREATE OR REPLACE FUNCTION save_wallet_balance_snapshots(
+    p_saldi JSONB,
+    p_watermark BIGINT,
+    p_watermark_precedente BIGINT DEFAULT NULL
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_corrente BIGINT;
+BEGIN
+    LOCK TABLE wallet_balance_snapshots IN SHARE ROW EXCLUSIVE MODE;
+
+    IF p_watermark_precedente IS NOT NULL THEN
+        SELECT MIN(watermark_seq) INTO v_corrente FROM wallet_balance_snapshots;
+        IF v_corrente IS DISTINCT FROM p_watermark_precedente THEN
+            RETURN FALSE;
+        END IF;
+    END IF;
+
+    INSERT INTO wallet_balance_snapshots (nome_wallet, saldo, watermark_seq, updated_at)
+    SELECT s.nome_wallet, s.saldo, p_watermark, NOW()
+    FROM jsonb_to_recordset(p_saldi) AS s(nome_wallet TEXT, saldo DECIMAL(15,2))
+    ON CONFLICT (nome_wallet) DO UPDATE
+        SET saldo = EXCLUDED.saldo,
+            watermark_seq = EXCLUDED.watermark_seq,
+            updated_at = EXCLUDED.updated_at;
+
+    UPDATE wallet_balance_snapshots
+    SET watermark_seq = p_watermark
+    WHERE watermark_seq IS DISTINCT FROM p_watermark;
+
+    RETURN TRUE;
+END;
+$$;
+
+-- Indice per leggere le transazioni successive al watermark
+CREATE INDEX IF NOT EXISTS idx_wallet_transactions_stato_ledger_seq
+    ON wallet_transactions(stato, ledger_seq);
+CREATE INDEX IF NOT EXISTS idx_wallet_transactions_mittente ON wallet_transactions(wallet_mittente);
+CREATE INDEX IF NOT EXISTS idx_wallet_transactions_destinatario ON wallet_transactions(wallet_destinatario);
+
+-- RLS allineata a wallet_transactions
+ALTER TABLE wallet_balance_snapshots ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow all operations on wallet_balance_snapshots" ON wallet_balance_snapshots;
+CREATE POLICY "Allow all operations on wallet_balance_snapshots" ON wallet_balance_snapshots
+    FOR ALL USING (true) WITH CHECK (true);
@@ -0,0 +1,37 @@
+-- Statistiche delle transazioni wallet calcolate dal database sull'intero storico
+-- Restituisce conteggi e importi raggruppati per (stato, tipo_transazione, valuta);
+-- i filtri NULL vengono ignorati. Chiamata da WalletTransactionsManager.get_transaction_statistics
+
+CREATE OR REPLACE FUNCTION wallet_transaction_stats(
+    p_stato TEXT DEFAULT NULL,
+    p_wallet_mittente TEXT DEFAULT NULL,
+    p_date_from TIMESTAMP DEFAULT NULL,
+    p_date_to TIMESTAMP DEFAULT NULL
+)
+RETURNS TABLE (
+    stato TEXT,
+    tipo_transazione TEXT,
+    valuta TEXT,
+    numero BIGINT,
+    importo NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        t.stato::TEXT,
+        COALESCE(t.tipo_transazione, '')::TEXT,
+        COALESCE(t.valuta, '')::TEXT,
+        COUNT(*),
+        COALESCE(SUM(t.importo), 0)
+    FROM wallet_transactions t
+    WHERE (p_stato IS NULL OR t.stato = p_stato)
+      AND (p_wallet_mittente IS NULL OR t.wallet_mittente = p_wallet_mittente)
+      AND (p_date_from IS NULL OR t.data_transazione >= p_date_from)
+      AND (p_date_to IS NULL OR t.data_transazione <= p_date_to)
+    GROUP BY 1, 2, 3;
+$$;
+
+-- Indice keyset per lo storico paginato (created_at, id decrescenti)
+CREATE INDEX IF NOT EXISTS idx_wallet_transactions_created_id
+    ON wallet_transactions(created_at DESC, id DESC);
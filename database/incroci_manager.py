@@ -9,12 +9,52 @@ import pandas as pd
 from datetime import datetime, date
 from typing import Dict, List, Tuple, Optional, Any
 import logging
+import uuid
+import copy
+import threading
+from collections import OrderedDict
 
 try:
     from supabase_manager import SupabaseManager
 except ImportError:
     SupabaseManager = None
 
+# Colonne restituite da ottieni_incroci
+INCROCIO_COLUMNS = ['id', 'nome_incrocio', 'data_apertura', 'data_chiusura', 'stato',
+                    'pair_trading', 'volume_trading', 'note']
+DETTAGLIO_COLUMNS = ['cliente_long', 'cliente_short', 'cliente_long_id', 'cliente_short_id',
+                     'broker_long', 'piattaforma_long', 'conto_long', 'volume_long',
+                     'broker_short', 'piattaforma_short', 'conto_short', 'volume_short',
+                     'totale_bonus']
+ACCOUNT_COLUMNS = ['incrocio_id', 'tipo_posizione', 'broker', 'piattaforma', 'numero_conto', 'volume_posizione']
+
+# Numero massimo di valori per filtro in_() (evita URL troppo lunghi)
+IN_FILTER_CHUNK_SIZE = 200
+
+# Funzione SQL per la creazione atomica degli incroci (database/create_incroci_bulk_function.sql)
+CREA_INCROCI_FUNCTION = 'crea_incroci_bulk'
+
+# Errori PostgREST che indicano una funzione RPC non installata; il generico "does not exist"
+# di PostgreSQL è escluso: può riferirsi a una tabella o colonna usata dentro la funzione,
+# un errore reale che l'insert di fallback non deve mascherare
+FUNZIONE_MANCANTE_ERRORI = ('PGRST202', 'Could not find the function')
+
+# Statistiche incroci: colonne lette, pagina keyset e memo per versione dei dati
+STATISTICHE_INCROCIO_COLUMNS = ['id', 'stato', 'pair_trading', 'volume_trading', 'data_apertura']
+STATISTICHE_SELECT = (', '.join(STATISTICHE_INCROCIO_COLUMNS)
+                      + ', incroci_account(incrocio_id, broker), incroci_bonus(incrocio_id, importo_bonus)')
+STATISTICHE_PAGE_SIZE = 1000
+STATISTICHE_CACHE_MAX_ENTRIES = 16
+
+# Memo per processo: (data_da, data_a) -> (versione dati, statistiche)
+_statistiche_memo: "OrderedDict[Tuple[Optional[str], Optional[str]], Tuple[Tuple, Dict]]" = OrderedDict()
+_statistiche_lock = threading.Lock()
+
+# Colonne obbligatorie del CSV di importazione incroci
+CSV_REQUIRED_COLUMNS = ['nome_incrocio', 'data_apertura', 'pair_trading',
+                        'broker_long', 'piattaforma_long', 'conto_long',
+                        'broker_short', 'piattaforma_short', 'conto_short']
+
 class IncrociManager:
     """Gestisce gli incroci tra account CPA usando Supabase"""
     
@@ -45,6 +85,9 @@ class IncrociManager:
         """
         Ottiene tutti gli incroci o filtrati per stato da Supabase
         
+        Account e bonus vengono caricati in un'unica query con embedding PostgREST,
+        i clienti con una sola query batch sui numeri conto coinvolti.
+        
         Args:
             stato: Filtro per stato ('attivo', 'chiuso', 'sospeso')
             
@@ -56,8 +99,12 @@ class IncrociManager:
                 logging.warning("Supabase non disponibile per ottieni_incroci")
                 return pd.DataFrame()
             
-            # Query base per incroci
-            query = self.supabase.supabase.table('incroci').select('*')
+            # Query unica: incroci + account + bonus embedded
+            query = self.supabase.supabase.table('incroci').select(
+                '*, '
+                'incroci_account(incrocio_id, tipo_posizione, broker, piattaforma, numero_conto, volume_posizione), '
+                'incroci_bonus(incrocio_id, importo_bonus)'
+            )
             
             if stato:
                 query = query.eq('stato', stato)
@@ -67,183 +114,256 @@ class IncrociManager:
             if not response.data:
                 return pd.DataFrame()
             
-            # Converti in DataFrame
-            df_incroci = pd.DataFrame(response.data)
+            accounts = [account for incrocio in response.data for account in (incrocio.get('incroci_account') or [])]
+            bonus = [b for incrocio in response.data for b in (incrocio.get('incroci_bonus') or [])]
             
-            # Per ogni incrocio, ottieni account e bonus correlati
-            incroci_completi = []
+            df_incroci = pd.DataFrame(response.data).drop(columns=['incroci_account', 'incroci_bonus'], errors='ignore')
+            df_account = pd.DataFrame(accounts, columns=ACCOUNT_COLUMNS)
+            df_bonus = pd.DataFrame(bonus, columns=['incrocio_id', 'importo_bonus'])
             
-            for _, incrocio in df_incroci.iterrows():
-                incrocio_id = incrocio['id']
-                
-                # Ottieni account long
-                response_account = self.supabase.supabase.table('incroci_account')\
-                    .select('*')\
-                    .eq('incrocio_id', incrocio_id)\
-                    .eq('tipo_posizione', 'long')\
-                    .execute()
-                
-                account_long = response_account.data[0] if response_account.data else {}
-                
-                # Ottieni account short
-                response_account = self.supabase.supabase.table('incroci_account')\
-                    .select('*')\
-                    .eq('incrocio_id', incrocio_id)\
-                    .eq('tipo_posizione', 'short')\
-                    .execute()
-                
-                account_short = response_account.data[0] if response_account.data else {}
-                
-                # Ottieni bonus
-                response_bonus = self.supabase.supabase.table('incroci_bonus')\
-                    .select('*')\
-                    .eq('incrocio_id', incrocio_id)\
-                    .execute()
-                
-                bonus_totali = sum(bonus.get('importo_bonus', 0) for bonus in response_bonus.data) if response_bonus.data else 0
-                
-                # Recupera informazioni clienti per ID
-                cliente_long_id = None
-                cliente_short_id = None
-                
-                try:
-                    # Cerca cliente long per numero conto
-                    if account_long.get('numero_conto'):
-                        cliente_long_response = self.supabase.supabase.table('clienti').select('id, nome_cliente').eq('numero_conto', account_long['numero_conto']).execute()
-                        if cliente_long_response.data:
-                            cliente_long_id = cliente_long_response.data[0]['id']
-                            cliente_long_nome = cliente_long_response.data[0]['nome_cliente']
-                        else:
-                            cliente_long_nome = account_long.get('numero_conto', 'N/A')
-                    else:
-                        cliente_long_nome = 'N/A'
-                    
-                    # Cerca cliente short per numero conto
-                    if account_short.get('numero_conto'):
-                        cliente_short_response = self.supabase.supabase.table('clienti').select('id, nome_cliente').eq('numero_conto', account_short['numero_conto']).execute()
-                        if cliente_short_response.data:
-                            cliente_short_id = cliente_short_response.data[0]['id']
-                            cliente_short_nome = cliente_short_response.data[0]['nome_cliente']
-                        else:
-                            cliente_short_nome = account_short.get('numero_conto', 'N/A')
-                    else:
-                        cliente_short_nome = 'N/A'
-                        
-                except Exception as e:
-                    logging.warning(f"Errore recupero info clienti: {e}")
-                    cliente_long_nome = account_long.get('numero_conto', 'N/A')
-                    cliente_short_nome = account_short.get('numero_conto', 'N/A')
-                
-                # Crea record completo
-                incrocio_completo = {
-                    'id': incrocio['id'],
-                    'nome_incrocio': incrocio['nome_incrocio'],
-                    'data_apertura': incrocio['data_apertura'],
-                    'data_chiusura': incrocio.get('data_chiusura'),
-                    'stato': incrocio['stato'],
-                    'pair_trading': incrocio['pair_trading'],
-                    'volume_trading': incrocio.get('volume_trading', 0),
-                    'note': incrocio.get('note', ''),
-                    'cliente_long': cliente_long_nome,
-                    'cliente_short': cliente_short_nome,
-                    'cliente_long_id': cliente_long_id,
-                    'cliente_short_id': cliente_short_id,
-                    'broker_long': account_long.get('broker', 'N/A'),
-                    'piattaforma_long': account_long.get('piattaforma', 'N/A'),
-                    'conto_long': account_long.get('numero_conto', 'N/A'),
-                    'volume_long': account_long.get('volume_posizione', 0),
-                    'broker_short': account_short.get('broker', 'N/A'),
-                    'piattaforma_short': account_short.get('piattaforma', 'N/A'),
-                    'conto_short': account_short.get('numero_conto', 'N/A'),
-                    'volume_short': account_short.get('volume_posizione', 0),
-                    'totale_bonus': bonus_totali
-                }
-                
-                incroci_completi.append(incrocio_completo)
+            # Indice clienti per numero conto (rubrica condivisa, nessuna query per riga)
+            numeri_conto = df_account['numero_conto'].dropna().astype(str).unique().tolist()
+            indice_clienti = self._carica_indice_clienti(numeri_conto)
             
-            return pd.DataFrame(incroci_completi)
+            return self._componi_incroci(df_incroci, df_account, df_bonus, indice_clienti)
                 
         except Exception as e:
             logging.error(f"Errore recupero incroci da Supabase: {e}")
             return pd.DataFrame()
     
-    def ottieni_statistiche_incroci(self) -> Dict:
+    def _carica_indice_clienti(self, numeri_conto: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Risolve i clienti associati ai numeri conto tramite la rubrica clienti condivisa
+        
+        Args:
+            numeri_conto: Lista dei numeri conto da risolvere
+            
+        Returns:
+            Dizionario numero_conto -> cliente ({'id', 'nome_cliente', 'numero_conto', ...})
+        """
+        indice = {}
+        if not numeri_conto:
+            return indice
+        
+        try:
+            rubrica = self.supabase.get_client_directory()
+            for numero_conto in numeri_conto:
+                cliente = rubrica.by_numero_conto(numero_conto)
+                if cliente:
+                    indice[str(numero_conto)] = cliente
+        except Exception as e:
+            logging.warning(f"Errore recupero info clienti: {e}")
+        
+        return indice
+    
+    @staticmethod
+    def _componi_incroci(df_incroci: pd.DataFrame, df_account: pd.DataFrame,
+                         df_bonus: pd.DataFrame, indice_clienti: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Costruisce il DataFrame finale degli incroci in un unico passaggio vettoriale
+        
+        Args:
+            df_incroci: Righe della tabella incroci
+            df_account: Righe di incroci_account
+            df_bonus: Righe di incroci_bonus
+            indice_clienti: Indice numero_conto -> cliente
+            
+        Returns:
+            DataFrame con le stesse colonne della lista incroci
+        """
+        result = df_incroci.reindex(columns=INCROCIO_COLUMNS).copy()
+        result['volume_trading'] = result['volume_trading'].fillna(0)
+        result['note'] = result['note'].fillna('')
+        
+        # Primo account per posizione, come nella lettura riga per riga
+        df_account = df_account.drop_duplicates(subset=['incrocio_id', 'tipo_posizione'], keep='first')
+        nomi_clienti = {conto: cliente.get('nome_cliente') for conto, cliente in indice_clienti.items()}
+        id_clienti = {conto: cliente.get('id') for conto, cliente in indice_clienti.items()}
+        
+        for posizione in ('long', 'short'):
+            account = df_account[df_account['tipo_posizione'] == posizione].set_index('incrocio_id')
+            account = account.reindex(result['id'])
+            
+            conto = account['numero_conto']
+            conto_str = conto.astype(str)
+            nome = conto_str.map(nomi_clienti)
+            
+            result[f'cliente_{posizione}'] = nome.fillna(conto).fillna('N/A').to_numpy()
+            result[f'cliente_{posizione}_id'] = pd.Series([id_clienti.get(c) for c in conto_str], dtype=object).to_numpy()
+            result[f'broker_{posizione}'] = account['broker'].fillna('N/A').to_numpy()
+            result[f'piattaforma_{posizione}'] = account['piattaforma'].fillna('N/A').to_numpy()
+            result[f'conto_{posizione}'] = conto.fillna('N/A').to_numpy()
+            result[f'volume_{posizione}'] = account['volume_posizione'].fillna(0).to_numpy()
+        
+        totale_bonus = df_bonus.groupby('incrocio_id')['importo_bonus'].sum()
+        result['totale_bonus'] = result['id'].map(totale_bonus).fillna(0).to_numpy()
+        
+        return result[INCROCIO_COLUMNS + DETTAGLIO_COLUMNS].reset_index(drop=True)
+    
+    def ottieni_statistiche_incroci(self, data_da: Optional[date] = None, data_a: Optional[date] = None) -> Dict:
         """
         Ottiene statistiche complete sugli incroci da Supabase
         
+        Legge solo le colonne necessarie (account e bonus embedded, filtro date lato
+        database) e aggrega per pair, broker e mese con groupby pandas. Il risultato
+        è memorizzato per processo finché la versione dei dati non cambia.
+        
+        Args:
+            data_da: Data apertura minima (inclusa)
+            data_a: Data apertura massima (inclusa)
+            
         Returns:
             Dizionario con le statistiche
         """
+        if not self.supabase:
+            return {}
+        
         try:
-            # Ottieni tutti gli incroci
-            response_incroci = self.supabase.supabase.table('incroci').select('*').execute()
-            incroci = response_incroci.data if response_incroci.data else []
-            
-            # Ottieni tutti gli account
-            response_account = self.supabase.supabase.table('incroci_account').select('*').execute()
-            accounts = response_account.data if response_account.data else []
-            
-            # Ottieni tutti i bonus
-            response_bonus = self.supabase.supabase.table('incroci_bonus').select('*').execute()
-            bonus = response_bonus.data if response_bonus.data else []
-            
-            # Statistiche generali
-            totale_incroci = len(incroci)
-            incroci_attivi = len([i for i in incroci if i.get('stato') == 'attivo'])
-            incroci_chiusi = len([i for i in incroci if i.get('stato') == 'chiuso'])
-            volume_totale = sum(i.get('volume_trading', 0) for i in incroci)
-            
-            # Statistiche per pair
-            pair_stats = {}
-            for incrocio in incroci:
-                pair = incrocio.get('pair_trading', 'Unknown')
-                if pair not in pair_stats:
-                    pair_stats[pair] = {'utilizzi': 0, 'volume_totale': 0}
-                pair_stats[pair]['utilizzi'] += 1
-                pair_stats[pair]['volume_totale'] += incrocio.get('volume_trading', 0)
-            
-            stats_pair = [(pair, data['utilizzi'], data['volume_totale']) 
-                         for pair, data in pair_stats.items()]
-            stats_pair.sort(key=lambda x: x[1], reverse=True)
-            
-            # Statistiche per broker
-            broker_stats = {}
-            for account in accounts:
-                broker = account.get('broker', 'Unknown')
-                if broker not in broker_stats:
-                    broker_stats[broker] = {'utilizzi': 0, 'incroci_unici': set()}
-                broker_stats[broker]['utilizzi'] += 1
-                broker_stats[broker]['incroci_unici'].add(account.get('incrocio_id'))
-            
-            stats_broker = [(broker, data['utilizzi'], len(data['incroci_unici'])) 
-                           for broker, data in broker_stats.items()]
-            stats_broker.sort(key=lambda x: x[1], reverse=True)
-            
-            # Statistiche bonus
-            totale_bonus = sum(b.get('importo_bonus', 0) for b in bonus)
-            numero_bonus = len(bonus)
-            bonus_attivi = len([b for b in bonus if b.get('stato_bonus') == 'attivo'])
-            
-            return {
-                'generali': {
-                    'totale_incroci': totale_incroci,
-                    'incroci_attivi': incroci_attivi,
-                    'incroci_chiusi': incroci_chiusi,
-                    'volume_totale': volume_totale
-                },
-                'per_pair': stats_pair,
-                'per_broker': stats_broker,
-                'bonus': {
-                    'totale_bonus': totale_bonus,
-                    'numero_bonus': numero_bonus,
-                    'bonus_attivi': bonus_attivi
-                }
-            }
+            filtri = (data_da.isoformat() if data_da else None, data_a.isoformat() if data_a else None)
+            versione = self._versione_dati_incroci()
+            
+            with _statistiche_lock:
+                memo = _statistiche_memo.get(filtri)
+                if memo is not None and versione is not None and memo[0] == versione:
+                    _statistiche_memo.move_to_end(filtri)
+                    return copy.deepcopy(memo[1])
+            
+            df_incroci, df_account, df_bonus = self._carica_dati_statistiche(*filtri)
+            stats = self._calcola_statistiche(df_incroci, df_account, df_bonus)
+            
+            if versione is not None:
+                with _statistiche_lock:
+                    _statistiche_memo[filtri] = (versione, stats)
+                    _statistiche_memo.move_to_end(filtri)
+                    while len(_statistiche_memo) > STATISTICHE_CACHE_MAX_ENTRIES:
+                        _statistiche_memo.popitem(last=False)
+            
+            return copy.deepcopy(stats)
                 
         except Exception as e:
             logging.error(f"Errore recupero statistiche incroci da Supabase: {e}")
             return {}
     
+    def _versione_dati_incroci(self) -> Optional[Tuple]:
+        """
+        Versione economica dei dati incroci: (numero incroci, max updated_at, numero bonus)
+        
+        Due query senza righe trasferite, condivise tramite la cache di lettura (le
+        scritture della dashboard invalidano 'incroci'). None se non determinabile.
+        """
+        def carica():
+            incroci = self.supabase.supabase.table('incroci')\
+                .select('updated_at', count='exact')\
+                .order('updated_at', desc=True, nullsfirst=False)\
+                .limit(1)\
+                .execute()
+            bonus = self.supabase.supabase.table('incroci_bonus')\
+                .select('id', count='exact', head=True)\
+                .execute()
+            ultimo = incroci.data[0].get('updated_at') if incroci.data else None
+            return (incroci.count, ultimo, bonus.count)
+        
+        try:
+            return self.supabase.cached_read('incroci', carica, key='statistiche_versione')
+        except Exception as e:
+            logging.warning(f"Versione dati incroci non disponibile: {e}")
+            return None
+    
+    def _carica_dati_statistiche(self, data_da: Optional[str] = None,
+                                 data_a: Optional[str] = None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Legge incroci, account e bonus (solo colonne per le statistiche) a pagine keyset su id"""
+        righe, ultimo_id = [], None
+        while True:
+            query = self.supabase.supabase.table('incroci').select(STATISTICHE_SELECT)
+            if data_da:
+                query = query.gte('data_apertura', data_da)
+            if data_a:
+                query = query.lte('data_apertura', data_a)
+            if ultimo_id is not None:
+                query = query.gt('id', ultimo_id)
+            
+            pagina = query.order('id').limit(STATISTICHE_PAGE_SIZE).execute().data or []
+            righe.extend(pagina)
+            if len(pagina) < STATISTICHE_PAGE_SIZE:
+                break
+            ultimo_id = pagina[-1]['id']
+        
+        df_incroci = pd.DataFrame(
+            [{column: riga.get(column) for column in STATISTICHE_INCROCIO_COLUMNS} for riga in righe],
+            columns=STATISTICHE_INCROCIO_COLUMNS
+        )
+        df_account = pd.DataFrame(
+            [account for riga in righe for account in (riga.get('incroci_account') or [])],
+            columns=['incrocio_id', 'broker']
+        )
+        df_bonus = pd.DataFrame(
+            [bonus for riga in righe for bonus in (riga.get('incroci_bonus') or [])],
+            columns=['incrocio_id', 'importo_bonus']
+        )
+        return df_incroci, df_account, df_bonus
+    
+    @staticmethod
+    def _calcola_statistiche(df_incroci: pd.DataFrame, df_account: pd.DataFrame,
+                             df_bonus: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Aggrega le statistiche incroci con groupby vettoriali
+        
+        Args:
+            df_incroci: Colonne STATISTICHE_INCROCIO_COLUMNS
+            df_account: Colonne incrocio_id, broker
+            df_bonus: Colonne incrocio_id, importo_bonus
+            
+        Returns:
+            Dizionario con generali, per_pair, per_broker, per_mese e bonus
+        """
+        incroci = df_incroci.assign(
+            volume_trading=pd.to_numeric(df_incroci['volume_trading'], errors='coerce').fillna(0),
+            pair_trading=df_incroci['pair_trading'].fillna('Unknown'),
+            mese=pd.to_datetime(df_incroci['data_apertura'], errors='coerce').dt.strftime('%Y-%m')
+        )
+        bonus = df_bonus.assign(importo_bonus=pd.to_numeric(df_bonus['importo_bonus'], errors='coerce').fillna(0))
+        account = df_account.assign(broker=df_account['broker'].fillna('Unknown'))
+        stati = incroci['stato'].value_counts()
+        
+        # Per pair e per broker, ordinati per utilizzi (a parità, ordine di prima comparsa)
+        per_pair = incroci.groupby('pair_trading', sort=False).agg(
+            utilizzi=('id', 'size'), volume_totale=('volume_trading', 'sum')
+        ).sort_values('utilizzi', ascending=False, kind='stable')
+        per_broker = account.groupby('broker', sort=False).agg(
+            utilizzi=('incrocio_id', 'size'), incroci_unici=('incrocio_id', 'nunique')
+        ).sort_values('utilizzi', ascending=False, kind='stable')
+        
+        # Per mese di apertura, con i bonus attribuiti al mese dell'incrocio
+        bonus_per_incrocio = bonus.groupby('incrocio_id')['importo_bonus'].sum()
+        per_mese = incroci.assign(
+            bonus=incroci['id'].map(bonus_per_incrocio).fillna(0)
+        ).dropna(subset=['mese']).groupby('mese').agg(
+            incroci=('id', 'size'), volume_totale=('volume_trading', 'sum'), bonus_totale=('bonus', 'sum')
+        )
+        
+        # Bonus degli incroci ancora attivi
+        id_attivi = incroci.loc[incroci['stato'] == 'attivo', 'id']
+        
+        return {
+            'generali': {
+                'totale_incroci': int(len(incroci)),
+                'incroci_attivi': int(stati.get('attivo', 0)),
+                'incroci_chiusi': int(stati.get('chiuso', 0)),
+                'volume_totale': float(incroci['volume_trading'].sum())
+            },
+            'per_pair': [(pair, int(riga.utilizzi), float(riga.volume_totale))
+                         for pair, riga in per_pair.iterrows()],
+            'per_broker': [(broker, int(riga.utilizzi), int(riga.incroci_unici))
+                           for broker, riga in per_broker.iterrows()],
+            'per_mese': [(mese, int(riga.incroci), float(riga.volume_totale), float(riga.bonus_totale))
+                         for mese, riga in per_mese.iterrows()],
+            'bonus': {
+                'totale_bonus': float(bonus['importo_bonus'].sum()),
+                'numero_bonus': int(len(bonus)),
+                'bonus_attivi': int(bonus['incrocio_id'].isin(id_attivi).sum())
+            }
+        }
+    
     def crea_incrocio(self, dati_incrocio: Dict) -> Tuple[bool, str]:
         """
         Crea un nuovo incrocio tra account in Supabase
@@ -254,159 +374,265 @@ class IncrociManager:
         Returns:
             (success, incrocio_id o messaggio errore)
         """
-        try:
-            if not self.supabase:
-                logging.warning("Supabase non disponibile per crea_incrocio")
-                return False, "Supabase non disponibile"
-            
-            # Crea incrocio principale
-            incrocio_data = {
-                'nome_incrocio': dati_incrocio['nome_incrocio'],
-                'data_apertura': dati_incrocio['data_apertura'].isoformat() if isinstance(dati_incrocio['data_apertura'], (date, datetime)) else str(dati_incrocio['data_apertura']),
-                'pair_trading': dati_incrocio['pair_trading'],
-                'volume_trading': dati_incrocio.get('volume_trading', 0),
-                'note': dati_incrocio.get('note', ''),
-                'stato': 'attivo',
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-            
-            response = self.supabase.supabase.table('incroci').insert(incrocio_data).execute()
-            
-            if not response.data:
-                return False, "Errore creazione incrocio principale"
-            
-            incrocio_id = response.data[0]['id']
-            
-            # Crea account long
-            account_long_data = {
-                'incrocio_id': incrocio_id,
-                'tipo_posizione': 'long',
-                'broker': dati_incrocio['broker_long'],
-                'piattaforma': dati_incrocio['piattaforma_long'],
-                'numero_conto': dati_incrocio['conto_long'],
-                'volume_posizione': dati_incrocio.get('volume_long', 0),
-                'created_at': datetime.now().isoformat()
-            }
-            
-            response = self.supabase.supabase.table('incroci_account').insert(account_long_data).execute()
-            if not response.data:
-                return False, "Errore creazione account long"
-            
-            # Crea account short
-            account_short_data = {
-                'incrocio_id': incrocio_id,
-                'tipo_posizione': 'short',
-                'broker': dati_incrocio['broker_short'],
-                'piattaforma': dati_incrocio['piattaforma_short'],
-                'numero_conto': dati_incrocio['conto_short'],
-                'volume_posizione': dati_incrocio.get('volume_short', 0),
-                'created_at': datetime.now().isoformat()
-            }
-            
-            response = self.supabase.supabase.table('incroci_account').insert(account_short_data).execute()
-            if not response.data:
-                return False, "Errore creazione account short"
-            
-            # Crea bonus se specificato
-            if 'bonus' in dati_incrocio:
-                for bonus in dati_incrocio['bonus']:
-                    bonus_data = {
-                        'incrocio_id': incrocio_id,
-                        'importo_bonus': bonus.get('importo', bonus.get('importo_bonus', 0)),
-                        'data_bonus': bonus.get('data_sblocco', dati_incrocio['data_apertura']).isoformat() if isinstance(bonus.get('data_sblocco', dati_incrocio['data_apertura']), (date, datetime)) else str(bonus.get('data_sblocco', dati_incrocio['data_apertura'])),
-                        'note': bonus.get('note', ''),
-                        'created_at': datetime.now().isoformat()
-                    }
-                    
-                    response = self.supabase.supabase.table('incroci_bonus').insert(bonus_data).execute()
-                    if not response.data:
-                        logging.warning(f"Errore creazione bonus: {bonus}")
-            
-            # INTEGRAZIONE WALLET: Crea transazione wallet per tracciare l'incrocio
-            try:
-                from components.wallet_transactions_manager import WalletTransactionsManager
-                wallet_manager = WalletTransactionsManager()
-                
-                # Estrai ID clienti dai dati
-                cliente_long_id = dati_incrocio.get('account_long_id')
-                cliente_short_id = dati_incrocio.get('account_short_id')
-                
-                # Se sono tuple, estrai l'ID
-                if isinstance(cliente_long_id, tuple):
-                    cliente_long_id = cliente_long_id[1]
-                if isinstance(cliente_short_id, tuple):
-                    cliente_short_id = cliente_short_id[1]
-                
-                if cliente_long_id and cliente_short_id:
-                    wallet_success, wallet_message = wallet_manager.create_cross_transaction(
-                        incrocio_id=incrocio_id,
-                        cliente_long_id=cliente_long_id,
-                        cliente_short_id=cliente_short_id,
-                        volume_long=dati_incrocio.get('volume_long', 0),
-                        volume_short=dati_incrocio.get('volume_short', 0),
-                        pair_trading=dati_incrocio.get('pair_trading', '')
-                    )
-                    
-                    if wallet_success:
-                        logging.info(f"✅ Transazione wallet creata per incrocio {incrocio_id}")
-                    else:
-                        logging.warning(f"⚠️ Errore creazione transazione wallet: {wallet_message}")
-                else:
-                    logging.warning("⚠️ ID clienti non trovati per creazione transazione wallet")
-                    
-            except Exception as wallet_error:
-                logging.error(f"❌ Errore integrazione wallet: {wallet_error}")
-                # Non bloccare la creazione dell'incrocio se c'è un errore wallet
-            
-            logging.info(f"Incrocio creato con ID: {incrocio_id}")
-            
-            # Invia notifica Telegram per nuovo incrocio
-            # Recupera i nomi dei clienti dal database
-            cliente_long_name = 'N/A'
-            cliente_short_name = 'N/A'
-            
-            try:
-                # Recupera nome cliente long
-                if 'account_long_id' in dati_incrocio:
-                    cliente_long_id = dati_incrocio['account_long_id']
-                    if isinstance(cliente_long_id, tuple):
-                        cliente_long_id = cliente_long_id[1]
-                    
-                    cliente_response = self.supabase.supabase.table('clienti').select('nome_cliente, broker').eq('id', cliente_long_id).execute()
-                    if cliente_response.data and len(cliente_response.data) > 0:
-                        cliente_data = cliente_response.data[0]
-                        cliente_long_name = f"{cliente_data.get('nome_cliente', 'N/A')} - {cliente_data.get('broker', 'N/A')}"
-                
-                # Recupera nome cliente short
-                if 'account_short_id' in dati_incrocio:
-                    cliente_short_id = dati_incrocio['account_short_id']
-                    if isinstance(cliente_short_id, tuple):
-                        cliente_short_id = cliente_short_id[1]
-                    
-                    cliente_response = self.supabase.supabase.table('clienti').select('nome_cliente, broker').eq('id', cliente_short_id).execute()
-                    if cliente_response.data and len(cliente_response.data) > 0:
-                        cliente_data = cliente_response.data[0]
-                        cliente_short_name = f"{cliente_data.get('nome_cliente', 'N/A')} - {cliente_data.get('broker', 'N/A')}"
-                        
-            except Exception as e:
-                logging.warning(f"Errore recupero nomi clienti per notifica: {e}")
+        success, risultato = self.crea_incroci_bulk([dati_incrocio])
+        return (True, risultato[0]) if success else (False, risultato)
+    
+    def crea_incroci_bulk(self, lista_incroci: List[Dict]) -> Tuple[bool, Any]:
+        """
+        Crea più incroci (con account, bonus e transazione wallet di apertura) in modo atomico
+        
+        Gli ID degli incroci sono generati qui, così tutte le righe sono pronte prima
+        della scrittura: una sola chiamata alla funzione SQL crea_incroci_bulk, che le
+        inserisce in un'unica transazione. Se la funzione non è installata si usa un
+        insert multi-riga per tabella, eliminando gli incroci creati in caso di errore.
+        
+        Args:
+            lista_incroci: Dizionari con gli stessi campi di crea_incrocio
             
+        Returns:
+            (True, lista ID incroci creati) oppure (False, messaggio errore)
+        """
+        if not self.supabase:
+            logging.warning("Supabase non disponibile per crea_incroci_bulk")
+            return False, "Supabase non disponibile"
+        
+        if not lista_incroci:
+            return True, []
+        
+        try:
+            # Clienti coinvolti dalla rubrica condivisa (nomi per notifiche e wallet)
+            for dati in lista_incroci:
+                for chiave in ('account_long_id', 'account_short_id'):
+                    if isinstance(dati.get(chiave), tuple):
+                        dati[chiave] = dati[chiave][1]
+            clienti = self._carica_clienti_per_id(
+                [dati.get(chiave) for dati in lista_incroci for chiave in ('account_long_id', 'account_short_id')]
+            )
+            
+            righe = self._prepara_righe_incroci(lista_incroci, clienti)
+        except Exception as e:
+            logging.error(f"Errore preparazione incroci: {e}")
+            return False, str(e)
+        
+        try:
+            self.supabase.supabase.rpc(CREA_INCROCI_FUNCTION, {
+                'p_incroci': righe['incroci'],
+                'p_account': righe['account'],
+                'p_bonus': righe['bonus'],
+                'p_wallet_transactions': righe['wallet_transactions']
+            }).execute()
+        except Exception as rpc_error:
+            # Solo se la funzione non esiste: altri errori (es. timeout) potrebbero seguire un commit
+            if not any(segnale in str(rpc_error) for segnale in FUNZIONE_MANCANTE_ERRORI):
+                logging.error(f"Errore creazione incroci in Supabase: {rpc_error}")
+                return False, str(rpc_error)
+            logging.warning(f"⚠️ Funzione {CREA_INCROCI_FUNCTION} non disponibile, insert batch: {rpc_error}")
+            success, errore = self._inserisci_righe_incroci(righe)
+            if not success:
+                return False, errore
+        finally:
+            self.supabase.invalidate_cache('incroci')
+            self.supabase.invalidate_cache('wallet_transactions')
+        
+        incroci_ids = [incrocio['id'] for incrocio in righe['incroci']]
+        logging.info(f"{len(incroci_ids)} incroci creati: {incroci_ids}")
+        
+        # Invia notifica Telegram per ogni nuovo incrocio
+        for dati in lista_incroci:
             self._send_incrocio_notification('new_incrocio', {
-                'nome_incrocio': dati_incrocio['nome_incrocio'],
-                'pair_trading': dati_incrocio['pair_trading'],
-                'cliente_long': cliente_long_name,
-                'cliente_short': cliente_short_name,
-                'lot_size': dati_incrocio.get('volume_trading', 'N/A'),
+                'nome_incrocio': dati['nome_incrocio'],
+                'pair_trading': dati['pair_trading'],
+                'cliente_long': self._etichetta_cliente(clienti.get(str(dati.get('account_long_id')))),
+                'cliente_short': self._etichetta_cliente(clienti.get(str(dati.get('account_short_id')))),
+                'lot_size': dati.get('volume_trading', 'N/A'),
                 'created_at': datetime.now().isoformat()
             })
+        
+        return True, incroci_ids
+    
+    def _carica_clienti_per_id(self, clienti_ids: List[Any]) -> Dict[str, Dict[str, Any]]:
+        """Nome, broker e wallet dei clienti indicati, dalla rubrica clienti condivisa"""
+        rubrica = self.supabase.get_client_directory()
+        clienti = {}
+        for cliente_id in clienti_ids:
+            cliente = rubrica.get(cliente_id) if cliente_id else None
+            if cliente:
+                clienti[str(cliente_id)] = cliente
+        return clienti
+    
+    @staticmethod
+    def _etichetta_cliente(cliente: Optional[Dict[str, Any]]) -> str:
+        """Etichetta 'nome - broker' del cliente per le notifiche"""
+        if not cliente:
+            return 'N/A'
+        return f"{cliente.get('nome_cliente', 'N/A')} - {cliente.get('broker', 'N/A')}"
+    
+    def _prepara_righe_incroci(self, lista_incroci: List[Dict], clienti: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict]]:
+        """Righe di incroci, incroci_account, incroci_bonus e wallet_transactions da inserire"""
+        def iso(valore):
+            return valore.isoformat() if isinstance(valore, (date, datetime)) else str(valore)
+        
+        wallet_manager = None
+        try:
+            from components.wallet_transactions_manager import WalletTransactionsManager
+            wallet_manager = WalletTransactionsManager()
+        except Exception as wallet_error:
+            logging.error(f"❌ Errore integrazione wallet: {wallet_error}")
+        
+        now = datetime.now().isoformat()
+        righe = {'incroci': [], 'account': [], 'bonus': [], 'wallet_transactions': []}
+        
+        for dati in lista_incroci:
+            incrocio_id = str(uuid.uuid4())
+            righe['incroci'].append({
+                'id': incrocio_id,
+                'nome_incrocio': dati['nome_incrocio'],
+                'data_apertura': iso(dati['data_apertura']),
+                'pair_trading': dati['pair_trading'],
+                'volume_trading': dati.get('volume_trading', 0),
+                'note': dati.get('note', ''),
+                'stato': 'attivo',
+                'created_at': now,
+                'updated_at': now
+            })
             
-            return True, incrocio_id
-                
+            for tipo in ('long', 'short'):
+                righe['account'].append({
+                    'incrocio_id': incrocio_id,
+                    'tipo_posizione': tipo,
+                    'broker': dati[f'broker_{tipo}'],
+                    'piattaforma': dati[f'piattaforma_{tipo}'],
+                    'numero_conto': dati[f'conto_{tipo}'],
+                    'volume_posizione': dati.get(f'volume_{tipo}', 0),
+                    'created_at': now
+                })
+            
+            for bonus in dati.get('bonus') or []:
+                righe['bonus'].append({
+                    'incrocio_id': incrocio_id,
+                    'importo_bonus': bonus.get('importo', bonus.get('importo_bonus', 0)),
+                    'data_bonus': iso(bonus.get('data_sblocco', dati['data_apertura'])),
+                    'note': bonus.get('note', ''),
+                    'created_at': now
+                })
+            
+            # INTEGRAZIONE WALLET: transazione di apertura per tracciare l'incrocio
+            cliente_long = clienti.get(str(dati.get('account_long_id')))
+            cliente_short = clienti.get(str(dati.get('account_short_id')))
+            if not wallet_manager or not wallet_manager.supabase_manager:
+                continue
+            if not cliente_long or not cliente_short:
+                logging.warning(f"⚠️ ID clienti non trovati per transazione wallet di {dati['nome_incrocio']}")
+                continue
+            
+            transazione = wallet_manager.build_cross_transaction(
+                incrocio_id, cliente_long, cliente_short,
+                dati.get('volume_long', 0), dati.get('volume_short', 0), dati.get('pair_trading', '')
+            )
+            if transazione:
+                righe['wallet_transactions'].append(transazione)
+            else:
+                logging.warning(f"⚠️ Wallet clienti non trovati per incrocio {dati['nome_incrocio']}")
+        
+        return righe
+    
+    def _inserisci_righe_incroci(self, righe: Dict[str, List[Dict]]) -> Tuple[bool, str]:
+        """Insert multi-riga per tabella; se un passo fallisce elimina gli incroci già creati"""
+        incroci_ids = [incrocio['id'] for incrocio in righe['incroci']]
+        client = self.supabase.supabase
+        try:
+            client.table('incroci').insert(righe['incroci']).execute()
+            client.table('incroci_account').insert(righe['account']).execute()
+            if righe['bonus']:
+                client.table('incroci_bonus').insert(righe['bonus']).execute()
+            if righe['wallet_transactions']:
+                client.table('wallet_transactions').insert(righe['wallet_transactions']).execute()
+            return True, ""
         except Exception as e:
-            logging.error(f"Errore creazione incrocio in Supabase: {e}")
+            logging.error(f"Errore creazione incroci in Supabase: {e}")
+            try:
+                # Account e bonus vengono eliminati per CASCADE
+                for start in range(0, len(incroci_ids), IN_FILTER_CHUNK_SIZE):
+                    client.table('incroci').delete().in_('id', incroci_ids[start:start + IN_FILTER_CHUNK_SIZE]).execute()
+            except Exception as cleanup_error:
+                logging.error(f"❌ Errore rimozione incroci parziali {incroci_ids}: {cleanup_error}")
             return False, str(e)
     
+    def importa_incroci_csv(self, sorgente) -> Tuple[bool, Any]:
+        """
+        Importa più incroci da un CSV in un'unica creazione atomica
+        
+        Colonne obbligatorie: CSV_REQUIRED_COLUMNS. Facoltative: volume_trading,
+        volume_long, volume_short, note, bonus_importo, bonus_data. I clienti long/short
+        sono risolti dai numeri conto tramite la rubrica clienti.
+        
+        Args:
+            sorgente: Percorso o file-like (es. st.file_uploader)
+            
+        Returns:
+            (True, lista ID incroci creati) oppure (False, messaggio errore)
+        """
+        try:
+            df = pd.read_csv(sorgente, dtype=str, keep_default_na=False)
+        except Exception as e:
+            return False, f"CSV non leggibile: {e}"
+        
+        df.columns = [colonna.strip() for colonna in df.columns]
+        mancanti = [colonna for colonna in CSV_REQUIRED_COLUMNS if colonna not in df.columns]
+        if mancanti:
+            return False, f"Colonne mancanti nel CSV: {', '.join(mancanti)}"
+        if df.empty:
+            return False, "Il CSV non contiene incroci"
+        
+        df = df.apply(lambda colonna: colonna.str.strip())
+        conti = pd.concat([df['conto_long'], df['conto_short']]).unique().tolist()
+        indice_clienti = self._carica_indice_clienti([conto for conto in conti if conto])
+        
+        def numero(riga, colonna, default=0.0):
+            valore = riga.get(colonna, '')
+            return float(valore) if valore else default
+        
+        lista_incroci, errori = [], []
+        for posizione, riga in enumerate(df.to_dict('records'), start=2):
+            vuoti = [colonna for colonna in CSV_REQUIRED_COLUMNS if not riga[colonna]]
+            if vuoti:
+                errori.append(f"riga {posizione}: campi vuoti {', '.join(vuoti)}")
+                continue
+            
+            try:
+                volume_trading = numero(riga, 'volume_trading')
+                dati = {
+                    'nome_incrocio': riga['nome_incrocio'],
+                    'data_apertura': date.fromisoformat(riga['data_apertura']),
+                    'pair_trading': riga['pair_trading'],
+                    'volume_trading': volume_trading,
+                    'note': riga.get('note', ''),
+                    'bonus': []
+                }
+                for tipo in ('long', 'short'):
+                    dati[f'broker_{tipo}'] = riga[f'broker_{tipo}']
+                    dati[f'piattaforma_{tipo}'] = riga[f'piattaforma_{tipo}']
+                    dati[f'conto_{tipo}'] = riga[f'conto_{tipo}']
+                    dati[f'volume_{tipo}'] = numero(riga, f'volume_{tipo}', volume_trading)
+                    cliente = indice_clienti.get(riga[f'conto_{tipo}'])
+                    dati[f'account_{tipo}_id'] = cliente['id'] if cliente else None
+                
+                if riga.get('bonus_importo'):
+                    dati['bonus'].append({
+                        'importo': float(riga['bonus_importo']),
+                        'data_sblocco': date.fromisoformat(riga['bonus_data']) if riga.get('bonus_data') else dati['data_apertura']
+                    })
+            except ValueError as e:
+                errori.append(f"riga {posizione}: {e}")
+                continue
+            
+            lista_incroci.append(dati)
+        
+        if errori:
+            return False, "Nessun incrocio importato. " + "; ".join(errori)
+        
+        return self.crea_incroci_bulk(lista_incroci)
+    
     def chiudi_incrocio(self, incrocio_id: str, data_chiusura: date, note: str = "") -> bool:
         """
         Chiude un incrocio attivo in Supabase
@@ -430,6 +656,7 @@ class IncrociManager:
                 })\
                 .eq('id', incrocio_id)\
                 .execute()
+            self.supabase.invalidate_cache('incroci')
             
             if not response.data:
                 return False
@@ -470,6 +697,7 @@ class IncrociManager:
             }
             
             response = self.supabase.supabase.table('incroci_bonus').insert(bonus_data).execute()
+            self.supabase.invalidate_cache('incroci')
             
             if response.data:
                 logging.info(f"Bonus {tipo_bonus} aggiunto all'incrocio {incrocio_id}")
@@ -500,6 +728,7 @@ class IncrociManager:
             
             # Elimina l'incrocio (le tabelle correlate si eliminano automaticamente per CASCADE)
             response = self.supabase.supabase.table('incroci').delete().eq('id', incrocio_id).execute()
+            self.supabase.invalidate_cache('incroci')
             
             if response.data:
                 logging.info(f"Incrocio {incrocio_id} eliminato con successo")
@@ -539,27 +768,8 @@ class IncrociManager:
             logging.error(f"❌ Errore invio notifica incrocio '{notification_type}': {e}")
     
     def _is_notification_enabled(self, notification_category: str) -> bool:
-        """Controlla se le notifiche per una categoria sono abilitate"""
-        try:
-            if not self.supabase:
-                return True  # Default abilitato se Supabase non disponibile
-            
-            # Recupera impostazioni notifiche dal database
-            response = self.supabase.supabase.table('notification_settings').select('*').eq('notification_type', notification_category).execute()
-            
-            if response.data and len(response.data) > 0:
-                setting = response.data[0]
-                return setting.get('is_enabled', True)
-            else:
-                # Se non trova l'impostazione specifica, usa i default
-                default_settings = {
-                    'incrocio_new_incrocio': True,
-                    'incrocio_closed': True,
-                    'incrocio_daily_report': False,
-                    'incrocio_long_open_alert': False,
-                }
-                return default_settings.get(notification_category, True)
-                
-        except Exception as e:
-            logging.error(f"❌ Errore controllo impostazioni notifiche {notification_category}: {e}")
-            return True  # Default abilitato in caso di errore
+        """Controlla se le notifiche per una categoria sono abilitate (registro condiviso)"""
+        if not self.supabase:
+            return True  # Default abilitato se Supabase non disponibile
+        
+        return self.supabase.is_notification_enabled(notification_category)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+🔧 MIGRAZIONE INDICE WALLET_ADDRESS / CLIENTE_ID
+Popola le colonne wallet_address e cliente_id di wallet_collaboratori
+a partire dal campo note ("Wallet: <indirizzo> | Cliente: <nome> (ID: <uuid>)").
+
+Prima di eseguirlo aggiungi le colonne con database/add_wallet_address_index.sql
+(lo stesso file contiene anche il backfill in SQL puro).
+"""
+
+import sys
+import os
+import logging
+
+# Aggiungi il percorso del progetto
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+# Configurazione logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Righe per richiesta (PostgREST restituisce al massimo 1000 righe)
+PAGE_SIZE = 1000
+
+def _select_all(supabase, table: str, columns: str) -> list:
+    """Legge tutte le righe della tabella a pagine ordinate per id"""
+    rows = []
+    offset = 0
+    while True:
+        page = supabase.table(table).select(columns).order('id')\
+            .range(offset, offset + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+def migrate_wallet_address_index(dry_run: bool = False):
+    """Backfill delle colonne wallet_address e cliente_id dai campi note"""
+    
+    try:
+        from supabase_manager import SupabaseManager
+        from components.wallet_transactions_manager import parse_wallet_note
+        
+        supabase_manager = SupabaseManager()
+        if not supabase_manager.supabase:
+            logger.error("❌ Supabase non configurato")
+            return False
+        
+        wallets = _select_all(supabase_manager.supabase, 'wallet_collaboratori',
+                              'id, nome_wallet, note, wallet_address, cliente_id')
+        
+        # ID clienti esistenti (per non violare la foreign key)
+        clienti_ids = {str(c['id']) for c in _select_all(supabase_manager.supabase, 'clienti', 'id')}
+        
+        aggiornati = 0
+        for wallet in wallets:
+            wallet_address, cliente_id = parse_wallet_note(wallet.get('note'))
+            update_data = {}
+            
+            if wallet_address and not wallet.get('wallet_address'):
+                update_data['wallet_address'] = wallet_address
+            if cliente_id and not wallet.get('cliente_id') and cliente_id in clienti_ids:
+                update_data['cliente_id'] = cliente_id
+            
+            if not update_data:
+                continue
+            
+            print(f"  - {wallet['nome_wallet']}: {update_data}")
+            if not dry_run:
+                supabase_manager.supabase.table('wallet_collaboratori').update(update_data).eq('id', wallet['id']).execute()
+            aggiornati += 1
+        
+        supabase_manager.invalidate_cache('wallet_collaboratori')
+        print(f"\n✅ Wallet {'da aggiornare' if dry_run else 'aggiornati'}: {aggiornati} su {len(wallets)}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Errore durante la migrazione: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    print("🔧 MIGRAZIONE INDICE WALLET_ADDRESS / CLIENTE_ID")
+    print("="*80)
+    
+    migrate_wallet_address_index(dry_run='--dry-run' in sys.argv)
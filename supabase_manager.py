@@ -4,7 +4,14 @@
 """
 
 import os
+import re
+import json
+import math
+import time
+import sqlite3
 import logging
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime
 
@@ -12,6 +19,488 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Configurazione cache letture (TTL in secondi, 0 = disabilitata)
+READ_CACHE_TTL = float(os.getenv('SUPABASE_CACHE_TTL', 30))
+READ_CACHE_MAX_ENTRIES = int(os.getenv('SUPABASE_CACHE_MAX_ENTRIES', 64))
+
+# Paginazione lista clienti (solo colonne visibili, niente password/credenziali VPS)
+CLIENTI_PAGE_SIZE = 50
+CLIENTI_LIST_COLUMNS = 'id, nome_cliente, email, broker, data_registrazione, deposito, piattaforma, numero_conto, vps_ip, created_at'
+CLIENTI_SEARCH_COLUMNS = ['nome_cliente', 'email', 'numero_conto']
+
+# Rubrica clienti in memoria (indici per id, numero_conto, email)
+CLIENT_DIRECTORY_COLUMNS = 'id, nome_cliente, numero_conto, wallet, broker, email, updated_at'
+CLIENT_DIRECTORY_REFRESH = float(os.getenv('SUPABASE_CLIENT_DIRECTORY_REFRESH', 30))
+CLIENT_DIRECTORY_FULL_RELOAD = float(os.getenv('SUPABASE_CLIENT_DIRECTORY_FULL_RELOAD', 900))
+CLIENT_DIRECTORY_PAGE_SIZE = 1000
+
+# Configurazione sincronizzazione bulk clienti
+BULK_SYNC_CHUNK_SIZE = int(os.getenv('SUPABASE_SYNC_CHUNK_SIZE', 500))
+BULK_SYNC_FIELDS = ['nome_cliente', 'email', 'broker', 'piattaforma', 'numero_conto', 'volume_posizione']
+
+# Configurazione motore analitico locale (snapshot SQLite delle tabelle Supabase)
+ANALYTICS_SNAPSHOT_TTL = float(os.getenv('SUPABASE_ANALYTICS_TTL', 300))
+ANALYTICS_PAGE_SIZE = 1000
+
+# Tabelle copiate nello snapshot con le colonne garantite (NULL se assenti su Supabase)
+ANALYTICS_TABLES = {
+    'clienti': ['id', 'nome_cliente', 'email', 'broker', 'piattaforma', 'numero_conto',
+                'volume_posizione', 'deposito', 'ruolo', 'stato_account', 'vps_ip',
+                'note_cliente', 'data_registrazione', 'created_at'],
+    'incroci': ['id', 'nome_incrocio', 'data_apertura', 'data_chiusura', 'stato',
+                'profitto_perdita', 'pair_trading', 'volume_trading', 'note', 'created_at'],
+    'incroci_account': ['id', 'incrocio_id', 'account_id', 'tipo_posizione', 'broker', 'piattaforma',
+                        'numero_conto', 'volume_posizione', 'data_apertura_posizione',
+                        'data_chiusura_posizione', 'stato_posizione'],
+    'incroci_bonus': ['id', 'incrocio_id', 'importo_bonus', 'data_bonus']
+}
+
+# Viste dello schema raggruppato usato dalle query AI, derivate dalla tabella clienti
+ANALYTICS_VIEWS = {
+    'clienti_base': """
+        SELECT id, nome_cliente, email, vps_ip AS vps, note_cliente, created_at
+        FROM clienti
+    """,
+    'account_broker': """
+        SELECT id, id AS cliente_base_id, broker, piattaforma, numero_conto, volume_posizione,
+               COALESCE(ruolo, 'User') AS ruolo, COALESCE(stato_account, 'attivo') AS stato_account,
+               COALESCE(data_registrazione, created_at) AS data_registrazione, created_at
+        FROM clienti
+    """
+}
+
+# Impostazioni notifiche di default (usate quando il tipo non è salvato nel database)
+DEFAULT_NOTIFICATION_SETTINGS = {
+    # Task
+    'task_new_task': True,
+    'task_completed': True,
+    'task_due_soon': True,
+    'task_daily_report': False,
+    
+    # Incroci
+    'incrocio_new_incrocio': True,
+    'incrocio_closed': True,
+    'incrocio_daily_report': False,
+    'incrocio_long_open_alert': False,
+    
+    # Clienti
+    'cliente_new_client': True,
+    'cliente_modified': False,
+    'cliente_deleted': True,
+    
+    # Wallet
+    'wallet_new_deposit': True,
+    'wallet_new_withdrawal': True,
+    'wallet_cross_transaction': True,
+    'wallet_low_balance_alert': False,
+    
+    # VPS
+    'vps_expiring': True,
+    'vps_expired': True,
+    'vps_new': True,
+    'vps_monthly_report': False,
+    
+    # Report generale (scheduler)
+    'daily_report': False,
+}
+
+class _StddevAggregate:
+    """Aggregato STDDEV (campionario, come PostgreSQL) per SQLite"""
+    
+    def __init__(self):
+        self.values = []
+    
+    def step(self, value):
+        if value is not None:
+            self.values.append(float(value))
+    
+    def finalize(self):
+        if len(self.values) < 2:
+            return None
+        mean = sum(self.values) / len(self.values)
+        return math.sqrt(sum((v - mean) ** 2 for v in self.values) / (len(self.values) - 1))
+
+class AnalyticsSnapshot:
+    """
+    Snapshot in memoria (SQLite) delle tabelle Supabase usate dalle analisi AI.
+    Ogni tabella viene ricaricata a pagine quando scade il TTL o quando viene
+    invalidata nella cache di lettura; le query vengono eseguite localmente.
+    """
+    
+    def __init__(self, ttl_seconds: float = ANALYTICS_SNAPSHOT_TTL):
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_aggregate('STDDEV', 1, _StddevAggregate)
+        self._loaded: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.queries = 0
+        
+        for table, columns in ANALYTICS_TABLES.items():
+            self._create_table(table, columns)
+        for view, select_sql in ANALYTICS_VIEWS.items():
+            self._conn.execute(f"CREATE VIEW IF NOT EXISTS {view} AS {select_sql}")
+    
+    @staticmethod
+    def referenced_tables(query: str) -> List[str]:
+        """Tabelle dello snapshot referenziate dalla query (le viste dipendono da clienti)"""
+        names = set(re.findall(r'\b(?:from|join)\s+([a-z_]+)', query, re.IGNORECASE))
+        names = {name.lower() for name in names}
+        tables = {name for name in names if name in ANALYTICS_TABLES}
+        if names & set(ANALYTICS_VIEWS):
+            tables.add('clienti')
+        # account_id di incroci_account viene ricavato da clienti tramite numero_conto
+        if 'incroci_account' in tables:
+            tables.add('clienti')
+        return sorted(tables)
+    
+    def execute(self, client, query: str, params: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """Aggiorna le tabelle scadute ed esegue la query con parametri posizionali"""
+        sql = query.replace('%s', '?')
+        with self._lock:
+            stale = [t for t in self.referenced_tables(query) if self._is_stale(t)]
+            # clienti prima di incroci_account (serve per ricavare account_id)
+            for table in sorted(stale, key=lambda t: t != 'clienti'):
+                self._refresh_table(client, table)
+            if 'clienti' in stale and 'incroci_account' in self._loaded and 'incroci_account' not in stale:
+                self._link_account_ids()
+            
+            cursor = self._conn.execute(sql, tuple(params or ()))
+            self.queries += 1
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def invalidate(self, table: Optional[str] = None):
+        """Forza la ricarica di una tabella (o di tutto lo snapshot) alla prossima query"""
+        with self._lock:
+            if table is None:
+                self._loaded.clear()
+            else:
+                self._loaded.pop(table, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Stato dello snapshot: tabelle caricate, righe, refresh e query eseguite"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'tables': {
+                    table: {
+                        'rows': self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0],
+                        'age_seconds': round(now - loaded_at, 1)
+                    }
+                    for table, (loaded_at, _) in self._loaded.items()
+                },
+                'refreshes': self.refreshes,
+                'queries': self.queries,
+                'ttl_seconds': self.ttl_seconds
+            }
+    
+    def _is_stale(self, table: str) -> bool:
+        """True se la tabella non è caricata, è scaduta o è stata scritta nel frattempo"""
+        loaded = self._loaded.get(table)
+        if loaded is None:
+            return True
+        loaded_at, generation = loaded
+        return (time.monotonic() - loaded_at >= self.ttl_seconds
+                or generation != self._generation(table))
+    
+    @staticmethod
+    def _generation(table: str) -> int:
+        """Generazione di invalidazione; le tabelle figlie seguono anche quella di incroci"""
+        generation = _read_cache.generation(table)
+        if table in ('incroci_account', 'incroci_bonus'):
+            generation += _read_cache.generation('incroci')
+        return generation
+    
+    def _refresh_table(self, client, table: str):
+        """Ricarica una tabella da Supabase a pagine e la sostituisce nello snapshot"""
+        generation = self._generation(table)
+        rows = []
+        offset = 0
+        while True:
+            page = client.table(table).select('*').range(offset, offset + ANALYTICS_PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < ANALYTICS_PAGE_SIZE:
+                break
+            offset += ANALYTICS_PAGE_SIZE
+        
+        columns = list(ANALYTICS_TABLES[table])
+        for row in rows:
+            columns.extend(col for col in row if col not in columns)
+        
+        self._create_table(table, columns)
+        column_list = ', '.join(f'"{col}"' for col in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        self._conn.executemany(
+            f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})",
+            [tuple(self._to_sqlite(row.get(col)) for col in columns) for row in rows]
+        )
+        if table == 'incroci_account':
+            self._link_account_ids()
+        self._conn.commit()
+        
+        self._loaded[table] = (time.monotonic(), generation)
+        self.refreshes += 1
+        logger.info(f"📊 Snapshot analitico {table}: {len(rows)} righe")
+    
+    def _create_table(self, table: str, columns: List[str]):
+        """(Ri)crea la tabella dello snapshot con le colonne indicate (le viste restano valide)"""
+        self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+        column_list = ', '.join(f'"{col}"' for col in columns)
+        self._conn.execute(f"CREATE TABLE {table} ({column_list})")
+    
+    def _link_account_ids(self):
+        """Collega le posizioni al cliente tramite numero_conto quando account_id manca"""
+        self._conn.execute("""
+            UPDATE incroci_account
+            SET account_id = (SELECT c.id FROM clienti c WHERE c.numero_conto = incroci_account.numero_conto LIMIT 1)
+            WHERE account_id IS NULL AND numero_conto IS NOT NULL
+        """)
+    
+    @staticmethod
+    def _to_sqlite(value: Any) -> Any:
+        """Converte i valori JSON di Supabase in tipi accettati da SQLite"""
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        if isinstance(value, bool):
+            return int(value)
+        return value
+
+class ClientDirectory:
+    """
+    Rubrica dei clienti condivisa tra sessioni, indicizzata per id, numero_conto ed email.
+    Il primo accesso carica la proiezione CLIENT_DIRECTORY_COLUMNS a pagine; in seguito
+    si leggono solo i clienti con updated_at >= watermark (dopo ogni scrittura locale o
+    ogni CLIENT_DIRECTORY_REFRESH secondi). Un ricaricamento completo periodico rimuove
+    i clienti eliminati da altri processi.
+    
+    Le letture non prendono il lock: il ricaricamento completo costruisce indici nuovi e
+    li sostituisce in blocco, e all() itera su una copia dei valori.
+    """
+    
+    def __init__(self, refresh_seconds: float = CLIENT_DIRECTORY_REFRESH,
+                 full_reload_seconds: float = CLIENT_DIRECTORY_FULL_RELOAD):
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_conto: Dict[str, str] = {}
+        self._by_email: Dict[str, str] = {}
+        self._watermark: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        self._checked_at = 0.0
+        self._generation = -1
+        self._lock = threading.Lock()
+        self.full_loads = 0
+        self.incremental_loads = 0
+    
+    def ensure_fresh(self, client):
+        """Carica o aggiorna la rubrica se necessario (nessuna richiesta se è aggiornata)"""
+        now = time.monotonic()
+        generation = _read_cache.generation('clienti')
+        if (self._loaded_at is not None and now - self._loaded_at < self.full_reload_seconds
+                and generation == self._generation and now - self._checked_at < self.refresh_seconds):
+            return
+        
+        with self._lock:
+            now = time.monotonic()
+            generation = _read_cache.generation('clienti')
+            if self._loaded_at is None or now - self._loaded_at >= self.full_reload_seconds:
+                self._load(client, full=True)
+                self._loaded_at = now
+            elif generation != self._generation or now - self._checked_at >= self.refresh_seconds:
+                self._load(client, full=False)
+            self._checked_at = now
+            self._generation = generation
+    
+    def get(self, cliente_id: Any) -> Optional[Dict[str, Any]]:
+        """Cliente per id (copia), None se non presente"""
+        cliente = self._by_id.get(str(cliente_id))
+        return dict(cliente) if cliente else None
+    
+    def by_numero_conto(self, numero_conto: Any) -> Optional[Dict[str, Any]]:
+        """Cliente per numero conto (il primo registrato se il conto è condiviso)"""
+        return self.get(self._by_conto.get(str(numero_conto).strip())) if numero_conto else None
+    
+    def by_email(self, email: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Cliente per email (senza distinzione tra maiuscole e minuscole)"""
+        return self.get(self._by_email.get(email.strip().lower())) if email else None
+    
+    def all(self) -> List[Dict[str, Any]]:
+        """Tutti i clienti della rubrica (copie)"""
+        return [dict(cliente) for cliente in list(self._by_id.values())]
+    
+    def remove(self, cliente_id: Any):
+        """Rimuove un cliente eliminato (le eliminazioni non hanno updated_at)"""
+        with self._lock:
+            self._unindex(str(cliente_id))
+    
+    def reset(self):
+        """Svuota la rubrica: il prossimo accesso la ricarica per intero"""
+        with self._lock:
+            self._by_id, self._by_conto, self._by_email = {}, {}, {}
+            self._watermark = None
+            self._loaded_at = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Numero di clienti, watermark e caricamenti eseguiti"""
+        return {
+            'clienti': len(self._by_id),
+            'watermark': self._watermark,
+            'full_loads': self.full_loads,
+            'incremental_loads': self.incremental_loads
+        }
+    
+    def _load(self, client, full: bool):
+        """Legge a pagine tutti i clienti (full) o quelli modificati dal watermark"""
+        rows = []
+        offset = 0
+        while True:
+            query = client.table('clienti').select(CLIENT_DIRECTORY_COLUMNS)
+            if not full and self._watermark:
+                # >= per non perdere modifiche con lo stesso updated_at del watermark
+                query = query.gte('updated_at', self._watermark)
+            page = query.order('updated_at').order('id')\
+                .range(offset, offset + CLIENT_DIRECTORY_PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < CLIENT_DIRECTORY_PAGE_SIZE:
+                break
+            offset += CLIENT_DIRECTORY_PAGE_SIZE
+        
+        if full:
+            # Indici nuovi sostituiti in blocco: le altre sessioni non vedono mai una rubrica parziale
+            self._by_id, self._by_conto, self._by_email = self._build_indices(rows)
+            self.full_loads += 1
+        else:
+            for row in rows:
+                self._index(row)
+            self.incremental_loads += 1
+        
+        for row in rows:
+            if row.get('updated_at') and (self._watermark is None or str(row['updated_at']) > self._watermark):
+                self._watermark = str(row['updated_at'])
+        
+        logger.info(f"📇 Rubrica clienti {'caricata' if full else 'aggiornata'}: {len(rows)} righe")
+    
+    @staticmethod
+    def _build_indices(rows: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str], Dict[str, str]]:
+        """Indici per id, numero conto ed email (a parità di id vale l'ultima riga letta)"""
+        by_id = {str(row['id']): row for row in rows}
+        by_conto, by_email = {}, {}
+        for cliente_id, row in by_id.items():
+            if row.get('numero_conto'):
+                by_conto.setdefault(str(row['numero_conto']).strip(), cliente_id)
+            if row.get('email'):
+                by_email[row['email'].strip().lower()] = cliente_id
+        return by_id, by_conto, by_email
+    
+    def _index(self, row: Dict[str, Any]):
+        """Aggiunge o sostituisce un cliente negli indici"""
+        cliente_id = str(row['id'])
+        self._unindex(cliente_id)
+        self._by_id[cliente_id] = row
+        if row.get('numero_conto'):
+            self._by_conto.setdefault(str(row['numero_conto']).strip(), cliente_id)
+        if row.get('email'):
+            self._by_email[row['email'].strip().lower()] = cliente_id
+    
+    def _unindex(self, cliente_id: str):
+        """Toglie un cliente dagli indici (le chiavi di altri clienti restano)"""
+        previous = self._by_id.pop(cliente_id, None)
+        if not previous:
+            return
+        conto = str(previous.get('numero_conto') or '').strip()
+        if self._by_conto.get(conto) == cliente_id:
+            del self._by_conto[conto]
+            # Il conto può appartenere anche a un altro cliente
+            for other_id, other in self._by_id.items():
+                if str(other.get('numero_conto') or '').strip() == conto:
+                    self._by_conto[conto] = other_id
+                    break
+        email = (previous.get('email') or '').strip().lower()
+        if self._by_email.get(email) == cliente_id:
+            del self._by_email[email]
+
+class TableReadCache:
+    """Cache di lettura condivisa tra sessioni, con TTL ed eviction LRU per numero di voci"""
+    
+    def __init__(self, ttl_seconds: float = READ_CACHE_TTL, max_entries: int = READ_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._global_generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, table: str, key: str = '*') -> Tuple[bool, Any]:
+        """Restituisce (trovato, valore) per la voce richiesta se non scaduta"""
+        with self._lock:
+            entry = self._entries.get((table, key))
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end((table, key))
+                self.hits += 1
+                return True, entry[1]
+            
+            if entry is not None:
+                del self._entries[(table, key)]
+            self.misses += 1
+            return False, None
+    
+    def generation(self, table: str) -> int:
+        """Contatore di invalidazioni della tabella (per scartare letture concorrenti a una scrittura)"""
+        with self._lock:
+            return self._global_generation + self._generations.get(table, 0)
+    
+    def set(self, table: str, value: Any, key: str = '*', generation: Optional[int] = None):
+        """Memorizza una voce, eliminando le meno usate oltre il limite"""
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        
+        with self._lock:
+            if generation is not None and generation != self._global_generation + self._generations.get(table, 0):
+                return
+            self._entries[(table, key)] = (time.monotonic(), value)
+            self._entries.move_to_end((table, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, table: Optional[str] = None):
+        """Invalida tutte le voci di una tabella (o l'intera cache)"""
+        with self._lock:
+            if table is None:
+                self._entries.clear()
+                self._global_generation += 1
+            else:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                for cache_key in [k for k in self._entries if k[0] == table]:
+                    del self._entries[cache_key]
+            self.invalidations += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiche di utilizzo della cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total * 100, 2) if total else 0.0,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds
+            }
+
+# Cache unica per processo, condivisa da tutte le sessioni Streamlit
+_read_cache = TableReadCache()
+
+# Snapshot analitico unico per processo, usato da execute_query
+_analytics_snapshot = AnalyticsSnapshot()
+
+# Rubrica clienti unica per processo, usata da incroci e wallet
+_client_directory = ClientDirectory()
+
 class SupabaseManager:
     """Gestore Supabase per database remoto professionale"""
     
@@ -97,12 +586,136 @@ class SupabaseManager:
         if not self.supabase:
             return []
         
+        return self._cached_select('clienti', lambda: self.supabase.table('clienti').select('*').order('created_at', desc=True).execute())
+    
+    def get_clienti_page(self, limit: int = CLIENTI_PAGE_SIZE, cursor: Optional[Dict[str, Any]] = None,
+                         columns: str = CLIENTI_LIST_COLUMNS, broker: Optional[str] = None,
+                         piattaforma: Optional[str] = None, search: Optional[str] = None,
+                         with_count: bool = False) -> Dict[str, Any]:
+        """
+        Recupera una pagina di clienti con paginazione keyset su (created_at, id) decrescenti
+        
+        Filtri e ricerca vengono applicati da PostgREST: viaggiano solo le righe della pagina
+        e solo le colonne richieste.
+        
+        Args:
+            limit: Righe per pagina
+            cursor: {'created_at', 'id'} dell'ultima riga della pagina precedente (None = prima pagina)
+            columns: Proiezione delle colonne
+            broker: Filtro esatto sul broker
+            piattaforma: Filtro esatto sulla piattaforma
+            search: Testo cercato (ilike) in nome, email e numero conto
+            with_count: Se True restituisce anche il totale dei clienti filtrati
+            
+        Returns:
+            Dict con 'rows', 'next_cursor' (None se ultima pagina) e 'total' (None se non richiesto)
+        """
+        result = {'rows': [], 'next_cursor': None, 'total': None}
+        if not self.supabase:
+            return result
+        
+        # Le colonne del cursore servono sempre per calcolare la pagina successiva
+        select_columns = columns
+        for key_column in ('created_at', 'id'):
+            if columns != '*' and key_column not in [c.strip() for c in columns.split(',')]:
+                select_columns += f', {key_column}'
+        
+        def apply_filters(query):
+            if broker:
+                query = query.eq('broker', broker)
+            if piattaforma:
+                query = query.eq('piattaforma', piattaforma)
+            if search and search.strip():
+                pattern = self._postgrest_quote(f"*{search.strip()}*")
+                query = query.or_(','.join(f"{column}.ilike.{pattern}" for column in CLIENTI_SEARCH_COLUMNS))
+            return query
+        
         try:
-            response = self.supabase.table('clienti').select('*').order('created_at', desc=True).execute()
-            return response.data if response.data else []
+            # Sulla prima pagina il totale arriva con le righe; dopo, il cursore ridurrebbe il conteggio
+            count_with_page = with_count and not cursor
+            query = apply_filters(self.supabase.table('clienti').select(select_columns, count='exact' if count_with_page else None))
+            if cursor:
+                # Il limite superiore ridondante su created_at permette la scansione dell'indice
+                # idx_clienti_created_id (database/create_clienti_keyset_index.sql)
+                created_at = self._postgrest_quote(str(cursor['created_at']))
+                query = query.lte('created_at', cursor['created_at']).or_(f"created_at.lt.{created_at},"
+                                  f"and(created_at.eq.{created_at},id.lt.{cursor['id']})")
+            
+            # Una riga in più per sapere se esiste una pagina successiva
+            response = query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1).execute()
+            
+            if with_count:
+                count_response = response if count_with_page else apply_filters(
+                    self.supabase.table('clienti').select('id', count='exact', head=True)).execute()
+                result['total'] = count_response.count
         except Exception as e:
-            logger.error(f"❌ Errore recupero clienti: {e}")
-            return []
+            logger.error(f"❌ Errore recupero pagina clienti: {e}")
+            return result
+        
+        rows = response.data or []
+        if len(rows) > limit:
+            rows = rows[:limit]
+            result['next_cursor'] = {'created_at': rows[-1]['created_at'], 'id': rows[-1]['id']}
+        
+        result['rows'] = rows
+        return result
+    
+    def get_cliente_by_id(self, cliente_id: Any) -> Optional[Dict[str, Any]]:
+        """Recupera tutte le colonne di un singolo cliente"""
+        if not self.supabase:
+            return None
+        
+        try:
+            response = self.supabase.table('clienti').select('*').eq('id', cliente_id).limit(1).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"❌ Errore recupero cliente {cliente_id}: {e}")
+            return None
+    
+    def get_client_directory(self) -> ClientDirectory:
+        """
+        Rubrica clienti condivisa (id, numero_conto, email -> id, nome, conto, wallet, broker)
+        
+        Sostituisce le query riga per riga su clienti dei moduli incroci e wallet;
+        viene aggiornata in modo incrementale solo quando serve.
+        """
+        if self.supabase:
+            try:
+                _client_directory.ensure_fresh(self.supabase)
+            except Exception as e:
+                logger.error(f"❌ Errore aggiornamento rubrica clienti: {e}")
+        return _client_directory
+    
+    def get_clienti_filter_options(self) -> Dict[str, List[str]]:
+        """Valori distinti di broker e piattaforma per i filtri (proiezione su 2 colonne, cachata)"""
+        if not self.supabase:
+            return {'broker': [], 'piattaforma': []}
+        
+        def load_options():
+            rows = []
+            offset = 0
+            while True:
+                page = self.supabase.table('clienti').select('broker, piattaforma').range(offset, offset + 999).execute().data or []
+                rows.extend(page)
+                if len(page) < 1000:
+                    break
+                offset += 1000
+            return {
+                'broker': sorted({row['broker'] for row in rows if row.get('broker')}),
+                'piattaforma': sorted({row['piattaforma'] for row in rows if row.get('piattaforma')})
+            }
+        
+        try:
+            options = self.cached_read('clienti', load_options, key='filter_options')
+            return {name: list(values) for name, values in options.items()}
+        except Exception as e:
+            logger.error(f"❌ Errore recupero filtri clienti: {e}")
+            return {'broker': [], 'piattaforma': []}
+    
+    @staticmethod
+    def _postgrest_quote(value: str) -> str:
+        """Racchiude un valore tra virgolette per i filtri or() di PostgREST (virgole, parentesi, punti)"""
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
     
     def add_cliente(self, cliente_data: Dict[str, Any]) -> Tuple[bool, str]:
         """Aggiunge un nuovo cliente su Supabase con controllo duplicati"""
@@ -123,6 +736,7 @@ class SupabaseManager:
             cliente_data['updated_at'] = datetime.now().isoformat()
             
             response = self.supabase.table('clienti').insert(cliente_data).execute()
+            self.invalidate_cache('clienti')
             
             if response.data:
                 # Invia notifica Telegram per nuovo cliente
@@ -150,6 +764,7 @@ class SupabaseManager:
             cliente_data['updated_at'] = datetime.now().isoformat()
             
             response = self.supabase.table('clienti').update(cliente_data).eq('id', cliente_id).execute()
+            self.invalidate_cache('clienti')
             
             if response.data:
                 return True, "✅ Cliente aggiornato con successo"
@@ -166,6 +781,8 @@ class SupabaseManager:
         
         try:
             response = self.supabase.table('clienti').delete().eq('id', cliente_id).execute()
+            self.invalidate_cache('clienti')
+            _client_directory.remove(cliente_id)
             
             if response.data:
                 return True, "✅ Cliente eliminato con successo"
@@ -175,17 +792,128 @@ class SupabaseManager:
         except Exception as e:
             return False, f"❌ Errore: {e}"
     
-    def get_incroci(self) -> List[Dict[str, Any]]:
-        """Recupera tutti gli incroci da Supabase"""
+    def bulk_upsert_clienti(self, clienti: List[Dict[str, Any]], chunk_size: int = BULK_SYNC_CHUNK_SIZE) -> Dict[str, Any]:
+        """
+        Sincronizza in blocco una lista di clienti su Supabase usando l'email come chiave
+        
+        L'indice email remoto viene scaricato una sola volta, il confronto avviene in memoria
+        e le modifiche vengono inviate a blocchi (insert per i nuovi, upsert per id per gli esistenti).
+        
+        Args:
+            clienti: Lista di clienti già nel formato della tabella clienti
+            chunk_size: Numero massimo di righe per richiesta
+            
+        Returns:
+            Dizionario con conteggi (inseriti, aggiornati, invariati, errori, duplicati, senza_email)
+            e tempi per blocco; la somma dei conteggi è pari al numero di clienti ricevuti
+        """
+        result = {
+            'inseriti': 0,
+            'aggiornati': 0,
+            'invariati': 0,
+            'errori': 0,
+            'duplicati': 0,
+            'senza_email': 0,
+            'chunks': [],
+            'messaggi_errore': []
+        }
+        
         if not self.supabase:
-            return []
+            result['messaggi_errore'].append("❌ Client Supabase non disponibile")
+            return result
+        
+        chunk_size = max(1, int(chunk_size))
         
         try:
-            response = self.supabase.table('incroci').select('*').order('created_at', desc=True).execute()
-            return response.data if response.data else []
+            # 1. Indice email remoto (letto a pagine, oltre il limite di 1000 righe per richiesta)
+            campi = ', '.join(['id'] + BULK_SYNC_FIELDS)
+            remoti = {}
+            offset = 0
+            while True:
+                page = self.supabase.table('clienti').select(campi).order('id')\
+                    .range(offset, offset + CLIENT_DIRECTORY_PAGE_SIZE - 1).execute().data or []
+                remoti.update((row['email'], row) for row in page if row.get('email'))
+                if len(page) < CLIENT_DIRECTORY_PAGE_SIZE:
+                    break
+                offset += CLIENT_DIRECTORY_PAGE_SIZE
         except Exception as e:
-            logger.error(f"❌ Errore recupero incroci: {e}")
+            result['errori'] = len(clienti)
+            result['messaggi_errore'].append(f"❌ Errore recupero indice email: {e}")
+            return result
+        
+        # 2. Diff in memoria (a parità di email vince l'ultima riga locale, le altre sono duplicati)
+        con_email = [cliente for cliente in clienti if cliente.get('email')]
+        locali = {cliente['email']: cliente for cliente in con_email}
+        result['senza_email'] = len(clienti) - len(con_email)
+        result['duplicati'] = len(con_email) - len(locali)
+        now = datetime.now().isoformat()
+        da_inserire = []
+        da_aggiornare = []
+        
+        for email, cliente in locali.items():
+            remoto = remoti.get(email)
+            if remoto is None:
+                da_inserire.append({**cliente, 'created_at': now, 'updated_at': now})
+            elif any(not self._sync_values_equal(cliente.get(campo), remoto.get(campo)) for campo in BULK_SYNC_FIELDS if campo in cliente):
+                da_aggiornare.append({**cliente, 'id': remoto['id'], 'updated_at': now})
+            else:
+                result['invariati'] += 1
+        
+        # 3. Invio a blocchi
+        operazioni = [('insert', row) for row in da_inserire] + [('update', row) for row in da_aggiornare]
+        for start in range(0, len(operazioni), chunk_size):
+            chunk = operazioni[start:start + chunk_size]
+            inserimenti = [row for op, row in chunk if op == 'insert']
+            aggiornamenti = [row for op, row in chunk if op == 'update']
+            chunk_stats = {'chunk': start // chunk_size + 1, 'righe': len(chunk), 'inseriti': 0, 'aggiornati': 0, 'errori': 0}
+            started = time.perf_counter()
+            
+            if inserimenti:
+                try:
+                    self.supabase.table('clienti').insert(inserimenti).execute()
+                    chunk_stats['inseriti'] = len(inserimenti)
+                except Exception as e:
+                    chunk_stats['errori'] += len(inserimenti)
+                    result['messaggi_errore'].append(f"❌ Blocco {chunk_stats['chunk']} insert: {e}")
+            
+            if aggiornamenti:
+                try:
+                    self.supabase.table('clienti').upsert(aggiornamenti, on_conflict='id').execute()
+                    chunk_stats['aggiornati'] = len(aggiornamenti)
+                except Exception as e:
+                    chunk_stats['errori'] += len(aggiornamenti)
+                    result['messaggi_errore'].append(f"❌ Blocco {chunk_stats['chunk']} upsert: {e}")
+            
+            chunk_stats['durata_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            result['chunks'].append(chunk_stats)
+            result['inseriti'] += chunk_stats['inseriti']
+            result['aggiornati'] += chunk_stats['aggiornati']
+            result['errori'] += chunk_stats['errori']
+        
+        if operazioni:
+            self.invalidate_cache('clienti')
+        
+        logger.info(f"✅ Sync bulk clienti: {result['inseriti']} inseriti, {result['aggiornati']} aggiornati, "
+                    f"{result['invariati']} invariati, {result['errori']} errori, "
+                    f"{result['duplicati']} email duplicate, {result['senza_email']} senza email")
+        return result
+    
+    @staticmethod
+    def _sync_values_equal(locale: Any, remoto: Any) -> bool:
+        """Confronta un valore locale con quello remoto (numeri confrontati come float)"""
+        if isinstance(locale, (int, float)) and not isinstance(locale, bool):
+            try:
+                return float(locale) == float(remoto)
+            except (TypeError, ValueError):
+                return False
+        return str(locale if locale is not None else '') == str(remoto if remoto is not None else '')
+    
+    def get_incroci(self) -> List[Dict[str, Any]]:
+        """Recupera tutti gli incroci da Supabase"""
+        if not self.supabase:
             return []
+        
+        return self._cached_select('incroci', lambda: self.supabase.table('incroci').select('*').order('created_at', desc=True).execute())
     
     def add_incrocio(self, incrocio_data: Dict[str, Any]) -> Tuple[bool, str]:
         """Aggiunge un nuovo incrocio su Supabase"""
@@ -197,6 +925,7 @@ class SupabaseManager:
             incrocio_data['updated_at'] = datetime.now().isoformat()
             
             response = self.supabase.table('incroci').insert(incrocio_data).execute()
+            self.invalidate_cache('incroci')
             
             if response.data:
                 return True, "✅ Incrocio aggiunto con successo"
@@ -213,6 +942,7 @@ class SupabaseManager:
         
         try:
             response = self.supabase.table('incroci').delete().eq('id', incrocio_id).execute()
+            self.invalidate_cache('incroci')
             
             if response.data:
                 return True, "✅ Incrocio eliminato con successo"
@@ -222,6 +952,47 @@ class SupabaseManager:
         except Exception as e:
             return False, f"❌ Errore: {e}"
     
+    def cached_read(self, table: str, loader, key: str = '*') -> Any:
+        """
+        Restituisce il risultato di loader() passando dalla cache condivisa
+        
+        Args:
+            table: Tabella da cui dipende il valore (usata per l'invalidazione)
+            loader: Funzione senza argomenti che calcola il valore
+            key: Chiave della voce all'interno della tabella
+        """
+        found, value = _read_cache.get(table, key)
+        if found:
+            return value
+        
+        generation = _read_cache.generation(table)
+        value = loader()
+        _read_cache.set(table, value, key, generation)
+        return value
+    
+    def _cached_select(self, table: str, fetch, key: str = '*') -> List[Dict[str, Any]]:
+        """Esegue una select passando dalla cache condivisa; restituisce copie delle righe"""
+        try:
+            rows = self.cached_read(table, lambda: fetch().data or [], key)
+        except Exception as e:
+            logger.error(f"❌ Errore recupero {table}: {e}")
+            return []
+        
+        # Copie superficiali: i chiamanti possono modificare le righe senza alterare la cache
+        return [dict(row) for row in rows]
+    
+    def invalidate_cache(self, table: Optional[str] = None):
+        """Invalida la cache di lettura per una tabella (o per tutte)"""
+        _read_cache.invalidate(table)
+    
+    def get_cache_generation(self, table: str) -> int:
+        """Contatore di invalidazioni della tabella (cambia a ogni scrittura della dashboard)"""
+        return _read_cache.generation(table)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Restituisce hit/miss e stato della cache di lettura"""
+        return _read_cache.get_stats()
+    
     def get_database_info(self) -> Dict[str, Any]:
         """Recupera informazioni sul database Supabase"""
         if not self.supabase:
@@ -245,30 +1016,34 @@ class SupabaseManager:
         except Exception as e:
             return {"error": f"❌ Errore: {e}"}
     
-    def execute_query(self, query: str) -> List[Dict[str, Any]]:
+    def execute_query(self, query: str, params: Optional[Any] = None) -> List[Dict[str, Any]]:
         """
-        Esegue una query SQL personalizzata su Supabase
-        Per query complesse, restituisce dati mock per evitare errori
+        Esegue una query SQL di analisi sullo snapshot locale delle tabelle Supabase
+        
+        Le tabelle referenziate (clienti, incroci, incroci_account, incroci_bonus)
+        vengono copiate in SQLite in memoria e ricaricate allo scadere del TTL;
+        clienti_base e account_broker sono viste derivate da clienti.
         
         Args:
-            query: Query SQL da eseguire
+            query: Query SQL da eseguire (parametri posizionali %s)
+            params: Valori dei parametri
             
         Returns:
-            List[Dict]: Risultati della query o dati mock
+            List[Dict]: Risultati della query (dati mock se Supabase non è configurato)
         """
         if not self.supabase:
             logger.error("❌ Client Supabase non disponibile")
             return self._get_mock_broker_data()
         
         try:
-            # Per ora, dato che Supabase non supporta query SQL raw direttamente,
-            # restituiamo dati mock basati sulla struttura della query
-            logger.info("📊 Esecuzione query broker con dati mock")
-            return self._get_mock_broker_data()
-                
+            return _analytics_snapshot.execute(self.supabase, query, params)
         except Exception as e:
             logger.error(f"❌ Errore esecuzione query: {e}")
-            return self._get_mock_broker_data()
+            return []
+    
+    def get_analytics_stats(self) -> Dict[str, Any]:
+        """Restituisce lo stato dello snapshot analitico locale"""
+        return _analytics_snapshot.get_stats()
     
     def _get_mock_broker_data(self) -> List[Dict[str, Any]]:
         """
@@ -726,42 +1501,42 @@ class SupabaseManager:
         except Exception as e:
             logger.error(f"❌ Errore invio notifica cliente '{notification_type}': {e}")
     
-    def _is_notification_enabled(self, notification_type: str) -> bool:
-        """Controlla se le notifiche per un tipo specifico sono abilitate"""
+    def get_notification_settings(self) -> Dict[str, bool]:
+        """
+        Registro delle impostazioni notifiche: tutte le righe di notification_settings
+        lette con una sola query e condivise tramite la cache di lettura (TTL),
+        invalidata al salvataggio dalle Impostazioni
+        
+        Returns:
+            Dict[str, bool]: notification_type -> is_enabled (solo righe presenti nel database)
+        """
+        if not self.supabase:
+            return {}
+        
+        def load_settings():
+            response = self.supabase.table('notification_settings').select('notification_type, is_enabled').execute()
+            return {
+                row['notification_type']: row.get('is_enabled', True)
+                for row in (response.data or [])
+                if row.get('notification_type')
+            }
+        
         try:
-            if not self.supabase:
-                # Default settings se Supabase non disponibile
-                default_settings = {
-                    'cliente_new_client': True,
-                    'cliente_modified': False,
-                    'cliente_deleted': True,
-                }
-                return default_settings.get(notification_type, True)
-            
-            # Recupera impostazioni notifiche dal database
-            response = self.supabase.table('notification_settings').select('*').eq('notification_type', notification_type).execute()
-            
-            if response.data and len(response.data) > 0:
-                setting = response.data[0]
-                return setting.get('is_enabled', True)
-            else:
-                # Default settings se nessuna impostazione trovata
-                default_settings = {
-                    'cliente_new_client': True,
-                    'cliente_modified': False,
-                    'cliente_deleted': True,
-                }
-                return default_settings.get(notification_type, True)
-                
+            return dict(self.cached_read('notification_settings', load_settings, key='registry'))
         except Exception as e:
-            logger.error(f"❌ Errore controllo impostazioni notifiche {notification_type}: {e}")
-            # Default settings in caso di errore
-            default_settings = {
-                'cliente_new_client': True,
-                'cliente_modified': False,
-                'cliente_deleted': True,
-            }
-            return default_settings.get(notification_type, True)
+            logger.error(f"❌ Errore caricamento impostazioni notifiche: {e}")
+            return {}
+    
+    def is_notification_enabled(self, notification_type: str) -> bool:
+        """Controlla nel registro condiviso se un tipo di notifica è abilitato (default se assente)"""
+        settings = self.get_notification_settings()
+        if notification_type in settings:
+            return settings[notification_type]
+        return DEFAULT_NOTIFICATION_SETTINGS.get(notification_type, True)
+    
+    def _is_notification_enabled(self, notification_type: str) -> bool:
+        """Controlla se le notifiche per un tipo specifico sono abilitate"""
+        return self.is_notification_enabled(notification_type)
 
 def show_supabase_status():
     """Mostra lo stato di Supabase nell'interfaccia"""
@@ -782,6 +1557,8 @@ def show_supabase_status():
     
     if success:
         st.success(f"🔗 **SUPABASE**: {message}")
+        cache_stats = manager.get_cache_stats()
+        st.caption(f"🗄️ Cache letture: {cache_stats['hits']} hit / {cache_stats['misses']} miss ({cache_stats['hit_rate']}%)")
         return True
     else:
         st.error(f"❌ **SUPABASE**: {message}")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+🧪 TEST FAN-OUT CHIAMATE AI
+Verifica AIAssistant.generate_many contro un server locale che simula l'endpoint
+chat/completions: parallelismo, limite di concorrenza, ordine di completamento e timeout per chiamata
+"""
+
+import sys
+import os
+import re
+import json
+import time
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Aggiungi il path del progetto
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from components.ai_assistant.ai_core import AIAssistant, AIResponseCache
+
+# Configurazione logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class FakeChatCompletions(BaseHTTPRequestHandler):
+    """Risponde dopo RITARDO secondi (letto dal prompt) e conta le richieste contemporanee"""
+
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    @classmethod
+    def reset(cls):
+        cls.active = cls.max_active = 0
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = payload['messages'][-1]['content']
+        cls = FakeChatCompletions
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            time.sleep(float(re.search(r'RITARDO=([\d.]+)', prompt).group(1)))
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+        data = json.dumps({'choices': [{'message': {'role': 'assistant', 'content': f"risposta a {prompt}"}}]}).encode()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except OSError:
+            pass  # Il client ha già abbandonato la chiamata (timeout)
+
+    def log_message(self, *args):
+        pass
+
+def _start_server():
+    FakeChatCompletions.reset()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeChatCompletions)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _make_assistant(server):
+    """AIAssistant puntato al server locale, senza cache persistente e con un prompt di prova"""
+    assistant = AIAssistant()
+    assistant.api_url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    assistant.config = dict(assistant.config, cache_responses=False, retry_attempts=2)
+    assistant.cache = AIResponseCache(':memory:')
+    assistant.prompts = {'eco': "Sezione {sezione} RITARDO={ritardo}"}
+    return assistant
+
+def test_calls_run_in_parallel_and_yield_as_completed():
+    """Tre chiamate da 0.4s in circa 0.4s, restituite in ordine di completamento"""
+    server = _start_server()
+    assistant = _make_assistant(server)
+    calls = {name: ('eco', {'sezione': name, 'ritardo': ritardo})
+             for name, ritardo in (('lenta', 0.6), ('media', 0.4), ('veloce', 0.2))}
+
+    start = time.monotonic()
+    ordine = [name for name, response in assistant.generate_many(calls, max_workers=3)
+              if response.startswith(f"risposta a Sezione {name}")]
+    elapsed = time.monotonic() - start
+
+    assert ordine == ['veloce', 'media', 'lenta']
+    assert elapsed < 1.0, f"chiamate non parallele: {elapsed:.2f}s"
+    assert FakeChatCompletions.max_active == 3
+    server.shutdown()
+
+def test_concurrency_cap():
+    """Con max_workers=2 il server non vede mai più di due richieste insieme"""
+    server = _start_server()
+    assistant = _make_assistant(server)
+    calls = {f"s{i}": ('eco', {'sezione': i, 'ritardo': 0.1}) for i in range(5)}
+
+    risultati = dict(assistant.generate_many(calls, max_workers=2))
+    assert len(risultati) == 5 and all(r.startswith('risposta a') for r in risultati.values())
+    assert FakeChatCompletions.max_active == 2
+    server.shutdown()
+
+def test_per_call_timeout_returns_fallback():
+    """Una chiamata oltre il timeout restituisce il fallback senza bloccare le altre"""
+    server = _start_server()
+    assistant = _make_assistant(server)
+    calls = {'bloccata': ('eco', {'sezione': 'bloccata', 'ritardo': 3}),
+             'ok': ('eco', {'sezione': 'ok', 'ritardo': 0.1})}
+
+    start = time.monotonic()
+    risultati = dict(assistant.generate_many(calls, timeout=0.5))
+    elapsed = time.monotonic() - start
+
+    assert risultati['ok'].startswith('risposta a Sezione ok')
+    assert risultati['bloccata'] == assistant._get_fallback_response('eco')
+    assert elapsed < 1.5, f"timeout per chiamata non rispettato: {elapsed:.2f}s"
+    server.shutdown()
+
+def main():
+    """Esegue i test del fan-out AI"""
+    logger.info("🚀 TEST FAN-OUT CHIAMATE AI")
+    test_calls_run_in_parallel_and_yield_as_completed()
+    logger.info("✅ Chiamate in parallelo restituite al completamento")
+    test_concurrency_cap()
+    logger.info("✅ Limite di concorrenza")
+    test_per_call_timeout_returns_fallback()
+    logger.info("✅ Timeout per chiamata")
+
+if __name__ == "__main__":
+    main()
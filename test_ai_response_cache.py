@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+🧪 TEST CACHE RISPOSTE AI
+Verifica la cache persistente di AIAssistant: condivisione tra istanze e processi,
+TTL, eviction LRU per dimensione e statistiche hit/miss, senza chiamare l'API
+"""
+
+import sys
+import os
+import time
+import tempfile
+import logging
+
+# Aggiungi il path del progetto
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from components.ai_assistant.ai_core import AIAssistant, AIResponseCache
+
+# Configurazione logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATI_CLIENTE = {
+    'nome_cliente': 'Cliente Test', 'email': 'test@example.com', 'broker': 'Test Broker',
+    'piattaforma': 'MT4', 'volume_posizione': 1000, 'stato_account': 'attivo',
+    'data_registrazione': '2024-01-01', 'storia_incroci': 'Nessun incrocio registrato'
+}
+
+def _make_assistant(cache):
+    """AIAssistant con cache su file temporaneo e chiamata API simulata"""
+    assistant = AIAssistant()
+    assistant.cache = cache
+    assistant.api_calls = []
+    assistant._make_api_call_with_retry = lambda prompt, deadline=None: assistant.api_calls.append(prompt) or "Analisi completata"
+    return assistant
+
+def test_hit_skips_api_across_instances(tmp_path=None):
+    """Una nuova istanza (nuovo rerun o nuovo processo) trova la risposta senza chiamare l'API"""
+    path = os.path.join(str(tmp_path or tempfile.mkdtemp()), 'ai_cache.sqlite3')
+    primo = _make_assistant(AIResponseCache(path))
+    assert primo.generate_response('client_analysis', DATI_CLIENTE) == "Analisi completata"
+    assert len(primo.api_calls) == 1
+
+    secondo = _make_assistant(AIResponseCache(path))
+    assert secondo.generate_response('client_analysis', DATI_CLIENTE) == "Analisi completata"
+    assert secondo.api_calls == []
+
+    stats = secondo.get_cache_stats()
+    assert stats['total_cached'] == 1 and stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['hit_rate'] == 50.0
+
+def test_ttl_and_lru_eviction(tmp_path=None):
+    """Le risposte scadute non vengono servite; oltre max_bytes esce la meno usata di recente"""
+    path = os.path.join(str(tmp_path or tempfile.mkdtemp()), 'ai_cache_lru.sqlite3')
+    cache = AIResponseCache(path, max_bytes=250)
+
+    cache.set('scaduta', 'report_generation', 'x' * 10, ttl_seconds=0.05)
+    time.sleep(0.1)
+    assert cache.get('scaduta', ttl_seconds=0.05) is None
+
+    for key in ('a', 'b'):
+        cache.set(key, 'risk_analysis', key * 100, ttl_seconds=3600)
+    assert cache.get('a', ttl_seconds=3600) == 'a' * 100  # 'a' diventa la più recente
+    cache.set('c', 'risk_analysis', 'c' * 100, ttl_seconds=3600)
+
+    assert cache.get('b', ttl_seconds=3600) is None
+    assert cache.get('a', ttl_seconds=3600) and cache.get('c', ttl_seconds=3600)
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['size_bytes'] == 200 and stats['evictions'] == 1
+
+def test_cache_errors_keep_api_response(tmp_path=None):
+    """Il file della cache è 0600 e un errore SQLite non fa perdere la risposta dell'API"""
+    path = os.path.join(str(tmp_path or tempfile.mkdtemp()), 'ai_cache_errori.sqlite3')
+    cache = AIResponseCache(path)
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+    assistant = _make_assistant(cache)
+    cache._conn.close()  # ogni operazione successiva solleva sqlite3.ProgrammingError
+    assert assistant.generate_response('client_analysis', DATI_CLIENTE) == "Analisi completata"
+    assert len(assistant.api_calls) == 1
+
+def main():
+    """Esegue i test della cache AI"""
+    logger.info("🚀 TEST CACHE RISPOSTE AI")
+    with tempfile.TemporaryDirectory() as tmp_path:
+        test_hit_skips_api_across_instances(tmp_path)
+        logger.info("✅ Hit condivisi tra istanze senza chiamate API")
+        test_ttl_and_lru_eviction(tmp_path)
+        logger.info("✅ TTL ed eviction LRU")
+        test_cache_errors_keep_api_response(tmp_path)
+        logger.info("✅ Cache best-effort su errori SQLite")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+🧪 TEST JOB SCHEDULER
+Verifica pianificazione cron, esecuzione dei job scaduti, storico e deduplica degli alert
+con un client Supabase e un TelegramManager simulati in memoria
+"""
+
+import sys
+import os
+import logging
+from datetime import datetime
+
+# Aggiungi il path del progetto
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.job_scheduler import CronSchedule, JobScheduler, JOB_RUNS_TABLE, ALERTS_SENT_TABLE
+
+# Configurazione logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+class _Query:
+    """Sottoinsieme del query builder usato dallo scheduler (insert, upsert, in_, eq, order, limit)"""
+
+    def __init__(self, client, table):
+        self.client, self.table, self.rows, self.keys = client, table, None, None
+        self.sort, self.max_rows = None, None
+
+    def insert(self, rows):
+        self.rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        self.rows = [row for row in rows
+                     if not any(r[on_conflict] == row[on_conflict] for r in self.client.tables[self.table])]
+        return self
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        self.keys = (column, set(values))
+        return self
+
+    def eq(self, column, value):
+        return self.in_(column, [value])
+
+    def order(self, column, desc=False):
+        self.sort = (column, desc)
+        return self
+
+    def limit(self, count):
+        self.max_rows = count
+        return self
+
+    def execute(self):
+        self.client.requests += 1
+        if self.rows is not None:
+            self.client.tables[self.table].extend(self.rows)
+            return _Response(self.rows)
+        column, values = self.keys
+        rows = [row for row in self.client.tables[self.table] if row[column] in values]
+        if self.sort:
+            rows.sort(key=lambda row: row[self.sort[0]], reverse=self.sort[1])
+        return _Response(rows[:self.max_rows])
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables = {JOB_RUNS_TABLE: [], ALERTS_SENT_TABLE: []}
+        self.requests = 0
+
+    def table(self, name):
+        return _Query(self, name)
+
+class FakeSupabaseManager:
+    def __init__(self, disabled=()):
+        self.supabase = FakeSupabase()
+        self.disabled = set(disabled)
+
+    def is_notification_enabled(self, notification_type):
+        return notification_type not in self.disabled
+
+class FakeTelegram:
+    is_configured = True
+
+    def __init__(self):
+        self.sent = []
+
+    def send_notification(self, notification_type, data):
+        self.sent.append((notification_type, data))
+        return True, "📨 Notifica accodata per l'invio"
+
+def _make_scheduler(now, **kwargs):
+    clock = {'now': now}
+    scheduler = JobScheduler(supabase_manager=FakeSupabaseManager(**kwargs), telegram_manager=FakeTelegram(),
+                             clock=lambda: clock['now'])
+    return scheduler, clock
+
+def test_cron_next_after():
+    """Campi cron con liste, intervalli, passi e giorno della settimana"""
+    assert CronSchedule('0 9 * * *').next_after(datetime(2026, 3, 10, 9, 0)) == datetime(2026, 3, 11, 9, 0)
+    assert CronSchedule('*/15 * * * *').next_after(datetime(2026, 3, 10, 9, 7)) == datetime(2026, 3, 10, 9, 15)
+    assert CronSchedule('0 9 1 * *').next_after(datetime(2026, 12, 15, 10, 0)) == datetime(2027, 1, 1, 9, 0)
+    # 13/03/2026 è venerdì: lunedì-venerdì alle 18:30
+    assert CronSchedule('30 18 * * 1-5').next_after(datetime(2026, 3, 13, 19, 0)) == datetime(2026, 3, 16, 18, 30)
+    assert CronSchedule('0 0 * * 7').matches(datetime(2026, 3, 15, 0, 0))
+    try:
+        CronSchedule('0 25 * * *')
+        assert False, "ora fuori intervallo accettata"
+    except ValueError:
+        pass
+
+def test_run_pending_records_history():
+    """I job scaduti girano una sola volta per finestra e l'esito finisce nello storico"""
+    scheduler, clock = _make_scheduler(datetime(2026, 3, 10, 8, 59))
+    calls = []
+    scheduler.register('ok', '0 9 * * *', lambda s: (calls.append(s.clock()) or 1, 'fatto'))
+    scheduler.register('rotto', '0 9 * * *', lambda s: 1 / 0)
+
+    assert scheduler.run_pending() == []
+    clock['now'] = datetime(2026, 3, 10, 9, 0, 30)
+    assert sorted(scheduler.run_pending()) == ['ok', 'rotto']
+    assert scheduler.run_pending() == []
+
+    # Nessun controllo per tre giorni (stesso processo): un solo recupero
+    clock['now'] = datetime(2026, 3, 13, 12, 0)
+    assert scheduler.run_pending() == ['ok', 'rotto']
+    assert len(calls) == 2
+    assert scheduler.jobs['ok'].next_run == datetime(2026, 3, 14, 9, 0)
+
+    runs = scheduler.supabase_manager.supabase.tables[JOB_RUNS_TABLE]
+    assert [(run['job_name'], run['status']) for run in runs] == [
+        ('ok', 'success'), ('rotto', 'error'), ('ok', 'success'), ('rotto', 'error')]
+    assert runs[1]['message'] == 'division by zero'
+
+def test_missed_run_recovered_after_restart():
+    """Al riavvio l'esecuzione saltata a processo fermo viene recuperata una volta dallo storico"""
+    scheduler, clock = _make_scheduler(datetime(2026, 3, 10, 8, 59))
+    scheduler.register('ok', '0 9 * * *', lambda s: (1, 'fatto'))
+    clock['now'] = datetime(2026, 3, 10, 9, 0, 30)
+    assert scheduler.run_pending() == ['ok']
+
+    # Processo fermo l'11/03: al riavvio del 12/03 alle 10:00 l'esecuzione delle 9:00 è già passata
+    restarted, _ = _make_scheduler(datetime(2026, 3, 12, 10, 0))
+    restarted._supabase_manager.supabase = scheduler.supabase_manager.supabase
+    restarted.register('ok', '0 9 * * *', lambda s: (1, 'fatto'))
+    restarted.register('nuovo', '0 9 * * *', lambda s: (1, 'fatto'))
+    restarted.restore_from_history()
+
+    assert restarted.jobs['ok'].last_run == datetime(2026, 3, 10, 9, 0, 30)
+    assert restarted.run_pending() == ['ok']
+    assert restarted.jobs['ok'].next_run == datetime(2026, 3, 13, 9, 0)
+    assert restarted.jobs['nuovo'].next_run == datetime(2026, 3, 13, 9, 0)
+
+def test_alerts_are_deduplicated():
+    """Gli alert con la stessa chiave partono una volta sola, anche tra processi diversi"""
+    scheduler, _ = _make_scheduler(datetime(2026, 3, 10, 9, 0))
+    alerts = [('vps_expiring:1:2026-03-13:3', {'cliente_nome': 'A'}),
+              ('vps_expiring:2:2026-03-17:7', {'cliente_nome': 'B'})]
+
+    assert scheduler.notify_many('vps_expiry', 'vps_expiring', alerts) == 2
+    assert scheduler.notify_many('vps_expiry', 'vps_expiring', alerts) == 0
+
+    # Nuovo processo con la stessa tabella: deduplica persistente
+    restarted, _ = _make_scheduler(datetime(2026, 3, 11, 9, 0))
+    restarted._supabase_manager.supabase = scheduler.supabase_manager.supabase
+    nuovo = [('vps_expiring:1:2026-03-13:1', {'cliente_nome': 'A'})]
+    assert restarted.notify_many('vps_expiry', 'vps_expiring', alerts + nuovo) == 1
+    assert [data['cliente_nome'] for _, data in restarted.telegram_manager.sent] == ['A']
+    assert len(scheduler.supabase_manager.supabase.tables[ALERTS_SENT_TABLE]) == 3
+
+def test_disabled_notifications_are_skipped():
+    """I tipi disattivati nelle impostazioni non vengono inviati né marcati"""
+    scheduler, _ = _make_scheduler(datetime(2026, 3, 10, 9, 0), disabled={'vps_expired'})
+    assert scheduler.notify_many('vps_expiry', 'vps_expired', [('vps_expired:1:2026-03-01', {})]) == 0
+    assert scheduler.telegram_manager.sent == []
+    assert scheduler.supabase_manager.supabase.tables[ALERTS_SENT_TABLE] == []
+
+def main():
+    """Esegue i test dello scheduler"""
+    logger.info("🚀 TEST JOB SCHEDULER")
+    test_cron_next_after()
+    logger.info("✅ Pianificazione cron")
+    test_run_pending_records_history()
+    logger.info("✅ Esecuzione e storico")
+    test_missed_run_recovered_after_restart()
+    logger.info("✅ Recupero dallo storico al riavvio")
+    test_alerts_are_deduplicated()
+    logger.info("✅ Deduplica alert")
+    test_disabled_notifications_are_skipped()
+    logger.info("✅ Notifiche disattivate")
+
+if __name__ == "__main__":
+    main()
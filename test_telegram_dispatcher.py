@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+🧪 TEST TELEGRAM DISPATCHER
+Verifica l'invio asincrono delle notifiche contro un server HTTP locale che simula l'API Telegram
+"""
+
+import sys
+import os
+import json
+import time
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Aggiungi il path del progetto
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from components.telegram_dispatcher import TelegramDispatcher, ChatRateLimiter
+
+# Configurazione logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class StubTelegramHandler(BaseHTTPRequestHandler):
+    """Simula sendMessage: risposte lente, errori 500 programmati e 400 permanenti"""
+
+    received = []
+    fail_first = 0
+    delay = 0.0
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(StubTelegramHandler.delay)
+
+        if payload['text'] == 'permanente':
+            status, body = 400, {'ok': False, 'description': 'Bad Request: chat not found'}
+        elif StubTelegramHandler.fail_first > 0:
+            StubTelegramHandler.fail_first -= 1
+            status, body = 500, {'ok': False, 'description': 'Internal Server Error'}
+        else:
+            StubTelegramHandler.received.append(payload['text'])
+            status, body = 200, {'ok': True, 'result': {'message_id': len(StubTelegramHandler.received)}}
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def _start_stub_server():
+    """Avvia il server stub su una porta libera"""
+    StubTelegramHandler.received = []
+    StubTelegramHandler.fail_first = 0
+    StubTelegramHandler.delay = 0.0
+    server = HTTPServer(('127.0.0.1', 0), StubTelegramHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _make_dispatcher(server, logs, tmp_path=None):
+    """Dispatcher puntato al server stub, con retry rapidi e log in memoria"""
+    return TelegramDispatcher(
+        log_writer=logs.append,
+        retry_delays=[0.05, 0.05],
+        spool_path=os.path.join(str(tmp_path), 'spool.json') if tmp_path else None,
+        api_base=f"http://127.0.0.1:{server.server_port}"
+    )
+
+def test_enqueue_returns_immediately():
+    """I produttori non attendono la risposta lenta dell'API"""
+    server = _start_stub_server()
+    StubTelegramHandler.delay = 0.3
+    logs = []
+    dispatcher = _make_dispatcher(server, logs)
+
+    start = time.monotonic()
+    for i in range(3):
+        success, _ = dispatcher.enqueue('TOKEN', 'CHAT', f"messaggio {i}", 'cliente_new_client')
+        assert success
+    assert time.monotonic() - start < 0.1
+
+    assert dispatcher.flush(timeout=5)
+    assert StubTelegramHandler.received == ['messaggio 0', 'messaggio 1', 'messaggio 2']
+    dispatcher.stop()
+    server.shutdown()
+
+def test_retry_and_coalesced_logs(tmp_path=None):
+    """Gli errori 5xx vengono ritentati, i 4xx no; i log sono scritti in un unico blocco"""
+    server = _start_stub_server()
+    StubTelegramHandler.fail_first = 1
+    logs = []
+    dispatcher = _make_dispatcher(server, logs, tmp_path)
+
+    dispatcher.enqueue('TOKEN', 'CHAT', 'ritentato', 'wallet_new_deposit')
+    dispatcher.enqueue('TOKEN', 'CHAT', 'permanente', 'wallet_new_deposit')
+
+    deadline = time.monotonic() + 5
+    while dispatcher.get_stats()['sent'] + dispatcher.get_stats()['failed'] < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    dispatcher.stop()
+
+    stats = dispatcher.get_stats()
+    assert stats['sent'] == 1 and stats['failed'] == 1 and stats['retried'] == 1
+    assert StubTelegramHandler.received == ['ritentato']
+
+    rows = [row for batch in logs for row in batch]
+    assert sorted(row['status'] for row in rows) == ['failed', 'sent']
+    assert next(row for row in rows if row['status'] == 'sent')['retry_count'] == 1
+    assert len(logs) == 1
+    server.shutdown()
+
+def test_bounded_queue_drops_when_full():
+    """Oltre la capacità della coda i messaggi vengono scartati senza bloccare"""
+    server = _start_stub_server()
+    dispatcher = TelegramDispatcher(log_writer=lambda rows: None, max_queue_size=1, spool_path=None,
+                                    api_base=f"http://127.0.0.1:{server.server_port}")
+    dispatcher._ensure_worker = lambda: None  # Worker fermo: la coda resta piena
+
+    assert dispatcher.enqueue('TOKEN', 'CHAT', 'primo', 'vps_new')[0]
+    assert not dispatcher.enqueue('TOKEN', 'CHAT', 'secondo', 'vps_new')[0]
+    assert dispatcher.get_stats()['dropped'] == 1
+    server.shutdown()
+
+def test_token_bucket_per_chat():
+    """Raffica consentita fino a burst, poi un invio ogni 1/rate secondi; i gruppi hanno limiti propri"""
+    clock = {'now': 0.0}
+    limiter = ChatRateLimiter(rate=1.0, burst=2, group_rate=0.5, group_burst=1, clock=lambda: clock['now'])
+
+    assert [limiter.reserve('42') for _ in range(4)] == [0.0, 0.0, 1.0, 2.0]
+    assert limiter.reserve('-100123') == 0.0
+    assert limiter.reserve('-100123') == 2.0
+
+    clock['now'] = 10.0
+    assert limiter.reserve('42') == 0.0
+    limiter.pause('42', 5)
+    assert limiter.reserve('42') == 6.0
+
+    # Con max_wait un'attesa troppo lunga non consuma gettoni (invii sincroni in fail fast)
+    assert limiter.reserve('42', max_wait=2.0) == 7.0
+    assert limiter.reserve('42') == 7.0
+
+def test_burst_coalesced_into_digest():
+    """Gli eventi dello stesso tipo nella finestra partono in un riepilogo, quelli isolati invariati"""
+    server = _start_stub_server()
+    logs = []
+    dispatcher = _make_dispatcher(server, logs)
+    dispatcher.coalesce_window = 0.2
+
+    for i in range(5):
+        dispatcher.enqueue('TOKEN', 'CHAT', f"cliente {i}", 'cliente_new_client',
+                           coalesce_key='new_client', digest_title='RIEPILOGO CLIENTI')
+    dispatcher.enqueue('TOKEN', 'CHAT', 'incrocio 0', 'new_incrocio',
+                       coalesce_key='new_incrocio', digest_title='RIEPILOGO INCROCI')
+    dispatcher.enqueue('TOKEN', 'CHAT', 'deposito', 'wallet_new_deposit')
+
+    assert dispatcher.flush(timeout=5)
+    received = StubTelegramHandler.received
+    assert len(received) == 3 and received[0] == 'deposito'
+    digest = next(text for text in received if text.startswith('RIEPILOGO CLIENTI (5)'))
+    assert all(f"cliente {i}" in digest for i in range(5))
+    assert 'incrocio 0' in received
+    assert dispatcher.get_stats()['coalesced'] == 4
+    dispatcher.stop()
+    server.shutdown()
+
+def _wait_outcome(dispatcher, count: int, timeout: float = 5.0):
+    """Attende che `count` job siano stati inviati o falliti (i retry sono esclusi da flush)"""
+    deadline = time.monotonic() + timeout
+    while dispatcher.get_stats()['sent'] + dispatcher.get_stats()['failed'] < count and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+def test_spool_without_token(tmp_path=None):
+    """Lo spool dei retry è 0600 e non contiene il token; al riavvio il token viene risolto dalla configurazione"""
+    import tempfile
+    spool_path = os.path.join(str(tmp_path or tempfile.mkdtemp()), 'spool.json')
+    server = _start_stub_server()
+    primo = TelegramDispatcher(log_writer=lambda rows: None, spool_path=spool_path,
+                               api_base=f"http://127.0.0.1:{server.server_port}")
+    primo._ensure_worker = lambda: None  # Worker fermo: il job resta nello schedule
+    primo.enqueue('123456:SEGRETO', 'CHAT', 'ripreso', 'wallet_new_deposit')
+    primo._schedule_retry(primo._queue.get_nowait(), 0.0)
+
+    with open(spool_path, 'r', encoding='utf-8') as f:
+        assert 'SEGRETO' not in f.read()
+    assert os.stat(spool_path).st_mode & 0o777 == 0o600
+
+    logs = []
+    secondo = TelegramDispatcher(log_writer=logs.append, spool_path=spool_path, token_resolver=lambda: '123456:SEGRETO',
+                                 api_base=f"http://127.0.0.1:{server.server_port}")
+    _wait_outcome(secondo, 1)
+    assert StubTelegramHandler.received == ['ripreso'] and secondo.get_stats()['sent'] == 1
+    secondo.stop()
+
+    # Token cambiato nella configurazione: il retry salvato viene scartato
+    primo._save_spool()
+    terzo = TelegramDispatcher(log_writer=logs.append, spool_path=spool_path, token_resolver=lambda: '654321:ALTRO',
+                               api_base=f"http://127.0.0.1:{server.server_port}")
+    _wait_outcome(terzo, 1)
+    assert terzo.get_stats()['failed'] == 1 and StubTelegramHandler.received == ['ripreso']
+    terzo.stop()
+    server.shutdown()
+
+def main():
+    """Esegue i test del dispatcher"""
+    import tempfile
+    logger.info("🚀 TEST TELEGRAM DISPATCHER")
+    test_enqueue_returns_immediately()
+    logger.info("✅ Invio non bloccante")
+    with tempfile.TemporaryDirectory() as tmp_path:
+        test_retry_and_coalesced_logs(tmp_path)
+    logger.info("✅ Retry e log a blocchi")
+    test_bounded_queue_drops_when_full()
+    logger.info("✅ Coda limitata")
+    test_token_bucket_per_chat()
+    logger.info("✅ Token bucket per chat")
+    test_burst_coalesced_into_digest()
+    logger.info("✅ Riepilogo eventi in raffica")
+    with tempfile.TemporaryDirectory() as tmp_path:
+        test_spool_without_token(tmp_path)
+    logger.info("✅ Spool retry senza token")
+
+if __name__ == "__main__":
+    main()
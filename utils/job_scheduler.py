@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+"""
+⏰ JOB SCHEDULER
+Esecuzione pianificata dei controlli periodici fuori dal ciclo delle richieste
+Job con pianificazione in stile cron, deduplica degli alert già inviati e storico
+delle esecuzioni (tabelle in database/create_scheduled_jobs_tables.sql)
+
+Uso:
+    python -m utils.job_scheduler               # processo dedicato
+    python -m utils.job_scheduler --list        # job registrati e prossime esecuzioni
+    python -m utils.job_scheduler --run vps_expiry
+In alternativa start_job_scheduler() lo avvia come thread nel processo corrente.
+"""
+
+import os
+import sys
+import socket
+import logging
+import argparse
+import threading
+import uuid
+from datetime import datetime, date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Configurazione logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Configurazione scheduler
+SCHEDULER_TICK_SECONDS = float(os.getenv('SCHEDULER_TICK_SECONDS', 30))
+JOB_RUNS_TABLE = 'scheduled_job_runs'
+ALERTS_SENT_TABLE = 'scheduled_alerts_sent'
+
+# Soglie degli alert
+VPS_ALERT_THRESHOLDS = (7, 3, 1, 0)  # Giorni alla scadenza in cui avvisare (una volta per soglia)
+INCROCIO_LONG_OPEN_DAYS = int(os.getenv('INCROCIO_LONG_OPEN_DAYS', 7))
+
+# Numero massimo di valori per filtro in_() (evita URL troppo lunghi)
+IN_FILTER_CHUNK_SIZE = 200
+
+class CronSchedule:
+    """
+    Espressione cron a 5 campi: minuto ora giorno-mese mese giorno-settimana
+
+    Supporta *, valori, liste (1,15), intervalli (1-5) e passi (*/15, 0-30/10).
+    Giorno della settimana 0-6 con 0 = domenica (7 accettato come domenica);
+    se giorno-mese e giorno-settimana sono entrambi vincolati basta uno dei due.
+    """
+
+    FIELDS = [('minuto', 0, 59), ('ora', 0, 23), ('giorno', 1, 31), ('mese', 1, 12), ('giorno_settimana', 0, 7)]
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Espressione cron non valida (servono 5 campi): '{expression}'")
+
+        self.expression = expression
+        values = [self._parse_field(part, low, high) for part, (_, low, high) in zip(parts, self.FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {0 if d == 7 else d for d in weekdays}
+        self._day_restricted = parts[2] != '*'
+        self._weekday_restricted = parts[4] != '*'
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for item in field.split(','):
+            range_part, _, step = item.partition('/')
+            if range_part == '*':
+                start, end = low, high
+            elif '-' in range_part:
+                start, end = (int(v) for v in range_part.split('-', 1))
+            else:
+                start = end = int(range_part)
+                if step:
+                    end = high
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"Campo cron fuori intervallo: '{field}'")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, day: date) -> bool:
+        day_ok = day.day in self.days
+        weekday_ok = (day.weekday() + 1) % 7 in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def matches(self, moment: datetime) -> bool:
+        """True se il minuto indicato è pianificato"""
+        return (moment.minute in self.minutes and moment.hour in self.hours
+                and moment.month in self.months and self._day_matches(moment.date()))
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Primo minuto pianificato strettamente successivo a moment"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+
+        while candidate < limit:
+            if candidate.month not in self.months or not self._day_matches(candidate.date()):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+
+        raise ValueError(f"Nessuna esecuzione possibile per '{self.expression}'")
+
+class ScheduledJob:
+    """Job registrato: funzione eseguita secondo una pianificazione cron"""
+
+    def __init__(self, name: str, cron: str, func: Callable[['JobScheduler'], Tuple[int, str]], description: str = ''):
+        self.name = name
+        self.schedule = CronSchedule(cron)
+        self.func = func
+        self.description = description
+        self.next_run: Optional[datetime] = None
+        self.last_run: Optional[datetime] = None
+        self.last_status: Optional[str] = None
+        self.last_message: str = ''
+
+class JobScheduler:
+    """
+    Esegue i job pianificati in un thread (o nel processo dedicato)
+
+    Ogni job riceve lo scheduler e restituisce (elementi elaborati, messaggio); gli
+    alert passano da notify_many(), che scarta quelli già inviati (chiave di deduplica
+    salvata in scheduled_alerts_sent) e rispetta le impostazioni notifiche.
+    """
+
+    def __init__(self, supabase_manager=None, telegram_manager=None,
+                 tick_seconds: float = SCHEDULER_TICK_SECONDS, clock: Callable[[], datetime] = datetime.now):
+        self._supabase_manager = supabase_manager
+        self._telegram_manager = telegram_manager
+        self.tick_seconds = tick_seconds
+        self.clock = clock
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._sent_alerts: Set[str] = set()
+        self._history_available = True
+        self._alerts_table_available = True
+        self.host = socket.gethostname()
+
+    # ===== DIPENDENZE (caricate al primo uso) =====
+
+    @property
+    def supabase_manager(self):
+        if self._supabase_manager is None:
+            from supabase_manager import SupabaseManager
+            self._supabase_manager = SupabaseManager()
+        return self._supabase_manager
+
+    @property
+    def telegram_manager(self):
+        if self._telegram_manager is None:
+            from components.telegram_manager import TelegramManager
+            self._telegram_manager = TelegramManager()
+        return self._telegram_manager
+
+    # ===== REGISTRAZIONE ED ESECUZIONE =====
+
+    def register(self, name: str, cron: str, func: Callable[['JobScheduler'], Tuple[int, str]], description: str = ''):
+        """Registra (o sostituisce) un job"""
+        job = ScheduledJob(name, cron, func, description)
+        job.next_run = job.schedule.next_after(self.clock())
+        with self._lock:
+            self.jobs[name] = job
+        return job
+
+    def restore_from_history(self):
+        """
+        Riprende la pianificazione dall'ultima esecuzione registrata di ogni job
+
+        Un'esecuzione saltata mentre il processo era fermo viene recuperata (una sola volta)
+        al primo controllo; i job senza storico partono dalla prossima esecuzione pianificata.
+        """
+        if not self._history_available or not self.supabase_manager.supabase:
+            return
+
+        with self._lock:
+            jobs = list(self.jobs.values())
+        try:
+            for job in jobs:
+                rows = self.supabase_manager.supabase.table(JOB_RUNS_TABLE)\
+                    .select('started_at, status, message')\
+                    .eq('job_name', job.name)\
+                    .order('started_at', desc=True)\
+                    .limit(1)\
+                    .execute().data or []
+                if not rows:
+                    continue
+                last_run = datetime.fromisoformat(str(rows[0]['started_at'])).replace(tzinfo=None)
+                job.last_run, job.last_status, job.last_message = last_run, rows[0]['status'], rows[0].get('message') or ''
+                job.next_run = min(job.next_run, job.schedule.next_after(last_run))
+        except Exception as e:
+            self._history_available = False
+            logger.warning(f"⚠️ Storico job non disponibile ({JOB_RUNS_TABLE}), pianificazione da adesso: {e}")
+
+    def run_pending(self, now: Optional[datetime] = None) -> List[str]:
+        """Esegue i job la cui esecuzione è scaduta; restituisce i nomi dei job eseguiti"""
+        now = now or self.clock()
+        with self._lock:
+            due = [job for job in self.jobs.values() if job.next_run and job.next_run <= now]
+
+        for job in due:
+            self.run_job(job.name)
+            # Un solo recupero anche se il processo è rimasto fermo per più esecuzioni
+            job.next_run = job.schedule.next_after(now)
+        return [job.name for job in due]
+
+    def run_job(self, name: str) -> Tuple[bool, str]:
+        """Esegue subito un job e ne registra l'esito nello storico"""
+        job = self.jobs[name]
+        started_at = self.clock()
+
+        try:
+            items, message = job.func(self)
+            status = 'success'
+            logger.info(f"✅ Job '{name}' completato: {message}")
+        except Exception as e:
+            items, message, status = 0, str(e), 'error'
+            logger.error(f"❌ Job '{name}' fallito: {e}")
+
+        job.last_run, job.last_status, job.last_message = started_at, status, message
+        self._record_run(job, started_at, self.clock(), status, items, message)
+        return status == 'success', message
+
+    def _record_run(self, job: ScheduledJob, started_at: datetime, finished_at: datetime,
+                    status: str, items: int, message: str):
+        """Scrive l'esecuzione in scheduled_job_runs (disattivato se la tabella non esiste)"""
+        if not self._history_available or not self.supabase_manager.supabase:
+            return
+
+        try:
+            self.supabase_manager.supabase.table(JOB_RUNS_TABLE).insert({
+                'id': str(uuid.uuid4()),
+                'job_name': job.name,
+                'started_at': started_at.isoformat(),
+                'finished_at': finished_at.isoformat(),
+                'duration_ms': int((finished_at - started_at).total_seconds() * 1000),
+                'status': status,
+                'items': items,
+                'message': message[:1000],
+                'host': self.host
+            }).execute()
+        except Exception as e:
+            self._history_available = False
+            logger.warning(f"⚠️ Storico job non disponibile ({JOB_RUNS_TABLE}): {e}")
+
+    def get_history(self, job_name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Ultime esecuzioni registrate (più recenti prima)"""
+        try:
+            query = self.supabase_manager.supabase.table(JOB_RUNS_TABLE).select('*')
+            if job_name:
+                query = query.eq('job_name', job_name)
+            return query.order('started_at', desc=True).limit(limit).execute().data or []
+        except Exception as e:
+            logger.error(f"❌ Errore lettura storico job: {e}")
+            return []
+
+    def get_status(self) -> Dict[str, Any]:
+        """Stato dello scheduler e dei job registrati"""
+        with self._lock:
+            return {
+                'running': self.running,
+                'tick_seconds': self.tick_seconds,
+                'jobs': {
+                    job.name: {
+                        'cron': job.schedule.expression,
+                        'description': job.description,
+                        'next_run': job.next_run.isoformat() if job.next_run else None,
+                        'last_run': job.last_run.isoformat() if job.last_run else 'Mai',
+                        'last_status': job.last_status,
+                        'last_message': job.last_message
+                    }
+                    for job in self.jobs.values()
+                }
+            }
+
+    # ===== THREAD =====
+
+    def start(self) -> bool:
+        """Avvia lo scheduler in un thread di background"""
+        if self.running:
+            logger.warning("⚠️ Scheduler già attivo")
+            return False
+
+        self.restore_from_history()
+        self.running = True
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._loop, name='job-scheduler', daemon=True)
+        self.thread.start()
+        logger.info(f"⏰ Scheduler avviato con {len(self.jobs)} job")
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """Ferma lo scheduler"""
+        self.running = False
+        self._stop.set()
+        if self.thread:
+            self.thread.join(timeout)
+        logger.info("⏰ Scheduler fermato")
+
+    def _loop(self):
+        """Ciclo principale: controlla i job scaduti ogni tick"""
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error(f"❌ Errore ciclo scheduler: {e}")
+            self._stop.wait(self.tick_seconds)
+
+    # ===== ALERT CON DEDUPLICA =====
+
+    def filter_new_alerts(self, keys: Iterable[str]) -> Set[str]:
+        """Chiavi di alert non ancora inviate (una query in_() per blocco di chiavi)"""
+        keys = set(keys) - self._sent_alerts
+        if not keys or not self._alerts_table_available or not self.supabase_manager.supabase:
+            return keys
+
+        gia_inviate = set()
+        try:
+            ordered = sorted(keys)
+            for start in range(0, len(ordered), IN_FILTER_CHUNK_SIZE):
+                response = self.supabase_manager.supabase.table(ALERTS_SENT_TABLE)\
+                    .select('alert_key')\
+                    .in_('alert_key', ordered[start:start + IN_FILTER_CHUNK_SIZE])\
+                    .execute()
+                gia_inviate.update(row['alert_key'] for row in response.data or [])
+        except Exception as e:
+            self._alerts_table_available = False
+            logger.warning(f"⚠️ Deduplica persistente non disponibile ({ALERTS_SENT_TABLE}), uso solo memoria: {e}")
+
+        self._sent_alerts.update(gia_inviate)
+        return keys - gia_inviate
+
+    def mark_alerts_sent(self, keys: Iterable[str], job_name: str):
+        """Registra le chiavi degli alert inviati"""
+        keys = sorted(set(keys))
+        if not keys:
+            return
+
+        self._sent_alerts.update(keys)
+        if not self._alerts_table_available or not self.supabase_manager.supabase:
+            return
+
+        try:
+            sent_at = self.clock().isoformat()
+            self.supabase_manager.supabase.table(ALERTS_SENT_TABLE).upsert(
+                [{'alert_key': key, 'job_name': job_name, 'sent_at': sent_at} for key in keys],
+                on_conflict='alert_key', ignore_duplicates=True
+            ).execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Errore salvataggio alert inviati: {e}")
+
+    def notify_many(self, job_name: str, notification_type: str,
+                    alerts: List[Tuple[Optional[str], Dict[str, Any]]]) -> int:
+        """
+        Invia una notifica per ogni (chiave di deduplica, dati) non ancora inviata
+
+        Le chiavi None non vengono deduplicate (es. report periodici già limitati dal cron).
+
+        Returns:
+            Numero di notifiche accodate
+        """
+        if not alerts or not self.supabase_manager.is_notification_enabled(notification_type):
+            return 0
+
+        telegram = self.telegram_manager
+        if not telegram.is_configured:
+            logger.info(f"📱 Telegram non configurato, alert '{notification_type}' non inviati")
+            return 0
+
+        nuove = self.filter_new_alerts(key for key, _ in alerts if key)
+        inviate, chiavi_inviate = 0, []
+        for key, data in alerts:
+            if key and key not in nuove:
+                continue
+            success, message = telegram.send_notification(notification_type, data)
+            if success:
+                inviate += 1
+                if key:
+                    chiavi_inviate.append(key)
+            else:
+                logger.warning(f"⚠️ Alert '{notification_type}' non inviato: {message}")
+
+        self.mark_alerts_sent(chiavi_inviate, job_name)
+        return inviate
+
+# ===== JOB PREDEFINITI =====
+
+def _count(scheduler: JobScheduler, table: str, apply=lambda query: query) -> int:
+    """Conteggio esatto senza trasferire righe"""
+    query = scheduler.supabase_manager.supabase.table(table).select('id', count='exact', head=True)
+    return apply(query).execute().count or 0
+
+def _vps_manager():
+    from components.vps_manager import VPSManager
+    return VPSManager()
+
+def job_task_due_soon(scheduler: JobScheduler) -> Tuple[int, str]:
+    """Task che scadono tra 1 e 3 giorni: un alert per task e giorni rimanenti"""
+    from components.tasks_manager import TasksManager
+
+    alerts = [
+        (f"task_due_soon:{task.get('id')}:{task.get('due_date')}:{days_left}", {
+            'title': task.get('title', 'N/A'),
+            'days_left': days_left,
+            'assigned_to': task.get('assigned_to', []),
+            'priority': task.get('priority', 'N/A')
+        })
+        for task, days_left in TasksManager().get_tasks_due_soon()
+    ]
+    inviate = scheduler.notify_many('task_due_soon', 'task_due_soon', alerts)
+    return inviate, f"{len(alerts)} task in scadenza, {inviate} alert inviati"
+
+def job_vps_expiry(scheduler: JobScheduler) -> Tuple[int, str]:
+    """VPS in scadenza (una volta per soglia 7/3/1/0 giorni) e scaduti (una volta per rinnovo)"""
+    vps_list = _vps_manager().get_vps_expiring_soon(max(VPS_ALERT_THRESHOLDS))
+
+    expiring, expired = [], []
+    for vps in vps_list:
+        giorni = vps['giorni_rimanenti']
+        if giorni < 0:
+            expired.append((f"vps_expired:{vps['id']}:{vps['data_rinnovo']}", {
+                'nome_cliente': vps['nome_cliente'],
+                'vps_ip': vps['vps_ip'],
+                'vps_username': vps['vps_username'],
+                'data_rinnovo': vps['data_rinnovo'],
+                'prezzo_vps': vps.get('prezzo_vps')
+            }))
+        else:
+            soglia = min(t for t in VPS_ALERT_THRESHOLDS if t >= giorni)
+            expiring.append((f"vps_expiring:{vps['id']}:{vps['data_rinnovo']}:{soglia}", {
+                'cliente_nome': vps['nome_cliente'],
+                'ip_vps': vps['vps_ip'],
+                'days_left': giorni,
+                'prezzo_vps': vps.get('prezzo_vps')
+            }))
+
+    inviate = (scheduler.notify_many('vps_expiry', 'vps_expiring', expiring)
+               + scheduler.notify_many('vps_expiry', 'vps_expired', expired))
+    return inviate, f"{len(expiring)} VPS in scadenza, {len(expired)} scaduti, {inviate} alert inviati"
+
+def _long_open_crosses(scheduler: JobScheduler) -> List[Dict[str, Any]]:
+    """Incroci attivi aperti da almeno INCROCIO_LONG_OPEN_DAYS giorni"""
+    from components.incroci_close_manager import IncrociCloseManager
+
+    oggi = scheduler.clock().date()
+    risultato = []
+    for incrocio in IncrociCloseManager().get_active_crosses():
+        try:
+            aperto = datetime.fromisoformat(str(incrocio['data_apertura'])[:10]).date()
+        except ValueError:
+            continue
+        giorni = (oggi - aperto).days
+        if giorni >= INCROCIO_LONG_OPEN_DAYS:
+            risultato.append(dict(incrocio, days_open=giorni))
+    return risultato
+
+def job_incroci_long_open(scheduler: JobScheduler) -> Tuple[int, str]:
+    """Incroci aperti da troppo tempo: un alert ogni INCROCIO_LONG_OPEN_DAYS giorni di apertura"""
+    alerts = [
+        (f"incrocio_long_open:{incrocio['id']}:{incrocio['days_open'] // INCROCIO_LONG_OPEN_DAYS}", {
+            'nome_incrocio': incrocio['nome_incrocio'],
+            'days_open': incrocio['days_open'],
+            'lot_size': incrocio['volume_trading'],
+            'pair': incrocio['pair_trading'],
+            'cliente_long': (incrocio['cliente_long'] or {}).get('nome_cliente', 'N/A'),
+            'cliente_short': (incrocio['cliente_short'] or {}).get('nome_cliente', 'N/A')
+        })
+        for incrocio in _long_open_crosses(scheduler)
+    ]
+    inviate = scheduler.notify_many('incroci_long_open', 'incrocio_long_open_alert', alerts)
+    return inviate, f"{len(alerts)} incroci aperti da oltre {INCROCIO_LONG_OPEN_DAYS} giorni, {inviate} alert inviati"
+
+def job_daily_report(scheduler: JobScheduler) -> Tuple[int, str]:
+    """Report giornaliero generale (task, incroci, clienti, transazioni del giorno)"""
+    from components.tasks_manager import TasksManager, TaskStatus
+
+    oggi = scheduler.clock().date().isoformat()
+    tasks = TasksManager().get_tasks()
+    stati = [task.get('status') for task in tasks]
+
+    data = {
+        'date': scheduler.clock().strftime('%d/%m/%Y'),
+        'tasks_total': len(tasks),
+        'tasks_completed': stati.count(TaskStatus.COMPLETED.value),
+        'tasks_in_progress': stati.count(TaskStatus.IN_PROGRESS.value),
+        'incroci_attivi': _count(scheduler, 'incroci', lambda q: q.eq('stato', 'attivo')),
+        'incroci_chiusi': _count(scheduler, 'incroci', lambda q: q.eq('data_chiusura', oggi)),
+        'clienti_nuovi': _count(scheduler, 'clienti', lambda q: q.gte('created_at', oggi)),
+        'depositi': _count(scheduler, 'wallet_transactions',
+                           lambda q: q.eq('tipo_transazione', 'deposit').gte('created_at', oggi)),
+        'prelievi': _count(scheduler, 'wallet_transactions',
+                           lambda q: q.eq('tipo_transazione', 'withdrawal').gte('created_at', oggi))
+    }
+    inviate = scheduler.notify_many('daily_report', 'daily_report', [(f"daily_report:{oggi}", data)])
+    return inviate, f"report giornaliero {'inviato' if inviate else 'non inviato'}"
+
+def job_incroci_daily_report(scheduler: JobScheduler) -> Tuple[int, str]:
+    """Report giornaliero incroci: aperti, chiusi oggi, volume, top pair e incroci aperti da tempo"""
+    from database.incroci_manager import IncrociManager
+
+    oggi = scheduler.clock().date().isoformat()
+    stats = IncrociManager().ottieni_statistiche_incroci()
+    if not stats:
+        return 0, "statistiche incroci non disponibili"
+
+    top_pairs = sorted(stats['per_pair'], key=lambda item: item[2], reverse=True)
+    alerts = [f"{incrocio['nome_incrocio']} aperto da {incrocio['days_open']} giorni"
+              for incrocio in _long_open_crosses(scheduler)]
+
+    data = {
+        'date': scheduler.clock().strftime('%d/%m/%Y'),
+        'open_crosses': stats['generali']['incroci_attivi'],
+        'closed_today': _count(scheduler, 'incroci', lambda q: q.eq('data_chiusura', oggi)),
+        'total_volume': stats['generali']['volume_totale'],
+        'top_pairs': [{'pair': pair, 'volume': volume} for pair, _, volume in top_pairs],
+        'alerts': alerts
+    }
+    inviate = scheduler.notify_many('incroci_daily_report', 'incrocio_daily_report',
+                                    [(f"incrocio_daily_report:{oggi}", data)])
+    return inviate, f"report incroci {'inviato' if inviate else 'non inviato'}"
+
+def job_vps_monthly_report(scheduler: JobScheduler) -> Tuple[int, str]:
+    """Report mensile VPS (il primo del mese, sul mese precedente per i nuovi VPS)"""
+    vps_manager = _vps_manager()
+    all_vps = vps_manager.get_all_vps()
+    expiring = vps_manager.get_vps_expiring_soon(30)
+    scaduti = [vps for vps in expiring if vps['giorni_rimanenti'] < 0]
+
+    oggi = scheduler.clock().date()
+    inizio_mese = oggi.replace(day=1).isoformat()
+    inizio_mese_precedente = (oggi.replace(day=1) - timedelta(days=1)).replace(day=1)
+    costo_totale = sum(float(vps.get('prezzo_vps') or 0) for vps in all_vps)
+
+    data = {
+        'month': inizio_mese_precedente.strftime('%m/%Y'),
+        'total_vps': len(all_vps),
+        'active_vps': len(all_vps) - len(scaduti),
+        'expiring_vps': len(expiring) - len(scaduti),
+        'expired_vps': len(scaduti),
+        'total_cost': round(costo_totale, 2),
+        'average_cost': round(costo_totale / len(all_vps), 2) if all_vps else 0,
+        'new_vps': sum(1 for vps in all_vps
+                       if inizio_mese_precedente.isoformat() <= str(vps.get('created_at') or '')[:10] < inizio_mese),
+        'alerts': [f"{vps['nome_cliente']}: scaduto il {vps['data_rinnovo']}" for vps in scaduti]
+    }
+    inviate = scheduler.notify_many('vps_monthly_report', 'vps_monthly_report',
+                                    [(f"vps_monthly_report:{inizio_mese_precedente:%Y-%m}", data)])
+    return inviate, f"report mensile VPS {'inviato' if inviate else 'non inviato'}"
+
+def job_notification_log_retention(scheduler: JobScheduler) -> Tuple[int, str]:
+    """Retention dei log notifiche: svuota i testi più vecchi (i contatori giornalieri restano)"""
+    from components.telegram_manager import NOTIFICATION_LOG_RETENTION_DAYS
+    alleggeriti = scheduler.telegram_manager.trim_notification_logs(NOTIFICATION_LOG_RETENTION_DAYS)
+    return alleggeriti, f"{alleggeriti} log più vecchi di {NOTIFICATION_LOG_RETENTION_DAYS} giorni alleggeriti"
+
+# Job predefiniti: (nome, cron, funzione, descrizione)
+DEFAULT_JOBS = [
+    ('task_due_soon', '0 9 * * *', job_task_due_soon, "Alert task in scadenza (1-3 giorni)"),
+    ('vps_expiry', '0 8 * * *', job_vps_expiry, "Alert VPS in scadenza e scaduti"),
+    ('incroci_long_open', '0 10 * * *', job_incroci_long_open, "Alert incroci aperti da troppo tempo"),
+    ('daily_report', '0 20 * * *', job_daily_report, "Report giornaliero generale"),
+    ('incroci_daily_report', '5 20 * * *', job_incroci_daily_report, "Report giornaliero incroci"),
+    ('vps_monthly_report', '0 9 1 * *', job_vps_monthly_report, "Report mensile VPS"),
+    ('notification_log_retention', '30 3 * * *', job_notification_log_retention, "Retention testo log notifiche"),
+]
+
+def create_default_scheduler(**kwargs) -> JobScheduler:
+    """Scheduler con i job predefiniti registrati"""
+    scheduler = JobScheduler(**kwargs)
+    for name, cron, func, description in DEFAULT_JOBS:
+        scheduler.register(name, cron, func, description)
+    return scheduler
+
+_scheduler: Optional[JobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_job_scheduler() -> JobScheduler:
+    """Scheduler unico per processo"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = create_default_scheduler()
+        return _scheduler
+
+def start_job_scheduler() -> bool:
+    """Avvia lo scheduler come thread nel processo corrente"""
+    return get_job_scheduler().start()
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduler dei controlli periodici della dashboard")
+    parser.add_argument('--list', action='store_true', help="Mostra i job e le prossime esecuzioni")
+    parser.add_argument('--run', metavar='JOB', help="Esegue subito un job ed esce")
+    args = parser.parse_args()
+
+    scheduler = get_job_scheduler()
+
+    if args.list:
+        scheduler.restore_from_history()
+        for name, info in scheduler.get_status()['jobs'].items():
+            print(f"⏰ {name:28} {info['cron']:12} prossima: {info['next_run']}  {info['description']}")
+        return
+
+    if args.run:
+        if args.run not in scheduler.jobs:
+            print(f"❌ Job sconosciuto: {args.run}")
+            sys.exit(1)
+        success, message = scheduler.run_job(args.run)
+        from components.telegram_dispatcher import get_telegram_dispatcher
+        get_telegram_dispatcher().flush()
+        print(f"{'✅' if success else '❌'} {args.run}: {message}")
+        sys.exit(0 if success else 1)
+
+    scheduler.start()
+    try:
+        while scheduler.thread.is_alive():
+            scheduler.thread.join(1)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+if __name__ == "__main__":
+    main()
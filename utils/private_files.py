@@ -0,0 +1,29 @@
+"""
+🔒 FILE PRIVATI DELL'APPLICAZIONE
+Directory dati riservata all'utente che esegue la dashboard (0700) e file creati 0600,
+per cache e spool locali che non devono stare in percorsi prevedibili e condivisi come /tmp
+"""
+
+import os
+
+# Directory dati dell'applicazione (sovrascrivibile con DASHBOARD_CPA_DATA_DIR)
+APP_DATA_DIR = os.getenv(
+    'DASHBOARD_CPA_DATA_DIR',
+    os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'dashboard_cpa')
+)
+
+def private_path(filename: str) -> str:
+    """Percorso di un file nella directory dati privata, creata con permessi 0700 se manca"""
+    os.makedirs(APP_DATA_DIR, mode=0o700, exist_ok=True)
+    return os.path.join(APP_DATA_DIR, filename)
+
+def create_private_file(path: str):
+    """Crea il file (e la sua directory) con permessi 0600; se esiste già ne restringe i permessi"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_CREAT | os.O_WRONLY, 0o600)
+    try:
+        os.fchmod(fd, 0o600)
+    finally:
+        os.close(fd)
@@ -4,8 +4,10 @@
 Gestione completa di ruoli, permessi e autorizzazioni granulari per Supabase
 """
 
+import time
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+from typing import Dict, List, Optional, Any, Iterable
 import uuid
 from datetime import datetime
 from functools import wraps
@@ -16,7 +18,28 @@ from utils.translations import t
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Istanza globale del gestore permessi
+# Chiave di sessione del set di permessi compilato
+SESSION_PERMISSIONS_KEY = 'permessi_compilati'
+
+class CompiledPermissions:
+    """Ruoli e permessi di un utente risolti una volta e congelati (verifiche senza I/O)"""
+    
+    def __init__(self, user_id: str, roles: Iterable[str], permissions: Iterable[str], version: int):
+        self.user_id = str(user_id)
+        self.roles = frozenset(roles)
+        self.permissions = frozenset(permissions)
+        self.version = version
+        self.compiled_at = time.monotonic()
+    
+    def is_valid(self, version: int, ttl: float) -> bool:
+        """True se compilato con la versione corrente dei permessi e non scaduto"""
+        return self.version == version and time.monotonic() - self.compiled_at < ttl
+
+def _current_user_id() -> Optional[str]:
+    """ID dell'utente in sessione (auth_simple salva 'user_id', i sistemi precedenti 'id')"""
+    user_info = st.session_state.get('user_info') or {}
+    user_id = user_info.get('user_id') or user_info.get('id')
+    return str(user_id) if user_id else None
 
 class SupabasePermissionManager:
     """Gestore permessi per Supabase - Adattato alla struttura esistente"""
@@ -24,8 +47,10 @@ class SupabasePermissionManager:
     def __init__(self):
         """Inizializza il gestore permessi"""
         self._supabase = None
-        self._cache = {}
+        self._cache: Dict[str, CompiledPermissions] = {}
         self._cache_ttl = 300  # 5 minuti
+        self._version = 0  # Incrementato da ogni modifica a ruoli/permessi
+        self._lock = threading.Lock()
         
     def _get_supabase(self):
         """Ottiene l'istanza Supabase"""
@@ -40,8 +65,67 @@ class SupabasePermissionManager:
         return self._supabase
     
     def _clear_cache(self):
-        """Pulisce la cache"""
-        self._cache = {}
+        """Invalida i permessi compilati (processo e sessioni) incrementando la versione"""
+        with self._lock:
+            self._version += 1
+            self._cache = {}
+    
+    def get_compiled_permissions(self, user_id: str, refresh: bool = False) -> CompiledPermissions:
+        """
+        Ruoli e permessi dell'utente come frozenset
+        
+        Cerca prima nella sessione (solo per l'utente in sessione), poi nella cache di
+        processo; ricompila (query users.role + user_roles.permissions) solo se il TTL
+        è scaduto o la versione è cambiata dopo assign/revoke/grant.
+        
+        Raises:
+            Exception: errore di lettura di ruoli o permessi; in quel caso non viene
+                       salvato nulla né in sessione né nella cache di processo
+        """
+        user_id = str(user_id)
+        in_sessione = user_id == _current_user_id()
+        
+        if not refresh:
+            if in_sessione:
+                compiled = st.session_state.get(SESSION_PERMISSIONS_KEY)
+                if compiled is not None and compiled.user_id == user_id and compiled.is_valid(self._version, self._cache_ttl):
+                    return compiled
+            
+            with self._lock:
+                compiled = self._cache.get(user_id)
+            if compiled is not None and compiled.is_valid(self._version, self._cache_ttl):
+                if in_sessione:
+                    st.session_state[SESSION_PERMISSIONS_KEY] = compiled
+                return compiled
+        
+        # Versione letta prima delle query: una modifica concorrente invalida il risultato
+        version = self._version
+        try:
+            roles = self._fetch_user_roles(user_id)
+            permissions = set()
+            for role in roles:
+                permissions.update(self._fetch_role_permissions(role))
+        except Exception as e:
+            logger.error(f"❌ Compilazione permessi fallita per user_id {user_id} (non salvata in cache): {e}")
+            raise
+        
+        compiled = CompiledPermissions(user_id, roles, permissions, version)
+        with self._lock:
+            self._cache[user_id] = compiled
+        if in_sessione:
+            st.session_state[SESSION_PERMISSIONS_KEY] = compiled
+        logger.info(f"🛡️ Permessi compilati per user_id {user_id}: ruoli={sorted(compiled.roles)}, {len(compiled.permissions)} permessi")
+        return compiled
+    
+    def load_session_permissions(self) -> Optional[CompiledPermissions]:
+        """Risolve ruoli e permessi dell'utente in sessione (chiamato al login; in caso di errore al primo controllo)"""
+        user_id = _current_user_id()
+        if not user_id:
+            return None
+        try:
+            return self.get_compiled_permissions(user_id, refresh=True)
+        except Exception:
+            return None
     
     def get_user_id(self, username: str) -> Optional[str]:
         """Ottiene l'ID utente dal username"""
@@ -62,83 +146,72 @@ class SupabasePermissionManager:
             return None
     
     def get_user_roles(self, user_id: str) -> List[str]:
-        """Ottiene i ruoli di un utente dalla tabella users"""
+        """Ottiene i ruoli di un utente dalla tabella users ([] in caso di errore)"""
         try:
-            logger.info(f"🔍 DEBUG get_user_roles: user_id={user_id}")
-            
-            supabase = self._get_supabase()
-            if not supabase:
-                logger.error("❌ DEBUG get_user_roles: Supabase non disponibile")
-                return []
-            
-            # Gestisci sia UUID che integer per compatibilità
-            try:
-                # Prova prima con UUID (formato Supabase standard)
-                result = supabase.table('users').select('role').eq('id', user_id).execute()
-                logger.info(f"🔍 DEBUG get_user_roles: Risultato query UUID={result.data}")
-            except Exception as e:
-                # Se fallisce con UUID, prova con integer (sistema auth_simple)
-                logger.info(f"🔍 DEBUG get_user_roles: Fallback a integer per user_id={user_id}")
-                try:
-                    result = supabase.table('users').select('role').eq('id', int(user_id)).execute()
-                    logger.info(f"🔍 DEBUG get_user_roles: Risultato query integer={result.data}")
-                except Exception as e2:
-                    # Se anche integer fallisce, usa il ruolo dalla sessione
-                    logger.info(f"🔍 DEBUG get_user_roles: Usando ruolo dalla sessione per user_id={user_id}")
-                    if 'user_info' in st.session_state:
-                        user_info = st.session_state.user_info
-                        role = user_info.get('role')
-                        if role:
-                            logger.info(f"🔍 DEBUG get_user_roles: Ruolo dalla sessione={role}")
-                            return [role]
-                    return []
-            
-            if result.data and result.data[0]['role']:
-                roles = [result.data[0]['role']]
-                logger.info(f"🔍 DEBUG get_user_roles: Ruoli trovati={roles}")
-                return roles
-            
-            logger.warning(f"⚠️ DEBUG get_user_roles: Nessun ruolo trovato per user_id={user_id}")
-            return []
-            
+            return self._fetch_user_roles(user_id)
         except Exception as e:
             logger.error(f"❌ Errore ottenimento ruoli per user_id {user_id}: {e}")
             return []
     
+    def _fetch_user_roles(self, user_id: str) -> List[str]:
+        """Ruoli dell'utente dalla tabella users; gli errori di lettura vengono sollevati"""
+        logger.info(f"🔍 DEBUG get_user_roles: user_id={user_id}")
+        
+        supabase = self._get_supabase()
+        if not supabase:
+            raise RuntimeError("Supabase non disponibile")
+        
+        # Gestisci sia UUID che integer per compatibilità
+        try:
+            # Prova prima con UUID (formato Supabase standard)
+            result = supabase.table('users').select('role').eq('id', user_id).execute()
+            logger.info(f"🔍 DEBUG get_user_roles: Risultato query UUID={result.data}")
+        except Exception:
+            # Se fallisce con UUID, prova con integer (sistema auth_simple)
+            logger.info(f"🔍 DEBUG get_user_roles: Fallback a integer per user_id={user_id}")
+            try:
+                result = supabase.table('users').select('role').eq('id', int(user_id)).execute()
+                logger.info(f"🔍 DEBUG get_user_roles: Risultato query integer={result.data}")
+            except Exception:
+                # Se anche integer fallisce, usa il ruolo dalla sessione
+                role = (st.session_state.get('user_info') or {}).get('role')
+                if role:
+                    logger.info(f"🔍 DEBUG get_user_roles: Ruolo dalla sessione={role}")
+                    return [role]
+                raise
+        
+        if result.data and result.data[0]['role']:
+            roles = [result.data[0]['role']]
+            logger.info(f"🔍 DEBUG get_user_roles: Ruoli trovati={roles}")
+            return roles
+        
+        logger.warning(f"⚠️ DEBUG get_user_roles: Nessun ruolo trovato per user_id={user_id}")
+        return []
+    
     def get_role_permissions(self, role_name: str) -> List[str]:
-        """Ottiene i permessi di un ruolo dalla tabella user_roles"""
+        """Ottiene i permessi di un ruolo dalla tabella user_roles ([] in caso di errore)"""
         try:
-            supabase = self._get_supabase()
-            if not supabase:
-                return []
-            
-            # Ottieni i permessi dalla tabella user_roles
-            result = supabase.table('user_roles').select('permissions').eq('role_name', role_name).eq('is_active', True).execute()
-            
-            if result.data and result.data[0]['permissions']:
-                return result.data[0]['permissions']
-            return []
-            
+            return self._fetch_role_permissions(role_name)
         except Exception as e:
             logger.error(f"❌ Errore ottenimento permessi per ruolo {role_name}: {e}")
             return []
     
+    def _fetch_role_permissions(self, role_name: str) -> List[str]:
+        """Permessi del ruolo dalla tabella user_roles; gli errori di lettura vengono sollevati"""
+        supabase = self._get_supabase()
+        if not supabase:
+            raise RuntimeError("Supabase non disponibile")
+        
+        result = supabase.table('user_roles').select('permissions').eq('role_name', role_name).eq('is_active', True).execute()
+        
+        if result.data and result.data[0]['permissions']:
+            return result.data[0]['permissions']
+        return []
+    
     def get_user_permissions(self, user_id: str) -> List[str]:
         """Ottiene i permessi di un utente (combinati da ruolo e personalizzati)"""
         try:
-            # Ottieni il ruolo dell'utente
-            user_roles = self.get_user_roles(user_id)
-            if not user_roles:
-                return []
-            
-            # Ottieni i permessi del ruolo
-            all_permissions = []
-            for role in user_roles:
-                role_permissions = self.get_role_permissions(role)
-                all_permissions.extend(role_permissions)
-            
-            # Rimuovi duplicati
-            return list(set(all_permissions))
+            return sorted(self.get_compiled_permissions(user_id).permissions)
             
         except Exception as e:
             logger.error(f"❌ Errore ottenimento permessi per user_id {user_id}: {e}")
@@ -147,8 +220,7 @@ class SupabasePermissionManager:
     def has_permission(self, user_id: str, permission_name: str) -> bool:
         """Verifica se un utente ha un permesso specifico"""
         try:
-            user_permissions = self.get_user_permissions(user_id)
-            return permission_name in user_permissions
+            return permission_name in self.get_compiled_permissions(user_id).permissions
             
         except Exception as e:
             logger.error(f"❌ Errore verifica permesso {permission_name} per user_id {user_id}: {e}")
@@ -157,15 +229,7 @@ class SupabasePermissionManager:
     def has_role(self, user_id: str, role_name: str) -> bool:
         """Verifica se un utente ha un ruolo specifico"""
         try:
-            logger.info(f"🔍 DEBUG SupabasePermissionManager.has_role: user_id={user_id}, role_name={role_name}")
-            
-            user_roles = self.get_user_roles(user_id)
-            logger.info(f"🔍 DEBUG SupabasePermissionManager.has_role: user_roles={user_roles}")
-            
-            result = role_name in user_roles
-            logger.info(f"🔍 DEBUG SupabasePermissionManager.has_role: Risultato={result}")
-            
-            return result
+            return role_name in self.get_compiled_permissions(user_id).roles
             
         except Exception as e:
             logger.error(f"❌ Errore verifica ruolo {role_name} per user_id {user_id}: {e}")
@@ -370,8 +434,7 @@ def require_permission(permission_name: str):
                 st.error("❌ Accesso negato. Effettua il login.")
                 st.stop()
             
-            user_info = st.session_state.user_info
-            user_id = user_info.get('id')
+            user_id = _current_user_id()
             
             if not user_id:
                 st.error("❌ Utente non trovato nella sessione.")
@@ -395,8 +458,7 @@ def require_role(role_name: str):
                 st.error("❌ Accesso negato. Effettua il login.")
                 st.stop()
             
-            user_info = st.session_state.user_info
-            user_id = user_info.get('id')
+            user_id = _current_user_id()
             
             if not user_id:
                 st.error("❌ Utente non trovato nella sessione.")
@@ -420,8 +482,7 @@ def require_resource_access(resource: str, action: str):
                 st.error("❌ Accesso negato. Effettua il login.")
                 st.stop()
             
-            user_info = st.session_state.user_info
-            user_id = user_info.get('id')
+            user_id = _current_user_id()
             
             if not user_id:
                 st.error("❌ Utente non trovato nella sessione.")
@@ -442,8 +503,7 @@ def get_current_user_permissions() -> List[str]:
     if 'user_info' not in st.session_state:
         return []
     
-    user_info = st.session_state.user_info
-    user_id = user_info.get('id')
+    user_id = _current_user_id()
     
     if not user_id:
         return []
@@ -455,8 +515,7 @@ def get_current_user_roles() -> List[str]:
     if 'user_info' not in st.session_state:
         return []
     
-    user_info = st.session_state.user_info
-    user_id = user_info.get('id')
+    user_id = _current_user_id()
     
     if not user_id:
         return []
@@ -468,8 +527,7 @@ def can_access_resource(resource: str, action: str) -> bool:
     if 'user_info' not in st.session_state:
         return False
     
-    user_info = st.session_state.user_info
-    user_id = user_info.get('id')
+    user_id = _current_user_id()
     
     if not user_id:
         return False
@@ -481,8 +539,7 @@ def has_permission(permission_name: str) -> bool:
     if 'user_info' not in st.session_state:
         return False
     
-    user_info = st.session_state.user_info
-    user_id = user_info.get('id')
+    user_id = _current_user_id()
     
     if not user_id:
         return False
@@ -491,27 +548,17 @@ def has_permission(permission_name: str) -> bool:
 
 def has_role(role_name: str) -> bool:
     """Verifica se l'utente corrente ha un ruolo specifico"""
-    logger.info(f"🔍 DEBUG has_role: Verificando ruolo '{role_name}'")
-    
     if 'user_info' not in st.session_state:
-        logger.error("❌ DEBUG has_role: user_info non presente nella sessione")
+        logger.error("❌ has_role: user_info non presente nella sessione")
         return False
     
-    user_info = st.session_state.user_info
-    user_id = user_info.get('user_id') or user_info.get('id')
-    username = user_info.get('username')
-    role = user_info.get('role')
-    
-    logger.info(f"🔍 DEBUG has_role: user_id={user_id}, username={username}, role={role}")
+    user_id = _current_user_id()
     
     if not user_id:
-        logger.error("❌ DEBUG has_role: user_id non presente")
+        logger.error("❌ has_role: user_id non presente")
         return False
     
-    result = supabase_permission_manager.has_role(user_id, role_name)
-    logger.info(f"🔍 DEBUG has_role: Risultato verifica ruolo '{role_name}' = {result}")
-    
-    return result
+    return supabase_permission_manager.has_role(user_id, role_name)
 
 def get_current_user() -> Optional[Dict[str, Any]]:
     """Ottiene le informazioni dell'utente corrente dalla sessione"""